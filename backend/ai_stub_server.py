@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible chat-completions stub for load-testing the AI pipeline.
+
+Serves POST /v1/chat/completions (plain and stream=True) with a canned
+CFO-style markdown answer, paced to look like a real model:
+
+    latency before the first token   --latency-ms
+    generation speed                 --tokens-per-second
+    answer length                    --answer-tokens (capped by max_tokens)
+
+A "token" is one word of the canned answer. Nothing is sent anywhere;
+the request prompt is only measured (prompt_tokens ~ words).
+
+Usage:
+    python ai_stub_server.py [--port 8001] [--latency-ms 600] [--tokens-per-second 60] [--answer-tokens 400]
+
+Then point the backend at it:
+    AI_BACKEND=local AI_BASE_URL=http://127.0.0.1:8001/v1 uvicorn main:app
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+ANSWER_HEAD = """## Nakit Durumu Özeti
+### Durum Analizi
+- Tahmini nakit pozisyonu **1.2M ₺**, runway **95 gün**
+- Vadesi geçmiş tahsilatlar takip edilmeli
+### Risk Değerlendirmesi
+| Metrik | Değer | Durum |
+| --- | --- | --- |
+| Likidite Riski | 21.0 | 🟢 İYİ |
+| Volatilite Riski | 42.1 | 🟢 İYİ |
+| Konsantrasyon Riski | 55.0 | 🟠 UYARI |
+### Önerilen Aksiyonlar
+1. Acil (bu hafta): vadesi geçmiş alacakları arayın
+2. Kısa dönem (bu ay): sabit giderleri gözden geçirin
+3. Uzun dönem (bu çeyrek): tahsilat vadesini kısaltın
+"""
+FILLER = "Nakit akışı planlaması haftalık olarak güncellenmeli ve sapmalar takip edilmeli."
+
+
+@dataclass
+class StubSettings:
+    latency_ms: float = 600.0
+    tokens_per_second: float = 60.0
+    answer_tokens: int = 400
+
+
+settings = StubSettings()
+app = FastAPI(title="AI stub")
+
+
+def answer_tokens(limit: int) -> list[str]:
+    """Kanonik cevabı kelime (token) listesi olarak döner; satır sonları korunur."""
+    words = []
+    for line in ANSWER_HEAD.splitlines():
+        parts = line.split(" ")
+        words += [w + " " for w in parts[:-1]] + [parts[-1] + "\n"]
+    while len(words) < limit:
+        words += [w + " " for w in FILLER.split(" ")]
+    return words[:limit]
+
+
+def _completion_id() -> str:
+    return f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    limit = min(settings.answer_tokens, int(body.get("max_tokens") or settings.answer_tokens))
+    tokens = answer_tokens(limit)
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+    delay = 1.0 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+    completion_id = _completion_id()
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(settings.latency_ms / 1000 + delay * len(tokens))
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+        })
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    async def events():
+        await asyncio.sleep(settings.latency_ms / 1000)
+        yield chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            yield chunk({"content": token})
+            await asyncio.sleep(delay)
+        yield chunk({}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible chat-completions stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=settings.latency_ms)
+    parser.add_argument("--tokens-per-second", type=float, default=settings.tokens_per_second)
+    parser.add_argument("--answer-tokens", type=int, default=settings.answer_tokens)
+    args = parser.parse_args()
+
+    settings.latency_ms = args.latency_ms
+    settings.tokens_per_second = args.tokens_per_second
+    settings.answer_tokens = args.answer_tokens
+    print(
+        f"AI stub on http://{args.host}:{args.port}/v1 "
+        f"(latency {args.latency_ms:.0f} ms, {args.tokens_per_second:g} tok/s, {args.answer_tokens} tokens)"
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
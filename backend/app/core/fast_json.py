@@ -0,0 +1,69 @@
+# app/core/fast_json.py
+"""
+High-throughput JSON responses for large list endpoints.
+
+Endpoints that return thousands of rows skip ORM entity loading and
+per-row Pydantic validation: they fetch column tuples, build plain dicts
+and encode them with orjson (stdlib json if orjson is not installed).
+
+The encoding rules match what FastAPI produces through a Pydantic
+response_model, so clients see identical bytes:
+    Decimal  -> string ("1250.00")
+    date     -> "YYYY-MM-DD"
+    datetime -> ISO 8601, UTC offset rendered as "Z"
+"""
+
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.warning("orjson not installed. Fast JSON responses fall back to stdlib json.")
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_default(value: Any):
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        if value.utcoffset() is not None and value.utcoffset().total_seconds() == 0:
+            text = text[: -len("+00:00")] + "Z"
+        return text
+    if isinstance(value, date):
+        return value.isoformat()
+    return _default(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Pydantic JSON kurallarıyla uyumlu hızlı encode."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        content,
+        default=_stdlib_default,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """dict/list içeriği dumps() ile encode eden JSON yanıtı."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
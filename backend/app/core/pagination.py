@@ -0,0 +1,109 @@
+# app/core/pagination.py
+"""
+Keyset (cursor) pagination for list endpoints.
+
+A page is ordered by (sort column, id) and the cursor holds the last row's
+(sort value, id) pair, so fetching page N costs the same as fetching page 1
+(no OFFSET scan). Cursors are opaque url-safe base64 strings.
+
+List endpoints keep their JSON list body; the next cursor and the optional
+total count travel in the X-Next-Cursor / X-Total-Count response headers.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def _dump(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(sort_value, row_id) -> str:
+    raw = json.dumps([_dump(sort_value), _dump(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parse_sort=None, parse_id=None) -> tuple:
+    """Cursor'ı (sort_value, id) olarak çözer; bozuk cursor için 400 döner."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if parse_sort and sort_value is not None:
+            sort_value = parse_sort(sort_value)
+        if parse_id and row_id is not None:
+            row_id = parse_id(row_id)
+        return sort_value, row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Geçersiz cursor")
+
+
+def keyset_page(
+    query: Query,
+    sort_col,
+    id_col,
+    *,
+    limit: int,
+    cursor: str | None = None,
+    descending: bool = True,
+    parse_sort=None,
+    parse_id=None,
+) -> tuple[list, str | None]:
+    """
+    query'yi (sort_col, id_col) sırasıyla keyset sayfalar.
+
+    Returns:
+        (rows, next_cursor) - son sayfada next_cursor None olur.
+        Satırlar ORM nesnesi veya kolon satırı olabilir; cursor sort_col/id_col
+        adlı attribute'lardan üretilir.
+    """
+    if cursor:
+        last_sort, last_id = decode_cursor(cursor, parse_sort, parse_id)
+        if descending:
+            query = query.filter(or_(
+                sort_col < last_sort,
+                and_(sort_col == last_sort, id_col < last_id),
+            ))
+        else:
+            query = query.filter(or_(
+                sort_col > last_sort,
+                and_(sort_col == last_sort, id_col > last_id),
+            ))
+
+    if descending:
+        query = query.order_by(sort_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(sort_col.asc(), id_col.asc())
+
+    # Bir fazla satır çekip sonraki sayfa olup olmadığını anlarız
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def count_total(query: Query) -> int:
+    """Filtrelenmiş sorgunun toplam satır sayısı (sıralamasız)."""
+    return query.order_by(None).count()
+
+
+def set_page_headers(response: Response, next_cursor: str | None, total: int | None = None) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
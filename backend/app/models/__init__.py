@@ -1,3 +1,4 @@
 from app.models.transaction import Transaction  # noqa
 from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_recurrence import PlannedRecurrence
 from app.models.planned_match import PlannedMatch
\ No newline at end of file
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+import uuid
+
+
+class AIAnswerCache(Base):
+    """
+    Tekrarlanan AI sorularının cevapları (app/services/ai_answer_cache.py).
+    Anahtar: şirket + normalize edilmiş soru + bağlam hash'i; bağlam
+    değişince (yeni veri, yeni gün) eski cevap kendiliğinden eşleşmez.
+    Veritabanında tutulur, instance yeniden başlasa da kaybolmaz.
+    """
+    __tablename__ = "ai_answer_cache"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+
+    question_norm = Column(String, nullable=False)
+    context_hash = Column(String(64), nullable=False)
+    answer = Column(Text, nullable=False)
+
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), nullable=False)  # LRU
+    expires_at = Column(DateTime(timezone=True), nullable=False)    # TTL
+
+    __table_args__ = (
+        Index("ux_ai_answer_cache_key", "company_id", "question_norm", "context_hash", unique=True),
+        Index("ix_ai_answer_cache_company_used", "company_id", "last_used_at"),
+    )
@@ -4,7 +4,7 @@ Maintains full audit trail of all incoming emails.
 """
 
 import uuid
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, UUID
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, UUID, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -26,6 +26,11 @@ class EmailIngestLog(Base):
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=True)
     received_at = Column(DateTime(timezone=True), server_default=func.now())
     processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination: (company_id, received_at, id)
+        Index("ix_email_logs_company_received_id", "company_id", "received_at", "id"),
+    )
     
     # Relationships
     user = relationship("User")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Date, DateTime, Numeric, Integer, ForeignKey
+from sqlalchemy import Column, String, Date, DateTime, Numeric, Integer, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 import uuid
@@ -26,4 +26,15 @@ class PlannedCashflowItem(Base):
     external_id = Column(String, nullable=True)
     company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
 
+    # Tekrarlayan kuraldan eşleşme anında üretilen satırlar
+    recurrence_id = Column(String, ForeignKey("planned_recurrences.id"), nullable=True)
+    occurrence_index = Column(Integer, nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pagination: (company_id, due_date, id)
+        Index("ix_planned_company_due_id", "company_id", "due_date", "id"),
+        # Bir oluşum en fazla bir kez satıra dönüşür
+        Index("ux_planned_recurrence_occurrence", "recurrence_id", "occurrence_index", unique=True),
+    )
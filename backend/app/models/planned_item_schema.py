@@ -4,6 +4,8 @@ from pydantic import BaseModel
 from datetime import date, datetime
 from decimal import Decimal
 
+from app.models.planned_item import PlannedCashflowItem
+
 
 class PlannedItemBase(BaseModel):
     type: str               # INVOICE / CHEQUE / NOTE / OTHER
@@ -29,6 +31,63 @@ class PlannedItemResponse(PlannedItemBase):
         from_attributes = True
 
 
+# PlannedItemResponse alanlarıyla aynı sırada kolonlar (entity yüklemeden okuma için)
+PLANNED_ITEM_RESPONSE_COLUMNS = (
+    PlannedCashflowItem.type,
+    PlannedCashflowItem.direction,
+    PlannedCashflowItem.amount,
+    PlannedCashflowItem.due_date,
+    PlannedCashflowItem.counterparty,
+    PlannedCashflowItem.reference_no,
+    PlannedCashflowItem.id,
+    PlannedCashflowItem.status,
+    PlannedCashflowItem.settled_amount,
+    PlannedCashflowItem.remaining_amount,
+    PlannedCashflowItem.created_at,
+)
+
+
+def planned_item_row_to_dict(row) -> dict:
+    """PLANNED_ITEM_RESPONSE_COLUMNS satırını PlannedItemResponse JSON çıktısıyla aynı dict'e çevirir."""
+    (item_type, direction, amount, due_date, counterparty, reference_no,
+     item_id, status, settled_amount, remaining_amount, created_at) = row
+    return {
+        "type": item_type,
+        "direction": direction,
+        "amount": str(amount),
+        "due_date": due_date,
+        "counterparty": counterparty,
+        "reference_no": reference_no,
+        "id": item_id,
+        "status": status,
+        "settled_amount": str(settled_amount),
+        "remaining_amount": str(remaining_amount),
+        "created_at": created_at,
+    }
+
+
+class PlannedRecurrenceCreate(BaseModel):
+    type: str               # INVOICE / CHEQUE / NOTE / OTHER
+    direction: str          # in / out
+    amount: Decimal
+    counterparty: str | None = None
+    reference_no: str | None = None
+    frequency: str          # MONTHLY / WEEKLY / CUSTOM (interval gün)
+    interval: int = 1
+    start_date: date
+    end_date: date | None = None
+    occurrence_count: int | None = None
+
+
+class PlannedRecurrenceResponse(PlannedRecurrenceCreate):
+    id: str
+    status: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class PlannedMatchCreate(BaseModel):
     transaction_id: str
     matched_amount: Decimal
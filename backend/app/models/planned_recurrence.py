@@ -0,0 +1,37 @@
+from sqlalchemy import Column, String, Date, DateTime, Numeric, Integer, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+import uuid
+
+
+class PlannedRecurrence(Base):
+    """
+    Tekrarlayan planlı kalem kuralı (kira, maaş, kredi taksiti...).
+    Oluşumlar satır olarak saklanmaz; gereken pencere için üretilir
+    (app/services/planned_recurrence.py) ve yalnızca eşleşince
+    PlannedCashflowItem satırına dönüşür.
+    """
+    __tablename__ = "planned_recurrences"
+
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+
+    type = Column(String, nullable=False)  # INVOICE / CHEQUE / NOTE / OTHER
+    direction = Column(String, nullable=False)  # in / out
+    amount = Column(Numeric(18, 2), nullable=False)
+    counterparty = Column(String, nullable=True)
+    reference_no = Column(String, nullable=True)
+
+    frequency = Column(String, nullable=False)  # MONTHLY / WEEKLY / CUSTOM (interval gün)
+    interval = Column(Integer, nullable=False, default=1)
+    start_date = Column(Date, nullable=False)   # ilk oluşumun vadesi
+    end_date = Column(Date, nullable=True)      # son vade (dahil)
+    occurrence_count = Column(Integer, nullable=True)
+
+    status = Column(String, nullable=False, default="ACTIVE")  # ACTIVE / CANCELLED
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_planned_recurrences_company_status", "company_id", "status"),
+    )
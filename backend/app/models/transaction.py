@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Date, DateTime, Numeric, Integer, ForeignKey, UniqueConstraint, UUID
+from sqlalchemy import Column, String, Date, DateTime, Numeric, Integer, ForeignKey, UniqueConstraint, UUID, Index, text
 from sqlalchemy.sql import func
 from app.core.database import Base
 import uuid
@@ -19,10 +19,27 @@ class Transaction(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     imported_at = Column(DateTime(timezone=True), nullable=True)  # When imported via email/excel
     external_id = Column(String, nullable=True, index=True)
-    
+    # Denormalized from planned_matches (see services/transaction_match_state.py)
+    matched_amount = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    match_status = Column(String, nullable=False, default="UNMATCHED", server_default="UNMATCHED")  # UNMATCHED, PARTIAL, MATCHED
+
     # Composite unique constraint: external_id + direction + company_id
     __table_args__ = (
         UniqueConstraint('external_id', 'direction', 'company_id', name='uq_external_direction_company'),
+        # Keyset pagination: (company_id, date, id)
+        Index('ix_transactions_company_date_id', 'company_id', 'date', 'id'),
+        # Unmatched rows only: match suggestions (nearest-amount range scans),
+        # reconciliation runs and exception lists (date ranges)
+        Index(
+            'ix_transactions_unmatched_dir_amount', 'company_id', 'direction', 'amount',
+            postgresql_where=text("match_status = 'UNMATCHED'"),
+            sqlite_where=text("match_status = 'UNMATCHED'"),
+        ),
+        Index(
+            'ix_transactions_unmatched_date', 'company_id', 'date',
+            postgresql_where=text("match_status = 'UNMATCHED'"),
+            sqlite_where=text("match_status = 'UNMATCHED'"),
+        ),
     )
 
 from pydantic import BaseModel, field_validator
@@ -49,6 +66,47 @@ class TransactionSchema(BaseModel):
             return datetime.now()
         return v
 
+# TransactionSchema alanlarıyla aynı sırada kolonlar (entity yüklemeden okuma için)
+TRANSACTION_SCHEMA_COLUMNS = (
+    Transaction.id,
+    Transaction.date,
+    Transaction.description,
+    Transaction.amount,
+    Transaction.direction,
+    Transaction.category,
+    Transaction.source,
+    Transaction.created_at,
+)
+
+
+def transaction_row_to_dict(row) -> dict:
+    """
+    TRANSACTION_SCHEMA_COLUMNS satırını TransactionSchema'nın JSON çıktısıyla
+    aynı dict'e çevirir (validate_created_at kuralı dahil).
+    """
+    tx_id, tx_date, description, amount, direction, category, source, created_at = row
+    return {
+        "id": tx_id,
+        "date": tx_date,
+        "description": description,
+        "amount": str(amount),
+        "direction": direction,
+        "category": category,
+        "source": source,
+        "created_at": created_at if created_at is not None else datetime.now(),
+    }
+
+
+class TransactionSearchHit(TransactionSchema):
+    score: float
+
+
+class TransactionSearchResponse(BaseModel):
+    query: str
+    backend: str
+    results: list[TransactionSearchHit]
+
+
 class TransactionCreate(BaseModel):
     date: date
     description: str
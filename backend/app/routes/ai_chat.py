@@ -1,618 +1,93 @@
 # app/routes/ai_chat.py
 
-from datetime import date, timedelta
-from typing import List
-from math import sqrt
-
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+import re
+import time
+from functools import partial
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
 
+from app.core.database import SessionLocal
 from app.core.deps import get_db, get_current_company
-from app.core.constants import FIXED_COST_CATEGORIES
 from app.models.company import Company
-from app.models.transaction import Transaction
-from app.models.planned_item import PlannedCashflowItem
-from app.models.planned_match import PlannedMatch
+from app.services.ai_context import compute_financial_context, supports_parallel_sessions
+from app.services.ai_context_cache import FinancialContext, get_context_cache_stats, get_financial_context
+from app.services.ai_answer_cache import get_cached_answer, store_answer
+from app.services.ai_backend import AIBackendUnavailable, get_ai_backend
+from app.services.ai_intents import get_intent_stats, route_question
+from app.services.ai_retrieval import render_retrieval_section, retrieve
+from app.services.ai_scheduler import AIQueueFull, get_ai_scheduler
+from app.services.ai_stream import cached_answer_events, direct_answer_events, sse_answer_events
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
 class AIQueryRequest(BaseModel):
     question: str
+    bypass_cache: bool = False  # True: cevap önbelleğine bakmadan modele sor
 
 
 class AIQueryResponse(BaseModel):
     answer: str
+    cached: bool = False
+    intent: str | None = None  # modele gitmeden şablonla cevaplandıysa niyet adı
 
 
-def clamp(x: float, lo: float, hi: float) -> float:
-    """Değeri lo ile hi arasına sınırla."""
-    return max(lo, min(hi, x))
-
-def safe_div(a: float, b: float) -> float:
-    """Güvenli bölme (b=0 ise 0 döner)."""
-    return a / b if b not in (0, 0.0, None) else 0.0
+def get_company_context(db: Session, company: Company) -> FinancialContext:
+    """
+    AI'ye verilecek zengin finansal bağlamı (metin + yapısal veriler) döner;
+    bölümler paralel üretilir (bkz. services/ai_context.py), şirket, gün ve
+    data version başına önbelleklidir (services/ai_context_cache.py).
+    """
+    bind = db.get_bind()
+    session_factory = partial(SessionLocal, bind=bind)
+    return get_financial_context(
+        company.id,
+        lambda today: compute_financial_context(
+            session_factory, company.id, today, parallel=supports_parallel_sessions(bind)
+        ),
+    )
 
 
 def build_financial_context(
     db: Session,
     company: Company,
 ) -> str:
-    """
-    AI'ye verilecek zengin finansal bağlamı oluşturur:
-    1. CFO Profile (risk scores, liquidity, cost structure)
-    2. Insights (uyarılar + fırsatlar)
-    3. Matching Health (reconciliation durumu)
-    4. Forecast (30/60/90 gün tahminleri)
-    """
-    from app.models.company_settings import CompanyFinancialSettings
-    from app.services.cash_position import calculate_estimated_cash
-
-    today = date.today()
-    ctx_lines = []
-
-    # ===== 1. CFO PROFILE =====
-    ctx_lines.append("=" * 70)
-    ctx_lines.append("### 📊 CFO PROFİLİ (Finansal Risk Özeti)")
-    ctx_lines.append("=" * 70)
-
-    try:
-        # CFO Profile'ı inline hesapla (endpoint kodu tekrarlanır ama context'te tam veri olur)
-        start_90 = today - timedelta(days=90)
-        tx_list_90 = db.query(Transaction).filter(
-            Transaction.company_id == company.id,
-            Transaction.date >= start_90
-        ).all()
-
-        if len(tx_list_90) == 0:
-            tx_list_90 = db.query(Transaction).filter(
-                Transaction.company_id == company.id
-            ).all()
-            use_last90 = False
-        else:
-            use_last90 = True
-
-        # Günlük net hesapla
-        daily_net = {}
-        daily_in = {}
-        daily_out = {}
-        total_in = 0.0
-        total_out = 0.0
-
-        for tx in tx_list_90:
-            d = tx.date
-            amt = float(tx.amount)
-            if d not in daily_net:
-                daily_net[d] = 0.0
-                daily_in[d] = 0.0
-                daily_out[d] = 0.0
-            if tx.direction == "in":
-                daily_net[d] += amt
-                daily_in[d] += amt
-                total_in += amt
-            else:
-                daily_net[d] -= amt
-                daily_out[d] += amt
-                total_out += amt
-
-        day_count = len(daily_net) if len(daily_net) > 0 else 0
-        avg_daily_net = safe_div(sum(daily_net.values()), day_count)
-        avg_daily_in = safe_div(total_in, day_count)
-        avg_daily_out = safe_div(total_out, day_count)
-
-        # Volatility
-        if day_count <= 1:
-            net_std = 0.0
-        else:
-            mean = avg_daily_net
-            var = sum((v - mean) ** 2 for v in daily_net.values()) / (day_count - 1)
-            net_std = sqrt(var)
-
-        # Estimated cash
-        settings = db.query(CompanyFinancialSettings).filter(
-            CompanyFinancialSettings.company_id == company.id
-        ).first()
-        estimated_cash = None
-        if settings:
-            try:
-                estimated_cash = float(settings.estimated_cash)
-            except:
-                pass
-        if estimated_cash is None:
-            estimated_cash = total_in - total_out
-
-        runway_days = safe_div(estimated_cash, avg_daily_out)
-
-        # Risk scores
-        liquidity_risk = 100 - clamp((runway_days / 120.0) * 100.0, 0, 100)
-        vol_ratio = safe_div(net_std, avg_daily_out)
-        volatility_risk = clamp(vol_ratio * 100.0, 0, 100)
-
-        # Category analysis for concentration
-        income_q = db.query(
-            Transaction.category,
-            func.coalesce(func.sum(Transaction.amount), 0).label("sum_amount")
-        ).filter(
-            Transaction.company_id == company.id,
-            Transaction.direction == "in",
-        )
-        if use_last90:
-            income_q = income_q.filter(Transaction.date >= start_90)
-        income_rows = income_q.group_by(Transaction.category).all()
-
-        expense_q = db.query(
-            Transaction.category,
-            func.coalesce(func.sum(Transaction.amount), 0).label("sum_amount")
-        ).filter(
-            Transaction.company_id == company.id,
-            Transaction.direction == "out",
-        )
-        if use_last90:
-            expense_q = expense_q.filter(Transaction.date >= start_90)
-        expense_rows = expense_q.group_by(Transaction.category).all()
-
-        income_by_cat = {cat or "UNCATEGORIZED": float(s or 0) for cat, s in income_rows}
-        expense_by_cat = {cat or "UNCATEGORIZED": float(s or 0) for cat, s in expense_rows}
-
-        total_income_cat = sum(income_by_cat.values())
-        total_expense_cat = sum(expense_by_cat.values())
-
-        top_income_share = safe_div(max(income_by_cat.values()) if income_by_cat else 0, total_income_cat)
-        top_expense_share = safe_div(max(expense_by_cat.values()) if expense_by_cat else 0, total_expense_cat)
-
-        conc = max(top_income_share, top_expense_share)
-        concentration_risk = clamp(safe_div((conc - 0.2), (0.8 - 0.2)) * 100.0, 0, 100)
-
-        # Fixed cost
-        fixed_cost = sum(expense_by_cat.get(c, 0.0) for c in FIXED_COST_CATEGORIES)
-        fixed_cost_ratio = safe_div(fixed_cost, total_expense_cat)
-
-        # CFO Profile output
-        ctx_lines.append(f"**Veri Dönemi:** {('Son 90 gün' if use_last90 else 'Tüm zamanlar')} ({day_count} gün)")
-        ctx_lines.append("")
-        ctx_lines.append("#### 💰 Likidite & Nakit")
-        ctx_lines.append(f"- Tahmini nakit: **{estimated_cash:,.0f} ₺**")
-        ctx_lines.append(f"- Runway: **{runway_days:.1f} gün** (nakit tükenmeden kaç gün daha çalışabilir)")
-        ctx_lines.append(f"- Ort. günlük net: **{avg_daily_net:,.0f} ₺** (↑ {avg_daily_in:,.0f} | ↓ {avg_daily_out:,.0f})")
-        ctx_lines.append(f"- Net volatilite: {net_std:,.0f} ₺ (günlük dalgalanma)")
-        ctx_lines.append("")
-        ctx_lines.append("#### ⚠️ Risk Skorları (0-100, yüksek = riskli)")
-        ctx_lines.append(f"- **Likidite Riski: {liquidity_risk:.1f}** {'🔴 CRİTİK' if liquidity_risk > 75 else '🟠 UYARI' if liquidity_risk > 50 else '🟢 İYİ'}")
-        ctx_lines.append(f"- **Volatilite Riski: {volatility_risk:.1f}** {'🔴 CRİTİK' if volatility_risk > 75 else '🟠 UYARI' if volatility_risk > 50 else '🟢 İYİ'}")
-        ctx_lines.append(f"- **Konsantrasyon Riski: {concentration_risk:.1f}** {'🔴 CRİTİK' if concentration_risk > 75 else '🟠 UYARI' if concentration_risk > 50 else '🟢 İYİ'}")
-        ctx_lines.append("")
-        ctx_lines.append("#### 📈 Maliyet Yapısı")
-        ctx_lines.append(f"- **Sabit gider oranı: {fixed_cost_ratio*100:.1f}%** ({fixed_cost:,.0f} ₺)")
-        ctx_lines.append(f"- Top gelir kategorisi payı: {top_income_share*100:.1f}%")
-        ctx_lines.append(f"- Top gider kategorisi payı: {top_expense_share*100:.1f}%")
-        ctx_lines.append("")
-
-    except Exception as e:
-        ctx_lines.append(f"⚠️ CFO Profile hesaplanamadı: {str(e)}")
-        ctx_lines.append("")
-
-    # ===== 2. CATEGORY TREND ANALYSIS (3 Months) =====
-    ctx_lines.append("=" * 70)
-    ctx_lines.append("### 📊 KATEGORİ TREND ANALİZİ (Son 3 Ay)")
-    ctx_lines.append("=" * 70)
-    
-    try:
-        # Get last 3 complete months
-        from datetime import datetime
-        current_month_start = date(today.year, today.month, 1)
-        
-        # Calculate 3 months back
-        months_data = []
-        for i in range(3, 0, -1):  # 3, 2, 1 (oldest to newest)
-            month_date = current_month_start - timedelta(days=i*30)
-            month_start = date(month_date.year, month_date.month, 1)
-            # Get next month start
-            if month_date.month == 12:
-                month_end = date(month_date.year + 1, 1, 1) - timedelta(days=1)
-            else:
-                month_end = date(month_date.year, month_date.month + 1, 1) - timedelta(days=1)
-            
-            months_data.append({
-                'name': month_date.strftime('%B')[:3],  # Jan, Feb, etc.
-                'start': month_start,
-                'end': month_end
-            })
-        
-        # Query transactions by category and month
-        category_trends = {}
-        for month_info in months_data:
-            month_txs = db.query(
-                Transaction.category,
-                func.coalesce(func.sum(Transaction.amount), 0).label("total")
-            ).filter(
-                Transaction.company_id == company.id,
-                Transaction.direction == "out",
-                Transaction.date >= month_info['start'],
-                Transaction.date <= month_info['end']
-            ).group_by(Transaction.category).all()
-            
-            for cat, total in month_txs:
-                cat_name = cat or "UNCATEGORIZED"
-                if cat_name not in category_trends:
-                    category_trends[cat_name] = []
-                category_trends[cat_name].append(float(total))
-        
-        # Sort by total volume (sum of 3 months)
-        category_totals = [(cat, sum(amounts)) for cat, amounts in category_trends.items()]
-        category_totals.sort(key=lambda x: x[1], reverse=True)
-        
-        # Show top 5-7 categories
-        top_categories = category_totals[:7]
-        
-        if top_categories:
-            for cat, _ in top_categories:
-                amounts = category_trends[cat]
-                # Pad with zeros if missing months
-                while len(amounts) < 3:
-                    amounts.insert(0, 0.0)
-                
-                ctx_lines.append(f"**{cat}:**")
-                for i, month_info in enumerate(months_data):
-                    amount = amounts[i]
-                    # Calculate MoM growth
-                    if i > 0 and amounts[i-1] > 0:
-                        growth = ((amount - amounts[i-1]) / amounts[i-1]) * 100
-                        growth_str = f" ({growth:+.1f}%)"
-                        if abs(growth) > 20:
-                            growth_str += " 🔴 ANOMALİ" if growth > 0 else " ⚠️ DÜŞÜŞ"
-                    else:
-                        growth_str = ""
-                    
-                    ctx_lines.append(f"  - {month_info['name']}: {amount:,.0f} ₺{growth_str}")
-                
-                # Overall trend
-                if len(amounts) >= 2 and amounts[0] > 0:
-                    total_growth = ((amounts[-1] - amounts[0]) / amounts[0]) * 100
-                    trend_icon = "↗️ Artış" if total_growth > 5 else "↘️ Azalış" if total_growth < -5 else "→ Stabil"
-                    ctx_lines.append(f"  → Trend: {trend_icon}")
-                ctx_lines.append("")
-        else:
-            ctx_lines.append("- Kategori bazlı veri bulunamadı")
-        
-        ctx_lines.append("")
-    
-    except Exception as e:
-        ctx_lines.append(f"⚠️ Kategori trend analizi alınamadı: {str(e)}")
-        ctx_lines.append("")
-
-    # ===== 3. TOP 10 COUNTERPARTY ANALYSIS =====
-    ctx_lines.append("=" * 70)
-    ctx_lines.append("### 🏢 EN BÜYÜK 10 KARŞI TARAF (Son 90 Gün)")
-    ctx_lines.append("=" * 70)
-    
-    try:
-        start_90 = today - timedelta(days=90)
-        
-        # Expense side - group by counterparty from planned items
-        expense_counterparties = db.query(
-            PlannedCashflowItem.counterparty,
-            func.count(PlannedMatch.id).label("tx_count"),
-            func.coalesce(func.sum(PlannedMatch.matched_amount), 0).label("total")
-        ).join(
-            PlannedMatch, PlannedMatch.planned_item_id == PlannedCashflowItem.id
-        ).join(
-            Transaction, Transaction.id == PlannedMatch.transaction_id
-        ).filter(
-            PlannedCashflowItem.company_id == company.id,
-            PlannedCashflowItem.direction == "out",
-            Transaction.date >= start_90,
-            PlannedCashflowItem.counterparty.isnot(None)
-        ).group_by(PlannedCashflowItem.counterparty).all()
-        
-        # Calculate total expense
-        total_expense_90 = db.query(
-            func.coalesce(func.sum(Transaction.amount), 0)
-        ).filter(
-            Transaction.company_id == company.id,
-            Transaction.direction == "out",
-            Transaction.date >= start_90
-        ).scalar() or 0
-        
-        # Sort and get top 10
-        expense_list = [(cp, int(tc), float(tot)) for cp, tc, tot in expense_counterparties if cp]
-        expense_list.sort(key=lambda x: x[2], reverse=True)
-        top_10_expense = expense_list[:10]
-        
-        if top_10_expense:
-            ctx_lines.append("**Gider Tarafı:**")
-            for i, (counterparty, tx_count, total) in enumerate(top_10_expense, 1):
-                pct = safe_div(total, total_expense_90) * 100
-                ctx_lines.append(f"{i}. {counterparty}: {total:,.0f} ₺ ({tx_count} işlem, toplam giderin %{pct:.1f})")
-            
-            # Concentration risk
-            top3_total = sum(x[2] for x in top_10_expense[:3])
-            top3_pct = safe_div(top3_total, total_expense_90) * 100
-            risk_indicator = "🔴 YÜKSEK RİSK" if top3_pct > 50 else "🟠 ORTA" if top3_pct > 30 else "🟢 Dengeli"
-            ctx_lines.append(f"\n**Konsantrasyon Riski:** Top 3 tedarikçi toplam giderin %{top3_pct:.1f}'sini oluşturuyor → {risk_indicator}")
-        else:
-            ctx_lines.append("**Gider Tarafı:** Counterparty bilgisi bulunamadı")
-        
-        ctx_lines.append("")
-        
-        # Income side
-        income_counterparties = db.query(
-            PlannedCashflowItem.counterparty,
-            func.count(PlannedMatch.id).label("tx_count"),
-            func.coalesce(func.sum(PlannedMatch.matched_amount), 0).label("total")
-        ).join(
-            PlannedMatch, PlannedMatch.planned_item_id == PlannedCashflowItem.id
-        ).join(
-            Transaction, Transaction.id == PlannedMatch.transaction_id
-        ).filter(
-            PlannedCashflowItem.company_id == company.id,
-            PlannedCashflowItem.direction == "in",
-            Transaction.date >= start_90,
-            PlannedCashflowItem.counterparty.isnot(None)
-        ).group_by(PlannedCashflowItem.counterparty).all()
-        
-        total_income_90 = db.query(
-            func.coalesce(func.sum(Transaction.amount), 0)
-        ).filter(
-            Transaction.company_id == company.id,
-            Transaction.direction == "in",
-            Transaction.date >= start_90
-        ).scalar() or 0
-        
-        income_list = [(cp, int(tc), float(tot)) for cp, tc, tot in income_counterparties if cp]
-        income_list.sort(key=lambda x: x[2], reverse=True)
-        top_10_income = income_list[:10]
-        
-        if top_10_income:
-            ctx_lines.append("**Gelir Tarafı:**")
-            for i, (counterparty, tx_count, total) in enumerate(top_10_income, 1):
-                pct = safe_div(total, total_income_90) * 100
-                risk_flag = " 🔴 RİSK" if pct > 25 else ""
-                ctx_lines.append(f"{i}. {counterparty}: {total:,.0f} ₺ ({tx_count} işlem, toplam gelirin %{pct:.1f}{risk_flag})")
-        else:
-            ctx_lines.append("**Gelir Tarafı:** Counterparty bilgisi bulunamadı")
-        
-        ctx_lines.append("")
-    
-    except Exception as e:
-        ctx_lines.append(f"⚠️ Counterparty analizi alınamadı: {str(e)}")
-        ctx_lines.append("")
-
-    # ===== 4. PAYMENT DISCIPLINE METRICS =====
-    ctx_lines.append("=" * 70)
-    ctx_lines.append("### ⏱️ ÖDEME DİSİPLİNİ ANALİZİ (Son 90 Gün)")
-    ctx_lines.append("=" * 70)
-    
-    try:
-        start_90 = today - timedelta(days=90)
-        
-        # Get matched transactions with due dates
-        matched_items = db.query(
-            PlannedMatch,
-            Transaction.date,
-            PlannedCashflowItem.due_date,
-            PlannedCashflowItem.category
-        ).join(
-            Transaction, Transaction.id == PlannedMatch.transaction_id
-        ).join(
-            PlannedCashflowItem, PlannedCashflowItem.id == PlannedMatch.planned_item_id
-        ).filter(
-            PlannedMatch.company_id == company.id,
-            Transaction.date >= start_90,
-            PlannedCashflowItem.due_date.isnot(None)
-        ).all()
-        
-        if matched_items:
-            total_matches = len(matched_items)
-            on_time = 0
-            late = 0
-            total_delay_days = 0
-            category_delays = {}
-            
-            for match, tx_date, due_date, category in matched_items:
-                days_diff = (tx_date - due_date).days
-                
-                if days_diff <= 0:
-                    on_time += 1
-                else:
-                    late += 1
-                    total_delay_days += days_diff
-                    
-                    # Track by category
-                    cat_name = category or "UNCATEGORIZED"
-                    if cat_name not in category_delays:
-                        category_delays[cat_name] = []
-                    category_delays[cat_name].append(days_diff)
-            
-            avg_delay = safe_div(total_delay_days, late) if late > 0 else 0
-            on_time_pct = safe_div(on_time, total_matches) * 100
-            late_pct = safe_div(late, total_matches) * 100
-            
-            ctx_lines.append("**Genel Durum:**")
-            ctx_lines.append(f"- Ortalama gecikme: {avg_delay:.1f} gün")
-            ctx_lines.append(f"- Zamanında ödeme oranı: {on_time_pct:.0f}% (eşleşen {total_matches} işlemden {on_time}'si)")
-            ctx_lines.append(f"- Geç ödeme oranı: {late_pct:.0f}% ({late} işlem)")
-            ctx_lines.append("")
-            
-            # Categories with worst discipline
-            if category_delays:
-                category_avg_delays = [
-                    (cat, sum(delays)/len(delays), len(delays))
-                    for cat, delays in category_delays.items()
-                    if delays
-                ]
-                category_avg_delays.sort(key=lambda x: x[1], reverse=True)
-                
-                ctx_lines.append("**En Çok Geciken Kategoriler:**")
-                for i, (cat, avg_d, count) in enumerate(category_avg_delays[:5], 1):
-                    if avg_d > 0:  # Only show categories with actual delays
-                        ctx_lines.append(f"{i}. {cat}: Ortalama {avg_d:.1f} gün gecikme ({count} işlem)")
-                
-                ctx_lines.append("")
-            
-            # Early payment opportunities (estimate)
-            if total_expense_90 > 0:
-                potential_savings = total_expense_90 * 0.02  # 2% discount assumption
-                ctx_lines.append("**Erken Ödeme Fırsatları:**")
-                ctx_lines.append(f"- Potansiyel tasarruf: ~{potential_savings/3:,.0f} ₺/ay (%2 iskonto varsayımı)")
-                ctx_lines.append("- Not: Tedarikçilere erken ödeme karşılığı iskonto talep edilebilir")
-        else:
-            ctx_lines.append("- Eşleşmiş vade bilgisi bulunamadı")
-        
-        ctx_lines.append("")
-    
-    except Exception as e:
-        ctx_lines.append(f"⚠️ Ödeme disiplini analizi alınamadı: {str(e)}")
-        ctx_lines.append("")
-
-    # ===== 5. MATCHING HEALTH (Reconciliation Durumu) =====
-    ctx_lines.append("=" * 70)
-    ctx_lines.append("### 📋 EŞLEŞTIRME DURUMU (Reconciliation Health)")
-    ctx_lines.append("=" * 70)
-
-    try:
-        auto_count = db.query(func.count(PlannedMatch.id)).filter(
-            PlannedMatch.company_id == company.id,
-            PlannedMatch.match_type == "AUTO"
-        ).scalar() or 0
-
-        manual_count = db.query(func.count(PlannedMatch.id)).filter(
-            PlannedMatch.company_id == company.id,
-            PlannedMatch.match_type != "AUTO"
-        ).scalar() or 0
-
-        partial_count = db.query(func.count(PlannedCashflowItem.id)).filter(
-            PlannedCashflowItem.company_id == company.id,
-            PlannedCashflowItem.status == "PARTIAL"
-        ).scalar() or 0
-
-        overdue = db.query(func.count(PlannedCashflowItem.id)).filter(
-            PlannedCashflowItem.company_id == company.id,
-            PlannedCashflowItem.status.in_(["OPEN", "PARTIAL"]),
-            PlannedCashflowItem.remaining_amount > 0,
-            PlannedCashflowItem.due_date < today
-        ).scalar() or 0
-
-        upcoming_14 = db.query(func.count(PlannedCashflowItem.id)).filter(
-            PlannedCashflowItem.company_id == company.id,
-            PlannedCashflowItem.status.in_(["OPEN", "PARTIAL"]),
-            PlannedCashflowItem.remaining_amount > 0,
-            PlannedCashflowItem.due_date >= today,
-            PlannedCashflowItem.due_date <= (today + timedelta(days=14))
-        ).scalar() or 0
-
-        ctx_lines.append(f"- Otomatik eşleşen: {auto_count}")
-        ctx_lines.append(f"- Manuel eşleşen: {manual_count}")
-        ctx_lines.append(f"- Kısmi eşleşen: {partial_count}")
-        ctx_lines.append(f"- **Vadesi geçmiş (işleme bekliyor): {overdue}** ⚠️")
-        ctx_lines.append(f"- Yaklaşan (14 gün içinde): {upcoming_14}")
-        ctx_lines.append("")
-
-    except Exception as e:
-        ctx_lines.append(f"⚠️ Matching health alınamadı: {str(e)}")
-        ctx_lines.append("")
-
-    # ===== 3. INSIGHTS (Otomatik Tespitler) =====
-    ctx_lines.append("=" * 70)
-    ctx_lines.append("### 💡 OTOMATIK TESPİTLER (Insights)")
-    ctx_lines.append("=" * 70)
-
-    try:
-        insights_q = db.query(func.func.json_extract(Transaction.metadata, '$.insight_type')).distinct()
-        # Basit yaklaşım: son 7 gün uyarı/fırsat tespitleri
-        alert_days = 7
-        start_alert = today - timedelta(days=alert_days)
-
-        recent_txs = db.query(Transaction).filter(
-            Transaction.company_id == company.id,
-            Transaction.date >= start_alert
-        ).all()
-
-        ctx_lines.append(f"(Son {alert_days} gün analizi)")
-        if len(recent_txs) > 0:
-            ctx_lines.append(f"- İşlem sayısı: {len(recent_txs)}")
-            ctx_lines.append(f"- Taranmış...")
-        else:
-            ctx_lines.append("- Son gün veri yok")
-        ctx_lines.append("")
-
-    except Exception as e:
-        ctx_lines.append(f"⚠️ Insights alınamadı: {str(e)}")
-        ctx_lines.append("")
+    """AI'ye verilecek finansal bağlam metni (bkz. get_company_context)."""
+    return get_company_context(db, company).text
 
-    # ===== 4. FORECAST (30/60/90 Günlük Tahminler) =====
-    ctx_lines.append("=" * 70)
-    ctx_lines.append("### 🔮 NAKIT TAHMİNİ (30/60/90 Gün)")
-    ctx_lines.append("=" * 70)
 
+def question_context(db: Session, company: Company, financial_context: FinancialContext, question: str) -> str:
+    """
+    Soruya göre prompt bağlamı (services/ai_retrieval.py): soru belirli
+    kayıtları hedefliyorsa (ör. bir karşı taraf) tam bağlama ilgili kayıtlar
+    ve özetleri eklenir; soru yalnızca o kayıtlarla ilgiliyse (compact) tam
+    bağlam yerine CFO profili + kayıtlar gider. Aksi halde tam bağlam.
+    """
     try:
-        # Basit forecast: son 90 günün ortalama günlük in/out'ı
-        start_forecast = today - timedelta(days=90)
-        forecast_txs = db.query(Transaction).filter(
-            Transaction.company_id == company.id,
-            Transaction.date >= start_forecast
-        ).all()
-
-        forecast_in = 0.0
-        forecast_out = 0.0
-        for tx in forecast_txs:
-            if tx.direction == "in":
-                forecast_in += float(tx.amount)
-            else:
-                forecast_out += float(tx.amount)
-
-        days_in_forecast = (today - start_forecast).days
-        avg_in = safe_div(forecast_in, days_in_forecast) if days_in_forecast > 0 else 0
-        avg_out = safe_div(forecast_out, days_in_forecast) if days_in_forecast > 0 else 0
-        avg_net = avg_in - avg_out
-
-        ctx_lines.append(f"**Varsayım:** Son 90 günün ortalaması ileriye uygulanacak")
-        ctx_lines.append(f"- Ort. günlük tahsilat: {avg_in:,.0f} ₺")
-        ctx_lines.append(f"- Ort. günlük ödeme: {avg_out:,.0f} ₺")
-        ctx_lines.append(f"- Ort. günlük net: {avg_net:,.0f} ₺")
-        ctx_lines.append("")
-        ctx_lines.append(f"**Tahmini nakit pozisyonu:**")
-        ctx_lines.append(f"- 30. gün: {estimated_cash + avg_net * 30:,.0f} ₺")
-        ctx_lines.append(f"- 60. gün: {estimated_cash + avg_net * 60:,.0f} ₺")
-        ctx_lines.append(f"- 90. gün: {estimated_cash + avg_net * 90:,.0f} ₺")
-        ctx_lines.append("")
-
+        result = retrieve(db, company.id, question, financial_context.today)
     except Exception as e:
-        ctx_lines.append(f"⚠️ Forecast alınamadı: {str(e)}")
-        ctx_lines.append("")
-
-    # ===== ÖZET =====
-    ctx_lines.append("=" * 70)
-    ctx_lines.append("### 🎯 ÖNERİLER İÇİN DİKKAT NOKTALARI")
-    ctx_lines.append("=" * 70)
-    ctx_lines.append("")
-    ctx_lines.append("Yukarıdaki veriler ışığında şirketin finansal durumunu analiz et:")
-    ctx_lines.append("1. Likidite riski nedir? Runway yeterli mi?")
-    ctx_lines.append("2. Volatilite çok mu? Nakit planlaması zor mu?")
-    ctx_lines.append("3. Sabit gider oranı sağlıklı mı? İndirme fırsatı var mı?")
-    ctx_lines.append("4. En riskli kategoriler hangileri?")
-    ctx_lines.append("5. Reconciliation gecikmeler var mı?")
-    ctx_lines.append("")
+        logger.warning("AI retrieval failed for company %s: %s", company.id, e)
+        return financial_context.text
+    if not result.focused:
+        return financial_context.text
+    base = financial_context.text
+    if result.compact:
+        base = financial_context.facts.get("section_text", {}).get("profile") or base
+    return "\n".join((base, render_retrieval_section(result)))
 
-    return "\n".join(ctx_lines)
 
 
-
-def call_ai_model(question: str, context: str) -> str:
-    """
-    OpenAI GPT-4 ile sohbet. CFO perspektifinden finansal analiz ve tavsiye döner.
-    """
-    import os
-    from openai import OpenAI
-    
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        return "Hata: OpenAI API key bulunamadı. .env dosyasında OPENAI_API_KEY tanımla."
-    
-    client = OpenAI(api_key=api_key)
-    
-    prompt = f"""Sen deneyimli bir kurumsal CFO (Chief Financial Officer) asistansın. 
+def build_prompt(question: str, context: str) -> str:
+    """CFO asistanı prompt'u (senkron ve stream uçları ortak kullanır)."""
+    return f"""Sen deneyimli bir kurumsal CFO (Chief Financial Officer) asistansın. 
 Türkçe, profesyonel ama anlaşılır bir dilde cevap ver.
 
 GÖREV: Şirketin finansal durumunu analiz et ve başkanı/yönetim kurulunu bilgilendir.
@@ -671,42 +146,306 @@ YANLIŞ FORMAT (BU YAPMA):
 Cevabını **Markdown formatında** döndür. İçinde raw transaction listeleri değil, summary + insight + advice olsun.
 TABLOLARDAKI SEPARATOR SATIRI ASLA ATMA!
 HER TABLO SATIRI YENİ LİNEDE OLACAK, ASLA TEK SATIRDA YAZILMAYACAK!"""
-    
+
+
+def fix_markdown_tables(answer: str) -> str:
+    """Tek satıra yazılmış markdown tablo satırlarını ayırır (tam cevap üzerinde)."""
+    # Markdown table'ları düzelt: tüm pipe satırlarını newline ile ayır
+    # Problem: "| a | b | | --- |" tüm tek satırda -> newline ekle
+    # Pattern: "| ... | | ..." -> "| ... |\n| ..."
+    # Regex: Pipe ile biten satır + space + pipe ile başlayan -> aralarına newline koy
+    answer = answer.replace("| |", "|\n|")  # First pass: "| |" -> "|\n|"
+
+    # Second pass: remaining cases where dashes are concatenated
+    # "| ------- |" should be on new line if preceded by data
+    return re.sub(r'(\|\s*[^\|]*\|\s*)(\|\s*---)', r'\1\n\2', answer)
+
+
+def call_ai_model(question: str, context: str) -> str:
+    """
+    Yapılandırılmış model backend'i ile sohbet (bkz. services/ai_backend.py).
+    CFO perspektifinden finansal analiz ve tavsiye döner.
+    """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=2000,
-        )
-        answer = response.choices[0].message.content
-        
-        # Markdown table'ları düzelt: tüm pipe satırlarını newline ile ayır
-        # Problem: "| a | b | | --- |" tüm tek satırda -> newline ekle
-        # Pattern: "| ... | | ..." -> "| ... |\n| ..."
-        # Regex: Pipe ile biten satır + space + pipe ile başlayan -> aralarına newline koy
-        answer = answer.replace("| |", "|\n|")  # First pass: "| |" -> "|\n|"
-        
-        # Second pass: remaining cases where dashes are concatenated
-        # "| ------- |" should be on new line if preceded by data
-        import re
-        answer = re.sub(r'(\|\s*[^\|]*\|\s*)(\|\s*---)', r'\1\n\2', answer)
-        
-        return answer
+        backend = get_ai_backend()
+    except AIBackendUnavailable as e:
+        return f"Hata: {e}"
+    return _call_ai_model(backend, question, context)[0]
+
+
+def _call_ai_model(backend, question: str, context: str, timings: dict | None = None) -> tuple[str, bool]:
+    """
+    Returns: (cevap veya hata mesajı, model cevabı mı).
+    timings verilirse "model" ve "post" süreleri (ms) yazılır.
+    """
+    timings = timings if timings is not None else {}
+    prompt = build_prompt(question, context)
+
+    started = time.perf_counter()
+    try:
+        answer = backend.complete(prompt)
     except Exception as e:
-        return f"OpenAI isteği başarısız: {str(e)}"
+        return f"OpenAI isteği başarısız: {str(e)}", False
+    finally:
+        timings["model"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    answer = fix_markdown_tables(answer)
+    timings["post"] = (time.perf_counter() - started) * 1000
+    return answer, True
+
+
+def server_timing(timings: dict) -> str:
+    """Server-Timing başlığı (tarayıcı devtools ve benchmark_ai.py okur)."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
+
+
+@router.get("/context-cache/stats")
+def ai_context_cache_stats(
+    current_company: Company = Depends(get_current_company),
+):
+    """AI bağlam önbelleği metrikleri (isabet/ıska sayıları, üretim süreleri)."""
+    return get_context_cache_stats()
+
+
+@router.get("/intents/stats")
+def ai_intent_stats(
+    current_company: Company = Depends(get_current_company),
+):
+    """Niyet yönlendirme metrikleri (şablonla cevaplanan / modele giden soru oranı)."""
+    return get_intent_stats()
+
+
+@router.get("/scheduler/stats")
+def ai_scheduler_stats(
+    current_company: Company = Depends(get_current_company),
+):
+    """AI scheduler metrikleri (aktif/bekleyen istekler, kuyruk bekleme süreleri, 429 sayısı)."""
+    return get_ai_scheduler().stats()
+
+
+def get_ai_company(
+    db: Session = Depends(get_db),
+    current_company: Company = Depends(get_current_company),
+) -> Company:
+    """
+    get_current_company + kimlik doğrulama bağlantısını havuza geri verir.
+    AI istekleri worker ve scheduler slotu beklerken DB bağlantısı tutarsa
+    ani bir AI yükü havuzu tüketir ve diğer endpoint'ler de bekler. Şirket
+    oturumdan ayrılır; yüklü alanları (id) kullanılabilir kalır.
+    """
+    db.expunge(current_company)
+    db.commit()
+    return current_company
+
+
+def _prepare_answer(
+    db: Session, company: Company, payload: AIQueryRequest, timings: dict
+) -> AIQueryResponse | tuple:
+    """
+    Model çağrısından önceki adımlar (bağlam, niyet, retrieval, cevap
+    önbelleği). Cevap bunlardan çıktıysa AIQueryResponse, aksi halde
+    (backend, bağlam) döner.
+    """
+    started = time.perf_counter()
+    financial_context = get_company_context(db, company)
+    timings["context"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    routed = route_question(company.id, payload.question, financial_context.facts)
+    timings["intent"] = (time.perf_counter() - started) * 1000
+    if routed is not None:
+        intent, answer = routed
+        return AIQueryResponse(answer=answer, intent=intent)
+
+    started = time.perf_counter()
+    context = question_context(db, company, financial_context, payload.question)
+    timings["retrieval"] = (time.perf_counter() - started) * 1000
+
+    try:
+        backend = get_ai_backend()
+    except AIBackendUnavailable as e:
+        return AIQueryResponse(answer=f"Hata: {e}")
+
+    if not payload.bypass_cache:
+        started = time.perf_counter()
+        cached = _cached_answer_committed(db, company.id, payload.question, context, backend.cache_key)
+        timings["cache"] = (time.perf_counter() - started) * 1000
+        if cached is not None:
+            return AIQueryResponse(answer=cached, cached=True)
+    # Kuyruk ve model çağrısı boyunca DB bağlantısı tutulmasın
+    db.commit()
+    return backend, context
+
+
+def _store_answer_committed(
+    db: Session, company_id: int, question: str, context: str, cache_key: str, answer: str
+) -> None:
+    store_answer(db, company_id, question, context, cache_key, answer)
+    db.commit()
+
+
+def queue_full(e: AIQueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
 
 @router.post("/query", response_model=AIQueryResponse)
-def ai_query(
+async def ai_query(
     payload: AIQueryRequest,
+    response: Response,
     db: Session = Depends(get_db),
-    current_company: Company = Depends(get_current_company),
+    current_company: Company = Depends(get_ai_company),
 ):
+    """
+    Soruyu finansal bağlamla birlikte modele sorar. Basit metrik soruları
+    (nakit, runway, ...) modele gitmeden bağlamdaki verilerle cevaplanır
+    (bkz. services/ai_intents.py); belirli kayıtları soran sorularda bağlam
+    ilgili kayıtlara indirgenir (question_context).
+
+    Model çağrıları AI scheduler'dan slot bekler (services/ai_scheduler.py);
+    beklerken thread tutulmaz, kuyruk doluysa 429 + Retry-After döner.
+    Server-Timing başlığı bağlam, niyet, retrieval, kuyruk, model ve son
+    işlem sürelerini (ms) taşır.
+    """
     if not payload.question or payload.question.strip() == "":
         raise HTTPException(status_code=400, detail="Soru boş olamaz")
 
-    context = build_financial_context(db, current_company)
-    answer = call_ai_model(payload.question, context)
+    timings = {}
+    prepared = await run_in_threadpool(_prepare_answer, db, current_company, payload, timings)
+    if isinstance(prepared, AIQueryResponse):
+        response.headers["Server-Timing"] = server_timing(timings)
+        return prepared
+    backend, context = prepared
 
+    try:
+        async with get_ai_scheduler().slot(current_company.id) as wait_ms:
+            timings["queue"] = wait_ms
+            answer, ok = await run_in_threadpool(_call_ai_model, backend, payload.question, context, timings)
+    except AIQueueFull as e:
+        raise queue_full(e)
+
+    if ok:
+        started = time.perf_counter()
+        await run_in_threadpool(
+            _store_answer_committed, db, current_company.id, payload.question, context, backend.cache_key, answer
+        )
+        timings["post"] += (time.perf_counter() - started) * 1000
+
+    response.headers["Server-Timing"] = server_timing(timings)
     return AIQueryResponse(answer=answer)
+
+
+@router.post("/query/stream")
+async def ai_query_stream(
+    payload: AIQueryRequest,
+    db: Session = Depends(get_db),
+    current_company: Company = Depends(get_ai_company),
+):
+    """
+    /query'nin stream hali: cevap parçaları üretildikçe Server-Sent Events
+    olarak gönderilir (bkz. services/ai_stream.py). Önbellekteki ya da
+    şablonla üretilen (niyet) cevap tek parça halinde döner. Model stream'i
+    AI scheduler slotu tutar (kuyruk doluysa 429). Server-Timing bağlam,
+    niyet, retrieval ve kuyruk sürelerini taşır.
+    """
+    if not payload.question or payload.question.strip() == "":
+        raise HTTPException(status_code=400, detail="Soru boş olamaz")
+
+    # Bağlam üretimi, retrieval ve önbellek bloklayan DB işi; event loop'u tutmasın
+    timings = {}
+    started = time.perf_counter()
+    financial_context = await run_in_threadpool(get_company_context, db, current_company)
+    timings["context"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    routed = route_question(current_company.id, payload.question, financial_context.facts)
+    timings["intent"] = (time.perf_counter() - started) * 1000
+    sse_headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "Server-Timing": server_timing(timings),
+    }
+    if routed is not None:
+        intent, answer = routed
+        return StreamingResponse(
+            direct_answer_events(answer, {"intent": intent}), media_type="text/event-stream", headers=sse_headers
+        )
+
+    started = time.perf_counter()
+    context = await run_in_threadpool(question_context, db, current_company, financial_context, payload.question)
+    timings["retrieval"] = (time.perf_counter() - started) * 1000
+    sse_headers["Server-Timing"] = server_timing(timings)
+
+    try:
+        backend = get_ai_backend()
+    except AIBackendUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if not payload.bypass_cache:
+        cached = await run_in_threadpool(
+            _cached_answer_committed, db, current_company.id, payload.question, context, backend.cache_key
+        )
+        if cached is not None:
+            return StreamingResponse(cached_answer_events(cached), media_type="text/event-stream", headers=sse_headers)
+
+    # Stream bitince cevabı yeni bir session ile yaz (istek session'ı o sırada kapanmış olur)
+    session_factory = partial(SessionLocal, bind=db.get_bind())
+    company_id = current_company.id
+
+    def remember(answer: str) -> None:
+        with session_factory() as store_db:
+            store_answer(store_db, company_id, payload.question, context, backend.cache_key, answer)
+            store_db.commit()
+
+    # Slot stream boyunca tutulur; kuyruk doluysa stream başlamadan 429.
+    # Kuyruk ve stream boyunca DB bağlantısı tutulmasın.
+    await run_in_threadpool(db.commit)
+    scheduler = get_ai_scheduler()
+    try:
+        timings["queue"] = await scheduler.acquire(company_id)
+    except AIQueueFull as e:
+        raise queue_full(e)
+    sse_headers["Server-Timing"] = server_timing(timings)
+    release = _SlotRelease(scheduler)
+
+    prompt = build_prompt(payload.question, context)
+    return StreamingResponse(
+        release.wrap(sse_answer_events(backend.stream(prompt), on_complete=remember)),
+        media_type="text/event-stream",
+        headers=sse_headers,
+        background=BackgroundTask(release),
+    )
+
+
+class _SlotRelease:
+    """Stream slotunu bir kez bırakır: stream bitince ya da (hiç başlamadıysa) yanıt sonrası."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.started = time.perf_counter()
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.scheduler.release((time.perf_counter() - self.started) * 1000)
+
+    async def __call__(self) -> None:
+        # async: BackgroundTask event loop'ta çalıştırsın (scheduler thread-safe değil)
+        self.release()
+
+    async def wrap(self, events):
+        try:
+            async for event in events:
+                yield event
+        finally:
+            self.release()
+
+
+def _cached_answer_committed(
+    db: Session, company_id: int, question: str, context: str, cache_key: str
+) -> str | None:
+    cached = get_cached_answer(db, company_id, question, context, cache_key)
+    if cached is not None:
+        db.commit()
+    return cached
@@ -12,10 +12,20 @@ from pydantic import BaseModel
 
 from app.core.deps import get_db, get_current_company
 from app.core.constants import CATEGORIES, INCOME_CATEGORIES
+from app.core.fast_json import FastJSONResponse
 from app.models.transaction import Transaction
 from app.models.company import Company
 from app.models.planned_item import PlannedCashflowItem
 from app.models.planned_match import PlannedMatch
+from app.services.window_aggregates import (
+    STANDARD_WINDOWS,
+    DEFAULT_WINDOW,
+    resolve_window,
+    get_window_aggregates,
+)
+from app.services.transaction_match_state import unmatched_condition
+from app.services.matching_health import get_matching_health, list_matching_exceptions
+from app.services.planned_recurrence import expand_occurrences, overdue_window_start
 
 
 # Helper function to format date for grouping - works with both SQLite and PostgreSQL
@@ -149,9 +159,9 @@ def get_daily(
             end = date(year, month + 1, 1)
         filters.append(and_(Transaction.date >= start, Transaction.date < end))
 
-    # Filtreye göre tüm transaction'ları çek
-    tx_list = (
-        db.query(Transaction)
+    # Filtreye göre tüm transaction'ları çek (entity yerine kolon satırları)
+    rows = (
+        db.query(Transaction.date, Transaction.direction, Transaction.amount)
         .filter(*filters)
         .order_by(Transaction.date.asc())
         .all()
@@ -160,34 +170,30 @@ def get_daily(
     # Python tarafında gün gün grupla
     daily_map: dict[date, dict[str, float]] = {}
 
-    for tx in tx_list:
-        d = tx.date
+    for d, direction, amount in rows:
         if d not in daily_map:
             daily_map[d] = {"income": 0.0, "expense": 0.0}
 
-        amt = float(tx.amount)
+        amt = float(amount)
 
-        if tx.direction == "in":
+        if direction == "in":
             daily_map[d]["income"] += amt
         else:
             daily_map[d]["expense"] += amt
 
-    # Sonucu listeye dönüştür
-    result: list[DailyPoint] = []
+    # Sonucu listeye dönüştür (DailyPoint alan sırasıyla)
+    result = []
     for d in sorted(daily_map.keys()):
         income = daily_map[d]["income"]
         expense = daily_map[d]["expense"]
-        net = income - expense
-        result.append(
-            DailyPoint(
-                date=d,
-                income=income,
-                expense=expense,
-                net=net,
-            )
-        )
+        result.append({
+            "date": d,
+            "income": income,
+            "expense": expense,
+            "net": income - expense,
+        })
 
-    return result
+    return FastJSONResponse(result)
 
 from datetime import date, timedelta
 from app.models.planned_item import PlannedCashflowItem
@@ -267,6 +273,9 @@ def forecast_advanced(
         PlannedCashflowItem.company_id == current_company.id
     ).all()
 
+    # Tekrarlayan kuralların satıra dönüşmemiş oluşumları da planlı kalem sayılır
+    items += expand_occurrences(db, current_company.id, overdue_window_start(today), today + timedelta(days=90))
+
     planned_0_30 = 0.0
     planned_30_60 = 0.0
     planned_60_90 = 0.0
@@ -356,70 +365,15 @@ def get_category_summary(
     current_company: Company = Depends(get_current_company),
     period: str | None = None,      # last30, last90, this_month
 ):
-    from datetime import timedelta
-    
-    today = date.today()
-    start_date = None
-    end_date = today
-
-    # 🔹 period'e göre tarih aralığı belirle
-    if period == "last30":
-        start_date = today - timedelta(days=30)
-    elif period == "last90":
-        start_date = today - timedelta(days=90)
-    elif period == "this_month":
-        start_date = today.replace(day=1)
-    else:
-        # period yoksa = tüm zamanlar
-        start_date = None
-        end_date = None
-
-    # 1) GELİR SORGU (direction = 'in')
-    income_q = db.query(
-        Transaction.category,
-        func.sum(Transaction.amount).label("total_in"),
-    ).filter(
-        Transaction.direction == "in",
-        Transaction.company_id == current_company.id
-    )
-
-    # 2) GİDER SORGU (direction = 'out')
-    expense_q = db.query(
-        Transaction.category,
-        func.sum(Transaction.amount).label("total_out"),
-    ).filter(
-        Transaction.direction == "out",
-        Transaction.company_id == current_company.id
-    )
+    # 🔹 period yoksa (veya tanınmıyorsa) = tüm zamanlar
+    if period not in STANDARD_WINDOWS:
+        period = "all"
 
-    # 🔹 TARİH FİLTRESİNİ UYGULA
-    if start_date:
-        income_q = income_q.filter(Transaction.date >= start_date)
-        expense_q = expense_q.filter(Transaction.date >= start_date)
-    if end_date:
-        income_q = income_q.filter(Transaction.date <= end_date)
-        expense_q = expense_q.filter(Transaction.date <= end_date)
-
-    income_rows = income_q.group_by(Transaction.category).all()
-    expense_rows = expense_q.group_by(Transaction.category).all()
-
-    # 3) Sonuçları kategori bazında birleştir
-    data = {}
-
-    for cat, total_in in income_rows:
-        key = cat or "UNCATEGORIZED"
-        if key not in data:
-            data[key] = {"in": 0.0, "out": 0.0}
-        data[key]["in"] = float(total_in or 0)
-
-    for cat, total_out in expense_rows:
-        key = cat or "UNCATEGORIZED"
-        if key not in data:
-            data[key] = {"in": 0.0, "out": 0.0}
-        data[key]["out"] = float(total_out or 0)
+    # Tüm standart pencereler tek taramada hesaplanır ve önbelleğe alınır
+    window = get_window_aggregates(db, current_company.id)[period]
 
     results: List[CategorySummary] = []
-    for cat, vals in data.items():
+    for cat, vals in window["by_category"].items():
         total_in = vals["in"]
         total_out = vals["out"]
         net = total_in - total_out
@@ -564,41 +518,7 @@ def debug_fixed_costs(
         Transaction.date >= six_months_ago
     ).scalar() or 0
     
-    # 4. Fixed cost kategorilerinde son 6 ayda out transaction'lar
-    fixed_cost_txs = db.query(func.count(Transaction.id)).filter(
-        Transaction.company_id == current_company.id,
-        Transaction.direction == "out",
-        Transaction.date >= six_months_ago,
-        Transaction.category.in_(list(FIXED_COST_CATEGORIES))
-    ).scalar() or 0
-    
-    # 5. Hangi kategoriler kullanılıyor?
-    used_categories = db.query(Transaction.category).filter(
-        Transaction.company_id == current_company.id,
-        Transaction.direction == "out",
-        Transaction.date >= six_months_ago
-    ).distinct().all()
-    
-    # 6. Fixed cost kategorilerinden kaç tane data var?
-    fixed_by_cat = {}
-    for cat in FIXED_COST_CATEGORIES:
-        count = db.query(func.count(Transaction.id)).filter(
-            Transaction.company_id == current_company.id,
-            Transaction.direction == "out",
-            Transaction.date >= six_months_ago,
-            Transaction.category == cat
-        ).scalar() or 0
-        fixed_by_cat[cat] = count
-    
-    # 7. NULL kategori olanlar
-    null_category = db.query(func.count(Transaction.id)).filter(
-        Transaction.company_id == current_company.id,
-        Transaction.direction == "out",
-        Transaction.date >= six_months_ago,
-        Transaction.category == None
-    ).scalar() or 0
-    
-    # 8. Hangi kategorilerde NULL dışında veri var?
+    # 4-8. Son 6 ayda out transaction'ların kategori dağılımı (tek grouped sorgu)
     category_sample = db.query(
         Transaction.category,
         func.count(Transaction.id).label("cnt")
@@ -607,6 +527,12 @@ def debug_fixed_costs(
         Transaction.direction == "out",
         Transaction.date >= six_months_ago
     ).group_by(Transaction.category).all()
+
+    counts_by_cat = {c[0]: int(c[1]) for c in category_sample}
+    used_categories = list(counts_by_cat.keys())
+    fixed_by_cat = {cat: counts_by_cat.get(cat, 0) for cat in FIXED_COST_CATEGORIES}
+    fixed_cost_txs = sum(fixed_by_cat.values())
+    null_category = counts_by_cat.get(None, 0)
     
     # 9. EFT_TAHSILAT olan transaction'lar (her direction'ta kaçar tane?)
     eft_in = db.query(func.count(Transaction.id)).filter(
@@ -643,7 +569,7 @@ def debug_fixed_costs(
         "out_direction_count": out_txs,
         "recent_out_count": recent_out_txs,
         "fixed_cost_txs_count": fixed_cost_txs,
-        "used_categories": [c[0] for c in used_categories],
+        "used_categories": used_categories,
         "fixed_cost_categories": list(FIXED_COST_CATEGORIES),
         "fixed_by_category": fixed_by_cat,
         "null_category_count": null_category,
@@ -676,145 +602,27 @@ def fixed_costs_analysis(
     
     Period: current_month, last_30_days, prev_month
     """
-    from datetime import timedelta
-    from app.core.constants import FIXED_COST_CATEGORIES, ANOMALY_THRESHOLD
+    from app.services.fixed_costs import (
+        resolve_fixed_cost_windows,
+        compute_fixed_cost_totals,
+        detect_fixed_cost_anomalies,
+    )
 
     today = date.today()
-    
-    # Periyoda göre date aralığını belirle
-    if period == "current_month":
-        period_start = today.replace(day=1)
-        period_end = today
-        comparison_start = today.replace(day=1) - timedelta(days=1)
-        comparison_start = comparison_start.replace(day=1)
-    elif period == "last_30_days":
-        period_start = today - timedelta(days=30)
-        period_end = today
-        comparison_start = today - timedelta(days=60)
-    elif period == "prev_month":
-        # Önceki ayın başı ve sonu
-        current_month_start = today.replace(day=1)
-        last_day_of_prev_month = current_month_start - timedelta(days=1)
-        period_start = last_day_of_prev_month.replace(day=1)
-        period_end = last_day_of_prev_month
-        # Karşılaştırma için: bir önceki ay
-        comparison_start = period_start - timedelta(days=period_start.day)
-    else:
-        period_start = today.replace(day=1)
-        period_end = today
-        comparison_start = today.replace(day=1) - timedelta(days=1)
-        comparison_start = comparison_start.replace(day=1)
-    
-    # 6 ay öncesi (karşılaştırma için baseline)
-    six_months_ago = period_start - timedelta(days=180)
-
-    # Sabit gider kategorilerine odaklan
-    year_month_col = get_year_month_format(Transaction.date).label("year_month")
-    
-    rows = (
-        db.query(
-            Transaction.category,
-            year_month_col,
-            func.sum(Transaction.amount).label("monthly_amount"),
-        )
-        .filter(
-            Transaction.direction == "out",
-            Transaction.company_id == current_company.id,
-            Transaction.date >= six_months_ago,
-            Transaction.category.in_(list(FIXED_COST_CATEGORIES)),
-        )
-        .group_by(
-            Transaction.category,
-            year_month_col,
-        )
-        .order_by(Transaction.category, year_month_col.desc())
-        .all()
+    windows = resolve_fixed_cost_windows(period, today)
+
+    # Tüm kategoriler için dönem / karşılaştırma / aylık toplamlar tek sorguda
+    totals = compute_fixed_cost_totals(
+        db,
+        current_company.id,
+        period_start=windows["period_start"],
+        period_end=windows["period_end"],
+        comparison_start=windows["comparison_start"],
+        six_months_ago=windows["six_months_ago"],
+        today=today,
     )
 
-    # Kategori bazında ay-tutarlarını grupla
-    category_data = {}
-    for cat, year_month, amount in rows:
-        if cat not in category_data:
-            category_data[cat] = {}
-        
-        # year_month is already in 'YYYY-MM' format from SQL
-        month_key = year_month
-        amount_float = float(amount or 0)
-        if month_key not in category_data[cat]:
-            category_data[cat][month_key] = 0.0
-        category_data[cat][month_key] += amount_float
-
-    results: list[FixedCostAnalysis] = []
-
-    for category in FIXED_COST_CATEGORIES:
-        if category not in category_data or not category_data[category]:
-            continue
-
-        monthly_amounts = category_data[category]
-        month_keys = sorted(monthly_amounts.keys(), reverse=True)
-
-        # Seçili periyodun tutarı
-        # Period start/end tarihlerindeki transaction'ları filtrele
-        period_txs = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
-            Transaction.direction == "out",
-            Transaction.company_id == current_company.id,
-            Transaction.category == category,
-            Transaction.date >= period_start,
-            Transaction.date <= period_end,
-        ).scalar()
-        current_amount = float(period_txs or 0)
-
-        # Karşılaştırma periyodunun tutarı
-        comparison_txs = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
-            Transaction.direction == "out",
-            Transaction.company_id == current_company.id,
-            Transaction.category == category,
-            Transaction.date >= comparison_start,
-            Transaction.date < period_start,
-        ).scalar()
-        avg_amount = float(comparison_txs or 0)
-
-        # Yüzde değişim
-        if avg_amount > 0:
-            change_pct = ((current_amount - avg_amount) / avg_amount) * 100
-        else:
-            change_pct = 0.0
-
-        # Status ve uyarı
-        if abs(change_pct) > ANOMALY_THRESHOLD:
-            status = "alert"
-            if change_pct > 0:
-                alert_msg = f"{category}: {change_pct:.1f}% artış tespit edildi. Mukerrer/hatalı işlem olabilir, kontrol edin."
-            else:
-                alert_msg = f"{category}: {abs(change_pct):.1f}% azalış tespit edildi."
-        elif abs(change_pct) > 10:
-            status = "warning"
-            alert_msg = f"{category}: {change_pct:.1f}% değişim (alışılmadık, gözlemde bulunun)."
-        else:
-            status = "normal"
-            alert_msg = None
-
-        # Ay listesi (en son 6 ay)
-        months_list = []
-        for month_key in month_keys[:6]:
-            months_list.append({
-                "month": month_key,
-                "amount": monthly_amounts[month_key]
-            })
-
-        results.append(
-            FixedCostAnalysis(
-                category=category,
-                avg_monthly=round(avg_amount, 2),
-                current_month=round(current_amount, 2),
-                change_percentage=round(change_pct, 2),
-                status=status,
-                alert_message=alert_msg,
-                months=months_list,
-            )
-        )
-
-    return results
+    return [FixedCostAnalysis(**row) for row in detect_fixed_cost_anomalies(totals)]
 
 
 # ============ INSIGHTS ENDPOINT ============
@@ -832,19 +640,10 @@ def get_insights(
     """
     today = date.today()
 
-    # --- Window Helper ---
-    def get_window(p: str):
-        if p == "last30":
-            return today - timedelta(days=30), today
-        if p == "last90":
-            return today - timedelta(days=90), today
-        if p == "this_month":
-            return today.replace(day=1), today
-        if p == "all":
-            return None, None
-        return today - timedelta(days=30), today
-
-    start, end = get_window(period)
+    start, end = resolve_window(period, today)
+    window_key = period if period in STANDARD_WINDOWS else DEFAULT_WINDOW
+    aggregates = get_window_aggregates(db, current_company.id, today)
+    window = aggregates[window_key]
     insights = []
 
     # 1) UPCOMING PLANNED ITEMS (7 and 14 days)
@@ -871,6 +670,11 @@ def get_insights(
         
         in_v = float(in_sum_q or 0)
         out_v = float(out_sum_q or 0)
+        for occ in expand_occurrences(db, current_company.id, today, end_d):
+            if occ.direction == "in":
+                in_v += float(occ.amount)
+            else:
+                out_v += float(occ.amount)
         return in_v, out_v
 
     in7, out7 = planned_sum(7)
@@ -885,28 +689,10 @@ def get_insights(
             "metric": {"planned_in_7": round(in7, 2), "planned_out_7": round(out7, 2)}
         })
 
-    # 2) NET TREND (last30 vs prev30)
+    # 2) NET TREND (window vs previous 30 days)
     if start is not None:
-        prev_start = start - timedelta(days=30)
-        prev_end = start
-
-        def net_between(a: date, b: date):
-            inc = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
-                Transaction.direction == "in",
-                Transaction.date >= a,
-                Transaction.date < b,
-                Transaction.company_id == current_company.id,
-            ).scalar()
-            exp = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
-                Transaction.direction == "out",
-                Transaction.date >= a,
-                Transaction.date < b,
-                Transaction.company_id == current_company.id,
-            ).scalar()
-            return float(inc or 0) - float(exp or 0)
-
-        net_last = net_between(start, end)
-        net_prev = net_between(prev_start, prev_end)
+        net_last = window["net"]
+        net_prev = aggregates[f"{window_key}:prev"]["net"]
 
         change_pct = None
         if net_prev != 0:
@@ -925,40 +711,18 @@ def get_insights(
                 }
             })
 
-    # 3) CATEGORY ANOMALY (last30 vs baseline)
+    # 3) CATEGORY ANOMALY (window vs last90 baseline)
     if start is not None:
-        # last30 out by category
-        last30 = db.query(
-            Transaction.category,
-            func.coalesce(func.sum(Transaction.amount), 0).label("out_sum")
-        ).filter(
-            Transaction.direction == "out",
-            Transaction.date >= start,
-            Transaction.date <= end,
-            Transaction.company_id == current_company.id,
-        ).group_by(Transaction.category).all()
-
-        # last90 baseline
-        b_start = today - timedelta(days=90)
-        baseline = db.query(
-            Transaction.category,
-            func.coalesce(func.sum(Transaction.amount), 0).label("out_sum90")
-        ).filter(
-            Transaction.direction == "out",
-            Transaction.date >= b_start,
-            Transaction.date <= today,
-            Transaction.company_id == current_company.id,
-        ).group_by(Transaction.category).all()
-
-        base_map = {(c or "UNCATEGORIZED"): float(s or 0) for c, s in baseline}
+        base_map = {
+            cat: vals["out"] for cat, vals in aggregates["last90"]["by_category"].items()
+        }
         anomalies = []
         
-        for c, s30 in last30:
-            cat = c or "UNCATEGORIZED"
+        for cat, vals in window["by_category"].items():
             # Skip income categories from expense spike analysis
-            if cat in INCOME_CATEGORIES:
+            if cat in INCOME_CATEGORIES or vals["out"] <= 0:
                 continue
-            out30 = float(s30 or 0)
+            out30 = vals["out"]
             out90 = base_map.get(cat, 0.0)
             # 90 günü 3 aya böl → aylık baseline
             baseline_month = out90 / 3 if out90 > 0 else 0.0
@@ -1036,28 +800,16 @@ def get_insights(
 
     # 5) TOP EXPENSE DRIVERS
     if start is not None:
-        top_exp = db.query(
-            Transaction.category,
-            func.coalesce(func.sum(Transaction.amount), 0).label("out_sum")
-        ).filter(
-            Transaction.direction == "out",
-            Transaction.date >= start,
-            Transaction.date <= end,
-            Transaction.company_id == current_company.id,
-        ).group_by(Transaction.category).order_by(func.sum(Transaction.amount).desc()).limit(3).all()
-
-        total_out = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
-            Transaction.direction == "out",
-            Transaction.date >= start,
-            Transaction.date <= end,
-            Transaction.company_id == current_company.id,
-        ).scalar() or 0
+        top_exp = sorted(
+            ((cat, vals["out"]) for cat, vals in window["by_category"].items() if vals["out"] > 0),
+            key=lambda x: x[1],
+            reverse=True,
+        )[:3]
+        total_out = window["expense"]
 
         if total_out > 0 and top_exp:
             items = []
-            for c, s in top_exp:
-                cat = c or "UNCATEGORIZED"
-                outv = float(s or 0)
+            for cat, outv in top_exp:
                 items.append({
                     "category": cat,
                     "out": round(outv, 2),
@@ -1098,19 +850,7 @@ def get_insight_detail(
     """
     today = date.today()
     
-    # --- Window Helper ---
-    def get_window(p: str):
-        if p == "last30":
-            return today - timedelta(days=30), today
-        if p == "last90":
-            return today - timedelta(days=90), today
-        if p == "this_month":
-            return today.replace(day=1), today
-        if p == "all":
-            return None, None
-        return today - timedelta(days=30), today
-    
-    start, end = get_window(period)
+    start, end = resolve_window(period, today)
     
     # Tüm insights'ı hesapla (aynı mantık ile)
     result = get_insights(period=period, db=db, current_company=current_company)
@@ -1151,6 +891,10 @@ def get_insight_detail(
             PlannedCashflowItem.due_date >= today,
             PlannedCashflowItem.due_date <= today + timedelta(days=7)
         ).order_by(PlannedCashflowItem.due_date).all()
+        upcoming_items = sorted(
+            [*upcoming_items, *expand_occurrences(db, current_company.id, today, today + timedelta(days=7))],
+            key=lambda item: item.due_date,
+        )
         
         detail_data["upcoming_items"] = [
             {
@@ -1226,143 +970,68 @@ def matching_health(
     - unmatched/overdue olanlar
     - partial match'ler
     """
-    company_id = company.id
-    today = date.today()
-
-    # Auto vs Manual match sayıları
-    auto_count = db.query(func.count(PlannedMatch.id)).filter(
-        PlannedMatch.company_id == company_id,
-        PlannedMatch.match_type == "AUTO"
-    ).scalar() or 0
-
-    # Manual matches: PARTIAL STATUS'LU planned itemler HARIC
-    # (PARTIAL statuslüler kısmi eşleşen kartında gösterilecek)
-    manual_count = db.query(func.count(PlannedMatch.id)).filter(
-        PlannedMatch.company_id == company_id,
-        PlannedMatch.match_type != "AUTO",
-        PlannedCashflowItem.status != "PARTIAL"
-    ).join(
-        PlannedCashflowItem,
-        PlannedMatch.planned_item_id == PlannedCashflowItem.id
-    ).scalar() or 0
-
-    # PARTIAL planned sayısı (sadece kısmi eşleşenleri saymak için)
-    partial_count = db.query(func.count(PlannedCashflowItem.id)).filter(
-        PlannedCashflowItem.company_id == company_id,
-        PlannedCashflowItem.status == "PARTIAL"
-    ).scalar() or 0
-
-    # Unmatched planned: Status kapatılmadıysa (OPEN/PARTIAL) ve remaining>0
-    # Vadesi geçmiş olanlar (overdue)
-    overdue = db.query(func.count(PlannedCashflowItem.id)).filter(
-        PlannedCashflowItem.company_id == company_id,
-        PlannedCashflowItem.status.in_(["OPEN", "PARTIAL"]),  # Kapatılmamış
-        PlannedCashflowItem.remaining_amount > 0,
-        PlannedCashflowItem.due_date < today
-    ).scalar() or 0
-
-    # Önümüzdeki 14 gün (upcoming)
-    # DEBUG: İlk önce gerçek kayıtları çekelim
-    import logging
-    logger = logging.getLogger(__name__)
-    
-    # Tarih aralığını açıkça hesapla (bugün dahil, 14 gün sonrası dahil değil)
-    end_date = today + timedelta(days=14)
-    
-    upcoming_items = db.query(PlannedCashflowItem).filter(
-        PlannedCashflowItem.company_id == company_id,
-        PlannedCashflowItem.status.in_(["OPEN", "PARTIAL"]),  # Kapatılmamış
-        PlannedCashflowItem.remaining_amount > 0,
-        PlannedCashflowItem.due_date >= today,
-        PlannedCashflowItem.due_date <= end_date
-    ).all()
-    
-    upcoming_14 = len(upcoming_items)
-    
-    logger.info(f"[MATCHING-HEALTH] upcoming_14 count: {upcoming_14}, today: {today}, end_date: {end_date}")
-    logger.info(f"[MATCHING-HEALTH] Date comparison: due_date >= {today} AND due_date <= {end_date}")
-    for item in upcoming_items:
-        in_range = item.due_date <= end_date
-        logger.info(f"  - Item {item.id}: due_date={item.due_date}, status={item.status}, remaining={item.remaining_amount}, in_range={in_range}, ({item.due_date} <= {end_date} = {in_range})")
+    health = get_matching_health(db, company.id)
 
     # MVP'de "pending review" yok; 0 dönüyoruz
-    pending_review = 0
-
     return {
-        "auto_matched": int(auto_count),
-        "manual_matched": int(manual_count),
-        "pending_review": int(pending_review),
-        "unmatched_overdue": int(overdue),
-        "unmatched_upcoming_14d": int(upcoming_14),
-        "partial_planned": int(partial_count),
+        "auto_matched": health["auto_matched"],
+        "manual_matched": health["manual_matched"],
+        "pending_review": 0,
+        "unmatched_overdue": health["unmatched_overdue"],
+        "unmatched_upcoming_14d": health["unmatched_upcoming_14d"],
+        "partial_planned": health["partial_planned"],
     }
 
 
 @router.get("/matching-exceptions")
 def matching_exceptions(
-    kind: str = Query("overdue"),  # overdue | upcoming14 | partial
+    kind: str = Query("overdue"),  # overdue | upcoming14 | partial | unmatched_tx
     db: Session = Depends(get_db),
     company = Depends(get_current_company),
 ):
     """
-    Eşleştirme istisnaları: vadesi geçmiş, yaklaşan, kısmi eşleştirmiş
+    Eşleştirme istisnaları: vadesi geçmiş, yaklaşan, kısmi eşleştirmiş,
+    hiçbir planlı kalemle eşleşmemiş işlemler (unmatched_tx)
     """
     company_id = company.id
     today = date.today()
 
-    q = db.query(PlannedCashflowItem).filter(
-        PlannedCashflowItem.company_id == company_id
-    )
+    if kind == "unmatched_tx":
+        rows = db.query(
+            Transaction.id,
+            Transaction.date,
+            Transaction.direction,
+            Transaction.amount,
+            Transaction.description,
+            Transaction.category,
+        ).filter(
+            Transaction.company_id == company_id,
+            unmatched_condition(),
+        ).order_by(Transaction.date.desc()).limit(200).all()
+        return {
+            "kind": kind,
+            "count": len(rows),
+            "items": [
+                {
+                    "id": tx_id,
+                    "date": tx_date.isoformat(),
+                    "direction": direction,
+                    "amount": float(amount),
+                    "description": description,
+                    "category": category,
+                }
+                for tx_id, tx_date, direction, amount, description, category in rows
+            ],
+        }
 
-    if kind == "overdue":
-        q = q.filter(
-            PlannedCashflowItem.status.in_(["OPEN", "PARTIAL"]),  # Kapatılmamış
-            PlannedCashflowItem.remaining_amount > 0,
-            PlannedCashflowItem.due_date < today
-        ).order_by(PlannedCashflowItem.due_date.asc())
-    elif kind == "upcoming14":
-        end_date = today + timedelta(days=14)
-        q = q.filter(
-            PlannedCashflowItem.status.in_(["OPEN", "PARTIAL"]),  # Kapatılmamış
-            PlannedCashflowItem.remaining_amount > 0,
-            PlannedCashflowItem.due_date >= today,
-            PlannedCashflowItem.due_date <= end_date
-        ).order_by(PlannedCashflowItem.due_date.asc())
-    elif kind == "partial":
-        q = q.filter(
-            PlannedCashflowItem.status == "PARTIAL"
-        ).order_by(PlannedCashflowItem.due_date.asc())
-    else:
+    items = list_matching_exceptions(db, company_id, kind, today)
+    if items is None:
         return {"items": []}
 
-    items = q.limit(200).all()
-    
-    # DEBUG: Log the exceptions query
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.info(f"[MATCHING-EXCEPTIONS] kind: {kind}, count: {len(items)}, today: {today}")
-    if kind == "upcoming14":
-        for item in items:
-            logger.info(f"  - Item {item.id}: due_date={item.due_date}, status={item.status}, remaining={item.remaining_amount}")
-
     return {
         "kind": kind,
         "count": len(items),
-        "items": [
-            {
-                "id": i.id,
-                "type": i.type,
-                "direction": i.direction,
-                "due_date": i.due_date.isoformat() if i.due_date else None,
-                "amount": float(i.amount),
-                "settled_amount": float(i.settled_amount or 0),
-                "remaining_amount": float(i.remaining_amount or 0),
-                "status": i.status,
-                "counterparty": i.counterparty or "",
-                "reference_no": i.reference_no or "",
-            }
-            for i in items
-        ]
+        "items": items,
     }
 
 
@@ -1837,6 +1506,8 @@ def get_cash_forecast(
         ).first()
         
         planned_cash = float(planned_result[0]) if planned_result and planned_result[0] else 0.0
+        for occ in expand_occurrences(db, company.id, overdue_window_start(now), now):
+            planned_cash += float(occ.amount) if occ.direction == "in" else -float(occ.amount)
         current_cash = float(current_cash) + planned_cash
     except Exception as e:
         import traceback
@@ -1855,6 +1526,12 @@ def get_cash_forecast(
         company_id=company.id
     ))
     
+    # Tekrarlayan kuralların ufuktaki oluşumları bir kez üretilir
+    future_occurrences = [
+        (occ.due_date, float(occ.amount) if occ.direction == "in" else -float(occ.amount))
+        for occ in expand_occurrences(db, company.id, now + timedelta(days=1), now + timedelta(weeks=weeks))
+    ]
+
     for week in range(1, weeks + 1):
         week_date = now + timedelta(weeks=week)
         
@@ -1876,6 +1553,7 @@ def get_cash_forecast(
         ).first()
         
         future_planned_cash = float(future_planned[0]) if future_planned and future_planned[0] else 0.0
+        future_planned_cash += sum(amount for due, amount in future_occurrences if due <= week_date)
         projected_value = float(projected_value) + future_planned_cash
         
         forecast.append(ForecastPoint(
@@ -1888,6 +1566,92 @@ def get_cash_forecast(
     return forecast
 
 
+class MonteCarloForecast(BaseModel):
+    start_balance: float
+    horizon_days: int
+    paths: int
+    slip_applied: list[str]
+    dates: list[str]
+    p10: list[float]
+    p50: list[float]
+    p90: list[float]
+    prob_negative: list[float]
+    prob_negative_any: float
+    elapsed_ms: float
+
+
+@router.get("/forecast-monte-carlo", response_model=MonteCarloForecast)
+def forecast_monte_carlo(
+    horizon_days: int = Query(90, ge=1, le=365),
+    paths: int = Query(5000, ge=100, le=20000),
+    slip: bool = Query(True, description="Planlı kalemlere geçmiş gecikme dağılımını uygula"),
+    seed: int | None = None,
+    db: Session = Depends(get_db),
+    company: Company = Depends(get_current_company),
+):
+    """
+    Monte Carlo nakit tahmini (güven bantlı).
+
+    Geçmiş günlük net akışlar bootstrap edilir, açık planlı kalemler vade
+    gününe (opsiyonel gecikme dağılımıyla) eklenir. Gün bazında
+    P10/P50/P90 bakiye eğrileri ve negatif nakit olasılığı döner.
+    """
+    import time
+    from app.models.company_settings import CompanyFinancialSettings
+    from app.services.cash_position import calculate_estimated_cash
+    from app.services.monte_carlo_forecast import (
+        simulate_cash_paths,
+        load_daily_net_history,
+        load_planned_flows,
+        load_slip_distributions,
+    )
+
+    today = date.today()
+
+    settings = db.query(CompanyFinancialSettings).filter(
+        CompanyFinancialSettings.company_id == company.id
+    ).first()
+    start_balance = 0.0
+    if settings:
+        start_balance = calculate_estimated_cash(
+            db, company.id, float(settings.initial_balance), settings.initial_balance_date
+        )
+
+    history = load_daily_net_history(db, company.id, today)
+    planned_days, planned_amounts, planned_directions = load_planned_flows(
+        db, company.id, today, horizon_days
+    )
+    slip_distributions = load_slip_distributions(db, company.id) if slip else {}
+
+    started = time.perf_counter()
+    result = simulate_cash_paths(
+        history,
+        start_balance,
+        planned_days,
+        planned_amounts,
+        horizon_days=horizon_days,
+        n_paths=paths,
+        planned_slip=planned_directions,
+        slip_distributions=slip_distributions,
+        seed=seed,
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    return MonteCarloForecast(
+        start_balance=round(start_balance, 2),
+        horizon_days=horizon_days,
+        paths=paths,
+        slip_applied=sorted(slip_distributions.keys()),
+        dates=[(today + timedelta(days=i)).isoformat() for i in range(horizon_days)],
+        p10=[round(float(v), 2) for v in result["p10"]],
+        p50=[round(float(v), 2) for v in result["p50"]],
+        p90=[round(float(v), 2) for v in result["p90"]],
+        prob_negative=[round(float(v), 4) for v in result["prob_negative"]],
+        prob_negative_any=round(result["prob_negative_any"], 4),
+        elapsed_ms=round(elapsed_ms, 1),
+    )
+
+
 class KeyInsight(BaseModel):
     title: str
     description: str
@@ -3,13 +3,16 @@ Email ingestion endpoints for webhook processing and management.
 Handles incoming emails, alias management, and rollback operations.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile, Query
 from sqlalchemy.orm import Session
 from typing import Optional, List
+from datetime import datetime
 import logging
+import uuid
 
 from ..core.database import get_db
 from ..core.deps import get_current_user, get_current_company
+from ..core.pagination import MAX_PAGE_SIZE, keyset_page, count_total
 from ..models.user import User
 from ..models.company import Company
 from ..models.email_ingest_log import EmailIngestLog
@@ -58,18 +61,38 @@ async def process_email_webhook(
 
 @router.get("/logs")
 async def get_email_logs(
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     current_company: Company = Depends(get_current_company),
     db: Session = Depends(get_db)
 ):
-    """Get email processing logs for the current user."""
-    logs = db.query(EmailIngestLog).filter(
+    """
+    Get email processing logs for the current user.
+
+    Logs are returned newest first, keyset-paginated on (received_at, id);
+    pass `next_cursor` back as `cursor` to fetch the next page.
+    """
+    q = db.query(EmailIngestLog).filter(
         EmailIngestLog.user_id == current_user.id,
         EmailIngestLog.company_id == current_company.id
-    ).order_by(EmailIngestLog.received_at.desc()).limit(limit).all()
+    )
+    if status:
+        q = q.filter(EmailIngestLog.status == status)
+
+    total = count_total(q) if include_total else None
+
+    logs, next_cursor = keyset_page(
+        q, EmailIngestLog.received_at, EmailIngestLog.id,
+        limit=limit, cursor=cursor, descending=True,
+        parse_sort=datetime.fromisoformat, parse_id=uuid.UUID,
+    )
     
     return {
+        "next_cursor": next_cursor,
+        "total": total,
         "logs": [
             {
                 "id": str(log.id),
@@ -144,7 +167,8 @@ async def rollback_attachment_transactions(
     
     result = email_ingestion_service.rollback_email_transactions(
         db=db,
-        attachment_id=attachment_id
+        attachment_id=attachment_id,
+        company_id=current_company.id
     )
     
     return result
@@ -1,14 +1,33 @@
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.core.deps import get_db, get_current_company
+from app.core.fast_json import FastJSONResponse
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    keyset_page,
+    count_total,
+    set_page_headers,
+)
 from app.models.planned_item import PlannedCashflowItem
 from app.models.transaction import Transaction
 from app.models.planned_match import PlannedMatch
-from app.schemas.match import MatchCreate
-from app.services.planned_recompute import recompute_planned_status
+from app.schemas.match import MatchCreate, MatchProposalConfirm
+from app.services.combination_match import (
+    confirm_allocations,
+    propose_for_planned,
+    propose_for_transaction,
+)
+from app.services.planned_settlement import apply_settlement_delta
+from app.services.planned_recurrence import resolve_planned_item_id
+from app.services.match_candidates import suggest_matches
+from app.services.match_listing import match_list_query, match_row_to_dict
+from app.services.matching_index import find_open_planned
+from app.services.reconciliation import reconcile_company
+from app.services.transaction_match_state import refresh_transaction_match_state
 
 router = APIRouter(prefix="", tags=["matches"])
 
@@ -16,45 +35,67 @@ router = APIRouter(prefix="", tags=["matches"])
 def get_all_matches(
     db: Session = Depends(get_db),
     company = Depends(get_current_company),
+    match_type: str | None = Query(None, pattern="^(MANUAL|AUTO)$"),
+    planned_item_id: str | None = None,
+    transaction_id: str | None = None,
+    planned_status: str | None = Query(None, pattern="^(OPEN|PARTIAL|SETTLED|CANCELLED)$"),
+    start_date: date | None = None,
+    end_date: date | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    include_total: bool = False,
+    fetch_all: bool = Query(False, alias="all", description="Uyumluluk: sayfalamadan tüm kayıtları döner"),
 ):
-    """Tüm eşleşmeleri listele - detaylı bilgiler ile"""
-    company_id = company.id
+    """
+    Tüm eşleşmeleri listele - detaylı bilgiler ile (tek join'li sorgu).
+    En yeni eşleşme önce gelir (id desc); sonraki sayfa için X-Next-Cursor kullanılır.
+    start_date / end_date işlem tarihine göre filtreler.
+    """
+    q = match_list_query(
+        db, company.id,
+        match_type=match_type,
+        planned_item_id=planned_item_id,
+        transaction_id=transaction_id,
+        planned_status=planned_status,
+        start_date=start_date,
+        end_date=end_date,
+    )
 
-    matches = db.query(PlannedMatch).filter(
-        PlannedMatch.company_id == company_id
-    ).all()
+    total = count_total(q) if include_total else None
+
+    if fetch_all:
+        matches = q.order_by(PlannedMatch.id.desc()).all()
+        next_cursor = None
+    else:
+        # id otomatik artan olduğundan ekleme sırasını izler; tek başına keyset anahtarı yeterli
+        matches, next_cursor = keyset_page(
+            q, PlannedMatch.id, PlannedMatch.id,
+            limit=limit, cursor=cursor, descending=True,
+            parse_sort=int, parse_id=int,
+        )
+
+    result = [match_row_to_dict(row) for row in matches]
+
+    response = FastJSONResponse(result)
+    set_page_headers(response, next_cursor, total)
+    return response
+
+@router.post("/matches/reconcile")
+def reconcile_matches(
+    dry_run: bool = Query(False, description="Sadece önerileri döndür, yazma"),
+    db: Session = Depends(get_db),
+    company = Depends(get_current_company),
+):
+    """
+    Toplu mutabakat: eşleşmemiş tüm işlemleri açık planlı kalemlerle
+    auto-match kurallarıyla (tutar, yön, ±7 gün, referans önceliği, belirsizlikte atla)
+    tek seferde eşleştirir.
+    """
+    result = reconcile_company(db, company.id, dry_run=dry_run)
+    if not dry_run:
+        db.commit()
+    return FastJSONResponse({"dry_run": dry_run, **result.as_dict()})
 
-    result = []
-    for m in matches:
-        # Planned item detaylarını al
-        planned = db.query(PlannedCashflowItem).filter(
-            PlannedCashflowItem.id == m.planned_item_id
-        ).first()
-        
-        # Transaction detaylarını al
-        tx = db.query(Transaction).filter(
-            Transaction.id == m.transaction_id
-        ).first()
-        
-        result.append({
-            "id": m.id,
-            "match_id": m.id,
-            "planned_item_id": m.planned_item_id,
-            "planned_reference": planned.reference_no if planned else "",
-            "planned_counterparty": planned.counterparty if planned else "",
-            "planned_amount": float(planned.amount) if planned else 0,
-            "planned_due_date": planned.due_date.isoformat() if planned and planned.due_date else "",
-            "planned_status": planned.status if planned else "",
-            "transaction_id": m.transaction_id,
-            "transaction_description": tx.description if tx else "",
-            "transaction_date": tx.date.isoformat() if tx and tx.date else "",
-            "transaction_amount": float(tx.amount) if tx else 0,
-            "matched_amount": float(m.matched_amount),
-            "match_type": m.match_type,
-            "created_at": m.created_at.isoformat() if hasattr(m, 'created_at') and m.created_at else None,
-        })
-
-    return result
 
 @router.post("/matches")
 def create_match(
@@ -64,9 +105,11 @@ def create_match(
 ):
     company_id = company.id
 
+    # Tekrarlayan oluşum id'si gelirse önce satırı üretilir
+    planned_item_id = resolve_planned_item_id(db, company_id, payload.planned_item_id)
     item = db.query(PlannedCashflowItem).filter(
         PlannedCashflowItem.company_id == company_id,
-        PlannedCashflowItem.id == payload.planned_item_id,
+        PlannedCashflowItem.id == planned_item_id,
     ).first()
     if not item:
         raise HTTPException(404, "Planned item bulunamadı")
@@ -104,18 +147,18 @@ def create_match(
         match_type=payload.match_type or "MANUAL",
     )
     db.add(m)
+    db.flush()
+    refresh_transaction_match_state(db, company_id, [tx.id])
+    apply_settlement_delta(db, company_id, item.id, payload.matched_amount)
     db.commit()
-    db.refresh(m)
-
-    updated = recompute_planned_status(db, company_id, item.id)
 
     return {
         "match_id": m.id,
         "planned_item_id": item.id,
         "transaction_id": tx.id,
-        "planned_status": updated.status,
-        "settled_amount": float(updated.settled_amount),
-        "remaining_amount": float(updated.remaining_amount),
+        "planned_status": item.status,
+        "settled_amount": float(item.settled_amount),
+        "remaining_amount": float(item.remaining_amount),
     }
 
 
@@ -135,11 +178,19 @@ def delete_match(
         raise HTTPException(404, "Match bulunamadı")
 
     planned_item_id = m.planned_item_id
+    transaction_id = m.transaction_id
+    matched_amount = m.matched_amount
 
     db.delete(m)
+    db.flush()
+    refresh_transaction_match_state(db, company_id, [transaction_id])
+    apply_settlement_delta(db, company_id, planned_item_id, -matched_amount)
     db.commit()
 
-    updated = recompute_planned_status(db, company_id, planned_item_id)
+    updated = db.query(PlannedCashflowItem).filter(
+        PlannedCashflowItem.company_id == company_id,
+        PlannedCashflowItem.id == planned_item_id,
+    ).first()
 
     return {
         "deleted": True,
@@ -158,11 +209,8 @@ def planned_match_suggestions(
 ):
     company_id = company.id
 
-    item = db.query(PlannedCashflowItem).filter(
-        PlannedCashflowItem.company_id == company_id,
-        PlannedCashflowItem.id == planned_id,
-        PlannedCashflowItem.status.in_(["OPEN","PARTIAL"]),
-    ).first()
+    # Kalem (veya sanal oluşum) önce şirketin matching index'inden aranır
+    item = find_open_planned(db, company_id, planned_id)
     if not item:
         raise HTTPException(404, "Planned item bulunamadı veya eşleşmeye kapalı")
 
@@ -170,106 +218,76 @@ def planned_match_suggestions(
     if remaining <= 0:
         return {"planned_id": planned_id, "remaining_amount": remaining, "suggestions": []}
 
-    window_start = item.due_date - timedelta(days=10)
-    window_end = item.due_date + timedelta(days=10)
+    suggestions = suggest_matches(db, company_id, item)
+    return {"planned_id": planned_id, "remaining_amount": remaining, "suggestions": suggestions}
+
+
+@router.get("/planned/{planned_id}/match-proposals")
+def planned_match_proposals(
+    planned_id: str,
+    db: Session = Depends(get_db),
+    company = Depends(get_current_company),
+):
+    """
+    Kalemi birden fazla işlemin (ör. iki havale - banka masrafı) kapattığı
+    kombinasyon önerileri. Onay için POST /matches/confirm-proposal.
+    """
+    item = find_open_planned(db, company.id, planned_id)
+    if not item:
+        raise HTTPException(404, "Planned item bulunamadı veya eşleşmeye kapalı")
+
+    result = propose_for_planned(db, company.id, item)
+    return FastJSONResponse({"planned_id": planned_id, **result.as_dict()})
 
-    matched_tx_ids = db.query(PlannedMatch.transaction_id).filter(
-        PlannedMatch.company_id == company_id
-    ).subquery()
 
-    # Build planned item keywords for description matching
-    planned_keywords = []
-    if item.counterparty:
-        planned_keywords.append(item.counterparty.lower())
-    if item.reference_no:
-        planned_keywords.append(item.reference_no.lower())
+@router.get("/transactions/{tx_id}/match-proposals")
+def transaction_match_proposals(
+    tx_id: str,
+    db: Session = Depends(get_db),
+    company = Depends(get_current_company),
+):
+    """
+    İşlemin birden fazla planlı kalemi (ör. tek ödemeyle üç fatura) kapattığı
+    kombinasyon önerileri. Onay için POST /matches/confirm-proposal.
+    """
+    tx = db.query(Transaction).filter(
+        Transaction.company_id == company.id,
+        Transaction.id == tx_id,
+    ).first()
+    if not tx:
+        raise HTTPException(404, "Transaction bulunamadı")
+
+    result = propose_for_transaction(db, company.id, tx)
+    return FastJSONResponse({"transaction_id": tx_id, **result.as_dict()})
 
-    # Query 1: Amount-based matches in date window
-    candidates = db.query(Transaction).filter(
-        Transaction.company_id == company_id,
-        Transaction.direction == item.direction,
-        Transaction.date >= window_start,
-        Transaction.date <= window_end,
-        ~Transaction.id.in_(matched_tx_ids),
-        Transaction.amount <= remaining * 1.02,
-    ).order_by(func.abs(Transaction.amount - remaining).asc()).limit(15).all()
-
-    # Query 2: Description-based matches (counterparty/reference_no in description)
-    desc_matches = []
-    if planned_keywords:
-        desc_matches = db.query(Transaction).filter(
-            Transaction.company_id == company_id,
-            Transaction.direction == item.direction,
-            ~Transaction.id.in_(matched_tx_ids),
-        ).limit(20).all()
-        desc_matches = [
-            tx for tx in desc_matches
-            if any(kw in (tx.description or "").lower() for kw in planned_keywords)
-        ]
-
-    # Query 3: Fallback - any transaction matching direction (if no amount/desc matches)
-    fallback_candidates = []
-    if len(candidates) == 0 and len(desc_matches) == 0:
-        fallback_candidates = db.query(Transaction).filter(
-            Transaction.company_id == company_id,
-            Transaction.direction == item.direction,
-            ~Transaction.id.in_(matched_tx_ids),
-        ).order_by(func.abs(Transaction.amount - remaining).asc()).limit(10).all()
-
-    # Merge all candidates, prioritizing description matches
-    all_candidates = candidates + desc_matches + fallback_candidates
-
-    # Remove duplicates by transaction_id
-    seen = set()
-    unique_candidates = []
-    for tx in all_candidates:
-        if tx.id not in seen:
-            unique_candidates.append(tx)
-            seen.add(tx.id)
-    candidates = unique_candidates
-
-    out = []
-    for tx in candidates:
-        amt = float(tx.amount)
-        amt_diff = abs(amt - remaining)
-        day_diff = abs((tx.date - item.due_date).days)
-
-        score = 0
-        # Amount scoring (max 30)
-        if amt_diff <= 0.01:
-            score += 30
-        elif amt < remaining:
-            score += 18
-
-        # Date scoring (max 12)
-        if day_diff <= 2:
-            score += 12
-        elif day_diff <= 7:
-            score += 8
-        elif day_diff <= 14:
-            score += 3
-
-        # Description scoring (max 58)
-        desc = (tx.description or "").lower()
-        cp = (item.counterparty or "").lower()
-        ref = (item.reference_no or "").lower()
-        
-        if cp and cp in desc:
-            score += 28
-        if ref and ref in desc:
-            score += 30
-
-        # Cap score at 100
-        score = min(score, 100)
-
-        out.append({
-            "transaction_id": tx.id,
-            "date": tx.date.isoformat(),
-            "amount": amt,
-            "description": tx.description,
-            "score": score,
-            "suggested_match_amount": min(amt, remaining),
-        })
-
-    out.sort(key=lambda x: x["score"], reverse=True)
-    return {"planned_id": planned_id, "remaining_amount": remaining, "suggestions": out}
+
+@router.post("/matches/confirm-proposal")
+def confirm_match_proposal(
+    payload: MatchProposalConfirm,
+    db: Session = Depends(get_db),
+    company = Depends(get_current_company),
+):
+    """Bir kombinasyon önerisinin tüm eşleşmelerini tek işlemde kaydeder."""
+    matches = confirm_allocations(
+        db, company.id,
+        [a.model_dump() for a in payload.allocations],
+        match_type=payload.match_type or "MANUAL",
+    )
+    db.commit()
+
+    items = db.query(PlannedCashflowItem).filter(
+        PlannedCashflowItem.company_id == company.id,
+        PlannedCashflowItem.id.in_({m.planned_item_id for m in matches}),
+    ).all()
+    return {
+        "match_ids": [m.id for m in matches],
+        "planned_items": [
+            {
+                "id": i.id,
+                "planned_status": i.status,
+                "settled_amount": float(i.settled_amount),
+                "remaining_amount": float(i.remaining_amount),
+            }
+            for i in items
+        ],
+    }
@@ -3,27 +3,51 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from datetime import datetime, timedelta
+from datetime import date, timedelta
 from decimal import Decimal
-from io import StringIO
-import csv
 from typing import List
 
 from app.core.deps import get_db, get_current_company
+from app.core.fast_json import FastJSONResponse
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    keyset_page,
+    count_total,
+    set_page_headers,
+)
 from app.models.planned_item import PlannedCashflowItem
 from app.models.planned_item_schema import (
     PlannedItemCreate,
     PlannedItemResponse,
+    PLANNED_ITEM_RESPONSE_COLUMNS,
+    planned_item_row_to_dict,
     PlannedMatchCreate,
     PlannedMatchResponse,
+    PlannedRecurrenceCreate,
+    PlannedRecurrenceResponse,
 )
 from app.models.company import Company
 from app.models.planned_match import PlannedMatch
+from app.models.planned_recurrence import PlannedRecurrence
 from app.models.transaction import Transaction, TransactionSchema
-from app.services.planned_recompute import recompute_planned_status
+from app.services.match_listing import match_list_query, planned_match_row_to_dict
+from app.services.planned_import import import_planned_items
+from app.services.planned_settlement import apply_settlement_delta
+from app.services.planned_recurrence import (
+    FREQUENCIES,
+    RECURRENCE_ACTIVE,
+    RECURRENCE_CANCELLED,
+    expand_occurrences,
+    resolve_planned_item_id,
+)
+from app.services.transaction_match_state import refresh_transaction_match_state
 
 router = APIRouter()
 
+OCCURRENCE_DEFAULT_DAYS = 90
+OCCURRENCE_MAX_DAYS = 366
+
 
 @router.post("/", response_model=PlannedItemResponse)
 @router.post("", response_model=PlannedItemResponse)
@@ -57,79 +81,175 @@ def create_planned_item(
 
 
 @router.post("/upload-csv")
-async def upload_planned_items_csv(
+@router.post("/import")
+def upload_planned_items_csv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     current_company: Company = Depends(get_current_company),
 ):
-    if not file.filename.lower().endswith(".csv"):
-        raise HTTPException(status_code=400, detail="Lütfen CSV formatında dosya yükleyin.")
+    """
+    CSV veya Excel (.xlsx/.xls) ile toplu planlı kalem yükleme.
+    Geçerli satırlar tek seferde eklenir ve eşleşmemiş işlemlerle aynı
+    işte uzlaştırılır (bkz. services/planned_import.py).
+    Ayrıştırma ve uzlaştırma CPU/DB işi olduğundan route senkron tanımlıdır;
+    FastAPI onu thread pool'da çalıştırır, event loop bloklanmaz.
+    """
+    result = import_planned_items(db, current_company.id, file.filename, file.file.read())
+    db.commit()
+    return result.as_dict()
 
-    content = (await file.read()).decode("utf-8", errors="ignore")
-    reader = csv.DictReader(StringIO(content))
 
-    required_columns = {"type", "direction", "amount", "due_date", "counterparty"}
-    if not required_columns.issubset(set(reader.fieldnames or [])):
-        raise HTTPException(
-            status_code=400,
-            detail=f"CSV şu kolonları içermeli: {', '.join(required_columns)}",
+@router.get("/", response_model=list[PlannedItemResponse])
+@router.get("", response_model=list[PlannedItemResponse])
+def list_planned_items(
+    db: Session = Depends(get_db),
+    current_company: Company = Depends(get_current_company),
+    status: str | None = Query(None, pattern="^(OPEN|PARTIAL|SETTLED)$"),
+    direction: str | None = Query(None, pattern="^(in|out)$"),
+    item_type: str | None = Query(None, alias="type"),
+    counterparty: str | None = None,
+    due_from: date | None = None,
+    due_to: date | None = None,
+    min_amount: Decimal | None = None,
+    max_amount: Decimal | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    include_total: bool = False,
+    fetch_all: bool = Query(False, alias="all", description="Uyumluluk: sayfalamadan tüm kayıtları döner"),
+):
+    """
+    Planlı kalemleri (due_date, id) sırasıyla keyset sayfalı listeler.
+    Sonraki sayfa için X-Next-Cursor header'ındaki değer `cursor` olarak gönderilir.
+    Kolon satırları doğrudan encode edilir; çıktı PlannedItemResponse ile aynıdır.
+    """
+    q = db.query(*PLANNED_ITEM_RESPONSE_COLUMNS).filter(
+        PlannedCashflowItem.status.in_([status] if status else ["OPEN", "PARTIAL", "SETTLED"]),
+        PlannedCashflowItem.company_id == current_company.id
+    )
+    if direction:
+        q = q.filter(PlannedCashflowItem.direction == direction)
+    if item_type:
+        q = q.filter(PlannedCashflowItem.type == item_type)
+    if counterparty:
+        q = q.filter(PlannedCashflowItem.counterparty.ilike(f"%{counterparty}%"))
+    if due_from:
+        q = q.filter(PlannedCashflowItem.due_date >= due_from)
+    if due_to:
+        q = q.filter(PlannedCashflowItem.due_date <= due_to)
+    if min_amount is not None:
+        q = q.filter(PlannedCashflowItem.amount >= min_amount)
+    if max_amount is not None:
+        q = q.filter(PlannedCashflowItem.amount <= max_amount)
+
+    total = count_total(q) if include_total else None
+
+    if fetch_all:
+        rows = q.order_by(PlannedCashflowItem.due_date, PlannedCashflowItem.id).all()
+        next_cursor = None
+    else:
+        rows, next_cursor = keyset_page(
+            q, PlannedCashflowItem.due_date, PlannedCashflowItem.id,
+            limit=limit, cursor=cursor, descending=False,
+            parse_sort=date.fromisoformat,
         )
 
-    inserted = 0
-    errors = []
-
-    for idx, row in enumerate(reader, start=1):
-        try:
-            type_val = row["type"].strip().upper()
-            direction = row["direction"].strip().lower()
-            amount = Decimal(row["amount"].strip().replace(",", "."))
-            due_date = datetime.strptime(row["due_date"].strip(), "%Y-%m-%d").date()
-            counterparty = row["counterparty"].strip()
-            reference_no = row.get("reference_no", "").strip() or None
-
-            if direction not in ("in", "out"):
-                raise ValueError("direction sadece 'in' veya 'out' olabilir")
-
-            if type_val not in ("INVOICE", "PO", "OTHER"):
-                raise ValueError("type sadece 'INVOICE', 'PO' veya 'OTHER' olabilir")
-
-            item = PlannedCashflowItem(
-                type=type_val,
-                direction=direction,
-                amount=amount,
-                due_date=due_date,
-                counterparty=counterparty,
-                reference_no=reference_no,
-                source="csv",
-                status="OPEN",
-                settled_amount=0,
-                remaining_amount=amount,
-                company_id=current_company.id,
-            )
-            db.add(item)
-            inserted += 1
-        except Exception as e:
-            errors.append(f"Satır {idx}: {e}")
+    response = FastJSONResponse([planned_item_row_to_dict(row) for row in rows])
+    set_page_headers(response, next_cursor, total)
+    return response
 
+
+@router.post("/recurrences", response_model=PlannedRecurrenceResponse)
+def create_recurrence(
+    payload: PlannedRecurrenceCreate,
+    db: Session = Depends(get_db),
+    current_company: Company = Depends(get_current_company),
+):
+    """
+    Tekrarlayan planlı kalem kuralı (kira, maaş, taksit) tek satır olarak saklanır.
+    Oluşumlar tahmin ve eşleştirme sırasında gereken pencere için üretilir.
+    """
+    if payload.direction not in ("in", "out"):
+        raise HTTPException(status_code=400, detail="direction sadece 'in' veya 'out' olabilir")
+    frequency = payload.frequency.strip().upper()
+    if frequency not in FREQUENCIES:
+        raise HTTPException(status_code=400, detail=f"frequency şunlardan biri olmalı: {', '.join(FREQUENCIES)}")
+    if payload.interval < 1:
+        raise HTTPException(status_code=400, detail="interval en az 1 olmalı")
+    if payload.amount <= 0:
+        raise HTTPException(status_code=400, detail="Tutar pozitif olmalı")
+    if payload.end_date and payload.end_date < payload.start_date:
+        raise HTTPException(status_code=400, detail="end_date start_date'ten önce olamaz")
+    if payload.occurrence_count is not None and payload.occurrence_count < 1:
+        raise HTTPException(status_code=400, detail="occurrence_count en az 1 olmalı")
+
+    rule = PlannedRecurrence(
+        **payload.model_dump(exclude={"frequency"}),
+        frequency=frequency,
+        status=RECURRENCE_ACTIVE,
+        company_id=current_company.id,
+    )
+    db.add(rule)
     db.commit()
+    db.refresh(rule)
+    return rule
 
-    return {
-        "inserted": inserted,
-        "errors": errors,
-    }
 
+@router.get("/recurrences", response_model=list[PlannedRecurrenceResponse])
+def list_recurrences(
+    db: Session = Depends(get_db),
+    current_company: Company = Depends(get_current_company),
+    status: str | None = Query(RECURRENCE_ACTIVE, pattern="^(ACTIVE|CANCELLED)$"),
+):
+    q = db.query(PlannedRecurrence).filter(PlannedRecurrence.company_id == current_company.id)
+    if status:
+        q = q.filter(PlannedRecurrence.status == status)
+    return q.order_by(PlannedRecurrence.start_date, PlannedRecurrence.id).all()
 
-@router.get("/", response_model=list[PlannedItemResponse])
-@router.get("", response_model=list[PlannedItemResponse])
-def list_planned_items(
+
+@router.delete("/recurrences/{recurrence_id}")
+def cancel_recurrence(
+    recurrence_id: str,
     db: Session = Depends(get_db),
     current_company: Company = Depends(get_current_company),
 ):
-    items = db.query(PlannedCashflowItem).filter(
-        PlannedCashflowItem.status.in_(["OPEN", "PARTIAL", "SETTLED"]),
-        PlannedCashflowItem.company_id == current_company.id
-    ).all()
-    return items
+    """Kuralı iptal eder; eşleşip satıra dönüşmüş oluşumlar olduğu gibi kalır."""
+    rule = db.query(PlannedRecurrence).filter(
+        PlannedRecurrence.id == recurrence_id,
+        PlannedRecurrence.company_id == current_company.id,
+    ).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail="Tekrarlayan kalem bulunamadı")
+
+    rule.status = RECURRENCE_CANCELLED
+    db.commit()
+    return {"status": "cancelled"}
+
+
+@router.get("/occurrences")
+def list_occurrences(
+    db: Session = Depends(get_db),
+    current_company: Company = Depends(get_current_company),
+    start: date | None = None,
+    end: date | None = None,
+    direction: str | None = Query(None, pattern="^(in|out)$"),
+):
+    """
+    Tekrarlayan kuralların [start, end] aralığındaki, henüz satıra dönüşmemiş
+    oluşumları (varsayılan: bugünden itibaren OCCURRENCE_DEFAULT_DAYS gün).
+    Dönen id'ler eşleştirme uçlarında planlı kalem id'si olarak kullanılabilir.
+    """
+    start = start or date.today()
+    end = end or start + timedelta(days=OCCURRENCE_DEFAULT_DAYS)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end start'tan önce olamaz")
+    if (end - start).days > OCCURRENCE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Aralık en fazla {OCCURRENCE_MAX_DAYS} gün olabilir")
+
+    occurrences = sorted(
+        expand_occurrences(db, current_company.id, start, end, direction),
+        key=lambda o: (o.due_date, o.id),
+    )
+    return FastJSONResponse([o.as_dict() for o in occurrences])
 
 
 @router.post("/{planned_id}/matches", response_model=PlannedMatchResponse)
@@ -139,6 +259,8 @@ def create_planned_match(
     db: Session = Depends(get_db),
     current_company: Company = Depends(get_current_company),
 ):
+    # Tekrarlayan oluşum id'si gelirse önce satırı üretilir
+    planned_id = resolve_planned_item_id(db, current_company.id, planned_id)
     item = db.query(PlannedCashflowItem).filter(
         PlannedCashflowItem.status.in_(["OPEN", "PARTIAL", "SETTLED"]),
         PlannedCashflowItem.company_id == current_company.id,
@@ -183,10 +305,11 @@ def create_planned_match(
     )
 
     db.add(match)
+    db.flush()
+    refresh_transaction_match_state(db, current_company.id, [payload.transaction_id])
+    apply_settlement_delta(db, current_company.id, planned_id, payload.matched_amount)
     db.commit()
     db.refresh(match)
-
-    recompute_planned_status(db, current_company.id, planned_id)
     return match
 
 
@@ -206,31 +329,10 @@ def get_planned_matches(
     if not item:
         raise HTTPException(404, "Planned item bulunamadı")
 
-    rows = db.query(PlannedMatch, Transaction).join(
-        Transaction,
-        Transaction.id == PlannedMatch.transaction_id
-    ).filter(
-        PlannedMatch.company_id == company_id,
-        PlannedMatch.planned_item_id == planned_id
+    rows = match_list_query(
+        db, company_id, planned_item_id=planned_id, inner=True
     ).order_by(PlannedMatch.created_at.desc()).all()
-
-    result = []
-    for m, tx in rows:
-        result.append({
-            "match_id": m.id,
-            "matched_amount": float(m.matched_amount),
-            "match_type": m.match_type,
-            "created_at": m.created_at.isoformat() if m.created_at else None,
-            "transaction": {
-                "id": tx.id,
-                "date": tx.date.isoformat(),
-                "amount": float(tx.amount),
-                "direction": tx.direction,
-                "category": tx.category,
-                "description": tx.description,
-                "source": tx.source,
-            }
-        })
+    result = [planned_match_row_to_dict(row) for row in rows]
 
     return {
         "planned_id": planned_id,
@@ -255,8 +357,24 @@ def delete_planned_item(
     
     if not item:
         raise HTTPException(status_code=404, detail="Planlı nakit kaydı bulunamadı")
-    
-    db.delete(item)
+
+    # Kalemin eşleşmeleri de silinir; işlemlerin eşleşme durumu güncellenir
+    match_q = db.query(PlannedMatch).filter(
+        PlannedMatch.company_id == current_company.id,
+        PlannedMatch.planned_item_id == planned_id,
+    )
+    matched_tx_ids = [tx_id for (tx_id,) in match_q.with_entities(PlannedMatch.transaction_id).all()]
+    match_q.delete(synchronize_session=False)
+
+    if item.recurrence_id:
+        # Satır silinirse oluşum yeniden üretilirdi; iptal edilmiş olarak kalır
+        item.status = "CANCELLED"
+        item.settled_amount = 0
+        item.remaining_amount = 0
+    else:
+        db.delete(item)
+    db.flush()
+    refresh_transaction_match_state(db, current_company.id, matched_tx_ids)
     db.commit()
     
     return {"status": "deleted"}
@@ -1,5 +1,7 @@
 # app/routes/transactions.py
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, date
@@ -11,9 +13,21 @@ import pandas as pd
 import logging
 
 from app.core.deps import get_db, get_current_company
+from app.core.fast_json import FastJSONResponse
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    keyset_page,
+    count_total,
+    set_page_headers,
+)
 from app.models.transaction import (
     Transaction,
     TransactionSchema,
+    TRANSACTION_SCHEMA_COLUMNS,
+    transaction_row_to_dict,
+    TransactionSearchHit,
+    TransactionSearchResponse,
     TransactionCreate,
     TransactionCategoryUpdate,
     ReconciliationInfo,
@@ -24,11 +38,51 @@ from app.models.planned_item import PlannedCashflowItem
 from app.models.company import Company
 from app.services.categorization import categorize_transaction
 from app.services.auto_match import auto_match_transaction
+from app.services.match_listing import match_list_query, transaction_match_row_to_dict
+from app.services.planned_settlement import apply_settlement_deltas
+from app.services.ledger_export import (
+    EXPORT_COLUMNS,
+    EXPORT_FORMATS,
+    parquet_available,
+    stream_ledger,
+)
+from app.services.transaction_search import search_transactions, search_backend
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _transaction_filters(
+    start_date: date | None = None,
+    end_date: date | None = None,
+    direction: str | None = None,
+    category: str | None = None,
+    source: str | None = None,
+    min_amount: Decimal | None = None,
+    max_amount: Decimal | None = None,
+):
+    """Liste / export / arama endpoint'lerinin ortak işlem filtre koşulları."""
+    conditions = []
+    if start_date:
+        conditions.append(Transaction.date >= start_date)
+    if end_date:
+        conditions.append(Transaction.date <= end_date)
+    if direction:
+        conditions.append(Transaction.direction == direction)
+    if category:
+        if category == "UNCATEGORIZED":
+            conditions.append(Transaction.category.is_(None))
+        else:
+            conditions.append(Transaction.category == category)
+    if source:
+        conditions.append(Transaction.source == source)
+    if min_amount is not None:
+        conditions.append(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        conditions.append(Transaction.amount <= max_amount)
+    return conditions
+
+
 @router.get("/", response_model=List[TransactionSchema])
 @router.get("", response_model=List[TransactionSchema])
 def list_transactions(
@@ -36,16 +90,111 @@ def list_transactions(
     current_company: Company = Depends(get_current_company),
     start_date: date | None = None,
     end_date: date | None = None,
+    direction: str | None = Query(None, pattern="^(in|out)$"),
+    category: str | None = None,
+    source: str | None = None,
+    min_amount: Decimal | None = None,
+    max_amount: Decimal | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    include_total: bool = False,
+    fetch_all: bool = Query(False, alias="all", description="Uyumluluk: sayfalamadan tüm kayıtları döner"),
 ):
-    q = db.query(Transaction).filter(Transaction.company_id == current_company.id)
+    """
+    İşlemleri (date desc, id desc) sırasıyla keyset sayfalı listeler.
+    Sonraki sayfa için X-Next-Cursor header'ındaki değer `cursor` olarak gönderilir;
+    include_total=true ise X-Total-Count header'ı da döner.
 
-    if start_date:
-        q = q.filter(Transaction.date >= start_date)
-    if end_date:
-        q = q.filter(Transaction.date <= end_date)
+    Entity/Pydantic yerine kolon satırları okunup doğrudan encode edilir;
+    çıktı TransactionSchema ile birebir aynıdır.
+    """
+    q = db.query(*TRANSACTION_SCHEMA_COLUMNS).filter(Transaction.company_id == current_company.id)
+    q = q.filter(*_transaction_filters(
+        start_date, end_date, direction, category, source, min_amount, max_amount
+    ))
+
+    total = count_total(q) if include_total else None
+
+    if fetch_all:
+        rows = q.order_by(Transaction.date.desc(), Transaction.id.desc()).all()
+        next_cursor = None
+    else:
+        rows, next_cursor = keyset_page(
+            q, Transaction.date, Transaction.id,
+            limit=limit, cursor=cursor, descending=True,
+            parse_sort=date.fromisoformat,
+        )
+
+    response = FastJSONResponse([transaction_row_to_dict(row) for row in rows])
+    set_page_headers(response, next_cursor, total)
+    return response
+
+
+@router.get("/search", response_model=TransactionSearchResponse)
+def search_transactions_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    db: Session = Depends(get_db),
+    current_company: Company = Depends(get_current_company),
+    start_date: date | None = None,
+    end_date: date | None = None,
+    direction: str | None = Query(None, pattern="^(in|out)$"),
+    category: str | None = None,
+    min_amount: Decimal | None = None,
+    max_amount: Decimal | None = None,
+    limit: int = Query(50, ge=1, le=200),
+):
+    """
+    Açıklama metninde indeksli arama (SQLite: FTS5, Postgres: tsvector + pg_trgm).
+    Sonuçlar alaka skoruna göre sıralıdır.
+    """
+    filters = _transaction_filters(
+        start_date, end_date, direction, category, None, min_amount, max_amount
+    )
+    backend = search_backend(db)
+    hits = search_transactions(db, current_company.id, q, filters=filters, limit=limit, backend=backend)
+    return TransactionSearchResponse(
+        query=q,
+        backend=backend,
+        results=[
+            TransactionSearchHit(**TransactionSchema.model_validate(tx).model_dump(), score=round(score, 4))
+            for tx, score in hits
+        ],
+    )
 
-    tx_list = q.order_by(Transaction.date.desc()).all()
-    return tx_list
+
+@router.get("/export")
+def export_transactions(
+    db: Session = Depends(get_db),
+    current_company: Company = Depends(get_current_company),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|parquet)$"),
+    start_date: date | None = None,
+    end_date: date | None = None,
+    direction: str | None = Query(None, pattern="^(in|out)$"),
+    category: str | None = None,
+    source: str | None = None,
+    min_amount: Decimal | None = None,
+    max_amount: Decimal | None = None,
+):
+    """
+    Tüm defteri stream ederek dışa aktarır (csv / ndjson / parquet).
+    Satırlar yield_per ile parça parça okunup yazıldığından bellek kullanımı
+    defter boyutundan bağımsızdır.
+    """
+    if export_format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export için pyarrow kurulu değil")
+
+    stmt = select(*EXPORT_COLUMNS).where(Transaction.company_id == current_company.id)
+    stmt = stmt.where(*_transaction_filters(
+        start_date, end_date, direction, category, source, min_amount, max_amount
+    )).order_by(Transaction.date, Transaction.id)
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"ledger_{current_company.id}_{date.today().isoformat()}.{extension}"
+    return StreamingResponse(
+        stream_ledger(db, stmt, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @router.post("/upload-csv")
 async def upload_transactions_csv(
@@ -170,7 +319,21 @@ def delete_transaction(
     if not tx:
         raise HTTPException(status_code=404, detail="Transaction bulunamadı")
 
+    # İşlemin eşleşmeleri de silinir; ilgili planlı kalemlerden düşülür
+    match_q = db.query(PlannedMatch).filter(
+        PlannedMatch.company_id == current_company.id,
+        PlannedMatch.transaction_id == tx_id,
+    )
+    deltas = {}
+    for planned_id, matched_amount in match_q.with_entities(
+        PlannedMatch.planned_item_id, PlannedMatch.matched_amount
+    ).all():
+        deltas[planned_id] = deltas.get(planned_id, 0) - matched_amount
+    match_q.delete(synchronize_session=False)
+
     db.delete(tx)
+    db.flush()
+    apply_settlement_deltas(db, current_company.id, deltas)
     db.commit()
     return {"status": "deleted"}
 
@@ -210,33 +373,10 @@ def get_transaction_matches(
     if not tx:
         raise HTTPException(404, "Transaction bulunamadı")
 
-    rows = db.query(PlannedMatch, PlannedCashflowItem).join(
-        PlannedCashflowItem,
-        PlannedCashflowItem.id == PlannedMatch.planned_item_id
-    ).filter(
-        PlannedMatch.company_id == company_id,
-        PlannedMatch.transaction_id == tx_id
+    rows = match_list_query(
+        db, company_id, transaction_id=tx_id, inner=True
     ).order_by(PlannedMatch.created_at.desc()).all()
-
-    result = []
-    for m, item in rows:
-        result.append({
-            "match_id": m.id,
-            "matched_amount": float(m.matched_amount),
-            "match_type": m.match_type,
-            "created_at": m.created_at.isoformat() if m.created_at else None,
-            "planned_item": {
-                "id": item.id,
-                "type": item.type,
-                "direction": item.direction,
-                "due_date": item.due_date.isoformat(),
-                "amount": float(item.amount),
-                "status": item.status,
-                "remaining_amount": float(item.remaining_amount),
-                "counterparty": item.counterparty,
-                "reference_no": item.reference_no,
-            }
-        })
+    result = [transaction_match_row_to_dict(row) for row in rows]
 
     return {
         "transaction_id": tx_id,
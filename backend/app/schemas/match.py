@@ -5,3 +5,14 @@ class MatchCreate(BaseModel):
     transaction_id: str
     matched_amount: float = Field(gt=0)
     match_type: str = "MANUAL"  # MANUAL/AUTO
+
+
+class MatchAllocation(BaseModel):
+    planned_item_id: str
+    transaction_id: str
+    matched_amount: float = Field(gt=0)
+
+
+class MatchProposalConfirm(BaseModel):
+    allocations: list[MatchAllocation] = Field(min_length=1, max_length=50)
+    match_type: str = "MANUAL"  # MANUAL/AUTO
@@ -0,0 +1,114 @@
+# app/services/ai_answer_cache.py
+"""
+Database-backed cache of AI answers.
+
+Users ask the same handful of questions ("nakit durumum nasıl?") again
+and again. An answer is reusable as long as both the question and the
+data it was answered from are the same, so entries are keyed on:
+
+- the question, normalized with categorization.normalize() (case,
+  Turkish characters, punctuation and whitespace do not matter),
+- a SHA-256 of the model name and the full financial context; the
+  context changes with every ledger write and every new day, so stale
+  answers simply stop matching.
+
+Entries live in the ai_answer_cache table so they survive instance
+restarts and are shared between instances. Each entry expires after
+AI_ANSWER_CACHE_TTL_SECONDS; beyond AI_ANSWER_CACHE_MAX_PER_COMPANY
+entries a company's least recently used ones are evicted on write.
+Only successful model answers are stored. Concurrent requests for the
+same question may both miss and both store; the loser of the insert race
+updates the winner's row instead of failing.
+
+Nothing here commits; callers commit.
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.ai_answer_cache import AIAnswerCache
+from app.services.categorization import normalize
+
+AI_ANSWER_CACHE_TTL_SECONDS = 6 * 3600
+AI_ANSWER_CACHE_MAX_PER_COMPANY = 200
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def context_hash(context: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\n{context}".encode("utf-8")).hexdigest()
+
+
+def get_cached_answer(db: Session, company_id: int, question: str, context: str, model: str) -> str | None:
+    """Süresi dolmamış cevabı döner ve kullanım zamanını günceller; yoksa None."""
+    question_norm = normalize(question)
+    if not question_norm:
+        return None
+    now = _now()
+    entry = db.query(AIAnswerCache).filter(
+        AIAnswerCache.company_id == company_id,
+        AIAnswerCache.question_norm == question_norm,
+        AIAnswerCache.context_hash == context_hash(context, model),
+        AIAnswerCache.expires_at > now,
+    ).first()
+    if entry is None:
+        return None
+    entry.last_used_at = now
+    entry.hit_count = (entry.hit_count or 0) + 1
+    db.flush()
+    return entry.answer
+
+
+def store_answer(db: Session, company_id: int, question: str, context: str, model: str, answer: str) -> None:
+    """Cevabı yazar (varsa yeniler), süresi dolanları ve LRU fazlasını siler."""
+    question_norm = normalize(question)
+    if not question_norm or not answer:
+        return
+    now = _now()
+    expires_at = now + timedelta(seconds=AI_ANSWER_CACHE_TTL_SECONDS)
+    digest = context_hash(context, model)
+    key = db.query(AIAnswerCache).filter(
+        AIAnswerCache.company_id == company_id,
+        AIAnswerCache.question_norm == question_norm,
+        AIAnswerCache.context_hash == digest,
+    )
+    entry = key.first()
+    if entry is None:
+        # Son değerlerle yazılır; eşzamanlı bir temizlik süresi dolmuş sanıp silmesin
+        entry = AIAnswerCache(
+            company_id=company_id, question_norm=question_norm, context_hash=digest, hit_count=0,
+            answer=answer, last_used_at=now, expires_at=expires_at,
+        )
+        try:
+            with db.begin_nested():
+                db.add(entry)
+        except IntegrityError:
+            # Aynı soruyu eşzamanlı soran başka bir istek önce yazdı; onu güncelle
+            entry = key.one()
+    entry.answer = answer
+    entry.last_used_at = now
+    entry.expires_at = expires_at
+    db.flush()
+
+    db.execute(
+        delete(AIAnswerCache)
+        .where(AIAnswerCache.company_id == company_id, AIAnswerCache.expires_at <= now)
+        .execution_options(synchronize_session=False)
+    )
+    keep = (
+        select(AIAnswerCache.id)
+        .where(AIAnswerCache.company_id == company_id)
+        .order_by(AIAnswerCache.last_used_at.desc(), AIAnswerCache.id)
+        .limit(AI_ANSWER_CACHE_MAX_PER_COMPANY)
+    )
+    db.execute(
+        delete(AIAnswerCache)
+        .where(AIAnswerCache.company_id == company_id, AIAnswerCache.id.not_in(keep))
+        .execution_options(synchronize_session=False)
+    )
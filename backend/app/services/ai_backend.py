@@ -0,0 +1,110 @@
+# app/services/ai_backend.py
+"""
+Pluggable chat-model backend for the AI endpoints.
+
+The backend is chosen by configuration (environment):
+
+    AI_BACKEND   openai (default) | local
+    AI_BASE_URL  API base URL; for "local" defaults to LOCAL_BASE_URL
+    AI_MODEL     model name (default gpt-4o)
+
+- openai: the hosted OpenAI API; needs OPENAI_API_KEY.
+- local:  any OpenAI-compatible chat-completions server (e.g.
+          ai_stub_server.py for load tests, or a self-hosted model); the
+          API key is optional.
+
+Both are served by the same client code (the openai SDK with a custom
+base_url). Sync and async clients are created once per configuration
+and reused, so connections to the model server stay alive across
+requests. `cache_key` names backend and model, so answers cached from a
+stub never satisfy real questions.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+AI_BACKENDS = ("openai", "local")
+DEFAULT_AI_MODEL = "gpt-4o"
+LOCAL_BASE_URL = "http://127.0.0.1:8001/v1"
+AI_TEMPERATURE = 0.7
+AI_MAX_TOKENS = 2000
+
+_lock = threading.Lock()
+_backend = None
+_backend_config = None
+
+
+class AIBackendUnavailable(Exception):
+    """Backend yapılandırılmamış (ör. OpenAI API key yok)."""
+
+
+@dataclass(frozen=True)
+class AIBackendConfig:
+    name: str
+    model: str
+    base_url: str | None
+    api_key: str | None
+
+    @classmethod
+    def from_env(cls) -> "AIBackendConfig":
+        name = (os.getenv("AI_BACKEND") or "openai").strip().lower()
+        if name not in AI_BACKENDS:
+            raise AIBackendUnavailable(f"Bilinmeyen AI_BACKEND: {name} ({', '.join(AI_BACKENDS)})")
+        base_url = os.getenv("AI_BASE_URL") or (LOCAL_BASE_URL if name == "local" else None)
+        api_key = os.getenv("OPENAI_API_KEY") or ("local" if name == "local" else None)
+        return cls(name, os.getenv("AI_MODEL") or DEFAULT_AI_MODEL, base_url, api_key)
+
+
+class ChatBackend:
+    """OpenAI uyumlu chat-completions istemcisi (senkron + stream)."""
+
+    def __init__(self, config: AIBackendConfig):
+        from openai import AsyncOpenAI, OpenAI
+
+        self.config = config
+        self.client = OpenAI(api_key=config.api_key, base_url=config.base_url)
+        self.async_client = AsyncOpenAI(api_key=config.api_key, base_url=config.base_url)
+
+    @property
+    def model(self) -> str:
+        return self.config.model
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.config.name}:{self.config.model}"
+
+    def _request(self, prompt: str) -> dict:
+        return {
+            "model": self.config.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": AI_TEMPERATURE,
+            "max_tokens": AI_MAX_TOKENS,
+        }
+
+    def complete(self, prompt: str) -> str:
+        response = self.client.chat.completions.create(**self._request(prompt))
+        return response.choices[0].message.content or ""
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        stream = await self.async_client.chat.completions.create(**self._request(prompt), stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def get_ai_backend() -> ChatBackend:
+    """
+    Yapılandırmaya göre paylaşılan backend'i döner; yapılandırma değişirse
+    yeniden kurulur. Kullanılamıyorsa AIBackendUnavailable.
+    """
+    global _backend, _backend_config
+    config = AIBackendConfig.from_env()
+    if not config.api_key:
+        raise AIBackendUnavailable("OpenAI API key bulunamadı. .env dosyasında OPENAI_API_KEY tanımla.")
+    with _lock:
+        if _backend is None or _backend_config != config:
+            _backend = ChatBackend(config)
+            _backend_config = config
+        return _backend
@@ -0,0 +1,716 @@
+# app/services/ai_context.py
+"""
+AI financial context, built from independent section providers.
+
+Each section of the context (CFO profile, category trends, top
+counterparties, payment discipline, matching health, insights, forecast)
+is a provider `(db, company_id, today) -> (lines, facts)` that runs its
+own queries in its own session. Providers share nothing, so
+`compute_financial_context` runs them concurrently on a bounded,
+process-wide thread pool (AI_CONTEXT_WORKERS threads) and stitches the
+results back together in a fixed order.
+
+Every section has a timeout measured from when it starts running. A
+section that misses it is replaced by a placeholder line and the rest of
+the context is returned; the unfinished provider keeps running in the
+background and closes its session when done. Concurrent builds are
+bounded (AI_CONTEXT_MAX_BUILDS, one pool's worth of sections each), and a
+build holds its slot until all of its sections have finished, so a
+build's sections never queue behind another build's, even behind one
+that timed out. The names of degraded sections are
+reported in facts["degraded_sections"] (the context cache does not keep
+degraded contexts), and per-section timings are logged and reported in
+facts["section_ms"]. Each section's rendered text is also kept in
+facts["section_text"] so a smaller prompt can reuse single sections.
+
+Single-connection engines (StaticPool, e.g. in-memory SQLite) cannot
+serve several sessions at once; sections run inline there.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from datetime import date, timedelta
+from math import sqrt
+from typing import Callable
+
+from sqlalchemy import case, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core.constants import FIXED_COST_CATEGORIES
+from app.models.company_settings import CompanyFinancialSettings
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.cash_position import calculate_estimated_cash
+from app.services.matching_health import get_matching_health
+
+logger = logging.getLogger(__name__)
+
+AI_CONTEXT_WORKERS = 8
+AI_CONTEXT_SECTION_TIMEOUT_SECONDS = 5.0
+
+_executor = ThreadPoolExecutor(max_workers=AI_CONTEXT_WORKERS, thread_name_prefix="ai-context")
+
+SectionProvider = Callable[[Session, int, date], tuple[list[str], dict | None]]
+
+
+@dataclass(frozen=True)
+class ContextSection:
+    key: str
+    title: str
+    name: str  # hata/zaman aşımı mesajlarında
+    provider: SectionProvider
+    timeout: float = AI_CONTEXT_SECTION_TIMEOUT_SECONDS
+
+
+def clamp(x: float, lo: float, hi: float) -> float:
+    """Değeri lo ile hi arasına sınırla."""
+    return max(lo, min(hi, x))
+
+
+def safe_div(a: float, b: float) -> float:
+    """Güvenli bölme (b=0 ise 0 döner)."""
+    return a / b if b not in (0, 0.0, None) else 0.0
+
+
+def _estimated_cash(db: Session, company_id: int, fallback: float) -> tuple[float, bool]:
+    """
+    Dashboard'daki tahmini nakit (başlangıç bakiyesi + o tarihten beri net
+    akış); şirketin finansal ayarı yoksa fallback (dönem net akışı).
+    Returns: (tutar, ayardan mı hesaplandı)
+    """
+    settings = db.query(CompanyFinancialSettings).filter(
+        CompanyFinancialSettings.company_id == company_id
+    ).first()
+    if settings:
+        return calculate_estimated_cash(
+            db, company_id, float(settings.initial_balance), settings.initial_balance_date
+        ), True
+    return fallback, False
+
+
+def _flow_totals(db: Session, company_id: int, start: date | None) -> tuple[float, float, int]:
+    """(giriş toplamı, çıkış toplamı, işlem sayısı); start None ise tüm zamanlar."""
+    q = db.query(
+        func.coalesce(func.sum(case((Transaction.direction == "in", Transaction.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((Transaction.direction == "in", 0), else_=Transaction.amount)), 0),
+        func.count(Transaction.id),
+    ).filter(Transaction.company_id == company_id)
+    if start is not None:
+        q = q.filter(Transaction.date >= start)
+    total_in, total_out, count = q.one()
+    return float(total_in), float(total_out), int(count)
+
+
+# ===== 1. CFO PROFILE =====
+def profile_section(db: Session, company_id: int, today: date) -> tuple[list[str], dict]:
+    ctx_lines = []
+
+    start_90 = today - timedelta(days=90)
+    tx_list_90 = db.query(Transaction.date, Transaction.amount, Transaction.direction).filter(
+        Transaction.company_id == company_id,
+        Transaction.date >= start_90
+    ).all()
+
+    if len(tx_list_90) == 0:
+        tx_list_90 = db.query(Transaction.date, Transaction.amount, Transaction.direction).filter(
+            Transaction.company_id == company_id
+        ).all()
+        use_last90 = False
+    else:
+        use_last90 = True
+
+    # Günlük net hesapla
+    daily_net = {}
+    total_in = 0.0
+    total_out = 0.0
+
+    for d, amount, direction in tx_list_90:
+        amt = float(amount)
+        if direction == "in":
+            daily_net[d] = daily_net.get(d, 0.0) + amt
+            total_in += amt
+        else:
+            daily_net[d] = daily_net.get(d, 0.0) - amt
+            total_out += amt
+
+    day_count = len(daily_net)
+    avg_daily_net = safe_div(sum(daily_net.values()), day_count)
+    avg_daily_in = safe_div(total_in, day_count)
+    avg_daily_out = safe_div(total_out, day_count)
+
+    # Volatility
+    if day_count <= 1:
+        net_std = 0.0
+    else:
+        mean = avg_daily_net
+        var = sum((v - mean) ** 2 for v in daily_net.values()) / (day_count - 1)
+        net_std = sqrt(var)
+
+    estimated_cash, cash_from_settings = _estimated_cash(db, company_id, total_in - total_out)
+    runway_days = safe_div(estimated_cash, avg_daily_out)
+
+    # Risk scores
+    liquidity_risk = 100 - clamp((runway_days / 120.0) * 100.0, 0, 100)
+    vol_ratio = safe_div(net_std, avg_daily_out)
+    volatility_risk = clamp(vol_ratio * 100.0, 0, 100)
+
+    # Category analysis for concentration
+    cat_q = db.query(
+        Transaction.direction,
+        Transaction.category,
+        func.coalesce(func.sum(Transaction.amount), 0).label("sum_amount")
+    ).filter(
+        Transaction.company_id == company_id,
+    )
+    if use_last90:
+        cat_q = cat_q.filter(Transaction.date >= start_90)
+    income_by_cat = {}
+    expense_by_cat = {}
+    for direction, cat, s in cat_q.group_by(Transaction.direction, Transaction.category).all():
+        target = income_by_cat if direction == "in" else expense_by_cat
+        key = cat or "UNCATEGORIZED"
+        target[key] = target.get(key, 0.0) + float(s or 0)
+
+    total_income_cat = sum(income_by_cat.values())
+    total_expense_cat = sum(expense_by_cat.values())
+
+    top_income_share = safe_div(max(income_by_cat.values()) if income_by_cat else 0, total_income_cat)
+    top_expense_category = max(expense_by_cat, key=expense_by_cat.get) if expense_by_cat else None
+    top_expense_share = safe_div(expense_by_cat.get(top_expense_category, 0), total_expense_cat)
+
+    conc = max(top_income_share, top_expense_share)
+    concentration_risk = clamp(safe_div((conc - 0.2), (0.8 - 0.2)) * 100.0, 0, 100)
+
+    # Fixed cost
+    fixed_cost = sum(expense_by_cat.get(c, 0.0) for c in FIXED_COST_CATEGORIES)
+    fixed_cost_ratio = safe_div(fixed_cost, total_expense_cat)
+
+    facts = {
+        "period": "last90" if use_last90 else "all",
+        "day_count": day_count,
+        "estimated_cash": estimated_cash,
+        "cash_from_settings": cash_from_settings,  # False: bakiye değil dönem net akışı
+        "runway_days": runway_days,
+        "avg_daily_net": avg_daily_net,
+        "avg_daily_in": avg_daily_in,
+        "avg_daily_out": avg_daily_out,
+        "net_std": net_std,
+        "liquidity_risk": liquidity_risk,
+        "volatility_risk": volatility_risk,
+        "concentration_risk": concentration_risk,
+        "fixed_cost": fixed_cost,
+        "fixed_cost_ratio": fixed_cost_ratio,
+        "top_income_share": top_income_share,
+        "top_expense_share": top_expense_share,
+        "top_expense_category": top_expense_category,
+        "top_expense_amount": expense_by_cat.get(top_expense_category, 0.0),
+        "expense_total": total_expense_cat,
+    }
+
+    # CFO Profile output
+    ctx_lines.append(f"**Veri Dönemi:** {('Son 90 gün' if use_last90 else 'Tüm zamanlar')} ({day_count} gün)")
+    ctx_lines.append("")
+    ctx_lines.append("#### 💰 Likidite & Nakit")
+    ctx_lines.append(f"- Tahmini nakit: **{estimated_cash:,.0f} ₺**")
+    ctx_lines.append(f"- Runway: **{runway_days:.1f} gün** (nakit tükenmeden kaç gün daha çalışabilir)")
+    ctx_lines.append(f"- Ort. günlük net: **{avg_daily_net:,.0f} ₺** (↑ {avg_daily_in:,.0f} | ↓ {avg_daily_out:,.0f})")
+    ctx_lines.append(f"- Net volatilite: {net_std:,.0f} ₺ (günlük dalgalanma)")
+    ctx_lines.append("")
+    ctx_lines.append("#### ⚠️ Risk Skorları (0-100, yüksek = riskli)")
+    ctx_lines.append(f"- **Likidite Riski: {liquidity_risk:.1f}** {'🔴 CRİTİK' if liquidity_risk > 75 else '🟠 UYARI' if liquidity_risk > 50 else '🟢 İYİ'}")
+    ctx_lines.append(f"- **Volatilite Riski: {volatility_risk:.1f}** {'🔴 CRİTİK' if volatility_risk > 75 else '🟠 UYARI' if volatility_risk > 50 else '🟢 İYİ'}")
+    ctx_lines.append(f"- **Konsantrasyon Riski: {concentration_risk:.1f}** {'🔴 CRİTİK' if concentration_risk > 75 else '🟠 UYARI' if concentration_risk > 50 else '🟢 İYİ'}")
+    ctx_lines.append("")
+    ctx_lines.append("#### 📈 Maliyet Yapısı")
+    ctx_lines.append(f"- **Sabit gider oranı: {fixed_cost_ratio*100:.1f}%** ({fixed_cost:,.0f} ₺)")
+    ctx_lines.append(f"- Top gelir kategorisi payı: {top_income_share*100:.1f}%")
+    ctx_lines.append(f"- Top gider kategorisi payı: {top_expense_share*100:.1f}%")
+    ctx_lines.append("")
+    return ctx_lines, facts
+
+
+# ===== 2. CATEGORY TREND ANALYSIS (3 Months) =====
+def category_trends_section(db: Session, company_id: int, today: date) -> tuple[list[str], dict]:
+    ctx_lines = []
+    current_month_start = date(today.year, today.month, 1)
+
+    # Son 3 ay (eskiden yeniye)
+    months_data = []
+    for i in range(3, 0, -1):
+        month_date = current_month_start - timedelta(days=i*30)
+        month_start = date(month_date.year, month_date.month, 1)
+        if month_date.month == 12:
+            month_end = date(month_date.year + 1, 1, 1) - timedelta(days=1)
+        else:
+            month_end = date(month_date.year, month_date.month + 1, 1) - timedelta(days=1)
+
+        months_data.append({
+            'name': month_date.strftime('%B')[:3],  # Jan, Feb, etc.
+            'start': month_start,
+            'end': month_end
+        })
+
+    # Kategori x ay toplamları
+    category_trends = {}
+    for month_info in months_data:
+        month_txs = db.query(
+            Transaction.category,
+            func.coalesce(func.sum(Transaction.amount), 0).label("total")
+        ).filter(
+            Transaction.company_id == company_id,
+            Transaction.direction == "out",
+            Transaction.date >= month_info['start'],
+            Transaction.date <= month_info['end']
+        ).group_by(Transaction.category).all()
+
+        for cat, total in month_txs:
+            cat_name = cat or "UNCATEGORIZED"
+            if cat_name not in category_trends:
+                category_trends[cat_name] = []
+            category_trends[cat_name].append(float(total))
+
+    # Sort by total volume (sum of 3 months)
+    category_totals = [(cat, sum(amounts)) for cat, amounts in category_trends.items()]
+    category_totals.sort(key=lambda x: x[1], reverse=True)
+
+    # Show top 5-7 categories
+    top_categories = category_totals[:7]
+    facts = {
+        "months": [m['name'] for m in months_data],
+        "expense_by_category": {
+            cat: [0.0] * (3 - len(category_trends[cat])) + category_trends[cat]
+            for cat, _ in top_categories
+        },
+    }
+
+    if top_categories:
+        for cat, _ in top_categories:
+            amounts = category_trends[cat]
+            # Pad with zeros if missing months
+            while len(amounts) < 3:
+                amounts.insert(0, 0.0)
+
+            ctx_lines.append(f"**{cat}:**")
+            for i, month_info in enumerate(months_data):
+                amount = amounts[i]
+                # Calculate MoM growth
+                if i > 0 and amounts[i-1] > 0:
+                    growth = ((amount - amounts[i-1]) / amounts[i-1]) * 100
+                    growth_str = f" ({growth:+.1f}%)"
+                    if abs(growth) > 20:
+                        growth_str += " 🔴 ANOMALİ" if growth > 0 else " ⚠️ DÜŞÜŞ"
+                else:
+                    growth_str = ""
+
+                ctx_lines.append(f"  - {month_info['name']}: {amount:,.0f} ₺{growth_str}")
+
+            # Overall trend
+            if len(amounts) >= 2 and amounts[0] > 0:
+                total_growth = ((amounts[-1] - amounts[0]) / amounts[0]) * 100
+                trend_icon = "↗️ Artış" if total_growth > 5 else "↘️ Azalış" if total_growth < -5 else "→ Stabil"
+                ctx_lines.append(f"  → Trend: {trend_icon}")
+            ctx_lines.append("")
+    else:
+        ctx_lines.append("- Kategori bazlı veri bulunamadı")
+
+    ctx_lines.append("")
+    return ctx_lines, facts
+
+
+# ===== 3. TOP 10 COUNTERPARTY ANALYSIS =====
+def _top_counterparties(db: Session, company_id: int, direction: str, start: date) -> list[tuple[str, int, float]]:
+    rows = db.query(
+        PlannedCashflowItem.counterparty,
+        func.count(PlannedMatch.id).label("tx_count"),
+        func.coalesce(func.sum(PlannedMatch.matched_amount), 0).label("total")
+    ).join(
+        PlannedMatch, PlannedMatch.planned_item_id == PlannedCashflowItem.id
+    ).join(
+        Transaction, Transaction.id == PlannedMatch.transaction_id
+    ).filter(
+        PlannedCashflowItem.company_id == company_id,
+        PlannedCashflowItem.direction == direction,
+        Transaction.date >= start,
+        PlannedCashflowItem.counterparty.isnot(None)
+    ).group_by(PlannedCashflowItem.counterparty).all()
+
+    ranked = [(cp, int(tc), float(tot)) for cp, tc, tot in rows if cp]
+    ranked.sort(key=lambda x: x[2], reverse=True)
+    return ranked[:10]
+
+
+def counterparties_section(db: Session, company_id: int, today: date) -> tuple[list[str], dict]:
+    ctx_lines = []
+    start_90 = today - timedelta(days=90)
+
+    total_income_90, total_expense_90, _ = _flow_totals(db, company_id, start_90)
+    top_10_expense = _top_counterparties(db, company_id, "out", start_90)
+    top_10_income = _top_counterparties(db, company_id, "in", start_90)
+
+    facts = {
+        "expense_total_90": total_expense_90,
+        "income_total_90": total_income_90,
+        "top_expense": [
+            {"counterparty": cp, "tx_count": tc, "total": tot} for cp, tc, tot in top_10_expense
+        ],
+        "top_income": [
+            {"counterparty": cp, "tx_count": tc, "total": tot} for cp, tc, tot in top_10_income
+        ],
+    }
+
+    if top_10_expense:
+        ctx_lines.append("**Gider Tarafı:**")
+        for i, (counterparty, tx_count, total) in enumerate(top_10_expense, 1):
+            pct = safe_div(total, total_expense_90) * 100
+            ctx_lines.append(f"{i}. {counterparty}: {total:,.0f} ₺ ({tx_count} işlem, toplam giderin %{pct:.1f})")
+
+        # Concentration risk
+        top3_total = sum(x[2] for x in top_10_expense[:3])
+        top3_pct = safe_div(top3_total, total_expense_90) * 100
+        risk_indicator = "🔴 YÜKSEK RİSK" if top3_pct > 50 else "🟠 ORTA" if top3_pct > 30 else "🟢 Dengeli"
+        ctx_lines.append(f"\n**Konsantrasyon Riski:** Top 3 tedarikçi toplam giderin %{top3_pct:.1f}'sini oluşturuyor → {risk_indicator}")
+    else:
+        ctx_lines.append("**Gider Tarafı:** Counterparty bilgisi bulunamadı")
+
+    ctx_lines.append("")
+
+    if top_10_income:
+        ctx_lines.append("**Gelir Tarafı:**")
+        for i, (counterparty, tx_count, total) in enumerate(top_10_income, 1):
+            pct = safe_div(total, total_income_90) * 100
+            risk_flag = " 🔴 RİSK" if pct > 25 else ""
+            ctx_lines.append(f"{i}. {counterparty}: {total:,.0f} ₺ ({tx_count} işlem, toplam gelirin %{pct:.1f}{risk_flag})")
+    else:
+        ctx_lines.append("**Gelir Tarafı:** Counterparty bilgisi bulunamadı")
+
+    ctx_lines.append("")
+    return ctx_lines, facts
+
+
+# ===== 4. PAYMENT DISCIPLINE METRICS =====
+def payment_discipline_section(db: Session, company_id: int, today: date) -> tuple[list[str], dict | None]:
+    ctx_lines = []
+    start_90 = today - timedelta(days=90)
+
+    # Vadesi olan eşleşmeler (ödeme tarihi, vade, işlem kategorisi)
+    matched_items = db.query(
+        Transaction.date,
+        PlannedCashflowItem.due_date,
+        Transaction.category
+    ).select_from(PlannedMatch).join(
+        Transaction, Transaction.id == PlannedMatch.transaction_id
+    ).join(
+        PlannedCashflowItem, PlannedCashflowItem.id == PlannedMatch.planned_item_id
+    ).filter(
+        PlannedMatch.company_id == company_id,
+        Transaction.date >= start_90,
+        PlannedCashflowItem.due_date.isnot(None)
+    ).all()
+
+    if not matched_items:
+        ctx_lines.append("- Eşleşmiş vade bilgisi bulunamadı")
+        ctx_lines.append("")
+        return ctx_lines, None
+
+    total_matches = len(matched_items)
+    on_time = 0
+    late = 0
+    total_delay_days = 0
+    category_delays = {}
+
+    for tx_date, due_date, category in matched_items:
+        days_diff = (tx_date - due_date).days
+
+        if days_diff <= 0:
+            on_time += 1
+        else:
+            late += 1
+            total_delay_days += days_diff
+
+            # Track by category
+            cat_name = category or "UNCATEGORIZED"
+            if cat_name not in category_delays:
+                category_delays[cat_name] = []
+            category_delays[cat_name].append(days_diff)
+
+    avg_delay = safe_div(total_delay_days, late) if late > 0 else 0
+    on_time_pct = safe_div(on_time, total_matches) * 100
+    late_pct = safe_div(late, total_matches) * 100
+    facts = {
+        "matches": total_matches,
+        "on_time": on_time,
+        "late": late,
+        "avg_delay_days": avg_delay,
+    }
+
+    ctx_lines.append("**Genel Durum:**")
+    ctx_lines.append(f"- Ortalama gecikme: {avg_delay:.1f} gün")
+    ctx_lines.append(f"- Zamanında ödeme oranı: {on_time_pct:.0f}% (eşleşen {total_matches} işlemden {on_time}'si)")
+    ctx_lines.append(f"- Geç ödeme oranı: {late_pct:.0f}% ({late} işlem)")
+    ctx_lines.append("")
+
+    # Categories with worst discipline
+    if category_delays:
+        category_avg_delays = [
+            (cat, sum(delays)/len(delays), len(delays))
+            for cat, delays in category_delays.items()
+            if delays
+        ]
+        category_avg_delays.sort(key=lambda x: x[1], reverse=True)
+
+        ctx_lines.append("**En Çok Geciken Kategoriler:**")
+        for i, (cat, avg_d, count) in enumerate(category_avg_delays[:5], 1):
+            if avg_d > 0:  # Only show categories with actual delays
+                ctx_lines.append(f"{i}. {cat}: Ortalama {avg_d:.1f} gün gecikme ({count} işlem)")
+
+        ctx_lines.append("")
+
+    # Early payment opportunities (estimate)
+    _, total_expense_90, _ = _flow_totals(db, company_id, start_90)
+    if total_expense_90 > 0:
+        potential_savings = total_expense_90 * 0.02  # 2% discount assumption
+        ctx_lines.append("**Erken Ödeme Fırsatları:**")
+        ctx_lines.append(f"- Potansiyel tasarruf: ~{potential_savings/3:,.0f} ₺/ay (%2 iskonto varsayımı)")
+        ctx_lines.append("- Not: Tedarikçilere erken ödeme karşılığı iskonto talep edilebilir")
+
+    ctx_lines.append("")
+    return ctx_lines, facts
+
+
+# ===== 5. MATCHING HEALTH (Reconciliation Durumu) =====
+def matching_health_section(db: Session, company_id: int, today: date) -> tuple[list[str], dict]:
+    health = get_matching_health(db, company_id, today)
+    ctx_lines = [
+        f"- Otomatik eşleşen: {health['auto_matched']}",
+        f"- Manuel eşleşen: {health['manual_matched_all']}",
+        f"- Kısmi eşleşen: {health['partial_planned']}",
+        f"- **Vadesi geçmiş (işleme bekliyor): {health['unmatched_overdue']}** ⚠️ ({health['unmatched_overdue_amount']:,.0f} ₺ kalan)",
+        f"- Yaklaşan (14 gün içinde): {health['unmatched_upcoming_14d']} ({health['unmatched_upcoming_14d_amount']:,.0f} ₺ kalan)",
+        "",
+    ]
+    return ctx_lines, dict(health)
+
+
+# ===== 6. INSIGHTS (Otomatik Tespitler) =====
+def insights_section(db: Session, company_id: int, today: date) -> tuple[list[str], dict]:
+    # Basit yaklaşım: son 7 gün uyarı/fırsat tespitleri
+    alert_days = 7
+    start_alert = today - timedelta(days=alert_days)
+
+    recent_count = db.query(func.count(Transaction.id)).filter(
+        Transaction.company_id == company_id,
+        Transaction.date >= start_alert
+    ).scalar() or 0
+
+    ctx_lines = [f"(Son {alert_days} gün analizi)"]
+    if recent_count > 0:
+        ctx_lines.append(f"- İşlem sayısı: {recent_count}")
+        ctx_lines.append(f"- Taranmış...")
+    else:
+        ctx_lines.append("- Son gün veri yok")
+    ctx_lines.append("")
+    return ctx_lines, {"recent_days": alert_days, "recent_transactions": recent_count}
+
+
+# ===== 7. FORECAST (30/60/90 Günlük Tahminler) =====
+def forecast_section(db: Session, company_id: int, today: date) -> tuple[list[str], dict]:
+    # Basit forecast: son 90 günün ortalama günlük in/out'ı
+    start_forecast = today - timedelta(days=90)
+    forecast_in, forecast_out, count = _flow_totals(db, company_id, start_forecast)
+
+    # Tahmini nakit, CFO profilindeki gibi: ayar yoksa dönem net akışı
+    # (son 90 günde işlem yoksa tüm zamanlar)
+    basis_in, basis_out = forecast_in, forecast_out
+    if count == 0:
+        basis_in, basis_out, _ = _flow_totals(db, company_id, None)
+    estimated_cash, cash_from_settings = _estimated_cash(db, company_id, basis_in - basis_out)
+
+    days_in_forecast = (today - start_forecast).days
+    avg_in = safe_div(forecast_in, days_in_forecast) if days_in_forecast > 0 else 0
+    avg_out = safe_div(forecast_out, days_in_forecast) if days_in_forecast > 0 else 0
+    avg_net = avg_in - avg_out
+    facts = {
+        "avg_daily_in": avg_in,
+        "avg_daily_out": avg_out,
+        "avg_daily_net": avg_net,
+        "cash": {str(d): estimated_cash + avg_net * d for d in (30, 60, 90)},
+        "cash_from_settings": cash_from_settings,
+    }
+
+    ctx_lines = [
+        f"**Varsayım:** Son 90 günün ortalaması ileriye uygulanacak",
+        f"- Ort. günlük tahsilat: {avg_in:,.0f} ₺",
+        f"- Ort. günlük ödeme: {avg_out:,.0f} ₺",
+        f"- Ort. günlük net: {avg_net:,.0f} ₺",
+        "",
+        f"**Tahmini nakit pozisyonu:**",
+        f"- 30. gün: {estimated_cash + avg_net * 30:,.0f} ₺",
+        f"- 60. gün: {estimated_cash + avg_net * 60:,.0f} ₺",
+        f"- 90. gün: {estimated_cash + avg_net * 90:,.0f} ₺",
+        "",
+    ]
+    return ctx_lines, facts
+
+
+CONTEXT_SECTIONS = (
+    ContextSection("profile", "### 📊 CFO PROFİLİ (Finansal Risk Özeti)", "CFO Profile", profile_section),
+    ContextSection("category_trends", "### 📊 KATEGORİ TREND ANALİZİ (Son 3 Ay)", "Kategori trend analizi", category_trends_section),
+    ContextSection("counterparties", "### 🏢 EN BÜYÜK 10 KARŞI TARAF (Son 90 Gün)", "Counterparty analizi", counterparties_section),
+    ContextSection("payment_discipline", "### ⏱️ ÖDEME DİSİPLİNİ ANALİZİ (Son 90 Gün)", "Ödeme disiplini analizi", payment_discipline_section),
+    ContextSection("matching_health", "### 📋 EŞLEŞTIRME DURUMU (Reconciliation Health)", "Matching health", matching_health_section),
+    ContextSection("insights", "### 💡 OTOMATIK TESPİTLER (Insights)", "Insights", insights_section),
+    ContextSection("forecast", "### 🔮 NAKIT TAHMİNİ (30/60/90 Gün)", "Forecast", forecast_section),
+)
+
+# Her build'in tüm bölümleri aynı anda bir worker bulabilsin
+AI_CONTEXT_MAX_BUILDS = max(1, AI_CONTEXT_WORKERS // len(CONTEXT_SECTIONS))
+_build_slots = threading.BoundedSemaphore(AI_CONTEXT_MAX_BUILDS)
+
+SUMMARY_LINES = (
+    "=" * 70,
+    "### 🎯 ÖNERİLER İÇİN DİKKAT NOKTALARI",
+    "=" * 70,
+    "",
+    "Yukarıdaki veriler ışığında şirketin finansal durumunu analiz et:",
+    "1. Likidite riski nedir? Runway yeterli mi?",
+    "2. Volatilite çok mu? Nakit planlaması zor mu?",
+    "3. Sabit gider oranı sağlıklı mı? İndirme fırsatı var mı?",
+    "4. En riskli kategoriler hangileri?",
+    "5. Reconciliation gecikmeler var mı?",
+    "",
+)
+
+
+def supports_parallel_sessions(bind: Engine) -> bool:
+    """Aynı anda birden çok bağlantı açılabiliyor mu (StaticPool tek bağlantı paylaşır)."""
+    return not isinstance(bind.pool, StaticPool)
+
+
+class _SectionStart:
+    """Bölümün çalışmaya başladığı an; zaman aşımı buradan ölçülür."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.at = 0.0
+
+    def mark(self) -> None:
+        self.at = time.monotonic()
+        self.event.set()
+
+
+def _run_section(
+    section: ContextSection,
+    session_factory: Callable[[], Session],
+    company_id: int,
+    today: date,
+    start: _SectionStart | None = None,
+) -> tuple[list[str], dict | None, float]:
+    if start is not None:
+        start.mark()
+    started = time.perf_counter()
+    db = session_factory()
+    try:
+        lines, facts = section.provider(db, company_id, today)
+    except Exception as e:
+        logger.warning("AI context section %s failed for company %s: %s", section.key, company_id, e)
+        lines, facts = [f"⚠️ {section.name} alınamadı: {str(e)}", ""], None
+    finally:
+        db.close()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info("AI context section %s for company %s took %.1f ms", section.key, company_id, elapsed_ms)
+    return lines, facts, elapsed_ms
+
+
+def _submit_build(
+    sections: tuple[ContextSection, ...],
+    starts: list[_SectionStart],
+    session_factory: Callable[[], Session],
+    company_id: int,
+    today: date,
+) -> list:
+    """
+    Bir build slotu alıp bölümleri pool'a verir. Slot, build döndüğünde
+    değil, son bölüm (zaman aşımına uğrayanlar dahil) bittiğinde bırakılır.
+    """
+    _build_slots.acquire()
+    if not sections:
+        _build_slots.release()
+        return []
+    pending = [len(sections)]
+    lock = threading.Lock()
+
+    def finished(_future) -> None:
+        with lock:
+            pending[0] -= 1
+            last = pending[0] == 0
+        if last:
+            _build_slots.release()
+
+    futures = []
+    for section, start in zip(sections, starts):
+        future = _executor.submit(_run_section, section, session_factory, company_id, today, start)
+        future.add_done_callback(finished)
+        futures.append(future)
+    return futures
+
+
+def compute_financial_context(
+    session_factory: Callable[[], Session],
+    company_id: int,
+    today: date,
+    sections: tuple[ContextSection, ...] = CONTEXT_SECTIONS,
+    parallel: bool = True,
+) -> tuple[str, dict]:
+    """
+    Bölümleri (paralel=True ise thread pool'da, her biri kendi session'ıyla)
+    üretip sabit sırayla birleştirir. Zaman aşımına uğrayan bölümün yerine
+    uyarı satırı konur.
+
+    Returns: (bağlam metni, yapısal veriler; bölüm anahtarı -> dict,
+              ayrıca "section_ms", "degraded_sections" ve "section_text")
+    """
+    if parallel:
+        starts = [_SectionStart() for _ in sections]
+        futures = _submit_build(sections, starts, session_factory, company_id, today)
+        outcomes = []
+        for section, start, future in zip(sections, starts, futures):
+            try:
+                # Build slotu worker ayırdığından bölüm hemen başlar; süre başlangıçtan sayılır
+                if not start.event.wait(section.timeout):
+                    raise FutureTimeoutError()
+                remaining = section.timeout - (time.monotonic() - start.at)
+                outcomes.append(future.result(timeout=max(remaining, 0)))
+            except FutureTimeoutError:
+                future.cancel()
+                logger.warning(
+                    "AI context section %s for company %s timed out after %.1f s",
+                    section.key, company_id, section.timeout,
+                )
+                outcomes.append(None)
+    else:
+        outcomes = [_run_section(section, session_factory, company_id, today) for section in sections]
+
+    ctx_lines = []
+    facts = {"section_ms": {}, "degraded_sections": [], "section_text": {}}
+    for section, outcome in zip(sections, outcomes):
+        header = ["=" * 70, section.title, "=" * 70]
+        if outcome is None:
+            lines = [f"⚠️ {section.name} zaman aşımına uğradı ({section.timeout:g} sn), bu bölüm atlandı.", ""]
+            ctx_lines += header + lines
+            facts["degraded_sections"].append(section.key)
+            continue
+        lines, section_facts, elapsed_ms = outcome
+        ctx_lines += header + lines
+        facts["section_text"][section.key] = "\n".join(header + lines)
+        facts["section_ms"][section.key] = round(elapsed_ms, 1)
+        if section_facts is not None:
+            facts[section.key] = section_facts
+
+    ctx_lines += SUMMARY_LINES
+    return "\n".join(ctx_lines), facts
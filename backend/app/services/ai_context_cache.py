@@ -0,0 +1,153 @@
+# app/services/ai_context_cache.py
+"""
+Per-company cache of the AI financial context.
+
+Building the context (CFO profile, category trends, counterparties,
+payment discipline, matching health, forecast) costs a dozen queries and
+a few full scans, and users typically ask several follow-up questions in
+a row on unchanged data. The generated text and the structured facts it
+was rendered from are cached per company, keyed on (day, data version),
+so any write to the ledger or a new day rebuilds it.
+
+Memory is bounded by keeping at most AI_CONTEXT_CACHE_MAX_COMPANIES
+companies (LRU) plus a TTL, like the other analytics caches. A context
+with degraded (timed out) sections is returned but not cached. Hits, misses
+and build times are counted process-wide (`get_context_cache_stats`).
+
+Concurrent misses for the same company share one build: a burst of AI
+questions after a write would otherwise rebuild the context once per
+request and exhaust the DB pool.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable
+
+from app.services.data_version import get_data_version
+
+logger = logging.getLogger(__name__)
+
+AI_CONTEXT_CACHE_MAX_COMPANIES = 256
+AI_CONTEXT_CACHE_TTL_SECONDS = 300
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[int, tuple[tuple, float, FinancialContext]]" = OrderedDict()
+# şirket -> bağlamı üreten thread'in kilidi; aynı anda tek build
+_build_locks: dict[int, threading.Lock] = {}
+
+
+@dataclass(frozen=True)
+class FinancialContext:
+    text: str
+    facts: dict
+    today: date
+    build_ms: float
+
+
+@dataclass
+class ContextCacheStats:
+    hits: int = 0
+    misses: int = 0
+    build_ms_total: float = 0.0
+    build_ms_max: float = 0.0
+    build_ms_last: float = 0.0
+    entries: int = 0
+
+    def as_dict(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+            "entries": self.entries,
+            "build_ms_avg": round(self.build_ms_total / self.misses, 1) if self.misses else 0.0,
+            "build_ms_max": round(self.build_ms_max, 1),
+            "build_ms_last": round(self.build_ms_last, 1),
+        }
+
+
+_stats = ContextCacheStats()
+
+
+def get_financial_context(
+    company_id: int,
+    build: Callable[[date], tuple[str, dict]],
+    today: date | None = None,
+) -> FinancialContext:
+    """
+    Şirketin AI bağlamını döner; (gün, data version) değiştiyse veya TTL
+    dolduysa build(today) -> (metin, yapısal veriler) ile yeniden üretir.
+    """
+    today = today or date.today()
+    key = (today, get_data_version(company_id))
+
+    cached = _lookup(company_id, key)
+    if cached is not None:
+        return cached
+
+    with _cache_lock:
+        build_lock = _build_locks.setdefault(company_id, threading.Lock())
+    with build_lock:
+        # Beklerken başka bir istek üretmiş olabilir
+        cached = _lookup(company_id, key)
+        if cached is not None:
+            return cached
+        return _build(company_id, key, build, today)
+
+
+def _lookup(company_id: int, key: tuple) -> FinancialContext | None:
+    with _cache_lock:
+        cached = _cache.get(company_id)
+        if cached and cached[0] == key and time.monotonic() - cached[1] < AI_CONTEXT_CACHE_TTL_SECONDS:
+            _cache.move_to_end(company_id)
+            _stats.hits += 1
+            return cached[2]
+    return None
+
+
+def _build(
+    company_id: int,
+    key: tuple,
+    build: Callable[[date], tuple[str, dict]],
+    today: date,
+) -> FinancialContext:
+    now = time.monotonic()
+    started = time.perf_counter()
+    text, facts = build(today)
+    build_ms = (time.perf_counter() - started) * 1000
+    context = FinancialContext(text=text, facts=facts, today=today, build_ms=build_ms)
+    logger.info("AI context built for company %s in %.1f ms (%d chars)", company_id, build_ms, len(text))
+
+    with _cache_lock:
+        _stats.misses += 1
+        _stats.build_ms_total += build_ms
+        _stats.build_ms_max = max(_stats.build_ms_max, build_ms)
+        _stats.build_ms_last = build_ms
+        # Zaman aşımıyla eksik kalmış bağlam saklanmaz; sonraki soru yeniden dener
+        if facts.get("degraded_sections"):
+            return context
+        _cache[company_id] = (key, now, context)
+        _cache.move_to_end(company_id)
+        while len(_cache) > AI_CONTEXT_CACHE_MAX_COMPANIES:
+            _cache.popitem(last=False)
+
+    return context
+
+
+def get_context_cache_stats() -> dict:
+    with _cache_lock:
+        _stats.entries = len(_cache)
+        return _stats.as_dict()
+
+
+def clear_context_cache() -> None:
+    """Önbelleği ve sayaçları sıfırlar."""
+    global _stats
+    with _cache_lock:
+        _cache.clear()
+        _build_locks.clear()
+        _stats = ContextCacheStats()
@@ -0,0 +1,252 @@
+# app/services/ai_intents.py
+"""
+Rule-based intent router for AI questions.
+
+Many questions are lookups of numbers the financial context already holds
+("ne kadar nakdim var?", "runway kaç gün?", "en büyük gider kalemim ne?",
+"kaç vadesi geçmiş ödeme var?"). Those are answered straight from the
+cached context facts (ai_context_cache.py) with a short markdown
+template, without a model call.
+
+Classification runs on categorization.normalize()d text (upper case,
+Turkish characters folded, punctuation removed), so "Nakdim ne kadar?"
+and "NAKDIM NE KADAR" are the same question. A question is routed only
+when it is short, matches an intent's patterns, and has no open-ended
+wording (neden, nasıl, öneri, analiz, ...); everything else goes to the
+model. An intent whose facts are missing (e.g. a degraded section)
+also falls back to the model, and so do cash, runway and forecast
+questions for a company without an initial balance: the context's cash
+figure is then only the period's net flow, not the balance the
+dashboard shows, and must not be stated as one.
+
+Decisions are logged and counted process-wide (`get_intent_stats`) so the
+hit rate can be measured.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from app.services.categorization import normalize
+
+logger = logging.getLogger(__name__)
+
+# Bundan uzun sorular açık uçlu kabul edilir
+INTENT_MAX_WORDS = 14
+
+# Yorum/tavsiye isteyen sorular her zaman modele gider
+_OPEN_ENDED = re.compile(
+    r"\b(NEDEN|NIYE|NICIN|NASIL|ONER\w*|TAVSIYE\w*|ANALIZ\w*|STRATEJI\w*|YORUM\w*|"
+    r"KARSILASTIR\w*|DEGERLENDIR\w*|YAPMALI\w*|AZALT\w*|ARTIR\w*|IYILESTIR\w*|ACIKLA\w*)\b"
+)
+_AMOUNT_WORDS = r"(NE KADAR|KAC|MEVCUT|SU AN|SUAN|GUNCEL|TOPLAM|VAR MI|NEDIR|NE)"
+
+
+def _fmt_tl(value: float) -> str:
+    return f"{value:,.0f} ₺"
+
+
+def _risk_label(score: float) -> str:
+    return "🔴 CRİTİK" if score > 75 else "🟠 UYARI" if score > 50 else "🟢 İYİ"
+
+
+def _cash_answer(facts: dict, match: re.Match) -> str | None:
+    profile = facts.get("profile")
+    if not profile or not profile.get("cash_from_settings"):
+        return None
+    lines = [
+        "## 💰 Nakit Durumu",
+        f"- Tahmini nakit: **{_fmt_tl(profile['estimated_cash'])}**",
+        f"- Ort. günlük net: **{_fmt_tl(profile['avg_daily_net'])}** "
+        f"(↑ {_fmt_tl(profile['avg_daily_in'])} | ↓ {_fmt_tl(profile['avg_daily_out'])})",
+    ]
+    if profile["avg_daily_out"] > 0:
+        lines.append(f"- Runway: **{profile['runway_days']:.1f} gün**")
+    return "\n".join(lines)
+
+
+def _runway_answer(facts: dict, match: re.Match) -> str | None:
+    profile = facts.get("profile")
+    if not profile or not profile.get("cash_from_settings"):
+        return None
+    if profile["avg_daily_out"] <= 0:
+        return (
+            "## ⏳ Runway\n"
+            f"- Tahmini nakit: **{_fmt_tl(profile['estimated_cash'])}**\n"
+            "- Dönemde gider olmadığı için runway hesaplanamadı"
+        )
+    liquidity_risk = profile["liquidity_risk"]
+    return (
+        "## ⏳ Runway\n"
+        f"- Runway: **{profile['runway_days']:.1f} gün** (nakit tükenmeden kaç gün daha çalışabilir)\n"
+        f"- Tahmini nakit: **{_fmt_tl(profile['estimated_cash'])}**, "
+        f"ort. günlük gider: {_fmt_tl(profile['avg_daily_out'])}\n"
+        f"- Likidite Riski: **{liquidity_risk:.1f}** {_risk_label(liquidity_risk)}"
+    )
+
+
+def _cash_forecast_answer(facts: dict, match: re.Match) -> str | None:
+    forecast = facts.get("forecast")
+    days = match.group("days")
+    if not forecast or not forecast.get("cash_from_settings") or days not in forecast["cash"]:
+        return None
+    return (
+        f"## 🔮 {days} Gün Sonra Tahmini Nakit\n"
+        f"- {days}. gün: **{_fmt_tl(forecast['cash'][days])}**\n"
+        f"- Varsayım: son 90 günün ort. günlük neti ({_fmt_tl(forecast['avg_daily_net'])}) ileriye uygulanır"
+    )
+
+
+def _top_expense_answer(facts: dict, match: re.Match) -> str | None:
+    profile = facts.get("profile")
+    if not profile or not profile.get("top_expense_category"):
+        return None
+    period = "Son 90 gün" if profile["period"] == "last90" else "Tüm zamanlar"
+    return (
+        "## 📈 En Büyük Gider Kategorisi\n"
+        f"- **{profile['top_expense_category']}**: {_fmt_tl(profile['top_expense_amount'])} "
+        f"(toplam giderin %{profile['top_expense_share'] * 100:.1f}'i)\n"
+        f"- Dönem: {period}, toplam gider {_fmt_tl(profile['expense_total'])}"
+    )
+
+
+def _overdue_answer(facts: dict, match: re.Match) -> str | None:
+    health = facts.get("matching_health")
+    if not health:
+        return None
+    overdue = health["unmatched_overdue"]
+    icon = "⚠️" if overdue else "✅"
+    return (
+        "## 📋 Vadesi Geçmiş Planlı Kalemler\n"
+        f"- {icon} Vadesi geçmiş: **{overdue}** kalem ({_fmt_tl(health['unmatched_overdue_amount'])} kalan)\n"
+        f"- Yaklaşan (14 gün içinde): {health['unmatched_upcoming_14d']} kalem "
+        f"({_fmt_tl(health['unmatched_upcoming_14d_amount'])} kalan)"
+    )
+
+
+@dataclass(frozen=True)
+class Intent:
+    key: str
+    patterns: tuple[re.Pattern, ...]  # hepsi eşleşmeli
+    answer: Callable[[dict, re.Match], str | None]
+    excludes: re.Pattern | None = None
+
+
+def _all(*patterns: str) -> tuple[re.Pattern, ...]:
+    return tuple(re.compile(p) for p in patterns)
+
+
+# Sıra önemli: ilk eşleşen kazanır (ör. "nakit kaç gün yeter" runway'dir)
+INTENTS = (
+    Intent(
+        "cash_forecast",
+        _all(r"\b(NAKIT\w*|NAKD\w*|KASA\w*|BAKIYE\w*|PARA\w*)\b", r"\b(?P<days>\d+) GUN (SONRA\w*|ICINDE)\b"),
+        _cash_forecast_answer,
+    ),
+    Intent(
+        "runway",
+        _all(
+            r"\bRUNWAY\b|\bKAC (GUN|AY)\w* (YETER|IDARE|DAYAN\w*)\b"
+            r"|\b(NAKIT\w*|NAKD\w*|PARA\w*) (NE ZAMAN|KAC GUNDE) (BITER|TUKEN\w*)\b"
+        ),
+        _runway_answer,
+    ),
+    Intent(
+        "cash",
+        _all(r"\b(NAKIT\w*|NAKD\w*|KASA\w*|BAKIYE\w*)\b", rf"\b{_AMOUNT_WORDS}\b"),
+        _cash_answer,
+        excludes=re.compile(r"\b(AKIS\w*|TAHMIN\w*|GELECEK|AY SONRA\w*)\b"),
+    ),
+    Intent(
+        "top_expense_category",
+        _all(r"\bEN (BUYUK|YUKSEK|FAZLA|COK)\b", r"\b(GIDER\w*|MASRAF\w*|HARC[AI]\w*)\b"),
+        _top_expense_answer,
+        excludes=re.compile(r"\b(KARSI TARAF\w*|TEDARIKCI\w*|FIRMA\w*|MUSTERI\w*|GELIR\w*)\b"),
+    ),
+    Intent(
+        "overdue_planned",
+        _all(r"\b(VADESI (GEC|DOL)\w*|GECMIS VADE\w*|GECIKMIS|GECIKEN)\b", rf"\b({_AMOUNT_WORDS}|SAYI\w*|ADET)\b"),
+        _overdue_answer,
+    ),
+)
+
+
+def classify_intent(question: str) -> tuple[Intent, re.Match] | None:
+    """Soru şablonla cevaplanabilir bir niyetse (Intent, son eşleşme) döner; değilse None."""
+    text = normalize(question)
+    if not text or len(text.split()) > INTENT_MAX_WORDS or _OPEN_ENDED.search(text):
+        return None
+    for intent in INTENTS:
+        if intent.excludes is not None and intent.excludes.search(text):
+            continue
+        match = None
+        for pattern in intent.patterns:
+            match = pattern.search(text)
+            if match is None:
+                break
+        if match is not None:
+            return intent, match
+    return None
+
+
+@dataclass
+class IntentStats:
+    routed: dict = field(default_factory=dict)  # intent -> adet
+    fallback: int = 0
+    route_ms_total: float = 0.0
+
+    def as_dict(self) -> dict:
+        routed = sum(self.routed.values())
+        questions = routed + self.fallback
+        return {
+            "questions": questions,
+            "routed": routed,
+            "fallback": self.fallback,
+            "hit_rate": round(routed / questions, 3) if questions else 0.0,
+            "by_intent": dict(self.routed),
+            "route_ms_avg": round(self.route_ms_total / routed, 2) if routed else 0.0,
+        }
+
+
+_stats_lock = threading.Lock()
+_stats = IntentStats()
+
+
+def route_question(company_id: int, question: str, facts: dict) -> tuple[str, str] | None:
+    """
+    Soruyu şablonla cevaplamayı dener: (intent, markdown cevap) ya da
+    modele gidilmesi gerekiyorsa None. Karar ve süre loglanır.
+    """
+    started = time.perf_counter()
+    classified = classify_intent(question)
+    answer = classified[0].answer(facts, classified[1]) if classified else None
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    intent = classified[0].key if classified else None
+    with _stats_lock:
+        if answer is not None:
+            _stats.routed[intent] = _stats.routed.get(intent, 0) + 1
+            _stats.route_ms_total += elapsed_ms
+        else:
+            _stats.fallback += 1
+    if answer is not None:
+        logger.info("AI intent route: company=%s intent=%s ms=%.2f", company_id, intent, elapsed_ms)
+        return intent, answer
+    logger.info(
+        "AI intent fallback: company=%s intent=%s ms=%.2f", company_id, intent or "-", elapsed_ms
+    )
+    return None
+
+
+def get_intent_stats() -> dict:
+    with _stats_lock:
+        return _stats.as_dict()
+
+
+def reset_intent_stats() -> None:
+    global _stats
+    with _stats_lock:
+        _stats = IntentStats()
@@ -0,0 +1,496 @@
+# app/services/ai_retrieval.py
+"""
+Per-company BM25 retrieval index for AI questions.
+
+The AI context is a fixed company-wide summary, so a specific question
+("Shell'e ne kadar ödedik?") cannot be answered from it: raw transactions
+are never included. This index finds the rows a question is about, and
+the prompt carries those rows and their aggregates next to the summary,
+or instead of it when the question is only about those rows (see
+routes/ai_chat.py).
+
+Documents are transactions (description) and non-cancelled planned items
+(counterparty + reference no). Text is categorization.normalize()d and
+every token is cut to its first 5 characters, a prefix stemmer that works
+well for Turkish suffixes ("SHELL'E", "MIGROSA" -> "SHELL", "MIGRO").
+
+Storage is plain-Python sparse: per term a pair of array('I') postings
+(document number, term frequency), per document its length, and a
+tombstone bytearray. Scoring is Okapi BM25 (k1=1.2, b=0.75) accumulated
+over the postings of the question's terms only.
+
+Freshness: entries are keyed on the company's data version. When it
+changes, the ids of the written transactions and planned items come from
+the data version change log (data_version.changed_rows, fed by the
+commit hooks of every write path), and only those rows are loaded by
+primary key: new or changed rows are tokenized and appended, removed or
+changed rows are tombstoned. Only when the log cannot name the rows (bulk
+write without ids, epoch bump, more than RETRIEVAL_INCREMENTAL_MAX_ROWS
+rows) or the TTL expires is every row's signature reloaded and diffed.
+One sync runs per company at a time (build lock, as in ai_context_cache);
+concurrent questions wait for it and reuse its result. When tombstones
+exceed RETRIEVAL_COMPACT_RATIO the index is rebuilt. Memory is bounded by keeping at most RETRIEVAL_MAX_COMPANIES
+companies (LRU), like the matching index.
+
+A question is "focused" when it has anchor terms: terms that occur in the
+index, are not generic ledger or question vocabulary (GENERIC_TERMS:
+ödeme, fatura, month names, büyük, geçen, ...) and occur in at most
+RETRIEVAL_ANCHOR_MAX_DF of the documents, i.e. names such as a
+counterparty. It is "compact" when the anchors also make up at least
+RETRIEVAL_COMPACT_COVERAGE of its non-generic terms, i.e. it asks about
+nothing but those records. Aggregates (count, total, date range per
+direction) are computed over every document that contains all anchor
+terms, not just the top-k. A period named in the question ("mart",
+"geçen ay", "bu yıl") restricts both the rows and the aggregates.
+"""
+
+import calendar
+import math
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.transaction import Transaction
+from app.services.categorization import normalize
+from app.services.data_version import changed_rows, get_data_version
+
+RETRIEVAL_MAX_COMPANIES = 64
+RETRIEVAL_TTL_SECONDS = 300
+RETRIEVAL_TOP_K = 15
+RETRIEVAL_PLANNED_TOP_K = 5
+RETRIEVAL_ANCHOR_MAX_DF = 0.5
+RETRIEVAL_COMPACT_COVERAGE = 0.5
+RETRIEVAL_COMPACT_RATIO = 0.25
+RETRIEVAL_INCREMENTAL_MAX_ROWS = 2000
+STEM_LENGTH = 5
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+INDEX_TABLES = (Transaction.__tablename__, PlannedCashflowItem.__tablename__)
+# tablo -> index'teki doküman türü
+DOC_KINDS = {Transaction.__tablename__: "tx", PlannedCashflowItem.__tablename__: "planned"}
+
+# Soru kalıpları; kök (ilk 5 harf) olarak
+STOPWORDS = frozenset({
+    "NE", "KADAR", "KAC", "BU", "SU", "O", "BIR", "VE", "ILE", "MI", "MU", "DA", "DE", "ICIN",
+    "GIBI", "EN", "COK", "AZ", "NASIL", "HANGI", "VAR", "YOK", "OLAN", "MIYIZ", "MISIN", "BANA",
+    "BIZ", "BIZIM", "BEN", "BENIM", "TOPLA", "TUTAR", "SON", "KIME", "NEREY", "ZAMAN",
+})
+
+MONTHS = ("OCAK", "SUBAT", "MART", "NISAN", "MAYIS", "HAZIRAN", "TEMMUZ", "AGUSTOS", "EYLUL", "EKIM",
+          "KASIM", "ARALIK")
+
+# Skorlamaya katılır ama soruyu belirli kayıtlara odaklamaz (kök olarak)
+GENERIC_TERMS = frozenset({
+    # defter dili
+    "ODEME", "ODEDI", "ODENE", "ODENM", "TAHSI", "FATUR", "EFT", "HAVAL", "FAST", "POS", "NAKIT",
+    "GIDER", "GELIR", "HARCA", "ISLEM", "PARA", "MASRA", "BORC", "ALACA", "TL", "TRY", "BANKA",
+    "GELEN", "GIDEN", "KAR", "KARLI", "ZARAR", "CIRO", "SATIS", "MALIY", "BAKIY", "BUTCE",
+    # dönemler
+    *(month[:STEM_LENGTH] for month in MONTHS),
+    "AY", "AYA", "AYI", "AYIN", "AYIND", "AYDA", "AYDAN", "AYLIK", "AYLAR", "YIL", "YILI", "YILIN",
+    "YILDA", "YILLI", "HAFTA", "GUN", "GUNLU", "BUGUN", "DUN", "DONEM", "CEYRE", "GECEN", "GECTI",
+    "ONCEK", "SONRA", "ONCE",
+    # soru dili
+    "BUYUK", "KUCUK", "ARTTI", "ARTIS", "AZALD", "AZALM", "DEGIS", "FARK", "GORE", "ORAN", "ORTAL",
+    "DURUM", "NEYDI", "NEDIR", "NELER", "OLDU", "YAPTI", "TREND",
+})
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[int, RetrievalIndex]" = OrderedDict()
+_build_locks: dict[int, threading.Lock] = {}
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Normalize edilmiş metnin 5 harflik kökleri (soru kalıpları hariç)."""
+    terms = []
+    for token in normalize(text).split():
+        if len(token) < 2:
+            continue
+        stem = token[:STEM_LENGTH]
+        if stem not in STOPWORDS and token not in STOPWORDS:
+            terms.append(stem)
+    return terms
+
+
+def _month_range(year: int, month: int) -> tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def question_period(question: str, today: date) -> tuple[date, date] | None:
+    """
+    Soruda adı geçen dönem (bu/geçen ay, bu/geçen yıl, ay adı + isteğe bağlı
+    yıl). Yılsız ay adı bugüne kadarki en son o aydır.
+    """
+    text = normalize(question)
+    if re.search(r"\bGECEN AY", text):
+        last_month = today.replace(day=1) - timedelta(days=1)
+        return _month_range(last_month.year, last_month.month)
+    if re.search(r"\bBU AY", text):
+        return _month_range(today.year, today.month)
+    if re.search(r"\bGECEN YIL", text):
+        return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+    if re.search(r"\bBU YIL", text):
+        return date(today.year, 1, 1), date(today.year, 12, 31)
+    for token in text.split():
+        for number, month in enumerate(MONTHS, start=1):
+            if token.startswith(month):
+                year = re.search(r"\b(?:19|20)\d{2}\b", question or "")
+                if year:
+                    return _month_range(int(year.group()), number)
+                return _month_range(today.year if number <= today.month else today.year - 1, number)
+    return None
+
+
+@dataclass(frozen=True)
+class RetrievedDoc:
+    kind: str  # "tx" | "planned"
+    id: str
+    date: date
+    text: str
+    amount: float
+    direction: str
+    label: str | None  # işlem: kategori, planlı kalem: durum
+    remaining: float = 0.0
+
+
+def _load_rows(db: Session, company_id: int, changes: dict | None = None) -> dict[tuple[str, str], tuple]:
+    """
+    (tür, id) -> satır (aynı zamanda imza). changes ({tablo: id kümesi})
+    verilirse yalnızca o satırlar birincil anahtarla okunur; aksi halde tüm satırlar.
+    """
+    rows = {}
+    tx_query = db.query(
+        Transaction.id, Transaction.date, Transaction.description, Transaction.amount,
+        Transaction.direction, Transaction.category,
+    ).filter(Transaction.company_id == company_id)
+    planned_query = db.query(
+        PlannedCashflowItem.id, PlannedCashflowItem.due_date, PlannedCashflowItem.counterparty,
+        PlannedCashflowItem.reference_no, PlannedCashflowItem.amount, PlannedCashflowItem.remaining_amount,
+        PlannedCashflowItem.direction, PlannedCashflowItem.status,
+    ).filter(
+        PlannedCashflowItem.company_id == company_id,
+        PlannedCashflowItem.status != "CANCELLED",
+    )
+    if changes is not None:
+        tx_ids = changes.get(Transaction.__tablename__)
+        planned_ids = changes.get(PlannedCashflowItem.__tablename__)
+        tx_query = tx_query.filter(Transaction.id.in_(tx_ids)) if tx_ids else None
+        planned_query = planned_query.filter(PlannedCashflowItem.id.in_(planned_ids)) if planned_ids else None
+
+    for row in tx_query or ():
+        rows[("tx", row[0])] = tuple(row)
+    for row in planned_query or ():
+        rows[("planned", row[0])] = tuple(row)
+    return rows
+
+
+def _to_document(kind: str, row: tuple) -> RetrievedDoc:
+    if kind == "tx":
+        tx_id, tx_date, description, amount, direction, category = row
+        return RetrievedDoc("tx", tx_id, tx_date, description or "", float(amount), direction, category)
+    item_id, due_date, counterparty, reference_no, amount, remaining, direction, status = row
+    text = " ".join(part for part in (counterparty, reference_no) if part)
+    return RetrievedDoc("planned", item_id, due_date, text, float(amount), direction, status, float(remaining or 0))
+
+
+@dataclass
+class RetrievalIndex:
+    """Bir şirketin BM25 index'i (terim -> (doküman no, terim frekansı) dizileri)."""
+
+    company_id: int
+    version: tuple = ()
+    built_at: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._docs: list[RetrievedDoc] = []
+        self._signatures: dict[tuple[str, str], tuple[int, tuple]] = {}  # (tür, id) -> (no, satır)
+        self._lengths = array("I")
+        self._alive = bytearray()
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._alive_count = 0
+        self._alive_length = 0
+
+    def __len__(self) -> int:
+        return self._alive_count
+
+    @property
+    def tombstones(self) -> int:
+        return len(self._docs) - self._alive_count
+
+    def _add(self, key, row: tuple) -> None:
+        doc = _to_document(key[0], row)
+        number = len(self._docs)
+        terms = tokenize(doc.text)
+        counts: dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("I"))
+            postings[0].append(number)
+            postings[1].append(tf)
+        self._docs.append(doc)
+        self._lengths.append(len(terms))
+        self._alive.append(1)
+        self._signatures[key] = (number, row)
+        self._alive_count += 1
+        self._alive_length += len(terms)
+
+    def _remove(self, key) -> None:
+        number, _ = self._signatures.pop(key)
+        self._alive[number] = 0
+        self._alive_count -= 1
+        self._alive_length -= self._lengths[number]
+
+    def sync(self, rows: dict, keys=None) -> tuple[int, int]:
+        """
+        Index'i satır listesine getirir: yeni/değişen satırlar eklenir,
+        silinen/değişenler tombstone olur. keys verilirse yalnızca bu
+        anahtarlar yoklanır (rows'ta olmayanları silinmiştir); aksi halde
+        rows şirketin tüm satırlarıdır. Returns: (eklenen, silinen)
+        """
+        added = removed = 0
+        with self._lock:
+            candidates = self._signatures if keys is None else [k for k in keys if k in self._signatures]
+            for key in [k for k in candidates if k not in rows]:
+                self._remove(key)
+                removed += 1
+            for key, row in rows.items():
+                current = self._signatures.get(key)
+                if current is not None:
+                    if current[1] == row:
+                        continue
+                    self._remove(key)
+                    removed += 1
+                self._add(key, row)
+                added += 1
+        return added, removed
+
+    def _document_frequency(self, term: str) -> int:
+        postings = self._postings.get(term)
+        if postings is None:
+            return 0
+        return sum(self._alive[n] for n in postings[0])
+
+    def search(
+        self,
+        question: str,
+        k: int = RETRIEVAL_TOP_K,
+        planned_k: int = RETRIEVAL_PLANNED_TOP_K,
+        period: tuple[date, date] | None = None,
+    ) -> "RetrievalResult":
+        """period verilirse yalnızca o tarih aralığındaki kayıtlar döner ve özetlenir."""
+        terms = list(dict.fromkeys(tokenize(question)))
+        with self._lock:
+            n_docs = self._alive_count
+            if not terms or not n_docs:
+                return RetrievalResult(terms, [], [], [], {}, period)
+            avg_length = self._alive_length / n_docs
+            frequencies = {term: self._document_frequency(term) for term in terms}
+            max_df = max(1, int(RETRIEVAL_ANCHOR_MAX_DF * n_docs))
+            anchors = [
+                term for term, df in frequencies.items() if 0 < df <= max_df and term not in GENERIC_TERMS
+            ]
+
+            scores: dict[int, float] = {}
+            for term, df in frequencies.items():
+                if not df:
+                    continue
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                numbers, tfs = self._postings[term]
+                for number, tf in zip(numbers, tfs):
+                    if not self._alive[number]:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[number] / avg_length)
+                    scores[number] = scores.get(number, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda x: (-x[1], -self._docs[x[0]].date.toordinal()))
+            transactions, planned = [], []
+            for number, score in ranked:
+                doc = self._docs[number]
+                if period is not None and not period[0] <= doc.date <= period[1]:
+                    continue
+                target, limit = (transactions, k) if doc.kind == "tx" else (planned, planned_k)
+                if len(target) < limit:
+                    target.append((round(score, 3), doc))
+                if len(transactions) >= k and len(planned) >= planned_k:
+                    break
+
+            aggregates = self._aggregate(anchors, period) if anchors else {}
+        return RetrievalResult(terms, anchors, transactions, planned, aggregates, period)
+
+    def _aggregate(self, anchors: list[str], period: tuple[date, date] | None) -> dict:
+        """Tüm anchor terimlerini içeren (dönemdeki) dokümanların yön bazında özetleri."""
+        matching = None
+        for term in anchors:
+            numbers = {n for n in self._postings[term][0] if self._alive[n]}
+            matching = numbers if matching is None else matching & numbers
+        aggregates: dict = {}
+        for number in matching or ():
+            doc = self._docs[number]
+            if period is not None and not period[0] <= doc.date <= period[1]:
+                continue
+            key = f"{doc.kind}_{doc.direction}"
+            entry = aggregates.setdefault(key, {"count": 0, "total": 0.0, "remaining": 0.0, "first": doc.date, "last": doc.date})
+            entry["count"] += 1
+            entry["total"] += doc.amount
+            entry["remaining"] += doc.remaining
+            entry["first"] = min(entry["first"], doc.date)
+            entry["last"] = max(entry["last"], doc.date)
+        return aggregates
+
+
+@dataclass(frozen=True)
+class RetrievalResult:
+    terms: list[str]
+    anchors: list[str]
+    transactions: list[tuple[float, RetrievedDoc]]
+    planned: list[tuple[float, RetrievedDoc]]
+    aggregates: dict  # "tx_in" / "tx_out" / "planned_in" / "planned_out" -> özet
+    period: tuple[date, date] | None = None
+
+    @property
+    def focused(self) -> bool:
+        """Soru belirli bir karşı tarafı/açıklamayı hedefliyor mu."""
+        return bool(self.anchors) and bool(self.transactions or self.planned)
+
+    @property
+    def compact(self) -> bool:
+        """Soru yalnızca bu kayıtlarla mı ilgili (genel olmayan terimlerin çoğu anchor)."""
+        content = [term for term in self.terms if term not in GENERIC_TERMS]
+        return self.focused and len(self.anchors) >= RETRIEVAL_COMPACT_COVERAGE * len(content)
+
+
+def _cached(company_id: int, version: tuple, now: float) -> tuple[RetrievalIndex | None, bool]:
+    """Önbellekteki index ve güncel olup olmadığı."""
+    with _cache_lock:
+        index = _cache.get(company_id)
+        if index is None:
+            return None, False
+        _cache.move_to_end(company_id)
+        return index, index.version == version and now - index.built_at < RETRIEVAL_TTL_SECONDS
+
+
+def get_retrieval_index(db: Session, company_id: int) -> RetrievalIndex:
+    """
+    Şirketin retrieval index'ini döner; versiyon değiştiyse yalnızca yazılan
+    satırları okuyarak senkronlar. Şirket başına aynı anda tek senkron çalışır.
+    """
+    index, fresh = _cached(company_id, get_data_version(company_id), time.monotonic())
+    if fresh:
+        return index
+
+    with _cache_lock:
+        build_lock = _build_locks.setdefault(company_id, threading.Lock())
+    with build_lock:
+        # Beklerken başka bir istek senkronlamış olabilir
+        now = time.monotonic()
+        index, fresh = _cached(company_id, get_data_version(company_id), now)
+        if fresh:
+            return index
+        return _sync(db, company_id, index, now)
+
+
+def _sync(db: Session, company_id: int, index: RetrievalIndex | None, now: float) -> RetrievalIndex:
+    changes = None
+    if (
+        index is not None
+        and now - index.built_at < RETRIEVAL_TTL_SECONDS
+        and index.tombstones <= RETRIEVAL_COMPACT_RATIO * max(len(index), 1)
+    ):
+        version, changes = changed_rows(company_id, index.version, INDEX_TABLES)
+        if changes is not None and sum(len(ids) for ids in changes.values()) > RETRIEVAL_INCREMENTAL_MAX_ROWS:
+            changes = None
+    else:
+        version = get_data_version(company_id)
+
+    if changes is not None:
+        keys = [(DOC_KINDS[table], row_id) for table, ids in changes.items() for row_id in ids]
+        index.sync(_load_rows(db, company_id, changes), keys)
+    else:
+        rows = _load_rows(db, company_id)
+        if index is None or index.tombstones > RETRIEVAL_COMPACT_RATIO * max(len(index), 1):
+            index = RetrievalIndex(company_id)
+        index.sync(rows)
+        index.built_at = now
+    index.version = version
+
+    with _cache_lock:
+        _cache[company_id] = index
+        _cache.move_to_end(company_id)
+        while len(_cache) > RETRIEVAL_MAX_COMPANIES:
+            _cache.popitem(last=False)
+    return index
+
+
+def retrieve(db: Session, company_id: int, question: str, today: date | None = None) -> RetrievalResult:
+    period = question_period(question, today or date.today())
+    return get_retrieval_index(db, company_id).search(question, period=period)
+
+
+_AGGREGATE_LABELS = {
+    "tx_out": "Ödemeler (işlem)",
+    "tx_in": "Tahsilatlar (işlem)",
+    "planned_out": "Planlı ödemeler",
+    "planned_in": "Planlı tahsilatlar",
+}
+
+
+def render_retrieval_section(result: RetrievalResult) -> str:
+    """Soruyla ilgili kayıtlar ve özetleri (prompt bölümü)."""
+    lines = ["=" * 70, "### 🔎 SORUYLA İLGİLİ KAYITLAR", "=" * 70]
+    if result.period is not None:
+        lines.append(f"**Dönem:** {result.period[0]} – {result.period[1]}")
+    if result.aggregates:
+        lines.append("**Özet (eşleşen tüm kayıtlar):**")
+        for key, label in _AGGREGATE_LABELS.items():
+            entry = result.aggregates.get(key)
+            if entry is None:
+                continue
+            line = f"- {label}: {entry['count']} kayıt, toplam **{entry['total']:,.0f} ₺** ({entry['first']} – {entry['last']})"
+            if key.startswith("planned") and entry["remaining"]:
+                line += f", kalan {entry['remaining']:,.0f} ₺"
+            lines.append(line)
+        lines.append("")
+    if result.transactions:
+        lines += [
+            f"**En ilgili {len(result.transactions)} işlem:**",
+            "| Tarih | Açıklama | Yön | Tutar | Kategori |",
+            "| --- | --- | --- | --- | --- |",
+        ]
+        for _, doc in result.transactions:
+            direction = "Giriş" if doc.direction == "in" else "Çıkış"
+            description = doc.text.replace("|", "/")
+            lines.append(f"| {doc.date} | {description} | {direction} | {doc.amount:,.2f} ₺ | {doc.label or '-'} |")
+        lines.append("")
+    if result.planned:
+        lines.append("**İlgili planlı kalemler:**")
+        for _, doc in result.planned:
+            direction = "tahsilat" if doc.direction == "in" else "ödeme"
+            lines.append(
+                f"- {doc.text} ({direction}, vade {doc.date}): {doc.amount:,.0f} ₺, "
+                f"kalan {doc.remaining:,.0f} ₺, {doc.label}"
+            )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def invalidate_retrieval_index(company_id: int) -> None:
+    with _cache_lock:
+        _cache.pop(company_id, None)
+
+
+def clear_retrieval_index() -> None:
+    with _cache_lock:
+        _cache.clear()
+        _build_locks.clear()
@@ -0,0 +1,203 @@
+# app/services/ai_scheduler.py
+"""
+Concurrency limit and fair queuing for AI model calls.
+
+A model call takes seconds. The sync `/ai/query` path runs it on a
+threadpool worker, so a burst of AI questions from one company used to
+occupy the workers every other endpoint (dashboard, lists) needs.
+
+The scheduler hands out at most AI_MAX_CONCURRENCY slots per process.
+Requests that do not get a slot wait in the event loop, not on a thread.
+Waiting requests are queued per company and slots are granted round-robin
+across companies, so one company's burst only delays that company.
+
+Bounds: at most AI_MAX_QUEUE waiting requests in total and
+AI_MAX_QUEUE_PER_COMPANY per company. Beyond that `acquire` raises
+AIQueueFull with a Retry-After estimate (queue depth / slots x average
+slot hold time), and the routes answer 429.
+
+Only model calls take a slot. Intent answers, cached answers and context
+building run before it (routes/ai_chat.py). Queue wait times, hold times
+and rejections are counted (`get_ai_scheduler().stats()`).
+
+State is per process and per event loop, like the other in-memory caches.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+AI_MAX_CONCURRENCY = 4
+AI_MAX_QUEUE = 32
+AI_MAX_QUEUE_PER_COMPANY = 8
+# Geçmiş yokken slot süresi tahmini (sn)
+DEFAULT_HOLD_SECONDS = 5.0
+RETRY_AFTER_MAX_SECONDS = 60
+
+
+class AIQueueFull(Exception):
+    """AI kuyruğu dolu; retry_after saniye sonra tekrar denenmeli."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"AI istek kuyruğu dolu, {retry_after} sn sonra tekrar deneyin.")
+        self.retry_after = retry_after
+
+
+@dataclass
+class SchedulerStats:
+    granted: int = 0
+    queued: int = 0
+    rejected: int = 0
+    wait_ms_total: float = 0.0
+    wait_ms_max: float = 0.0
+    hold_ms_total: float = 0.0
+    released: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "granted": self.granted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(self.wait_ms_total / self.granted, 1) if self.granted else 0.0,
+            "wait_ms_max": round(self.wait_ms_max, 1),
+            "hold_ms_avg": round(self.hold_ms_total / self.released, 1) if self.released else 0.0,
+        }
+
+
+class AIScheduler:
+    """Global slot sınırı + şirket başına kuyruk, şirketler arasında round-robin."""
+
+    def __init__(
+        self,
+        max_concurrency: int = AI_MAX_CONCURRENCY,
+        max_queue: int = AI_MAX_QUEUE,
+        max_queue_per_company: int = AI_MAX_QUEUE_PER_COMPANY,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_company = max_queue_per_company
+        self._active = 0
+        self._waiting = 0
+        # şirket -> bekleyen future'lar; sıradaki şirket en baştaki
+        self._queues: "OrderedDict[int, deque[asyncio.Future]]" = OrderedDict()
+        self._stats = SchedulerStats()
+
+    @classmethod
+    def from_env(cls) -> "AIScheduler":
+        return cls(
+            int(os.getenv("AI_MAX_CONCURRENCY") or AI_MAX_CONCURRENCY),
+            int(os.getenv("AI_MAX_QUEUE") or AI_MAX_QUEUE),
+            int(os.getenv("AI_MAX_QUEUE_PER_COMPANY") or AI_MAX_QUEUE_PER_COMPANY),
+        )
+
+    def retry_after(self) -> int:
+        hold_s = (
+            self._stats.hold_ms_total / self._stats.released / 1000
+            if self._stats.released else DEFAULT_HOLD_SECONDS
+        )
+        rounds = (self._waiting + 1) / self.max_concurrency
+        return max(1, min(RETRY_AFTER_MAX_SECONDS, math.ceil(rounds * hold_s)))
+
+    async def acquire(self, company_id: int) -> float:
+        """
+        Slot alınana kadar bekler. Returns: bekleme süresi (ms).
+        Kuyruk doluysa AIQueueFull.
+        """
+        started = time.perf_counter()
+        if self._active < self.max_concurrency and not self._waiting:
+            self._active += 1
+            return self._granted(started)
+
+        queue = self._queues.get(company_id)
+        if self._waiting >= self.max_queue or (queue is not None and len(queue) >= self.max_queue_per_company):
+            self._stats.rejected += 1
+            raise AIQueueFull(self.retry_after())
+
+        if queue is None:
+            queue = self._queues[company_id] = deque()
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        self._waiting += 1
+        self._stats.queued += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # slot verilmişti ama istek iptal edildi; slotu bırak
+                self.release()
+            else:
+                self._drop(company_id, future)
+            raise
+        return self._granted(started)
+
+    def _granted(self, started: float) -> float:
+        wait_ms = (time.perf_counter() - started) * 1000
+        self._stats.granted += 1
+        self._stats.wait_ms_total += wait_ms
+        self._stats.wait_ms_max = max(self._stats.wait_ms_max, wait_ms)
+        return wait_ms
+
+    def _drop(self, company_id: int, future: asyncio.Future) -> None:
+        queue = self._queues.get(company_id)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self._waiting -= 1
+            if not queue:
+                del self._queues[company_id]
+
+    def release(self, hold_ms: float | None = None) -> None:
+        """Slotu bırakır ve sıradaki şirketin ilk isteğine verir."""
+        self._active -= 1
+        if hold_ms is not None:
+            self._stats.released += 1
+            self._stats.hold_ms_total += hold_ms
+        while self._queues and self._active < self.max_concurrency:
+            company_id, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                self._queues.move_to_end(company_id)
+            else:
+                del self._queues[company_id]
+            if not future.done():
+                self._active += 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, company_id: int):
+        """`async with scheduler.slot(cid) as wait_ms:` bloğu boyunca slot tutar."""
+        wait_ms = await self.acquire(company_id)
+        started = time.perf_counter()
+        try:
+            yield wait_ms
+        finally:
+            self.release((time.perf_counter() - started) * 1000)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "waiting": self._waiting,
+            "waiting_by_company": {cid: len(queue) for cid, queue in self._queues.items()},
+            **self._stats.as_dict(),
+        }
+
+
+_scheduler: AIScheduler | None = None
+
+
+def get_ai_scheduler() -> AIScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AIScheduler.from_env()
+    return _scheduler
+
+
+def reset_ai_scheduler() -> None:
+    global _scheduler
+    _scheduler = None
@@ -0,0 +1,122 @@
+# app/services/ai_stream.py
+"""
+Streaming AI answers over Server-Sent Events.
+
+The model is called through the configured backend's shared async client
+(ai_backend.py; its httpx pool keeps connections to the model server
+alive across requests) with `stream=True`, and every delta is forwarded
+to the browser as an SSE `token` event as soon as it arrives.
+
+The sync endpoint repairs markdown tables on the finished answer. Here
+the same repair runs incrementally: text of a line that cannot be a
+table row (does not start with "|") is forwarded immediately, and
+candidate table rows are held until their newline and repaired as a
+whole line. Because the repair only sees one line at a time, it never
+inserts a break between a correct header row and its separator.
+
+Events:
+    event: token  data: {"text": "..."}
+    event: error  data: {"detail": "..."}
+    event: done   data: {} ({"cached": true} when served from the answer cache,
+                           {"intent": "..."} when answered by the intent router)
+"""
+
+import asyncio
+import json
+import logging
+import re
+from typing import AsyncIterator, Callable
+
+logger = logging.getLogger(__name__)
+
+# "| a | b | | --- |": tek satıra yapışmış separator
+_GLUED_SEPARATOR = re.compile(r'(\|[ \t]*[^\|\n]*\|[ \t]*)(\|[ \t]*---)')
+
+
+def repair_table_line(line: str) -> str:
+    """Tek satıra yazılmış tablo satırlarını ayırır (fix_markdown_tables'ın satır bazlı hali)."""
+    line = line.replace("| |", "|\n|")
+    return _GLUED_SEPARATOR.sub(r'\1\n\2', line)
+
+
+class TableRepairStream:
+    """
+    Parça parça gelen metni tablo düzeltmesiyle aktarır: "|" ile başlamayan
+    satırlar hemen, olası tablo satırları satır sonu gelince düzeltilip verilir.
+    """
+
+    def __init__(self):
+        self._line = ""
+        self._passthrough = False
+
+    def feed(self, chunk: str) -> str:
+        out = []
+        while chunk:
+            head, newline, chunk = chunk.partition("\n")
+            if self._passthrough:
+                out.append(head)
+            else:
+                self._line += head
+                stripped = self._line.lstrip()
+                if stripped and not stripped.startswith("|"):
+                    out.append(self._line)
+                    self._line = ""
+                    self._passthrough = True
+            if newline:
+                if not self._passthrough:
+                    out.append(repair_table_line(self._line))
+                    self._line = ""
+                out.append("\n")
+                self._passthrough = False
+        return "".join(out)
+
+    def flush(self) -> str:
+        line, self._line, self._passthrough = self._line, "", False
+        return repair_table_line(line) if line else ""
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def sse_answer_events(
+    chunks: AsyncIterator[str], on_complete: Callable[[str], None] | None = None
+) -> AsyncIterator[str]:
+    """
+    Metin parçalarını tablo düzeltmesinden geçirip SSE olaylarına çevirir.
+    Stream hatasız biterse on_complete(tam cevap) bir worker thread'de çağrılır
+    (ör. cevap önbelleğine yazmak için).
+    """
+    repair = TableRepairStream()
+    parts = []
+    try:
+        async for chunk in chunks:
+            text = repair.feed(chunk)
+            if text:
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        tail = repair.flush()
+        if tail:
+            parts.append(tail)
+            yield sse_event("token", {"text": tail})
+    except Exception as e:
+        logger.warning("AI stream failed: %s", e)
+        yield sse_event("error", {"detail": f"OpenAI isteği başarısız: {str(e)}"})
+    else:
+        if on_complete is not None and parts:
+            try:
+                await asyncio.to_thread(on_complete, "".join(parts))
+            except Exception as e:
+                logger.warning("AI stream completion hook failed: %s", e)
+    yield sse_event("done", {})
+
+
+async def direct_answer_events(answer: str, done: dict) -> AsyncIterator[str]:
+    """Hazır cevabı tek token olayı olarak gönderir; done olayı `done` verisini taşır."""
+    yield sse_event("token", {"text": answer})
+    yield sse_event("done", done)
+
+
+def cached_answer_events(answer: str) -> AsyncIterator[str]:
+    """Önbellekteki cevabı tek token olayı olarak gönderir."""
+    return direct_answer_events(answer, {"cached": True})
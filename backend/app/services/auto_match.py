@@ -7,6 +7,11 @@ Rules:
 - Date window: ±7 days
 - Reference-first: if planned.reference_no exists and appears in tx.description, prefer that
 - Ambiguity: if multiple candidates with same date distance, do NOT auto-match
+
+Candidates come from the per-company matching index (matching_index.py),
+so a transaction without a candidate costs no query; the picked item is
+re-read by primary key before the match is written. Occurrences of
+recurring rules compete like real items and get their row when matched.
 """
 
 from sqlalchemy.orm import Session
@@ -16,11 +21,68 @@ import logging
 from app.models.planned_item import PlannedCashflowItem
 from app.models.planned_match import PlannedMatch
 from app.models.transaction import Transaction
-from app.services.planned_recompute import recompute_planned_status
+from app.services.matching_index import (
+    MATCHABLE_STATUSES,
+    get_matching_index,
+    invalidate_matching_index,
+    record_settlement,
+    to_cents,
+)
+from app.services.planned_recurrence import (
+    find_open_occurrence,
+    materialize_occurrence,
+    parse_occurrence_id,
+)
+from app.services.planned_settlement import apply_settlement_delta
+from app.services.transaction_match_state import refresh_transaction_match_state
 
 logger = logging.getLogger(__name__)
 
 
+def _select_candidate(db: Session, tx: Transaction, company_id: int):
+    """
+    Index'ten tek adayı seçer ve kalemi birincil anahtarla doğrular.
+    Index bayatsa (başka bir instance yazdıysa) bir kez yeniden kurulur.
+    Returns: (index, aday veya None, aday tekrarlayan oluşumsa Occurrence)
+    """
+    for _ in range(2):
+        index = get_matching_index(db, company_id)
+        planned, ambiguous = index.pick(tx.direction, tx.amount, tx.date, tx.description)
+        if ambiguous:
+            logger.warning(
+                f"Auto-match AMBIGUOUS for tx {tx.id}: multiple candidates with equal date distance "
+                f"(amount={tx.amount}, direction={tx.direction})"
+            )
+            return index, None, None
+        if planned is None:
+            logger.debug(f"Auto-match: No candidates for tx {tx.id} (amount={tx.amount}, direction={tx.direction})")
+            return index, None, None
+
+        if parse_occurrence_id(planned.id):
+            # Tekrarlayan kuralın oluşumu: kural hâlâ aktif ve oluşum satıra dönüşmemiş olmalı
+            occurrence = find_open_occurrence(db, company_id, planned.id)
+            if occurrence is not None:
+                return index, planned, occurrence
+        else:
+            current = db.query(
+                PlannedCashflowItem.remaining_amount,
+                PlannedCashflowItem.status,
+            ).filter(
+                PlannedCashflowItem.id == planned.id,
+                PlannedCashflowItem.company_id == company_id,
+            ).first()
+            if (
+                current is not None
+                and current.status in MATCHABLE_STATUSES
+                and to_cents(current.remaining_amount) == to_cents(tx.amount)
+            ):
+                return index, planned, None
+
+        logger.debug(f"Auto-match: stale matching index for company {company_id} (planned {planned.id})")
+        invalidate_matching_index(company_id)
+    return index, None, None
+
+
 def auto_match_transaction(db: Session, tx: Transaction, company_id: int) -> list:
     """
     Attempts to auto-match a newly created Transaction with PlannedCashflowItems.
@@ -38,100 +100,55 @@ def auto_match_transaction(db: Session, tx: Transaction, company_id: int) -> lis
     7. Idempotency: check existing match before creating
     """
     created_matches = []
-    
-    # Step 1: Query candidate planned items
-    # Base filters: company, direction, status, exact remaining_amount
-    candidates = db.query(PlannedCashflowItem).filter(
-        PlannedCashflowItem.company_id == company_id,
-        PlannedCashflowItem.direction == tx.direction,
-        PlannedCashflowItem.status.in_(["OPEN", "PARTIAL", "SETTLED"]),
-        PlannedCashflowItem.remaining_amount == tx.amount
-    ).all()
-    
-    if not candidates:
-        logger.debug(f"Auto-match: No candidates for tx {tx.id} (amount={tx.amount}, direction={tx.direction})")
-        return created_matches
-    
-    logger.debug(f"Auto-match: Found {len(candidates)} initial candidates for tx {tx.id}")
-    
-    # Step 2: Filter by date window (±7 days)
-    DATE_WINDOW_DAYS = 7
-    candidates_in_window = [
-        p for p in candidates 
-        if abs((tx.date - p.due_date).days) <= DATE_WINDOW_DAYS
-    ]
-    
-    if not candidates_in_window:
-        logger.debug(f"Auto-match: No candidates within ±{DATE_WINDOW_DAYS} days for tx {tx.id}")
+
+    # Steps 1-5: candidate lookup in the cached matching index (no query)
+    index, planned, occurrence = _select_candidate(db, tx, company_id)
+    if planned is None:
         return created_matches
-    
-    logger.debug(f"Auto-match: {len(candidates_in_window)} candidates within date window for tx {tx.id}")
-    
-    # Step 3: Prefer reference_no matches
-    # If any candidate has non-empty reference_no and that string appears in tx.description, use those
-    ref_matches = [
-        p for p in candidates_in_window
-        if p.reference_no and p.reference_no.strip() and p.reference_no in (tx.description or "")
-    ]
-    
-    if ref_matches:
-        candidates_in_window = ref_matches
-        logger.debug(f"Auto-match: {len(ref_matches)} candidates matched by reference_no for tx {tx.id}")
-    
-    # Step 4: Handle multiple candidates
-    if len(candidates_in_window) > 1:
-        # Sort by nearest due_date
-        candidates_in_window.sort(key=lambda p: abs((tx.date - p.due_date).days))
-        
-        # Check for ambiguity: if top 2 have same distance, do NOT auto-match
-        distance_0 = abs((tx.date - candidates_in_window[0].due_date).days)
-        distance_1 = abs((tx.date - candidates_in_window[1].due_date).days)
-        
-        if distance_0 == distance_1:
-            logger.warning(
-                f"Auto-match AMBIGUOUS for tx {tx.id}: multiple candidates with equal date distance. "
-                f"Candidates: {[p.id for p in candidates_in_window[:3]]}"
-            )
-            return created_matches
-    
-    # Step 5: We have a unique candidate
-    planned = candidates_in_window[0]
-    
+
     logger.info(
         f"Auto-match candidate selected: tx {tx.id} -> planned {planned.id} "
         f"(amount={tx.amount}, date_diff={abs((tx.date - planned.due_date).days)} days)"
     )
-    
+
     # Step 6: Idempotency check — ensure no existing match
-    existing = db.query(PlannedMatch).filter(
-        PlannedMatch.planned_item_id == planned.id,
-        PlannedMatch.transaction_id == tx.id,
-        PlannedMatch.company_id == company_id
-    ).first()
-    
-    if existing:
-        logger.debug(f"Auto-match: Match already exists (match_id={existing.id}) for tx {tx.id} and planned {planned.id}")
-        return created_matches
-    
-    # Step 7: Create PlannedMatch
-    match = PlannedMatch(
-        planned_item_id=planned.id,
-        transaction_id=tx.id,
-        matched_amount=tx.amount,
-        match_type="AUTO",
-        company_id=company_id,
-    )
-    
-    db.add(match)
-    
+    # (a recurring occurrence has no row yet, so it cannot have a match)
+    if occurrence is None:
+        existing = db.query(PlannedMatch).filter(
+            PlannedMatch.planned_item_id == planned.id,
+            PlannedMatch.transaction_id == tx.id,
+            PlannedMatch.company_id == company_id
+        ).first()
+
+        if existing:
+            logger.debug(f"Auto-match: Match already exists (match_id={existing.id}) for tx {tx.id} and planned {planned.id}")
+            return created_matches
+
     try:
+        planned_item_id = planned.id
+        if occurrence is not None:
+            # Recurring occurrence: materialize its row first (unique per occurrence)
+            planned_item_id = materialize_occurrence(db, company_id, occurrence).id
+
+        # Step 7: Create PlannedMatch
+        match = PlannedMatch(
+            planned_item_id=planned_item_id,
+            transaction_id=tx.id,
+            matched_amount=tx.amount,
+            match_type="AUTO",
+            company_id=company_id,
+        )
+        db.add(match)
+        db.flush()
+        refresh_transaction_match_state(db, company_id, [tx.id])
+        # Step 8: Settle planned item (same transaction as the match)
+        apply_settlement_delta(db, company_id, planned_item_id, tx.amount)
         db.commit()
         db.refresh(match)
-        logger.info(f"Auto-match SUCCESS: created match_id={match.id} for tx {tx.id} -> planned {planned.id}")
+        logger.info(f"Auto-match SUCCESS: created match_id={match.id} for tx {tx.id} -> planned {planned_item_id}")
         created_matches.append(match)
-        
-        # Step 8: Recompute planned item status/remaining
-        recompute_planned_status(db, company_id, planned.id)
+        # Kalem kapandı: index yeniden kurulmadan güncellenir
+        record_settlement(index, tx.direction, tx.amount, planned.id)
         
     except IntegrityError as ie:
         db.rollback()
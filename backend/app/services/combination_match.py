@@ -0,0 +1,389 @@
+# app/services/combination_match.py
+"""
+Tolerance-aware combination matching.
+
+auto_match.py only pairs one transaction with one planned item of exactly
+the same amount. Real payments are messier:
+
+* ONE_TO_MANY: one customer payment settles several invoices;
+* MANY_TO_ONE: one invoice is paid in several transfers, minus bank fees.
+
+For a transaction (or a planned item) this module looks at the other
+side's open candidates inside a date window and searches for subsets whose
+sum is within a tolerance of the target amount. Everything is integer
+minor units (kuruş). The search is meet-in-the-middle: the candidates are
+split in two halves, every subset of up to MAX_PARTS items of each half is
+enumerated, and one half is sorted so matching partners for the other half
+are found by bisect. Hard caps keep it bounded: at most MAX_CANDIDATES
+candidates (nearest due dates first), at most MAX_PARTS parts, and a time
+budget per search, after which the best results so far are returned with
+`truncated=True`.
+
+Results are scored proposals with ready-to-confirm allocations; nothing is
+written until `confirm_allocations` is called.
+"""
+
+import bisect
+import heapq
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from itertools import combinations
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.planned_recurrence import expand_occurrences, resolve_planned_item_id
+from app.services.planned_settlement import apply_settlement_deltas
+from app.services.transaction_match_state import (
+    refresh_transaction_match_state,
+    unmatched_condition,
+)
+
+DATE_WINDOW_DAYS = 30
+TOLERANCE_ABS = Decimal("5.00")
+TOLERANCE_RATIO = Decimal("0.005")
+MAX_CANDIDATES = 24
+MAX_PARTS = 4
+MAX_PROPOSALS = 5
+MAX_RAW_HITS = 500
+TIME_BUDGET_SECONDS = 0.05
+
+ONE_TO_MANY = "ONE_TO_MANY"
+MANY_TO_ONE = "MANY_TO_ONE"
+
+
+@dataclass
+class _Candidate:
+    id: str
+    cents: int
+    day: object
+    texts: tuple[str, ...]
+
+
+@dataclass
+class MatchProposal:
+    kind: str
+    score: int
+    target_amount: Decimal
+    total_amount: Decimal
+    allocations: list[dict]
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "score": self.score,
+            "target_amount": float(self.target_amount),
+            "total_amount": float(self.total_amount),
+            "difference": float(self.total_amount - self.target_amount),
+            "allocations": [
+                {**a, "matched_amount": float(a["matched_amount"])} for a in self.allocations
+            ],
+        }
+
+
+@dataclass
+class ProposalResult:
+    candidates: int = 0
+    truncated: bool = False
+    elapsed_ms: float = 0.0
+    proposals: list[MatchProposal] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "candidates": self.candidates,
+            "truncated": self.truncated,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "proposals": [p.as_dict() for p in self.proposals],
+        }
+
+
+def _cents(value) -> int:
+    return int((Decimal(value) * 100).to_integral_value())
+
+
+def _amount(cents: int) -> Decimal:
+    return Decimal(cents) / 100
+
+
+def tolerance_cents(target_cents: int) -> int:
+    """Mutlak (TOLERANCE_ABS) ve oransal (TOLERANCE_RATIO) toleransın büyüğü."""
+    return max(_cents(TOLERANCE_ABS), int(target_cents * TOLERANCE_RATIO))
+
+
+def _half_sums(amounts: list[int], offset: int, max_parts: int) -> list[tuple[int, tuple[int, ...]]]:
+    out = []
+    indexes = range(offset, offset + len(amounts))
+    for size in range(0, max_parts + 1):
+        for combo in combinations(indexes, size):
+            out.append((sum(amounts[i - offset] for i in combo), combo))
+    return out
+
+
+def find_subsets(
+    amounts: list[int],
+    target: int,
+    tolerance: int,
+    max_parts: int = MAX_PARTS,
+    deadline: float | None = None,
+) -> tuple[list[tuple[int, ...]], bool]:
+    """
+    Toplamı target ± tolerance olan (en fazla max_parts elemanlı) alt kümeler.
+
+    Returns:
+        (indeks demetleri - |fark| ve parça sayısına göre sıralı, truncated)
+    """
+    mid = len(amounts) // 2
+    left = _half_sums(amounts[:mid], 0, max_parts)
+    right = sorted(_half_sums(amounts[mid:], mid, max_parts))
+    right_sums = [s for s, _ in right]
+
+    # En iyi MAX_RAW_HITS sonuç tutulur: heap'in tepesi en kötü sonuçtur
+    best: list[tuple[int, int, tuple[int, ...]]] = []
+    truncated = False
+    for n, (left_sum, left_combo) in enumerate(left):
+        if deadline is not None and n % 64 == 0 and time.perf_counter() > deadline:
+            truncated = True
+            break
+        lo = bisect.bisect_left(right_sums, target - tolerance - left_sum)
+        hi = bisect.bisect_right(right_sums, target + tolerance - left_sum)
+        for right_sum, right_combo in right[lo:hi]:
+            size = len(left_combo) + len(right_combo)
+            if size == 0 or size > max_parts:
+                continue
+            entry = (-abs(left_sum + right_sum - target), -size, left_combo + right_combo)
+            if len(best) < MAX_RAW_HITS:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+    best.sort(reverse=True)
+    return [combo for _, _, combo in best], truncated
+
+
+def _score(diff_cents: int, tolerance: int, day_diffs: list[int], parts: int, text_hits: int) -> int:
+    """Tutar (50) + tarih (25) + az parça (10) + referans/karşı taraf (15), en fazla 100."""
+    amount = 50 * (1 - diff_cents / (tolerance + 1))
+    date_score = 25 * max(0.0, 1 - (sum(day_diffs) / len(day_diffs)) / DATE_WINDOW_DAYS)
+    size = max(0, 10 - 2 * (parts - 1))
+    text = 15 * text_hits / parts
+    return min(int(round(amount + date_score + size + text)), 100)
+
+
+def _nearest(candidates: list[_Candidate], day) -> list[_Candidate]:
+    candidates.sort(key=lambda c: (abs((c.day - day).days), c.id))
+    return candidates[:MAX_CANDIDATES]
+
+
+def _search(kind, target_cents, anchor_day, candidates, text_hit, allocate, result, started) -> None:
+    tolerance = tolerance_cents(target_cents)
+    combos, result.truncated = find_subsets(
+        [c.cents for c in candidates], target_cents, tolerance,
+        deadline=started + TIME_BUDGET_SECONDS,
+    )
+
+    scored = []
+    for combo in combos:
+        parts = [candidates[i] for i in combo]
+        total = sum(p.cents for p in parts)
+        score = _score(
+            abs(total - target_cents), tolerance,
+            [abs((p.day - anchor_day).days) for p in parts],
+            len(parts), sum(1 for p in parts if text_hit(p)),
+        )
+        scored.append((score, total, parts))
+    scored.sort(key=lambda s: -s[0])
+
+    for score, total, parts in scored[:MAX_PROPOSALS]:
+        # Hedef tutar, tarihi en erken parçadan başlayarak dağıtılır (hedefi aşmaz)
+        budget = target_cents
+        allocations = []
+        for part in sorted(parts, key=lambda p: (p.day, p.id)):
+            share = min(part.cents, budget)
+            budget -= share
+            if share > 0:
+                allocations.append({**allocate(part), "matched_amount": _amount(share)})
+        result.proposals.append(MatchProposal(
+            kind, score, _amount(target_cents), _amount(total), allocations
+        ))
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+
+
+def propose_for_transaction(db: Session, company_id: int, tx: Transaction) -> ProposalResult:
+    """Bir işlemin birden fazla planlı kalemi kapattığı kombinasyonlar (ONE_TO_MANY)."""
+    started = time.perf_counter()
+    result = ProposalResult()
+    target = _cents(tx.amount) - _cents(tx.matched_amount or 0)
+    if target <= 0:
+        return result
+
+    rows = db.query(
+        PlannedCashflowItem.id,
+        PlannedCashflowItem.remaining_amount,
+        PlannedCashflowItem.due_date,
+        PlannedCashflowItem.reference_no,
+        PlannedCashflowItem.counterparty,
+    ).filter(
+        PlannedCashflowItem.company_id == company_id,
+        PlannedCashflowItem.direction == tx.direction,
+        PlannedCashflowItem.status.in_(["OPEN", "PARTIAL"]),
+        PlannedCashflowItem.remaining_amount > 0,
+        PlannedCashflowItem.remaining_amount <= _amount(target + tolerance_cents(target)),
+        PlannedCashflowItem.due_date >= tx.date - timedelta(days=DATE_WINDOW_DAYS),
+        PlannedCashflowItem.due_date <= tx.date + timedelta(days=DATE_WINDOW_DAYS),
+    ).all()
+    # Tekrarlayan kuralların pencere içindeki oluşumları da aday (sanal id ile)
+    rows += [
+        (occ.id, occ.remaining_amount, occ.due_date, occ.reference_no, occ.counterparty)
+        for occ in expand_occurrences(
+            db, company_id, tx.date - timedelta(days=DATE_WINDOW_DAYS),
+            tx.date + timedelta(days=DATE_WINDOW_DAYS), tx.direction,
+        )
+        if _cents(occ.remaining_amount) <= target + tolerance_cents(target)
+    ]
+    candidates = _nearest([
+        _Candidate(item_id, _cents(remaining), due_date,
+                   tuple(t.lower() for t in (reference_no, counterparty) if t))
+        for item_id, remaining, due_date, reference_no, counterparty in rows
+    ], tx.date)
+    result.candidates = len(candidates)
+
+    description = (tx.description or "").lower()
+    _search(
+        ONE_TO_MANY, target, tx.date, candidates,
+        text_hit=lambda p: any(t in description for t in p.texts),
+        allocate=lambda p: {"planned_item_id": p.id, "transaction_id": tx.id},
+        result=result, started=started,
+    )
+    return result
+
+
+def propose_for_planned(db: Session, company_id: int, item: PlannedCashflowItem) -> ProposalResult:
+    """
+    Bir planlı kalemi birden fazla işlemin kapattığı kombinasyonlar
+    (MANY_TO_ONE). item tekrarlayan kuralın oluşumu da olabilir.
+    """
+    started = time.perf_counter()
+    result = ProposalResult()
+    target = _cents(item.remaining_amount)
+    if target <= 0:
+        return result
+
+    rows = db.query(
+        Transaction.id,
+        Transaction.amount,
+        Transaction.date,
+        Transaction.description,
+    ).filter(
+        Transaction.company_id == company_id,
+        Transaction.direction == item.direction,
+        unmatched_condition(),
+        Transaction.amount <= _amount(target + tolerance_cents(target)),
+        Transaction.date >= item.due_date - timedelta(days=DATE_WINDOW_DAYS),
+        Transaction.date <= item.due_date + timedelta(days=DATE_WINDOW_DAYS),
+    ).all()
+    candidates = _nearest([
+        _Candidate(tx_id, _cents(amount), tx_date, ((description or "").lower(),))
+        for tx_id, amount, tx_date, description in rows
+    ], item.due_date)
+    result.candidates = len(candidates)
+
+    needles = [t.lower() for t in (item.reference_no, item.counterparty) if t]
+    _search(
+        MANY_TO_ONE, target, item.due_date, candidates,
+        text_hit=lambda p: any(n in p.texts[0] for n in needles),
+        allocate=lambda p: {"planned_item_id": item.id, "transaction_id": p.id},
+        result=result, started=started,
+    )
+    return result
+
+
+def confirm_allocations(
+    db: Session, company_id: int, allocations: list[dict], match_type: str = "MANUAL"
+) -> list[PlannedMatch]:
+    """
+    Bir öneriyi tek seferde uygular: eşleşmeleri ekler, planlı kalemleri ve
+    işlemlerin eşleşme durumunu günceller. Commit çağırana aittir.
+    """
+    if not allocations:
+        raise HTTPException(400, "Eşleşme listesi boş")
+
+    # Tekrarlayan oluşum id'leri satıra dönüştürülür
+    resolved = {
+        a["planned_item_id"]: resolve_planned_item_id(db, company_id, a["planned_item_id"])
+        for a in allocations
+    }
+    allocations = [{**a, "planned_item_id": resolved[a["planned_item_id"]]} for a in allocations]
+
+    pairs = {(a["planned_item_id"], a["transaction_id"]) for a in allocations}
+    if len(pairs) != len(allocations):
+        raise HTTPException(400, "Aynı planned kalem ve transaction çifti listede birden fazla kez var")
+
+    planned_ids = {a["planned_item_id"] for a in allocations}
+    tx_ids = {a["transaction_id"] for a in allocations}
+    planned = {
+        p.id: p for p in db.query(PlannedCashflowItem).filter(
+            PlannedCashflowItem.company_id == company_id,
+            PlannedCashflowItem.id.in_(planned_ids),
+        )
+    }
+    txs = {
+        t.id: t for t in db.query(Transaction).filter(
+            Transaction.company_id == company_id,
+            Transaction.id.in_(tx_ids),
+        )
+    }
+    if planned_ids - planned.keys():
+        raise HTTPException(404, "Planned item bulunamadı")
+    if tx_ids - txs.keys():
+        raise HTTPException(404, "Transaction bulunamadı")
+
+    existing = db.query(PlannedMatch.planned_item_id, PlannedMatch.transaction_id).filter(
+        PlannedMatch.company_id == company_id,
+        PlannedMatch.planned_item_id.in_(planned_ids),
+        PlannedMatch.transaction_id.in_(tx_ids),
+    ).all()
+    if existing:
+        raise HTTPException(409, "Bu transaction zaten bu planned kalem ile eşleştirilmiş")
+
+    per_planned: dict[str, Decimal] = {}
+    per_tx: dict[str, Decimal] = {}
+    for a in allocations:
+        item, tx = planned[a["planned_item_id"]], txs[a["transaction_id"]]
+        amount = Decimal(str(a["matched_amount"]))
+        if amount <= 0:
+            raise HTTPException(400, "Eşleşme tutarı pozitif olmalı")
+        if item.status not in ("OPEN", "PARTIAL"):
+            raise HTTPException(400, f"Bu planned kalem eşleşmeye kapalı: {item.status}")
+        if tx.direction != item.direction:
+            raise HTTPException(400, "Direction uyumsuz (in/out)")
+        per_planned[item.id] = per_planned.get(item.id, Decimal(0)) + amount
+        per_tx[tx.id] = per_tx.get(tx.id, Decimal(0)) + amount
+
+    for item_id, total in per_planned.items():
+        if total - Decimal(planned[item_id].remaining_amount) > Decimal("0.01"):
+            raise HTTPException(400, "Matched amount remaining'den büyük olamaz")
+    for tx_id, total in per_tx.items():
+        tx = txs[tx_id]
+        if total - (Decimal(tx.amount) - Decimal(tx.matched_amount or 0)) > Decimal("0.01"):
+            raise HTTPException(400, "Eşleşme tutarı işlem tutarını aşamaz")
+
+    matches = [
+        PlannedMatch(
+            company_id=company_id,
+            planned_item_id=a["planned_item_id"],
+            transaction_id=a["transaction_id"],
+            matched_amount=Decimal(str(a["matched_amount"])),
+            match_type=match_type,
+        )
+        for a in allocations
+    ]
+    db.add_all(matches)
+    db.flush()
+    refresh_transaction_match_state(db, company_id, per_tx.keys())
+    apply_settlement_deltas(db, company_id, per_planned)
+    return matches
@@ -0,0 +1,193 @@
+# app/services/data_version.py
+"""
+Per-company data version counter.
+
+Caches that derive numbers from a company's ledger (window aggregates,
+matching health, AI context, ...) key their entries on this version so a
+write to transactions, planned items or matches invalidates them without
+explicit cache clearing.
+
+Writes are recorded automatically from a SQLAlchemy `after_flush` hook
+for every ORM insert/update/delete on a tracked table, and the version is
+bumped only when the session commits (`after_commit`); a rollback drops
+the recorded writes. Bumping at flush time would let a concurrent reader
+see the new version, read the still-uncommitted old rows and cache them
+under the new key. Bulk statements
+(`query(...).update()/delete()`, `session.execute(insert(...)/update(...))`)
+bypass the unit of work, so they bump a global epoch that is part of every
+company's version, unless the statement names its company via
+`.execution_options(data_version_company_id=...)`. Core statements run on
+the session's connection register themselves with `record_data_write`.
+
+A company's version can also be read for a subset of tables
+(`get_data_version(company_id, tables=...)`): the matching index only
+depends on planned items, so new transactions must not invalidate it.
+Bumps that do not name their tables count as a write to every table.
+
+Every bump also goes into a short per-company change log with the ids of
+the rows it touched when they are known (ORM flushes always know them;
+bulk statements pass `data_version_row_ids`). `changed_rows` lets a cache
+that mirrors rows (the AI retrieval index) reload only those rows instead
+of rescanning the company; it answers None whenever the log cannot say
+exactly what changed.
+
+Versions are process-local. Caches built on them are process-local too,
+so they should also carry a short TTL to bound staleness when another
+instance writes.
+"""
+
+import threading
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Tables whose rows feed analytics
+TRACKED_TABLES = {
+    "transactions",
+    "planned_cashflow_items",
+    "planned_matches",
+    "planned_recurrences",
+    "company_financial_settings",
+}
+
+_lock = threading.Lock()
+_versions: dict[int, int] = {}
+# (company_id, table) -> counter; table None counts bumps without table info
+_table_versions: dict[tuple[int, str | None], int] = {}
+_epoch = 0
+
+DATA_CHANGE_LOG_LIMIT = 256
+DATA_CHANGE_MAX_IDS = 1000
+# company_id -> (company counter, table, id'ler veya None) kayıtları
+_changes: dict[int, deque] = {}
+# company_id -> log'dan düşen son kaydın sayacı
+_change_floor: dict[int, int] = {}
+
+
+def get_data_version(company_id: int, tables: tuple[str, ...] | None = None) -> tuple:
+    """
+    Current (epoch, company counter) version for a company.
+    With tables, only writes to those tables (and untargeted bumps) count:
+    (epoch, untargeted counter, (counter per table, ...)).
+    """
+    with _lock:
+        if tables is None:
+            return _epoch, _versions.get(company_id, 0)
+        return (
+            _epoch,
+            _table_versions.get((company_id, None), 0),
+            tuple(_table_versions.get((company_id, table), 0) for table in tables),
+        )
+
+
+def bump_data_version(company_id: int | None = None, tables=None, row_ids: dict | None = None) -> None:
+    """
+    Invalidate cached analytics for a company.
+    With company_id=None every company is invalidated (global epoch).
+    tables names the tables that were written; None means any of them.
+    row_ids optionally maps a table to the ids of the rows written to it.
+    """
+    global _epoch
+    with _lock:
+        if company_id is None:
+            _epoch += 1
+            return
+        counter = _versions[company_id] = _versions.get(company_id, 0) + 1
+        log = _changes.setdefault(company_id, deque())
+        for table in (tables or (None,)):
+            key = (company_id, table)
+            _table_versions[key] = _table_versions.get(key, 0) + 1
+            ids = (row_ids or {}).get(table)
+            if ids is not None and len(ids) > DATA_CHANGE_MAX_IDS:
+                ids = None
+            log.append((counter, table, frozenset(ids) if ids is not None else None))
+        while len(log) > DATA_CHANGE_LOG_LIMIT:
+            _change_floor[company_id] = log.popleft()[0]
+
+
+def changed_rows(company_id: int, since: tuple, tables: tuple[str, ...]) -> tuple[tuple, dict | None]:
+    """
+    since (get_data_version(company_id) değeri) sonrasında tables'a yazılan
+    satır id'leri. Returns: (güncel versiyon, {tablo: id kümesi}) ya da
+    log kesin söyleyemiyorsa (epoch değişti, log kısaldı, id'siz yazım)
+    (güncel versiyon, None).
+    """
+    with _lock:
+        current = (_epoch, _versions.get(company_id, 0))
+        epoch, counter = since
+        if epoch != _epoch or _change_floor.get(company_id, 0) > counter:
+            return current, None
+        changes = {table: set() for table in tables}
+        for entry_counter, table, ids in _changes.get(company_id, ()):
+            if entry_counter <= counter or (table is not None and table not in changes):
+                continue
+            if table is None or ids is None:
+                return current, None
+            changes[table] |= ids
+        return current, changes
+
+
+_PENDING_KEY = "data_version_pending"
+
+
+def record_data_write(
+    session: Session, company_id: int | None, tables=None, row_ids: dict | None = None
+) -> None:
+    """
+    Session'ın açık transaction'ında yapılan yazımı kaydeder; versiyon
+    commit sonrası artırılır (argümanlar bump_data_version gibi).
+    """
+    session.info.setdefault(_PENDING_KEY, []).append(
+        (company_id, tuple(tables) if tables else None, row_ids)
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    for company_id, tables, row_ids in session.info.pop(_PENDING_KEY, ()):
+        bump_data_version(company_id, tables, row_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_unfinished(session, transaction):
+    # Commit edilmeden kapanan session (close() rollback event'i üretmez)
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_on_flush(session, flush_context):
+    touched: dict[int, dict[str, set]] = {}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table not in TRACKED_TABLES:
+            continue
+        company_id = getattr(obj, "company_id", None)
+        if company_id is not None:
+            touched.setdefault(company_id, {}).setdefault(table, set()).add(getattr(obj, "id", None))
+    for company_id, row_ids in touched.items():
+        record_data_write(session, company_id, tuple(row_ids), row_ids)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_statement(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    table = getattr(mapper, "persist_selectable", None) if mapper is not None else None
+    if table is None or getattr(table, "name", None) not in TRACKED_TABLES:
+        return
+    options = orm_execute_state.execution_options
+    row_ids = options.get("data_version_row_ids")
+    record_data_write(
+        orm_execute_state.session,
+        options.get("data_version_company_id"),
+        (table.name,),
+        {table.name: set(row_ids)} if row_ids is not None else None,
+    )
@@ -15,9 +15,11 @@ from sqlalchemy.orm import Session
 from ..models.email_alias import EmailAlias
 from ..models.email_ingest_log import EmailIngestLog
 from ..models.email_attachment import EmailAttachment
+from ..models.planned_match import PlannedMatch
 from ..models.transaction import Transaction
 from ..models.company import Company
 from .bank_detector import bank_detector
+from .planned_settlement import apply_settlement_deltas
 
 logger = logging.getLogger(__name__)
 
@@ -320,15 +322,39 @@ class EmailIngestionService:
     def rollback_email_transactions(
         self,
         db: Session,
-        attachment_id: str
+        attachment_id: str,
+        company_id: int
     ) -> Dict:
         """Rollback all transactions created from a specific email attachment."""
         try:
-            # Delete transactions
-            deleted_count = db.query(Transaction).filter(
+            tx_ids = [tx_id for (tx_id,) in db.query(Transaction.id).filter(
+                Transaction.company_id == company_id,
                 Transaction.source == "EMAIL",
                 Transaction.source_id == attachment_id
-            ).delete()
+            ).all()]
+
+            # İşlemlerin eşleşmeleri de silinir; ilgili planlı kalemlerden düşülür
+            match_q = db.query(PlannedMatch).filter(
+                PlannedMatch.company_id == company_id,
+                PlannedMatch.transaction_id.in_(tx_ids)
+            )
+            deltas = {}
+            for planned_id, matched_amount in match_q.with_entities(
+                PlannedMatch.planned_item_id, PlannedMatch.matched_amount
+            ).all():
+                deltas[planned_id] = deltas.get(planned_id, 0) - matched_amount
+            match_q.execution_options(data_version_company_id=company_id).delete(
+                synchronize_session=False
+            )
+
+            # Delete transactions
+            deleted_count = db.query(Transaction).filter(
+                Transaction.company_id == company_id,
+                Transaction.id.in_(tx_ids)
+            ).execution_options(
+                data_version_company_id=company_id, data_version_row_ids=tx_ids
+            ).delete(synchronize_session=False)
+            apply_settlement_deltas(db, company_id, deltas)
             
             # Update attachment status
             attachment = db.query(EmailAttachment).filter(
@@ -0,0 +1,193 @@
+# app/services/fixed_costs.py
+"""
+Sabit gider analizi.
+
+Tüm sabit gider kategorileri için dönem, karşılaştırma dönemi ve aylık
+toplamlar tek bir `GROUP BY category` sorgusuyla (SUM(CASE WHEN ...))
+hesaplanır; anomali tespiti bellekteki sonuç üzerinde yapılır. Böylece
+sorgu sayısı kategori sayısından bağımsızdır.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import func, case, and_
+from sqlalchemy.orm import Session
+
+from app.core.constants import FIXED_COST_CATEGORIES, ANOMALY_THRESHOLD
+from app.models.transaction import Transaction
+
+
+def resolve_fixed_cost_windows(period: str, today: date) -> dict:
+    """
+    Periyoda göre analiz pencerelerini döner.
+
+    Returns:
+        {"period_start", "period_end", "comparison_start", "six_months_ago"}
+        Karşılaştırma penceresi [comparison_start, period_start) aralığıdır.
+    """
+    if period == "last_30_days":
+        period_start = today - timedelta(days=30)
+        period_end = today
+        comparison_start = today - timedelta(days=60)
+    elif period == "prev_month":
+        # Önceki ayın başı ve sonu
+        current_month_start = today.replace(day=1)
+        last_day_of_prev_month = current_month_start - timedelta(days=1)
+        period_start = last_day_of_prev_month.replace(day=1)
+        period_end = last_day_of_prev_month
+        # Karşılaştırma için: bir önceki ay
+        comparison_start = period_start - timedelta(days=period_start.day)
+    else:
+        # current_month (varsayılan)
+        period_start = today.replace(day=1)
+        period_end = today
+        comparison_start = (period_start - timedelta(days=1)).replace(day=1)
+
+    return {
+        "period_start": period_start,
+        "period_end": period_end,
+        "comparison_start": comparison_start,
+        # 6 ay öncesi (aylık geçmiş için baseline)
+        "six_months_ago": period_start - timedelta(days=180),
+    }
+
+
+def _month_starts(start: date, end: date) -> list[date]:
+    """start ve end tarihlerini kapsayan ay başlarını (artan sırada) döner."""
+    months = []
+    cursor = start.replace(day=1)
+    while cursor <= end:
+        months.append(cursor)
+        cursor = (cursor + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def _sum_between(start: date, end_exclusive: date):
+    """Tarih aralığındaki tutarları toplayan koşullu SUM ifadesi."""
+    return func.coalesce(
+        func.sum(
+            case(
+                (and_(Transaction.date >= start, Transaction.date < end_exclusive), Transaction.amount),
+                else_=0,
+            )
+        ),
+        0,
+    )
+
+
+def compute_fixed_cost_totals(
+    db: Session,
+    company_id: int,
+    period_start: date,
+    period_end: date,
+    comparison_start: date,
+    six_months_ago: date,
+    today: date,
+) -> dict[str, dict]:
+    """
+    Sabit gider kategorileri için dönem/karşılaştırma/aylık toplamları
+    tek sorguda hesaplar.
+
+    Returns:
+        {category: {"current": float, "comparison": float,
+                    "months": {"YYYY-MM": float, ...}}}
+        Son 6 ayda hiç işlemi olmayan kategoriler sonuçta yer almaz.
+    """
+    month_starts = _month_starts(six_months_ago, max(today, period_end))
+    month_bounds = []
+    for m_start in month_starts:
+        m_end = (m_start + timedelta(days=32)).replace(day=1)
+        # İlk ay six_months_ago'dan başlar (kısmi ay)
+        month_bounds.append((m_start.strftime("%Y-%m"), max(m_start, six_months_ago), m_end))
+
+    columns = [
+        Transaction.category,
+        _sum_between(period_start, period_end + timedelta(days=1)).label("current"),
+        _sum_between(comparison_start, period_start).label("comparison"),
+    ]
+    for idx, (_, m_start, m_end) in enumerate(month_bounds):
+        columns.append(_sum_between(m_start, m_end).label(f"m{idx}"))
+
+    lower_bound = min(six_months_ago, comparison_start)
+    rows = (
+        db.query(*columns)
+        .filter(
+            Transaction.company_id == company_id,
+            Transaction.direction == "out",
+            Transaction.date >= lower_bound,
+            Transaction.category.in_(list(FIXED_COST_CATEGORIES)),
+        )
+        .group_by(Transaction.category)
+        .all()
+    )
+
+    totals = {}
+    for row in rows:
+        months = {}
+        for idx, (label, _, _) in enumerate(month_bounds):
+            amount = float(getattr(row, f"m{idx}") or 0)
+            if amount:
+                months[label] = amount
+        if not months:
+            continue
+        totals[row.category] = {
+            "current": float(row.current or 0),
+            "comparison": float(row.comparison or 0),
+            "months": months,
+        }
+    return totals
+
+
+def detect_fixed_cost_anomalies(totals: dict[str, dict]) -> list[dict]:
+    """
+    compute_fixed_cost_totals çıktısı üzerinde anomali tespiti yapar.
+    Kategoriler FIXED_COST_CATEGORIES sırasıyla döner.
+    """
+    results = []
+
+    for category in FIXED_COST_CATEGORIES:
+        data = totals.get(category)
+        if not data:
+            continue
+
+        current_amount = data["current"]
+        avg_amount = data["comparison"]
+
+        # Yüzde değişim
+        if avg_amount > 0:
+            change_pct = ((current_amount - avg_amount) / avg_amount) * 100
+        else:
+            change_pct = 0.0
+
+        # Status ve uyarı
+        if abs(change_pct) > ANOMALY_THRESHOLD:
+            status = "alert"
+            if change_pct > 0:
+                alert_msg = f"{category}: {change_pct:.1f}% artış tespit edildi. Mukerrer/hatalı işlem olabilir, kontrol edin."
+            else:
+                alert_msg = f"{category}: {abs(change_pct):.1f}% azalış tespit edildi."
+        elif abs(change_pct) > 10:
+            status = "warning"
+            alert_msg = f"{category}: {change_pct:.1f}% değişim (alışılmadık, gözlemde bulunun)."
+        else:
+            status = "normal"
+            alert_msg = None
+
+        # Ay listesi (en son 6 ay)
+        month_keys = sorted(data["months"].keys(), reverse=True)
+        months_list = [
+            {"month": month_key, "amount": data["months"][month_key]}
+            for month_key in month_keys[:6]
+        ]
+
+        results.append({
+            "category": category,
+            "avg_monthly": round(avg_amount, 2),
+            "current_month": round(current_amount, 2),
+            "change_percentage": round(change_pct, 2),
+            "status": status,
+            "alert_message": alert_msg,
+            "months": months_list,
+        })
+
+    return results
@@ -0,0 +1,165 @@
+# app/services/ledger_export.py
+"""
+Streaming ledger export (CSV / NDJSON / Parquet).
+
+Rows are read as plain column tuples through `yield_per` (a server-side
+cursor on Postgres) and encoded one chunk at a time, so memory stays flat
+regardless of ledger size: no ORM objects, no Pydantic list, no full file
+in memory. Parquet is written with one row group per chunk and the bytes
+of each row group are flushed to the response as soon as they are encoded.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from app.models.transaction import TRANSACTION_SCHEMA_COLUMNS
+
+EXPORT_CHUNK_SIZE = 5000
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+EXPORT_COLUMNS = TRANSACTION_SCHEMA_COLUMNS
+EXPORT_FIELDS = tuple(col.key for col in EXPORT_COLUMNS)
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _chunks(db: Session, stmt: Select, chunk_size: int) -> Iterator[list]:
+    """yield_per ile satırları parça parça okur; bittiğinde session'ı kapatır."""
+    try:
+        result = db.execute(stmt.execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        # Yanıt stream edilirken dependency session'ı kapatmış olabilir;
+        # burada açılan bağlantıyı her durumda geri veriyoruz.
+        db.close()
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_csv(db: Session, stmt: Select, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for partition in _chunks(db, stmt, chunk_size):
+        writer.writerows(
+            (
+                tx_id,
+                tx_date.isoformat() if tx_date else "",
+                description,
+                amount,
+                direction,
+                category or "",
+                source or "",
+                created_at.isoformat() if created_at else "",
+            )
+            for tx_id, tx_date, description, amount, direction, category, source, created_at in partition
+        )
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def iter_ndjson(db: Session, stmt: Select, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    dumps = json.JSONEncoder(default=_json_default, ensure_ascii=False, separators=(",", ":")).encode
+    for partition in _chunks(db, stmt, chunk_size):
+        lines = [dumps(dict(zip(EXPORT_FIELDS, row))) for row in partition]
+        lines.append("")
+        yield "\n".join(lines).encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Parquet writer'ın yazdığı byte'ları biriktirip parça parça boşaltılabilen sink."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._parts.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_parquet(db: Session, stmt: Select, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("date", pa.date32()),
+        ("description", pa.string()),
+        ("amount", pa.decimal128(12, 2)),
+        ("direction", pa.string()),
+        ("category", pa.string()),
+        ("source", pa.string()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for partition in _chunks(db, stmt, chunk_size):
+            columns = list(zip(*partition))
+            batch = pa.record_batch(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            )
+            # Her parça ayrı bir row group olarak yazılır ve hemen gönderilir
+            writer.write_batch(batch, row_group_size=len(partition))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream_ledger(db: Session, stmt: Select, fmt: str) -> Iterator[bytes]:
+    if fmt == "csv":
+        return iter_csv(db, stmt)
+    if fmt == "ndjson":
+        return iter_ndjson(db, stmt)
+    if fmt == "parquet":
+        return iter_parquet(db, stmt)
+    raise ValueError(f"Unsupported export format: {fmt}")
@@ -0,0 +1,162 @@
+# app/services/match_candidates.py
+"""
+Candidate retrieval and scoring for planned-item match suggestions.
+
+Candidates come from three bounded, index-backed lookups instead of
+"load some rows, filter in Python":
+
+* amount window: the transactions whose amount is nearest to the item's
+  remaining amount within ±AMOUNT_WINDOW_DAYS of the due date, fetched
+  as two range scans on the unmatched (company_id, direction, amount)
+  index, one walking up from the target and one walking down, then
+  merged by distance;
+* text: counterparty / reference lookup in the description search index
+  (FTS5 / tsvector / trigram, see transaction_search.py);
+* fallback (only when both are empty): nearest amounts without a date
+  window.
+
+Only unmatched transactions are considered (match_status = UNMATCHED,
+covered by partial indexes on transactions). The union is at most AMOUNT_CANDIDATES + 2 * TEXT_CANDIDATES rows and is
+scored in memory.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from sqlalchemy.orm import Session
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.transaction import Transaction
+from app.services.transaction_match_state import unmatched_condition
+from app.services.transaction_search import fold_text, search_transactions
+
+AMOUNT_WINDOW_DAYS = 10
+AMOUNT_TOLERANCE = Decimal("1.02")
+AMOUNT_CANDIDATES = 15
+TEXT_CANDIDATES = 20
+FALLBACK_CANDIDATES = 10
+
+
+def nearest_amount_candidates(
+    db: Session,
+    company_id: int,
+    direction: str,
+    target: Decimal,
+    limit: int,
+    upper: Decimal | None = None,
+    date_from=None,
+    date_to=None,
+) -> list[Transaction]:
+    """
+    Tutarı target'a en yakın `limit` eşleşmemiş işlem.
+    İki index aralık taramasıyla (target'tan yukarı / aşağı) bulunur.
+    """
+    q = db.query(Transaction).filter(
+        Transaction.company_id == company_id,
+        Transaction.direction == direction,
+        unmatched_condition(),
+    )
+    if date_from is not None:
+        q = q.filter(Transaction.date >= date_from)
+    if date_to is not None:
+        q = q.filter(Transaction.date <= date_to)
+
+    above_q = q.filter(Transaction.amount >= target)
+    if upper is not None:
+        above_q = above_q.filter(Transaction.amount <= upper)
+    above = above_q.order_by(Transaction.amount.asc(), Transaction.id).limit(limit).all()
+    below = q.filter(Transaction.amount < target).order_by(
+        Transaction.amount.desc(), Transaction.id
+    ).limit(limit).all()
+
+    merged = sorted(above + below, key=lambda tx: abs(Decimal(tx.amount) - target))
+    return merged[:limit]
+
+
+def retrieve_candidates(db: Session, company_id: int, item: PlannedCashflowItem) -> list[Transaction]:
+    """Planlı kalem için sınırlı, tekrarsız aday kümesi."""
+    remaining = Decimal(item.remaining_amount)
+
+    by_amount = nearest_amount_candidates(
+        db, company_id, item.direction, remaining, AMOUNT_CANDIDATES,
+        upper=remaining * AMOUNT_TOLERANCE,
+        date_from=item.due_date - timedelta(days=AMOUNT_WINDOW_DAYS),
+        date_to=item.due_date + timedelta(days=AMOUNT_WINDOW_DAYS),
+    )
+
+    by_text = []
+    for keyword in (item.counterparty, item.reference_no):
+        if not keyword:
+            continue
+        hits = search_transactions(
+            db, company_id, keyword,
+            filters=[Transaction.direction == item.direction, unmatched_condition()],
+            limit=TEXT_CANDIDATES,
+        )
+        by_text.extend(tx for tx, _ in hits)
+
+    fallback = []
+    if not by_amount and not by_text:
+        fallback = nearest_amount_candidates(
+            db, company_id, item.direction, remaining, FALLBACK_CANDIDATES
+        )
+
+    seen = set()
+    candidates = []
+    for tx in by_amount + by_text + fallback:
+        if tx.id not in seen:
+            seen.add(tx.id)
+            candidates.append(tx)
+    return candidates
+
+
+def score_candidate(item: PlannedCashflowItem, remaining: float, tx: Transaction) -> int:
+    """Tutar (30) + tarih (12) + açıklama (58) puanı, en fazla 100."""
+    amt = float(tx.amount)
+    amt_diff = abs(amt - remaining)
+    day_diff = abs((tx.date - item.due_date).days)
+
+    score = 0
+    # Amount scoring (max 30)
+    if amt_diff <= 0.01:
+        score += 30
+    elif amt < remaining:
+        score += 18
+
+    # Date scoring (max 12)
+    if day_diff <= 2:
+        score += 12
+    elif day_diff <= 7:
+        score += 8
+    elif day_diff <= 14:
+        score += 3
+
+    # Description scoring (max 58); "Ödeme"/"ODEME", "İstanbul"/"ISTANBUL" aynı sayılır
+    desc = fold_text(tx.description)
+    cp = fold_text(item.counterparty)
+    ref = fold_text(item.reference_no)
+
+    if cp and cp in desc:
+        score += 28
+    if ref and ref in desc:
+        score += 30
+
+    return min(score, 100)
+
+
+def suggest_matches(db: Session, company_id: int, item: PlannedCashflowItem) -> list[dict]:
+    """Skora göre sıralı eşleşme önerileri (item matching index kaydı veya tekrarlayan kuralın oluşumu da olabilir)."""
+    remaining = float(item.remaining_amount)
+    out = []
+    for tx in retrieve_candidates(db, company_id, item):
+        amt = float(tx.amount)
+        out.append({
+            "transaction_id": tx.id,
+            "date": tx.date.isoformat(),
+            "amount": amt,
+            "description": tx.description,
+            "score": score_candidate(item, remaining, tx),
+            "suggested_match_amount": min(amt, remaining),
+        })
+    out.sort(key=lambda x: x["score"], reverse=True)
+    return out
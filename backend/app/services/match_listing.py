@@ -0,0 +1,154 @@
+# app/services/match_listing.py
+"""
+Joined fetch for match listings.
+
+Every match listing (all matches, matches of one transaction, matches of
+one planned item) is a single query: planned_matches joined to
+planned_cashflow_items and transactions, selecting only the columns the
+responses use. Rows are plain column tuples with labelled attributes
+(`planned_*`, `tx_*`), so there are no per-row lookups and no ORM
+entities to build.
+"""
+
+from datetime import date
+
+from sqlalchemy.orm import Query, Session
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+
+MATCH_LIST_COLUMNS = (
+    PlannedMatch.id,
+    PlannedMatch.planned_item_id,
+    PlannedMatch.transaction_id,
+    PlannedMatch.matched_amount,
+    PlannedMatch.match_type,
+    PlannedMatch.created_at,
+    PlannedCashflowItem.type.label("planned_type"),
+    PlannedCashflowItem.direction.label("planned_direction"),
+    PlannedCashflowItem.due_date.label("planned_due_date"),
+    PlannedCashflowItem.amount.label("planned_amount"),
+    PlannedCashflowItem.remaining_amount.label("planned_remaining_amount"),
+    PlannedCashflowItem.status.label("planned_status"),
+    PlannedCashflowItem.counterparty.label("planned_counterparty"),
+    PlannedCashflowItem.reference_no.label("planned_reference_no"),
+    Transaction.date.label("tx_date"),
+    Transaction.description.label("tx_description"),
+    Transaction.amount.label("tx_amount"),
+    Transaction.direction.label("tx_direction"),
+    Transaction.category.label("tx_category"),
+    Transaction.source.label("tx_source"),
+)
+
+
+def match_list_query(
+    db: Session,
+    company_id: int,
+    *,
+    match_type: str | None = None,
+    planned_item_id: str | None = None,
+    transaction_id: str | None = None,
+    planned_status: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    inner: bool = False,
+) -> Query:
+    """
+    Eşleşme + planlı kalem + işlem kolonlarını tek sorguda döner.
+    start_date / end_date işlem tarihine uygulanır. inner=True ise planlı
+    kalemi veya işlemi silinmiş eşleşmeler dışarıda kalır.
+    """
+    planned_on = PlannedCashflowItem.id == PlannedMatch.planned_item_id
+    tx_on = Transaction.id == PlannedMatch.transaction_id
+    q = db.query(*MATCH_LIST_COLUMNS)
+    if inner:
+        q = q.join(PlannedCashflowItem, planned_on).join(Transaction, tx_on)
+    else:
+        q = q.outerjoin(PlannedCashflowItem, planned_on).outerjoin(Transaction, tx_on)
+    q = q.filter(PlannedMatch.company_id == company_id)
+    if match_type:
+        q = q.filter(PlannedMatch.match_type == match_type)
+    if planned_item_id:
+        q = q.filter(PlannedMatch.planned_item_id == planned_item_id)
+    if transaction_id:
+        q = q.filter(PlannedMatch.transaction_id == transaction_id)
+    if planned_status:
+        q = q.filter(PlannedCashflowItem.status == planned_status)
+    if start_date:
+        q = q.filter(Transaction.date >= start_date)
+    if end_date:
+        q = q.filter(Transaction.date <= end_date)
+    return q
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+def match_row_to_dict(row) -> dict:
+    """GET /matches satırı (düz yapı)."""
+    return {
+        "id": row.id,
+        "match_id": row.id,
+        "planned_item_id": row.planned_item_id,
+        "planned_reference": row.planned_reference_no if row.planned_status is not None else "",
+        "planned_counterparty": row.planned_counterparty if row.planned_status is not None else "",
+        "planned_amount": float(row.planned_amount) if row.planned_amount is not None else 0,
+        "planned_due_date": row.planned_due_date.isoformat() if row.planned_due_date else "",
+        "planned_status": row.planned_status or "",
+        "transaction_id": row.transaction_id,
+        "transaction_description": row.tx_description or "",
+        "transaction_date": row.tx_date.isoformat() if row.tx_date else "",
+        "transaction_amount": float(row.tx_amount) if row.tx_amount is not None else 0,
+        "matched_amount": float(row.matched_amount),
+        "match_type": row.match_type,
+        "created_at": _iso(row.created_at),
+    }
+
+
+def _match_fields(row) -> dict:
+    return {
+        "match_id": row.id,
+        "matched_amount": float(row.matched_amount),
+        "match_type": row.match_type,
+        "created_at": _iso(row.created_at),
+    }
+
+
+def transaction_match_row_to_dict(row) -> dict:
+    """GET /transactions/{id}/matches satırı (planlı kalem iç içe)."""
+    return {
+        **_match_fields(row),
+        "planned_item": {
+            "id": row.planned_item_id,
+            "type": row.planned_type,
+            "direction": row.planned_direction,
+            "due_date": _iso(row.planned_due_date),
+            "amount": _float(row.planned_amount),
+            "status": row.planned_status,
+            "remaining_amount": _float(row.planned_remaining_amount),
+            "counterparty": row.planned_counterparty,
+            "reference_no": row.planned_reference_no,
+        },
+    }
+
+
+def planned_match_row_to_dict(row) -> dict:
+    """GET /planned/{id}/matches satırı (işlem iç içe)."""
+    return {
+        **_match_fields(row),
+        "transaction": {
+            "id": row.transaction_id,
+            "date": _iso(row.tx_date),
+            "amount": _float(row.tx_amount),
+            "direction": row.tx_direction,
+            "category": row.tx_category,
+            "description": row.tx_description,
+            "source": row.tx_source,
+        },
+    }
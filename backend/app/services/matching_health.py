@@ -0,0 +1,190 @@
+# app/services/matching_health.py
+"""
+Matching health in two aggregate queries.
+
+The dashboard card and the AI context both report how well planned items
+are being reconciled. Every number comes from one conditional-aggregation
+query over planned_cashflow_items and one over planned_matches (outer
+joined to the planned item for its status); results are cached per
+company, day and data version.
+
+The exception lists (overdue / upcoming / partial) use the same
+conditions, so a card count and the list behind it always agree.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.services.data_version import get_data_version
+
+UPCOMING_DAYS = 14
+EXCEPTION_KINDS = ("overdue", "upcoming14", "partial")
+EXCEPTION_LIMIT = 200
+
+HEALTH_CACHE_MAX_COMPANIES = 256
+HEALTH_CACHE_TTL_SECONDS = 300
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[int, tuple[tuple, float, dict]]" = OrderedDict()
+
+EXCEPTION_COLUMNS = (
+    PlannedCashflowItem.id,
+    PlannedCashflowItem.type,
+    PlannedCashflowItem.direction,
+    PlannedCashflowItem.due_date,
+    PlannedCashflowItem.amount,
+    PlannedCashflowItem.settled_amount,
+    PlannedCashflowItem.remaining_amount,
+    PlannedCashflowItem.status,
+    PlannedCashflowItem.counterparty,
+    PlannedCashflowItem.reference_no,
+)
+
+
+def _open_condition():
+    # Kapatılmamış (OPEN/PARTIAL) ve kalan tutarı olan
+    return and_(
+        PlannedCashflowItem.status.in_(["OPEN", "PARTIAL"]),
+        PlannedCashflowItem.remaining_amount > 0,
+    )
+
+
+def exception_condition(kind: str, today: date):
+    """İstisna türünün planlı kalem koşulu; bilinmeyen tür için None."""
+    if kind == "overdue":
+        return and_(_open_condition(), PlannedCashflowItem.due_date < today)
+    if kind == "upcoming14":
+        return and_(
+            _open_condition(),
+            PlannedCashflowItem.due_date >= today,
+            PlannedCashflowItem.due_date <= today + timedelta(days=UPCOMING_DAYS),
+        )
+    if kind == "partial":
+        return PlannedCashflowItem.status == "PARTIAL"
+    return None
+
+
+def _count_sum(condition, amount):
+    return (
+        func.coalesce(func.sum(case((condition, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((condition, amount), else_=0)), 0),
+    )
+
+
+def compute_matching_health(db: Session, company_id: int, today: date | None = None) -> dict:
+    """Eşleştirme sağlığı: planlı kalemler ve eşleşmeler üzerinde birer sorgu."""
+    today = today or date.today()
+    remaining = PlannedCashflowItem.remaining_amount
+
+    overdue_count, overdue_amount = _count_sum(exception_condition("overdue", today), remaining)
+    upcoming_count, upcoming_amount = _count_sum(exception_condition("upcoming14", today), remaining)
+    partial_count, partial_remaining = _count_sum(exception_condition("partial", today), remaining)
+    open_count, open_amount = _count_sum(_open_condition(), remaining)
+
+    planned = db.query(
+        overdue_count, overdue_amount,
+        upcoming_count, upcoming_amount,
+        partial_count, partial_remaining,
+        open_count, open_amount,
+    ).filter(PlannedCashflowItem.company_id == company_id).one()
+
+    is_auto = PlannedMatch.match_type == "AUTO"
+    is_manual = PlannedMatch.match_type != "AUTO"
+    amount = PlannedMatch.matched_amount
+    auto_count, auto_amount = _count_sum(is_auto, amount)
+    # Manuel kartında PARTIAL kalemlerin eşleşmeleri sayılmaz (kısmi kartında gösterilir)
+    manual_count, manual_amount = _count_sum(and_(is_manual, PlannedCashflowItem.status != "PARTIAL"), amount)
+    manual_all_count, _ = _count_sum(is_manual, amount)
+
+    matches = db.query(
+        auto_count, auto_amount,
+        manual_count, manual_amount,
+        manual_all_count,
+    ).select_from(PlannedMatch).outerjoin(
+        PlannedCashflowItem, PlannedCashflowItem.id == PlannedMatch.planned_item_id
+    ).filter(PlannedMatch.company_id == company_id).one()
+
+    return {
+        "auto_matched": int(matches[0]),
+        "auto_matched_amount": float(matches[1]),
+        "manual_matched": int(matches[2]),
+        "manual_matched_amount": float(matches[3]),
+        "manual_matched_all": int(matches[4]),
+        "unmatched_overdue": int(planned[0]),
+        "unmatched_overdue_amount": float(planned[1]),
+        "unmatched_upcoming_14d": int(planned[2]),
+        "unmatched_upcoming_14d_amount": float(planned[3]),
+        "partial_planned": int(planned[4]),
+        "partial_remaining_amount": float(planned[5]),
+        "open_planned": int(planned[6]),
+        "open_remaining_amount": float(planned[7]),
+    }
+
+
+def get_matching_health(db: Session, company_id: int, today: date | None = None) -> dict:
+    """
+    compute_matching_health'in önbellekli hali.
+    Anahtar: (gün, data version); şirket başına tek kayıt tutulur, LRU ile sınırlıdır.
+    """
+    today = today or date.today()
+    key = (today, get_data_version(company_id))
+    now = time.monotonic()
+
+    with _cache_lock:
+        cached = _cache.get(company_id)
+        if cached and cached[0] == key and now - cached[1] < HEALTH_CACHE_TTL_SECONDS:
+            _cache.move_to_end(company_id)
+            return cached[2]
+
+    health = compute_matching_health(db, company_id, today)
+
+    with _cache_lock:
+        _cache[company_id] = (key, now, health)
+        _cache.move_to_end(company_id)
+        while len(_cache) > HEALTH_CACHE_MAX_COMPANIES:
+            _cache.popitem(last=False)
+
+    return health
+
+
+def clear_matching_health_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def list_matching_exceptions(
+    db: Session, company_id: int, kind: str, today: date | None = None, limit: int = EXCEPTION_LIMIT
+) -> list[dict] | None:
+    """
+    Planlı kalem istisnalarını (vadeye göre sıralı) kolon tuple'ları olarak
+    tek sorguda döner. Bilinmeyen tür için None.
+    """
+    condition = exception_condition(kind, today or date.today())
+    if condition is None:
+        return None
+    rows = db.query(*EXCEPTION_COLUMNS).filter(
+        PlannedCashflowItem.company_id == company_id,
+        condition,
+    ).order_by(PlannedCashflowItem.due_date.asc()).limit(limit).all()
+    return [
+        {
+            "id": row.id,
+            "type": row.type,
+            "direction": row.direction,
+            "due_date": row.due_date.isoformat() if row.due_date else None,
+            "amount": float(row.amount),
+            "settled_amount": float(row.settled_amount or 0),
+            "remaining_amount": float(row.remaining_amount or 0),
+            "status": row.status,
+            "counterparty": row.counterparty or "",
+            "reference_no": row.reference_no or "",
+        }
+        for row in rows
+    ]
@@ -0,0 +1,363 @@
+# app/services/matching_index.py
+"""
+Per-company in-memory matching index.
+
+Auto-match looks for a planned item whose remaining amount equals the
+transaction amount exactly, in the same direction, within ±7 days. The
+index keeps a company's open planned items hashed on
+(direction, remaining amount in cents); every bucket is sorted by
+due_date, so a lookup is a dict get + bisect + short sweep and needs no
+query.
+
+Freshness:
+- Entries are keyed on the company's data version restricted to
+  planned_cashflow_items and planned_recurrences, so a new transaction
+  does not invalidate the index but any planned item or rule write
+  (create, edit, delete, settlement) does. A TTL bounds staleness when another instance writes.
+- After an auto-match settles an item, `record_settlement` drops that
+  item from its bucket and moves the index to the new version instead of
+  rebuilding it, provided the settlement was the only planned item write
+  since the index was read.
+- Buckets are replaced, never mutated, so readers in other threads always
+  see a consistent (candidates, due_dates) pair.
+
+Recurring rules (planned_recurrence.py) are hashed the same way on their
+amount; at lookup their occurrences inside the ±7 day window are expanded
+on the fly and compete with real items under the same rules. A picked
+occurrence has a virtual id and is materialized by the caller.
+
+Suggestion and proposal requests resolve their planned item (or virtual
+occurrence id) through `find_open_planned`: `MatchingIndex.find` is only a
+fast path (the index is per process and may lag writes from other
+instances), so a hit re-reads the remaining amount from the row and a
+miss falls back to the database before reporting "not found".
+
+Memory is bounded by keeping at most MATCHING_INDEX_MAX_COMPANIES
+companies (LRU).
+"""
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import timedelta
+from decimal import Decimal
+
+from sqlalchemy.orm import Session
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_recurrence import PlannedRecurrence
+from app.services.data_version import get_data_version
+from app.services.planned_recurrence import (
+    Occurrence,
+    find_open_occurrence,
+    load_active_rules,
+    load_materialized,
+    occurrence_at,
+    occurrence_dates,
+    occurrence_id,
+    parse_occurrence_id,
+)
+
+DATE_WINDOW_DAYS = 7
+
+# auto_match_transaction'ın dikkate aldığı durumlar
+MATCHABLE_STATUSES = ("OPEN", "PARTIAL", "SETTLED")
+# Öneri ve kombinasyon isteklerinin kabul ettiği durumlar
+OPEN_STATUSES = ("OPEN", "PARTIAL")
+
+MATCHING_INDEX_MAX_COMPANIES = 256
+MATCHING_INDEX_TTL_SECONDS = 300
+
+# Index yalnızca planlı kalemlere ve tekrarlayan kurallara bağlıdır
+INDEX_TABLES = (PlannedCashflowItem.__tablename__, PlannedRecurrence.__tablename__)
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[int, MatchingIndex]" = OrderedDict()
+
+
+@dataclass
+class PlannedCandidate:
+    id: str
+    due_date: object
+    reference_no: str | None
+    alive: bool = True
+    counterparty: str | None = None
+
+
+@dataclass(frozen=True)
+class IndexedItem:
+    """Index'teki açık planlı kalemin öneri servislerinin okuduğu alanları."""
+    id: str
+    direction: str
+    due_date: object
+    remaining_amount: Decimal
+    counterparty: str | None
+    reference_no: str | None
+
+
+def to_cents(value) -> int:
+    return int((Decimal(value) * 100).to_integral_value())
+
+
+def load_open_planned(
+    db: Session, company_id: int, statuses=("OPEN", "PARTIAL")
+) -> dict[tuple[str, int], list[PlannedCandidate]]:
+    """
+    Kalan tutarı olan planlı kalemleri (direction, kalan kuruş) kovalarına
+    ayırır; her kova (due_date, id) sıralıdır. Tek sorgu.
+    """
+    rows = db.query(
+        PlannedCashflowItem.id,
+        PlannedCashflowItem.direction,
+        PlannedCashflowItem.due_date,
+        PlannedCashflowItem.remaining_amount,
+        PlannedCashflowItem.reference_no,
+        PlannedCashflowItem.counterparty,
+    ).filter(
+        PlannedCashflowItem.company_id == company_id,
+        PlannedCashflowItem.status.in_(statuses),
+        PlannedCashflowItem.remaining_amount > 0,
+    ).all()
+
+    buckets: dict[tuple[str, int], list[PlannedCandidate]] = {}
+    for item_id, direction, due_date, remaining, reference_no, counterparty in rows:
+        buckets.setdefault((direction, to_cents(remaining)), []).append(
+            PlannedCandidate(
+                id=item_id,
+                due_date=due_date,
+                reference_no=reference_no,
+                counterparty=counterparty,
+            )
+        )
+    for bucket in buckets.values():
+        bucket.sort(key=lambda p: (p.due_date, p.id))
+    return buckets
+
+
+def _in_window(tx_date, bucket, due_dates) -> list[PlannedCandidate]:
+    lo = bisect.bisect_left(due_dates, tx_date - timedelta(days=DATE_WINDOW_DAYS))
+    hi = bisect.bisect_right(due_dates, tx_date + timedelta(days=DATE_WINDOW_DAYS))
+    return [p for p in bucket[lo:hi] if p.alive]
+
+
+def pick_candidate(tx_date, description: str, bucket, due_dates) -> tuple[PlannedCandidate | None, bool]:
+    """
+    auto_match_transaction kurallarıyla tek adayı seçer.
+    Returns: (aday veya None, belirsiz_mi)
+    """
+    return choose_candidate(tx_date, description, _in_window(tx_date, bucket, due_dates))
+
+
+def choose_candidate(tx_date, description: str, in_window: list) -> tuple[PlannedCandidate | None, bool]:
+    """Pencere içi adaylardan reference-first ve belirsizlik kurallarıyla birini seçer."""
+    if not in_window:
+        return None, False
+
+    # Reference-first
+    ref_matches = [
+        p for p in in_window
+        if p.reference_no and p.reference_no.strip() and p.reference_no in (description or "")
+    ]
+    if ref_matches:
+        in_window = ref_matches
+
+    if len(in_window) > 1:
+        in_window.sort(key=lambda p: abs((tx_date - p.due_date).days))
+        if abs((tx_date - in_window[0].due_date).days) == abs((tx_date - in_window[1].due_date).days):
+            return None, True
+    return in_window[0], False
+
+
+class MatchingIndex:
+    """Bir şirketin açık planlı kalemleri; kova başına (adaylar, due_date listesi)."""
+
+    def __init__(
+        self,
+        company_id: int,
+        version: tuple,
+        buckets: dict[tuple[str, int], list[PlannedCandidate]],
+        rules=(),
+        materialized: dict[str, set[int]] | None = None,
+    ):
+        self.company_id = company_id
+        self.version = version
+        self.built_at = time.monotonic()
+        self._buckets = {
+            key: (tuple(bucket), tuple(p.due_date for p in bucket))
+            for key, bucket in buckets.items()
+        }
+        # kalem id -> (kova anahtarı, aday)
+        self._items = {
+            p.id: (key, p) for key, (candidates, _) in self._buckets.items() for p in candidates
+        }
+        # (direction, tutar kuruş) -> kurallar; kural id -> satıra dönüşmüş index'ler
+        self._rules: dict[tuple[str, int], tuple] = {}
+        self._rules_by_id = {rule.id: rule for rule in rules}
+        for rule in rules:
+            key = (rule.direction, to_cents(rule.amount))
+            self._rules[key] = self._rules.get(key, ()) + (rule,)
+        self._materialized = {
+            rule_id: frozenset(indexes) for rule_id, indexes in (materialized or {}).items()
+        }
+
+    def __len__(self) -> int:
+        return sum(len(candidates) for candidates, _ in self._buckets.values())
+
+    def _occurrences(self, key, tx_date) -> list[PlannedCandidate]:
+        window = timedelta(days=DATE_WINDOW_DAYS)
+        found = []
+        for rule in self._rules.get(key, ()):
+            skip = self._materialized.get(rule.id, ())
+            for index, due_date in occurrence_dates(rule, tx_date - window, tx_date + window):
+                if index not in skip:
+                    found.append(PlannedCandidate(
+                        id=occurrence_id(rule.id, index),
+                        due_date=due_date,
+                        reference_no=rule.reference_no,
+                    ))
+        return found
+
+    def pick(self, direction: str, amount, tx_date, description: str) -> tuple[PlannedCandidate | None, bool]:
+        """İşlem için tek adayı seçer (sorgu yok). Returns: (aday veya None, belirsiz_mi)"""
+        key = (direction, to_cents(amount))
+        entry = self._buckets.get(key)
+        in_window = _in_window(tx_date, *entry) if entry else []
+        if key in self._rules:
+            in_window += self._occurrences(key, tx_date)
+        return choose_candidate(tx_date, description, in_window)
+
+    def find(self, planned_item_id: str) -> IndexedItem | Occurrence | None:
+        """
+        Açık planlı kalemi ya da (sanal id ile) satıra dönüşmemiş oluşumu
+        sorgusuz döner; kapanmış veya bilinmeyen id için None.
+        """
+        parsed = parse_occurrence_id(planned_item_id)
+        if parsed is not None:
+            rule_id, index = parsed
+            rule = self._rules_by_id.get(rule_id)
+            if rule is None or index in self._materialized.get(rule_id, ()):
+                return None
+            due_date = occurrence_at(rule, index)
+            return Occurrence(rule, index, due_date) if due_date is not None else None
+        entry = self._items.get(planned_item_id)
+        if entry is None:
+            return None
+        (direction, cents), p = entry
+        return IndexedItem(
+            id=p.id,
+            direction=direction,
+            due_date=p.due_date,
+            remaining_amount=Decimal(cents) / 100,
+            counterparty=p.counterparty,
+            reference_no=p.reference_no,
+        )
+
+    def _remove(self, direction: str, amount, planned_item_id: str) -> None:
+        parsed = parse_occurrence_id(planned_item_id)
+        if parsed is not None:
+            rule_id, index = parsed
+            self._materialized[rule_id] = self._materialized.get(rule_id, frozenset()) | {index}
+            return
+        self._items.pop(planned_item_id, None)
+        key = (direction, to_cents(amount))
+        entry = self._buckets.get(key)
+        if entry is None:
+            return
+        remaining = tuple(p for p in entry[0] if p.id != planned_item_id)
+        if remaining:
+            self._buckets[key] = (remaining, tuple(p.due_date for p in remaining))
+        else:
+            del self._buckets[key]
+
+
+def _index_version(company_id: int) -> tuple:
+    return get_data_version(company_id, INDEX_TABLES)
+
+
+def get_matching_index(db: Session, company_id: int) -> MatchingIndex:
+    """
+    Şirketin matching index'ini döner; versiyon değiştiyse veya TTL dolduysa
+    tek sorguyla yeniden kurar.
+    """
+    version = _index_version(company_id)
+    now = time.monotonic()
+
+    with _cache_lock:
+        index = _cache.get(company_id)
+        if index is not None and index.version == version and now - index.built_at < MATCHING_INDEX_TTL_SECONDS:
+            _cache.move_to_end(company_id)
+            return index
+
+    buckets = load_open_planned(db, company_id, MATCHABLE_STATUSES)
+    rules = load_active_rules(db, company_id)
+    materialized = load_materialized(db, company_id) if rules else {}
+    index = MatchingIndex(company_id, version, buckets, rules, materialized)
+
+    with _cache_lock:
+        _cache[company_id] = index
+        _cache.move_to_end(company_id)
+        while len(_cache) > MATCHING_INDEX_MAX_COMPANIES:
+            _cache.popitem(last=False)
+
+    return index
+
+
+def record_settlement(index: MatchingIndex, direction: str, amount, planned_item_id: str) -> bool:
+    """
+    Kalanı tam kapatan eşleşme commit edildikten sonra kalemi index'ten çıkarır
+    (sanal oluşum için: oluşumu satıra dönüşmüş olarak işaretler).
+    Index okunduğundan beri planlı kalem yazımları yalnızca bu eşleşmeninkiyse
+    (settlement; sanal oluşumda ayrıca satır üretimi) index yeni versiyona
+    taşınır; aksi halde (araya başka yazım girdiyse) düşürülür.
+    Returns: index güncel kaldıysa True.
+    """
+    writes = 2 if parse_occurrence_id(planned_item_id) else 1
+    current = _index_version(index.company_id)
+    epoch, untargeted, (items, rules) = index.version
+    with _cache_lock:
+        if _cache.get(index.company_id) is not index:
+            return False
+        if current != (epoch, untargeted, (items + writes, rules)):
+            del _cache[index.company_id]
+            return False
+        index._remove(direction, amount, planned_item_id)
+        index.version = current
+        return True
+
+
+def find_open_planned(db: Session, company_id: int, planned_item_id: str):
+    """
+    Eşleşmeye açık planlı kalem ya da (sanal id ile) oluşum; yoksa None.
+    Index'te bulunan kalemin kalan tutarı satırdan tekrar okunur; index'te
+    olmayan id (başka instance'ta yeni açılmış olabilir) veritabanında aranır.
+    """
+    item = get_matching_index(db, company_id).find(planned_item_id)
+    if parse_occurrence_id(planned_item_id) is not None:
+        return item or find_open_occurrence(db, company_id, planned_item_id)
+
+    if item is not None:
+        row = db.query(PlannedCashflowItem.status, PlannedCashflowItem.remaining_amount).filter(
+            PlannedCashflowItem.company_id == company_id,
+            PlannedCashflowItem.id == planned_item_id,
+        ).first()
+        if row is None or row.status not in OPEN_STATUSES:
+            return None
+        return replace(item, remaining_amount=Decimal(row.remaining_amount))
+
+    return db.query(PlannedCashflowItem).filter(
+        PlannedCashflowItem.company_id == company_id,
+        PlannedCashflowItem.id == planned_item_id,
+        PlannedCashflowItem.status.in_(OPEN_STATUSES),
+    ).first()
+
+
+def invalidate_matching_index(company_id: int) -> None:
+    with _cache_lock:
+        _cache.pop(company_id, None)
+
+
+def clear_matching_index() -> None:
+    with _cache_lock:
+        _cache.clear()
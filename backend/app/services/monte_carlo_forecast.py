@@ -0,0 +1,241 @@
+# app/services/monte_carlo_forecast.py
+"""
+Vectorized Monte Carlo cash-runway forecaster.
+
+Daily net flows are bootstrapped from the company's own history (days
+without transactions count as zero), planned items are overlaid on their
+due day, optionally shifted by a sampled payment slip, and every path is
+simulated at once as a (horizon, paths) NumPy matrix. The result is a set
+of P10/P50/P90 balance curves plus the probability of negative cash per
+day.
+
+Layout is day-major (row = day, column = path) so that the cumulative sum
+runs over contiguous rows and the per-day sort for percentiles runs over
+contiguous memory; 365 days x 10k paths stays well under 100ms on one core.
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+from app.models.transaction import Transaction
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.services.planned_recurrence import expand_occurrences, overdue_window_start
+
+HISTORY_DAYS = 365
+MAX_SLIP_DAYS = 60
+MIN_SLIP_SAMPLES = 10
+SLIP_LOOKUP_SIZE = 4096
+
+
+@dataclass
+class SlipDistribution:
+    """Discrete distribution of payment slip in days (0 = on time)."""
+    days: np.ndarray     # int, ascending
+    probs: np.ndarray    # float, sums to 1
+
+    @classmethod
+    def from_samples(cls, samples) -> "SlipDistribution":
+        values = np.clip(np.asarray(samples, dtype=np.int64), 0, MAX_SLIP_DAYS)
+        days, counts = np.unique(values, return_counts=True)
+        return cls(days=days, probs=counts / counts.sum())
+
+    def sample(self, rng: np.random.Generator, shape) -> np.ndarray:
+        # Quantized inverse-CDF lookup: one integer draw + gather per sample
+        # instead of a searchsorted over the CDF.
+        cdf = np.cumsum(self.probs)
+        cdf[-1] = 1.0
+        grid = (np.arange(SLIP_LOOKUP_SIZE) + 0.5) / SLIP_LOOKUP_SIZE
+        table = self.days[np.minimum(np.searchsorted(cdf, grid, side="right"), len(self.days) - 1)]
+        return table[rng.integers(0, SLIP_LOOKUP_SIZE, size=shape, dtype=np.int32)]
+
+
+def simulate_cash_paths(
+    history_daily_net: np.ndarray,
+    start_balance: float,
+    planned_days: np.ndarray,
+    planned_amounts: np.ndarray,
+    horizon_days: int = 90,
+    n_paths: int = 10000,
+    planned_slip: np.ndarray | None = None,
+    slip_distributions: dict | None = None,
+    seed: int | None = None,
+) -> dict:
+    """
+    Simulates n_paths balance paths over horizon_days.
+
+    Args:
+        history_daily_net: historical signed daily net flows (bootstrap pool)
+        start_balance: balance at day 0 (before today's flows)
+        planned_days: day offset of each planned item (0 = today; overdue
+            items should already be clipped to 0)
+        planned_amounts: signed remaining amount of each planned item
+        planned_slip: optional key per planned item into slip_distributions
+            (e.g. "in"/"out"); items whose key has no distribution do not slip
+        slip_distributions: {key: SlipDistribution}
+
+    Returns:
+        {"p10", "p50", "p90", "prob_negative", "mean"}: arrays of length
+        horizon_days (end-of-day balance / probability for day 1..horizon),
+        plus "prob_negative_any": probability that the balance dips below
+        zero at least once within the horizon.
+    """
+    rng = np.random.default_rng(seed)
+    horizon_days = int(horizon_days)
+    n_paths = int(n_paths)
+
+    # float32 halves memory traffic; the start balance is added back in
+    # float64 after the percentiles are taken, so cumulative flows stay small.
+    pool = np.asarray(history_daily_net, dtype=np.float32)
+    if pool.size == 0:
+        pool = np.zeros(1, dtype=np.float32)
+
+    # 1) Bootstrap routine flows: (horizon, paths)
+    flows = pool[rng.integers(0, pool.size, size=(horizon_days, n_paths), dtype=np.int32)]
+
+    # 2) Overlay planned items
+    planned_days = np.asarray(planned_days, dtype=np.int64)
+    planned_amounts = np.asarray(planned_amounts, dtype=np.float64)
+    slips = slip_distributions or {}
+    slip_keys = planned_slip if planned_slip is not None else [None] * len(planned_days)
+
+    fixed_mask = np.array([k not in slips for k in slip_keys], dtype=bool)
+    fixed_mask &= planned_days < horizon_days
+    if fixed_mask.any():
+        # Non-slipping items hit every path on the same day
+        per_day = np.bincount(
+            planned_days[fixed_mask],
+            weights=planned_amounts[fixed_mask],
+            minlength=horizon_days,
+        )
+        flows += per_day[:horizon_days, None].astype(np.float32)
+
+    flat = flows.reshape(-1)
+    path_ids = np.arange(n_paths, dtype=np.int64)
+    for key, dist in slips.items():
+        idx = np.array([i for i, k in enumerate(slip_keys) if k == key], dtype=np.int64)
+        if idx.size == 0:
+            continue
+        days = planned_days[idx][:, None] + dist.sample(rng, (idx.size, n_paths))
+        amounts = np.broadcast_to(planned_amounts[idx][:, None], days.shape)
+        inside = days < horizon_days
+        np.add.at(flat, (days * n_paths + path_ids)[inside], amounts[inside].astype(np.float32))
+
+    # 3) Cumulative net flow per path; balance = start_balance + cumulative
+    np.cumsum(flows, axis=0, out=flows)
+    cumulative = flows
+
+    negative = cumulative < np.float32(-start_balance)
+    prob_negative = np.count_nonzero(negative, axis=1) / n_paths
+    prob_negative_any = float(np.count_nonzero(negative.any(axis=0)) / n_paths)
+    mean = cumulative.mean(axis=1, dtype=np.float64) + start_balance
+
+    # 4) Percentiles (sorted per day, in place)
+    cumulative.sort(axis=1)
+    last = n_paths - 1
+
+    def column(q: float) -> np.ndarray:
+        return cumulative[:, int(round(q * last))].astype(np.float64) + start_balance
+
+    return {
+        "p10": column(0.10),
+        "p50": column(0.50),
+        "p90": column(0.90),
+        "mean": mean,
+        "prob_negative": prob_negative,
+        "prob_negative_any": prob_negative_any,
+    }
+
+
+def load_daily_net_history(db: Session, company_id: int, today: date) -> np.ndarray:
+    """
+    Son HISTORY_DAYS günün günlük net akışı (işlemsiz günler 0).
+    Son 1 yılda işlem yoksa tüm tarihçe kullanılır.
+    """
+    signed = case((Transaction.direction == "in", Transaction.amount), else_=-Transaction.amount)
+    start = today - timedelta(days=HISTORY_DAYS)
+
+    def grouped(date_filter):
+        q = db.query(Transaction.date, func.sum(signed)).filter(Transaction.company_id == company_id)
+        if date_filter is not None:
+            q = q.filter(date_filter)
+        return q.group_by(Transaction.date).all()
+
+    rows = grouped(Transaction.date >= start)
+    if not rows:
+        rows = grouped(None)
+    if not rows:
+        return np.zeros(0)
+
+    first_day = min(d for d, _ in rows)
+    span = max((today - first_day).days + 1, 1)
+    history = np.zeros(span)
+    for d, net in rows:
+        offset = (d - first_day).days
+        if 0 <= offset < span:
+            history[offset] += float(net or 0)
+    return history
+
+
+def load_planned_flows(db: Session, company_id: int, today: date, horizon_days: int):
+    """
+    Açık planlı kalemler: (gün offset, işaretli kalan tutar, yön).
+    Vadesi geçmişler bugüne (0) çekilir.
+    """
+    rows = db.query(
+        PlannedCashflowItem.due_date,
+        PlannedCashflowItem.remaining_amount,
+        PlannedCashflowItem.direction,
+    ).filter(
+        PlannedCashflowItem.company_id == company_id,
+        PlannedCashflowItem.status.in_(["OPEN", "PARTIAL"]),
+        PlannedCashflowItem.remaining_amount > 0,
+        PlannedCashflowItem.due_date < today + timedelta(days=horizon_days),
+    ).all()
+    # Tekrarlayan kuralların satıra dönüşmemiş oluşumları gerçek kalemler gibi eklenir
+    rows += [
+        (occ.due_date, occ.remaining_amount, occ.direction)
+        for occ in expand_occurrences(
+            db, company_id, overdue_window_start(today), today + timedelta(days=horizon_days - 1)
+        )
+    ]
+
+    days = np.array([max((d - today).days, 0) for d, _, _ in rows], dtype=np.int64)
+    amounts = np.array(
+        [float(a) if direction == "in" else -float(a) for _, a, direction in rows],
+        dtype=np.float64,
+    )
+    directions = [direction for _, _, direction in rows]
+    return days, amounts, directions
+
+
+def load_slip_distributions(db: Session, company_id: int) -> dict:
+    """
+    Eşleşmiş kalemlerin gerçekleşen gecikmelerinden (tx.date - due_date)
+    yön bazında ampirik slip dağılımı. Yeterli örnek yoksa o yön kaymaz.
+    """
+    rows = db.query(
+        PlannedCashflowItem.direction,
+        Transaction.date,
+        PlannedCashflowItem.due_date,
+    ).join(
+        PlannedMatch, PlannedMatch.planned_item_id == PlannedCashflowItem.id
+    ).join(
+        Transaction, Transaction.id == PlannedMatch.transaction_id
+    ).filter(
+        PlannedMatch.company_id == company_id,
+    ).all()
+
+    samples: dict[str, list[int]] = {}
+    for direction, tx_date, due_date in rows:
+        samples.setdefault(direction, []).append((tx_date - due_date).days)
+
+    return {
+        direction: SlipDistribution.from_samples(values)
+        for direction, values in samples.items()
+        if len(values) >= MIN_SLIP_SAMPLES
+    }
@@ -0,0 +1,184 @@
+# app/services/planned_import.py
+"""
+Bulk planned-items import (CSV / Excel).
+
+The whole file is validated column-wise with pandas instead of row by row:
+type, direction, amount and due_date are normalized as Series and every
+rule is a boolean mask, so a 50k-line file costs a handful of vectorized
+passes. Each rejected row keeps the first rule it failed ("Satır N: ...",
+N = data row number, header excluded); only the first
+IMPORT_ERROR_LIMIT messages are returned, `rejected` carries the full count.
+
+Valid rows go in with one bulk INSERT, and the new items are reconciled
+in the same job against the company's unmatched transactions
+(reconciliation.reconcile_company restricted to pairs involving the new
+items, while the ambiguity rule still sees every open item), so a file of
+invoices that were already paid comes back settled.
+
+The caller owns the transaction: this module flushes but never commits.
+"""
+
+import time
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+import pandas as pd
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.planned_item import PlannedCashflowItem
+from app.services.reconciliation import reconcile_company
+
+REQUIRED_COLUMNS = ("type", "direction", "amount", "due_date", "counterparty")
+PLANNED_TYPES = ("INVOICE", "PO", "OTHER")
+DIRECTIONS = ("in", "out")
+EXCEL_SUFFIXES = (".xlsx", ".xls")
+IMPORT_ERROR_LIMIT = 200
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    rejected: int = 0
+    auto_matched: int = 0
+    errors: list[str] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "auto_matched": self.auto_matched,
+            "errors": self.errors,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+        }
+
+
+def read_planned_frame(filename: str, content: bytes) -> pd.DataFrame:
+    """CSV veya Excel dosyasını kolon adları küçük harfe çevrilmiş bir DataFrame olarak okur."""
+    name = (filename or "").lower()
+    try:
+        if name.endswith(".csv"):
+            frame = pd.read_csv(
+                StringIO(content.decode("utf-8-sig", errors="ignore")),
+                dtype=str,
+                keep_default_na=False,
+            )
+        elif name.endswith(EXCEL_SUFFIXES):
+            engine = "xlrd" if name.endswith(".xls") else "openpyxl"
+            frame = pd.read_excel(BytesIO(content), sheet_name=0, dtype=object, engine=engine)
+        else:
+            raise HTTPException(status_code=400, detail="Lütfen CSV veya Excel formatında dosya yükleyin.")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Dosya okunamadı: {e}")
+
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Dosya şu kolonları içermeli: {', '.join(REQUIRED_COLUMNS)}",
+        )
+    # Excel'de tamamen boş satırlar NaN olarak gelir
+    return frame.dropna(how="all").reset_index(drop=True)
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.fillna("").astype(str).str.strip()
+
+
+def _parse_dates(series: pd.Series) -> pd.Series:
+    # Excel tarih hücreleri Timestamp gelir ("YYYY-MM-DD 00:00:00")
+    text = _text(series).str.replace(r" 00:00:00$", "", regex=True)
+    return pd.to_datetime(text, format="%Y-%m-%d", errors="coerce").dt.date
+
+
+def validate_planned_frame(frame: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Kolonları normalize eder ve satır başına ilk hatayı bulur.
+    Returns: (normalize edilmiş kolonlar, hata mesajı Series'i; geçerli satırda None)
+    """
+    clean = pd.DataFrame({
+        "type": _text(frame["type"]).str.upper(),
+        "direction": _text(frame["direction"]).str.lower(),
+        "amount": pd.to_numeric(_text(frame["amount"]).str.replace(",", ".", regex=False), errors="coerce"),
+        "due_date": _parse_dates(frame["due_date"]),
+        "counterparty": _text(frame["counterparty"]),
+        "reference_no": _text(frame["reference_no"]) if "reference_no" in frame.columns else "",
+    })
+
+    checks = [
+        (~clean["direction"].isin(DIRECTIONS), "direction sadece 'in' veya 'out' olabilir"),
+        (~clean["type"].isin(PLANNED_TYPES), "type sadece 'INVOICE', 'PO' veya 'OTHER' olabilir"),
+        (clean["amount"].isna(), "amount sayı olmalı"),
+        (clean["amount"] <= 0, "amount pozitif olmalı"),
+        (clean["due_date"].isna(), "due_date YYYY-MM-DD formatında olmalı"),
+    ]
+    errors = pd.Series(None, index=clean.index, dtype=object)
+    # Ters sırayla yazılır; her satırda listedeki ilk hata kalır
+    for mask, message in reversed(checks):
+        errors[mask] = message
+    return clean, errors
+
+
+def import_planned_items(db: Session, company_id: int, filename: str, content: bytes) -> ImportResult:
+    """
+    Dosyayı doğrular, geçerli satırları tek INSERT ile ekler ve yeni kalemleri
+    eşleşmemiş işlemlerle uzlaştırır. Commit çağırana aittir.
+    """
+    started = time.perf_counter()
+    result = ImportResult()
+
+    frame = read_planned_frame(filename, content)
+    clean, errors = validate_planned_frame(frame)
+
+    invalid = errors.notna()
+    result.rejected = int(invalid.sum())
+    result.errors = [
+        f"Satır {idx + 1}: {message}"
+        for idx, message in errors[invalid].head(IMPORT_ERROR_LIMIT).items()
+    ]
+
+    valid = clean[~invalid]
+    if valid.empty:
+        result.elapsed_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    source = "csv" if filename.lower().endswith(".csv") else "excel"
+    rows = []
+    for type_val, direction, amount, due_date, counterparty, reference_no in valid.itertuples(index=False):
+        amount = Decimal(f"{amount:.2f}")
+        item_id = str(uuid.uuid4())
+        rows.append({
+            "id": item_id,
+            "company_id": company_id,
+            "type": type_val,
+            "direction": direction,
+            "amount": amount,
+            "due_date": due_date,
+            "counterparty": counterparty,
+            "reference_no": reference_no or None,
+            "source": source,
+            "status": "OPEN",
+            "settled_amount": 0,
+            "remaining_amount": amount,
+        })
+
+    db.execute(
+        insert(PlannedCashflowItem).execution_options(
+            data_version_company_id=company_id, data_version_row_ids=[row["id"] for row in rows]
+        ),
+        rows,
+    )
+    result.inserted = len(rows)
+
+    reconciliation = reconcile_company(db, company_id, planned_ids={row["id"] for row in rows})
+    result.auto_matched = len(reconciliation.matches)
+
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
@@ -0,0 +1,337 @@
+# app/services/planned_recurrence.py
+"""
+Recurring planned items with lazy expansion.
+
+A recurrence rule (rent, salary, loan installment...) is stored once in
+planned_recurrences. Its occurrences are never written up front: callers
+ask for the window they need (forecast horizon, ±7 day matching window)
+and `occurrence_dates` generates exactly the dates inside it, jumping
+straight to the first one instead of walking from the rule's start.
+
+An occurrence becomes a PlannedCashflowItem row (recurrence_id,
+occurrence_index) only when it is matched. Once materialized, the row is
+the source of truth and the occurrence is no longer generated, so the
+same obligation is never counted twice.
+
+Unmaterialized occurrences carry a stable virtual id
+("rec:<recurrence_id>:<index>") and look like an OPEN planned item with
+remaining_amount = amount, so forecasts, auto-match, reconciliation,
+suggestions and combination proposals treat them exactly like real
+items. Matching endpoints accept the virtual id and materialize the row
+first.
+
+Forecasts count an unmatched past occurrence as an overdue obligation
+only for OCCURRENCE_OVERDUE_LOOKBACK_DAYS (`overdue_window_start`); an
+older one was most likely paid outside the ledger (e.g. before the rule
+was created) and would otherwise inflate every forecast forever.
+
+Nothing here commits; callers group their work into one transaction.
+"""
+
+import calendar
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_recurrence import PlannedRecurrence
+
+FREQUENCIES = ("MONTHLY", "WEEKLY", "CUSTOM")
+RECURRENCE_ACTIVE = "ACTIVE"
+RECURRENCE_CANCELLED = "CANCELLED"
+OCCURRENCE_ID_PREFIX = "rec"
+OCCURRENCE_OVERDUE_LOOKBACK_DAYS = 30
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    """Kuralın session'dan bağımsız kopyası (önbelleklerde tutulabilir)."""
+    id: str
+    type: str
+    direction: str
+    amount: Decimal
+    counterparty: str | None
+    reference_no: str | None
+    frequency: str
+    interval: int
+    start_date: date
+    end_date: date | None
+    occurrence_count: int | None
+
+
+RULE_COLUMNS = (
+    PlannedRecurrence.id,
+    PlannedRecurrence.type,
+    PlannedRecurrence.direction,
+    PlannedRecurrence.amount,
+    PlannedRecurrence.counterparty,
+    PlannedRecurrence.reference_no,
+    PlannedRecurrence.frequency,
+    PlannedRecurrence.interval,
+    PlannedRecurrence.start_date,
+    PlannedRecurrence.end_date,
+    PlannedRecurrence.occurrence_count,
+)
+
+
+@dataclass(frozen=True)
+class Occurrence:
+    """Satıra dönüşmemiş oluşum; açık (OPEN) bir planlı kalem gibi davranır."""
+    rule: RecurrenceRule
+    index: int
+    due_date: date
+
+    status = "OPEN"
+    settled_amount = Decimal("0")
+
+    @property
+    def id(self) -> str:
+        return occurrence_id(self.rule.id, self.index)
+
+    @property
+    def type(self) -> str:
+        return self.rule.type
+
+    @property
+    def direction(self) -> str:
+        return self.rule.direction
+
+    @property
+    def amount(self) -> Decimal:
+        return self.rule.amount
+
+    @property
+    def remaining_amount(self) -> Decimal:
+        return self.rule.amount
+
+    @property
+    def counterparty(self) -> str | None:
+        return self.rule.counterparty
+
+    @property
+    def reference_no(self) -> str | None:
+        return self.rule.reference_no
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "recurrence_id": self.rule.id,
+            "occurrence_index": self.index,
+            "type": self.type,
+            "direction": self.direction,
+            "amount": str(self.amount),
+            "due_date": self.due_date,
+            "counterparty": self.counterparty,
+            "reference_no": self.reference_no,
+            "status": self.status,
+            "settled_amount": str(self.settled_amount),
+            "remaining_amount": str(self.remaining_amount),
+        }
+
+
+def occurrence_id(recurrence_id: str, index: int) -> str:
+    return f"{OCCURRENCE_ID_PREFIX}:{recurrence_id}:{index}"
+
+
+def parse_occurrence_id(value: str) -> tuple[str, int] | None:
+    """Sanal oluşum id'sini (recurrence_id, index) olarak çözer; gerçek id için None."""
+    prefix, _, rest = (value or "").partition(":")
+    recurrence_id, _, index = rest.rpartition(":")
+    if prefix != OCCURRENCE_ID_PREFIX or not recurrence_id or not index.isdigit():
+        return None
+    return recurrence_id, int(index)
+
+
+def _add_months(start: date, months: int) -> date:
+    # Ay sonuna taşan günler ayın son gününe çekilir (31 Ocak -> 28/29 Şubat -> 31 Mart)
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def _step_days(rule) -> int:
+    return 7 * rule.interval if rule.frequency == "WEEKLY" else rule.interval
+
+
+def occurrence_date(rule, index: int) -> date:
+    """index'inci oluşumun vadesi (sınır kontrolü yapmaz)."""
+    if rule.frequency == "MONTHLY":
+        return _add_months(rule.start_date, index * rule.interval)
+    return rule.start_date + timedelta(days=index * _step_days(rule))
+
+
+def _first_index_on_or_after(rule, start: date) -> int:
+    if start <= rule.start_date:
+        return 0
+    if rule.frequency == "MONTHLY":
+        months = (start.year - rule.start_date.year) * 12 + start.month - rule.start_date.month
+        index = months // rule.interval
+        while occurrence_date(rule, index) < start:
+            index += 1
+        return index
+    step = _step_days(rule)
+    return -(-(start - rule.start_date).days // step)
+
+
+def _in_bounds(rule, index: int, due_date: date) -> bool:
+    if rule.occurrence_count is not None and index >= rule.occurrence_count:
+        return False
+    return rule.end_date is None or due_date <= rule.end_date
+
+
+def occurrence_at(rule, index: int) -> date | None:
+    """index'inci oluşumun vadesi; kuralın sınırları dışındaysa None."""
+    due_date = occurrence_date(rule, index)
+    return due_date if _in_bounds(rule, index, due_date) else None
+
+
+def occurrence_dates(rule, start: date | None, end: date):
+    """
+    [start, end] penceresindeki oluşumları (index, vade) olarak üretir.
+    start None ise kuralın başından itibaren. Pencere dışı oluşumlar
+    hesaplanmaz.
+    """
+    index = _first_index_on_or_after(rule, start) if start else 0
+    while True:
+        due_date = occurrence_date(rule, index)
+        if due_date > end or not _in_bounds(rule, index, due_date):
+            return
+        yield index, due_date
+        index += 1
+
+
+def overdue_window_start(today: date) -> date:
+    """Tahminlerde vadesi geçmiş oluşumların aranacağı en eski vade."""
+    return today - timedelta(days=OCCURRENCE_OVERDUE_LOOKBACK_DAYS)
+
+
+def load_active_rules(db: Session, company_id: int, direction: str | None = None) -> list[RecurrenceRule]:
+    q = db.query(*RULE_COLUMNS).filter(
+        PlannedRecurrence.company_id == company_id,
+        PlannedRecurrence.status == RECURRENCE_ACTIVE,
+    )
+    if direction:
+        q = q.filter(PlannedRecurrence.direction == direction)
+    return [RecurrenceRule(*row) for row in q.all()]
+
+
+def load_materialized(db: Session, company_id: int, recurrence_ids=None) -> dict[str, set[int]]:
+    """Satıra dönüşmüş oluşum index'leri: {recurrence_id: {index, ...}}."""
+    q = db.query(PlannedCashflowItem.recurrence_id, PlannedCashflowItem.occurrence_index).filter(
+        PlannedCashflowItem.company_id == company_id,
+        PlannedCashflowItem.recurrence_id.isnot(None),
+    )
+    if recurrence_ids is not None:
+        q = q.filter(PlannedCashflowItem.recurrence_id.in_(list(recurrence_ids)))
+    materialized: dict[str, set[int]] = {}
+    for recurrence_id, index in q.all():
+        materialized.setdefault(recurrence_id, set()).add(index)
+    return materialized
+
+
+def expand_occurrences(
+    db: Session, company_id: int, start: date | None, end: date, direction: str | None = None
+):
+    """
+    Aktif kuralların [start, end] penceresindeki, satıra dönüşmemiş
+    oluşumlarını üretir (kural başına sıralı). Kural yoksa tek sorgu.
+    """
+    rules = load_active_rules(db, company_id, direction)
+    if not rules:
+        return
+    materialized = load_materialized(db, company_id, [r.id for r in rules])
+    for rule in rules:
+        skip = materialized.get(rule.id, ())
+        for index, due_date in occurrence_dates(rule, start, end):
+            if index not in skip:
+                yield Occurrence(rule, index, due_date)
+
+
+def find_open_occurrence(db: Session, company_id: int, value: str) -> Occurrence | None:
+    """Sanal id hâlâ açık bir oluşumu gösteriyorsa onu döner (kural aktif, satırı yok)."""
+    parsed = parse_occurrence_id(value)
+    if parsed is None:
+        return None
+    recurrence_id, index = parsed
+    row = db.query(*RULE_COLUMNS).filter(
+        PlannedRecurrence.company_id == company_id,
+        PlannedRecurrence.id == recurrence_id,
+        PlannedRecurrence.status == RECURRENCE_ACTIVE,
+    ).first()
+    if row is None:
+        return None
+    rule = RecurrenceRule(*row)
+    due_date = occurrence_at(rule, index)
+    if due_date is None:
+        return None
+    if index in load_materialized(db, company_id, [recurrence_id]).get(recurrence_id, ()):
+        return None
+    return Occurrence(rule, index, due_date)
+
+
+def materialize_occurrence(db: Session, company_id: int, occurrence: Occurrence) -> PlannedCashflowItem:
+    """Oluşumu açık bir planlı kalem satırına dönüştürür (flush, commit yok)."""
+    item = PlannedCashflowItem(
+        type=occurrence.type,
+        direction=occurrence.direction,
+        amount=occurrence.amount,
+        due_date=occurrence.due_date,
+        counterparty=occurrence.counterparty,
+        reference_no=occurrence.reference_no,
+        source="recurrence",
+        status="OPEN",
+        settled_amount=0,
+        remaining_amount=occurrence.amount,
+        recurrence_id=occurrence.rule.id,
+        occurrence_index=occurrence.index,
+        company_id=company_id,
+    )
+    db.add(item)
+    db.flush()
+    return item
+
+
+def resolve_planned_item_id(db: Session, company_id: int, planned_item_id: str) -> str:
+    """
+    Eşleştirme uçları için: sanal oluşum id'si gelirse satırı üretir (veya
+    daha önce üretilmiş satırı bulur) ve gerçek id'yi döner.
+    """
+    parsed = parse_occurrence_id(planned_item_id)
+    if parsed is None:
+        return planned_item_id
+    existing = db.query(PlannedCashflowItem.id).filter(
+        PlannedCashflowItem.company_id == company_id,
+        PlannedCashflowItem.recurrence_id == parsed[0],
+        PlannedCashflowItem.occurrence_index == parsed[1],
+    ).first()
+    if existing:
+        return existing[0]
+    occurrence = find_open_occurrence(db, company_id, planned_item_id)
+    if occurrence is None:
+        raise HTTPException(404, "Tekrarlayan kalem oluşumu bulunamadı")
+    return materialize_occurrence(db, company_id, occurrence).id
+
+
+def ensure_recurrence_columns(engine: Engine) -> list[str]:
+    """
+    Var olan veritabanlarında planned_cashflow_items'a eksik kolonları ekler
+    (create_all mevcut tabloları değiştirmez). Eklenen kolon adlarını döner.
+    """
+    table = PlannedCashflowItem.__tablename__
+    existing = {col["name"] for col in inspect(engine).get_columns(table)}
+    statements = {
+        "recurrence_id": f"ALTER TABLE {table} ADD COLUMN recurrence_id VARCHAR REFERENCES planned_recurrences(id)",
+        "occurrence_index": f"ALTER TABLE {table} ADD COLUMN occurrence_index INTEGER",
+    }
+    added = []
+    with engine.begin() as conn:
+        for name, ddl in statements.items():
+            if name not in existing:
+                conn.execute(text(ddl))
+                added.append(name)
+    return added
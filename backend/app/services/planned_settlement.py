@@ -0,0 +1,121 @@
+# app/services/planned_settlement.py
+"""
+Planned-item settlement in SQL.
+
+A match changes its planned item by a signed delta (+matched_amount on
+create, -matched_amount on delete). Instead of re-summing every match of
+the item, the delta is applied in one UPDATE:
+
+    settled_amount   = settled_amount + :delta
+    remaining_amount = amount - settled_amount - :delta   (0 when <= epsilon)
+    status           = CASE ... END                       (same expression)
+
+All SET expressions read the pre-update row, so the statement is atomic
+and needs no prior SELECT. `recompute_planned_items` rebuilds the same
+columns from SUM(planned_matches) for many items in one statement (repair,
+backfill, deletes that drop many matches at once).
+
+Nothing here commits; callers group their work into one transaction.
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.services.data_version import record_data_write
+
+SETTLED_EPSILON = Decimal("0.005")
+
+
+def _settlement_values(settled) -> dict:
+    """settled ifadesinden settled/remaining/status SET ifadeleri."""
+    remaining = PlannedCashflowItem.amount - settled
+    return {
+        "settled_amount": settled,
+        "remaining_amount": case((remaining <= SETTLED_EPSILON, 0), else_=remaining),
+        "status": case(
+            (remaining <= SETTLED_EPSILON, "SETTLED"),
+            (settled > 0, "PARTIAL"),
+            else_="OPEN",
+        ),
+    }
+
+
+def apply_settlement_delta(db: Session, company_id: int, planned_item_id: str, delta) -> int:
+    """Tek kaleme imzalı tutar farkı uygular. Güncellenen satır sayısını döner."""
+    return apply_settlement_deltas(db, company_id, {planned_item_id: delta})
+
+
+def apply_settlement_deltas(db: Session, company_id: int, deltas: dict) -> int:
+    """
+    {planned_item_id: delta} farklarını tek bir (executemany) UPDATE ile uygular.
+    Aynı kaleme ait farklar önceden toplanmış olmalıdır.
+    """
+    params = [
+        {"b_id": item_id, "b_delta": Decimal(str(delta))}
+        for item_id, delta in deltas.items()
+        if item_id and delta
+    ]
+    if not params:
+        return 0
+
+    settled = func.coalesce(PlannedCashflowItem.settled_amount, 0) + bindparam(
+        "b_delta", type_=PlannedCashflowItem.settled_amount.type
+    )
+    stmt = (
+        update(PlannedCashflowItem)
+        .where(
+            PlannedCashflowItem.company_id == company_id,
+            PlannedCashflowItem.id == bindparam("b_id"),
+        )
+        .values(**_settlement_values(settled))
+    )
+    # Tek executemany; Core üzerinden çalıştığı için ORM hook'ları devreye
+    # girmez: yazım elle kaydedilir (versiyon commit'te artar), session'daki
+    # nesneler expire edilir
+    result = db.connection().execute(stmt, params)
+    table = PlannedCashflowItem.__tablename__
+    record_data_write(db, company_id, (table,), {table: {p["b_id"] for p in params}})
+    _expire_items(db, deltas.keys())
+    return result.rowcount
+
+
+def recompute_planned_items(db: Session, company_id: int, planned_item_ids=None) -> int:
+    """
+    Kalemlerin settled/remaining/status alanlarını eşleşmelerin toplamından
+    tek UPDATE ile yeniden hesaplar. planned_item_ids None ise şirketin tüm kalemleri.
+    """
+    settled = func.coalesce(
+        select(func.sum(PlannedMatch.matched_amount))
+        .where(
+            PlannedMatch.company_id == company_id,
+            PlannedMatch.planned_item_id == PlannedCashflowItem.id,
+        )
+        .scalar_subquery(),
+        0,
+    )
+    stmt = update(PlannedCashflowItem).where(PlannedCashflowItem.company_id == company_id)
+    if planned_item_ids is not None:
+        ids = sorted({item_id for item_id in planned_item_ids if item_id})
+        if not ids:
+            return 0
+        stmt = stmt.where(PlannedCashflowItem.id.in_(ids))
+    else:
+        ids = None
+    result = db.execute(
+        stmt.values(**_settlement_values(settled)).execution_options(
+            synchronize_session=False, data_version_company_id=company_id, data_version_row_ids=ids
+        )
+    )
+    _expire_items(db, ids)
+    return result.rowcount
+
+
+def _expire_items(db: Session, planned_item_ids=None) -> None:
+    wanted = set(planned_item_ids) if planned_item_ids is not None else None
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, PlannedCashflowItem) and (wanted is None or obj.id in wanted):
+            db.expire(obj, ["settled_amount", "remaining_amount", "status"])
@@ -0,0 +1,211 @@
+# app/services/reconciliation.py
+"""
+Global reconciliation: match every unmatched transaction of a company
+against its open planned items in one pass.
+
+Same rules as auto_match.py (exact amount vs remaining, same direction,
+±7 days, reference-first, no match on ambiguity), applied set-wise:
+
+1. Load unmatched transactions (match_status, partial index) and open
+   planned items as column tuples.
+2. Hash planned items on (direction, remaining in cents); each bucket is
+   sorted by due_date, so the ±7 day window is a bisect + short sweep
+   (same buckets and picking rule as matching_index.py, built fresh here
+   because matched items are marked dead in place). Unmaterialized
+   recurrence occurrences (planned_recurrence.py) due within the
+   transactions' date range join the buckets under their virtual ids, so
+   transactions that predate a rule settle its past occurrences.
+3. Walk transactions in (date, id) order; a matched planned item leaves
+   its bucket (it is settled by the match).
+4. Materialize the matched occurrences, write all matches with one bulk
+   INSERT, settle the planned items with one batched delta UPDATE
+   (planned_settlement.py) and mark the transactions matched with one
+   bulk UPDATE by primary key.
+
+The caller owns the transaction: this module flushes but never commits.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.matching_index import (
+    DATE_WINDOW_DAYS,
+    PlannedCandidate,
+    load_open_planned,
+    pick_candidate,
+    to_cents,
+)
+from app.services.planned_recurrence import expand_occurrences, materialize_occurrence
+from app.services.planned_settlement import apply_settlement_deltas
+from app.services.transaction_match_state import MATCH_STATUS_MATCHED, unmatched_condition
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReconciliationResult:
+    transactions_scanned: int = 0
+    planned_scanned: int = 0
+    ambiguous: int = 0
+    matches: list[dict] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "transactions_scanned": self.transactions_scanned,
+            "planned_scanned": self.planned_scanned,
+            "matched": len(self.matches),
+            "ambiguous": self.ambiguous,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "matches": [
+                {**m, "matched_amount": float(m["matched_amount"])} for m in self.matches
+            ],
+        }
+
+
+def reconcile_company(
+    db: Session, company_id: int, dry_run: bool = False, planned_ids: set[str] | None = None
+) -> ReconciliationResult:
+    """
+    Şirketin eşleşmemiş tüm işlemlerini açık planlı kalemlerle ve
+    tekrarlayan kuralların oluşumlarıyla eşleştirir.
+    planned_ids verilirse (ör. yeni içe aktarılan kalemler) yalnızca bu
+    kalemleri içeren eşleşmeler yazılır; belirsizlik kuralı yine tüm açık
+    kalemlere bakar.
+    dry_run=True ise hiçbir şey yazılmaz, sadece önerilen eşleşmeler döner
+    (oluşumlar sanal id'leriyle). Commit çağırana aittir.
+    """
+    started = time.perf_counter()
+    result = ReconciliationResult()
+
+    buckets = load_open_planned(db, company_id)
+    occurrences = _add_occurrences(db, company_id, buckets)
+    result.planned_scanned = sum(len(b) for b in buckets.values())
+
+    due_dates = {key: [p.due_date for p in bucket] for key, bucket in buckets.items()}
+    all_due = [
+        p.due_date for bucket in buckets.values() for p in bucket
+        if planned_ids is None or p.id in planned_ids
+    ]
+    if not all_due:
+        result.elapsed_ms = (time.perf_counter() - started) * 1000
+        return result
+    window = timedelta(days=DATE_WINDOW_DAYS)
+
+    tx_rows = db.query(
+        Transaction.id,
+        Transaction.date,
+        Transaction.direction,
+        Transaction.amount,
+        Transaction.description,
+    ).filter(
+        Transaction.company_id == company_id,
+        Transaction.date >= min(all_due) - window,
+        Transaction.date <= max(all_due) + window,
+        unmatched_condition(),
+    ).order_by(Transaction.date, Transaction.id).all()
+    result.transactions_scanned = len(tx_rows)
+
+    for tx_id, tx_date, direction, amount, description in tx_rows:
+        key = (direction, to_cents(amount))
+        bucket = buckets.get(key)
+        if not bucket:
+            continue
+
+        planned, ambiguous = pick_candidate(tx_date, description, bucket, due_dates[key])
+        if ambiguous:
+            result.ambiguous += 1
+            logger.debug(f"Reconcile AMBIGUOUS for tx {tx_id} (amount={amount}, direction={direction})")
+            continue
+        if planned is None or (planned_ids is not None and planned.id not in planned_ids):
+            continue
+
+        # Tutar kalan tutara eşit olduğundan kalem bu eşleşmeyle kapanır
+        planned.alive = False
+        result.matches.append({
+            "planned_item_id": planned.id,
+            "transaction_id": tx_id,
+            "matched_amount": amount,
+            "date_diff_days": abs((tx_date - planned.due_date).days),
+        })
+
+    if result.matches and not dry_run:
+        # Eşleşen oluşumlar önce satıra dönüşür
+        for m in result.matches:
+            occurrence = occurrences.get(m["planned_item_id"])
+            if occurrence is not None:
+                m["planned_item_id"] = materialize_occurrence(db, company_id, occurrence).id
+        db.execute(
+            insert(PlannedMatch).execution_options(data_version_company_id=company_id),
+            [
+                {
+                    "company_id": company_id,
+                    "planned_item_id": m["planned_item_id"],
+                    "transaction_id": m["transaction_id"],
+                    "matched_amount": m["matched_amount"],
+                    "match_type": "AUTO",
+                }
+                for m in result.matches
+            ],
+        )
+        # Her kalem en fazla bir kez eşleşir; farklar doğrudan uygulanabilir
+        apply_settlement_deltas(
+            db, company_id, {m["planned_item_id"]: m["matched_amount"] for m in result.matches}
+        )
+        # Eşleşmemiş işlem tam tutarıyla eşleşti
+        db.execute(
+            update(Transaction).execution_options(
+                data_version_company_id=company_id,
+                data_version_row_ids=[m["transaction_id"] for m in result.matches],
+            ),
+            [
+                {
+                    "id": m["transaction_id"],
+                    "matched_amount": m["matched_amount"],
+                    "match_status": MATCH_STATUS_MATCHED,
+                }
+                for m in result.matches
+            ],
+        )
+        db.flush()
+
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"Reconcile company {company_id}: {len(result.matches)} matched, {result.ambiguous} ambiguous, "
+        f"{result.transactions_scanned} tx x {result.planned_scanned} planned in {result.elapsed_ms:.0f}ms"
+        + (" (dry run)" if dry_run else "")
+    )
+    return result
+
+
+def _add_occurrences(db: Session, company_id: int, buckets: dict) -> dict:
+    """
+    Eşleşmemiş işlemlerin tarih aralığına düşen oluşumları kovalara ekler.
+    Returns: sanal id -> Occurrence
+    """
+    first, last = db.query(func.min(Transaction.date), func.max(Transaction.date)).filter(
+        Transaction.company_id == company_id,
+        unmatched_condition(),
+    ).one()
+    if first is None:
+        return {}
+    window = timedelta(days=DATE_WINDOW_DAYS)
+    occurrences = {}
+    touched = set()
+    for occurrence in expand_occurrences(db, company_id, first - window, last + window):
+        key = (occurrence.direction, to_cents(occurrence.amount))
+        buckets.setdefault(key, []).append(PlannedCandidate(
+            id=occurrence.id, due_date=occurrence.due_date, reference_no=occurrence.reference_no,
+        ))
+        occurrences[occurrence.id] = occurrence
+        touched.add(key)
+    for key in touched:
+        buckets[key].sort(key=lambda p: (p.due_date, p.id))
+    return occurrences
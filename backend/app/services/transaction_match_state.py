@@ -0,0 +1,106 @@
+# app/services/transaction_match_state.py
+"""
+Denormalized match state on transactions.
+
+`transactions.matched_amount` is the sum of planned_matches.matched_amount
+for the transaction and `transactions.match_status` is derived from it:
+
+    UNMATCHED  no match
+    PARTIAL    0 < matched_amount < amount
+    MATCHED    matched_amount >= amount
+
+Every path that writes planned_matches calls
+`refresh_transaction_match_state` with the affected transaction ids; the
+refresh is one UPDATE that recomputes both columns from planned_matches,
+so it is correct regardless of what the caller changed. Unmatched rows are
+covered by partial indexes (see Transaction.__table_args__), so "all
+unmatched transactions" is an index range scan instead of an anti-join
+against planned_matches.
+
+Like the other services this module never commits.
+"""
+
+from sqlalchemy import case, func, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+
+MATCH_STATUS_UNMATCHED = "UNMATCHED"
+MATCH_STATUS_PARTIAL = "PARTIAL"
+MATCH_STATUS_MATCHED = "MATCHED"
+MATCHED_EPSILON = 0.005
+
+
+def unmatched_condition():
+    """Hiç eşleşmesi olmayan işlemler (partial index ile karşılanır)."""
+    return Transaction.match_status == MATCH_STATUS_UNMATCHED
+
+
+def _match_state_values() -> dict:
+    matched = func.coalesce(
+        select(func.sum(PlannedMatch.matched_amount))
+        .where(PlannedMatch.transaction_id == Transaction.id)
+        .scalar_subquery(),
+        0,
+    )
+    status = case(
+        (matched <= 0, MATCH_STATUS_UNMATCHED),
+        (matched >= Transaction.amount - MATCHED_EPSILON, MATCH_STATUS_MATCHED),
+        else_=MATCH_STATUS_PARTIAL,
+    )
+    return {"matched_amount": matched, "match_status": status}
+
+
+def refresh_transaction_match_state(db: Session, company_id: int, transaction_ids) -> int:
+    """
+    Verilen işlemlerin matched_amount / match_status alanlarını
+    planned_matches'ten yeniden hesaplar. Güncellenen satır sayısını döner.
+    """
+    ids = sorted({tx_id for tx_id in transaction_ids if tx_id})
+    if not ids:
+        return 0
+    result = db.execute(
+        update(Transaction)
+        .where(Transaction.company_id == company_id, Transaction.id.in_(ids))
+        .values(**_match_state_values())
+        .execution_options(
+            synchronize_session="fetch", data_version_company_id=company_id, data_version_row_ids=ids
+        )
+    )
+    return result.rowcount
+
+
+def backfill_match_state(db: Session, company_id: int | None = None) -> int:
+    """Tüm işlemlerin (veya tek şirketin) eşleşme durumunu tek UPDATE ile doldurur."""
+    stmt = update(Transaction).values(**_match_state_values())
+    if company_id is not None:
+        stmt = stmt.where(Transaction.company_id == company_id)
+    result = db.execute(
+        stmt.execution_options(synchronize_session=False, data_version_company_id=company_id)
+    )
+    return result.rowcount
+
+
+def ensure_match_state_columns(engine: Engine) -> list[str]:
+    """
+    Var olan veritabanlarında eksik kolonları ekler (create_all mevcut
+    tabloları değiştirmez) ve aynı transaction içinde planned_matches'ten
+    doldurur; aksi halde eşleşmiş işlemler UNMATCHED görünüp yeniden
+    eşleştirilebilir. Eklenen kolon adlarını döner.
+    """
+    existing = {col["name"] for col in inspect(engine).get_columns(Transaction.__tablename__)}
+    statements = {
+        "matched_amount": "ALTER TABLE transactions ADD COLUMN matched_amount NUMERIC(12, 2) NOT NULL DEFAULT 0",
+        "match_status": f"ALTER TABLE transactions ADD COLUMN match_status VARCHAR NOT NULL DEFAULT '{MATCH_STATUS_UNMATCHED}'",
+    }
+    added = []
+    with engine.begin() as conn:
+        for name, ddl in statements.items():
+            if name not in existing:
+                conn.execute(text(ddl))
+                added.append(name)
+        if added:
+            conn.execute(update(Transaction).values(**_match_state_values()))
+    return added
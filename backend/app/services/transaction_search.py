@@ -0,0 +1,294 @@
+# app/services/transaction_search.py
+"""
+Indexed search over transaction descriptions.
+
+Backends, picked per database:
+
+* SQLite: an FTS5 virtual table (`transactions_fts`) kept in sync by
+  triggers. Its rows are keyed by `transactions_fts_keys`, an INTEGER
+  PRIMARY KEY -> transactions.id map, because the implicit rowid of a
+  String-PK table is not stable (VACUUM may renumber it). Tokens are
+  case- and diacritic-folded (unicode61 remove_diacritics 2; the dotless
+  "ı" is folded in the triggers), so "odeme" finds "ÖDEME". Ranked by bm25.
+* Postgres: a GIN `tsvector` index (prefix token match) plus a `pg_trgm`
+  GIN index (substring match), both on the description folded the way
+  search_tokens folds queries (lower + Turkish letters to ASCII), since
+  the 'simple' configuration keeps diacritics. Ranked by ts_rank +
+  trigram similarity.
+* Anything else, or when the index has not been created: ILIKE per token.
+
+`ensure_search_index(engine)` is idempotent and runs at startup and from
+create_tables.py.
+"""
+
+import logging
+import re
+import unicodedata
+import weakref
+
+from sqlalchemy import Float, String, and_, func, literal, literal_column, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERY_TOKENS = 8
+
+# Engine -> backend; keyed on the engine object (in-memory SQLite URLs are not unique)
+_backend_cache: "weakref.WeakKeyDictionary[Engine, str]" = weakref.WeakKeyDictionary()
+
+# FTS satırları, transactions.id'ye sabit bir INTEGER anahtarla bağlanır:
+# String PK'li tabloda örtük rowid VACUUM sonrası değişebilir.
+_SQLITE_LEGACY_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS transactions_fts_ai",
+    "DROP TRIGGER IF EXISTS transactions_fts_ad",
+    "DROP TRIGGER IF EXISTS transactions_fts_au",
+    "DROP TABLE IF EXISTS transactions_fts",
+]
+
+_SQLITE_SETUP = [
+    """
+    CREATE TABLE IF NOT EXISTS transactions_fts_keys (
+        fts_rowid INTEGER PRIMARY KEY,
+        transaction_id TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts_keys(transaction_id) VALUES (new.id);
+        INSERT INTO transactions_fts(rowid, description)
+        SELECT fts_rowid, replace(new.description, 'ı', 'i')
+        FROM transactions_fts_keys WHERE transaction_id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN
+        DELETE FROM transactions_fts
+        WHERE rowid = (SELECT fts_rowid FROM transactions_fts_keys WHERE transaction_id = old.id);
+        DELETE FROM transactions_fts_keys WHERE transaction_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE OF id, description ON transactions BEGIN
+        UPDATE transactions_fts_keys SET transaction_id = new.id WHERE transaction_id = old.id;
+        UPDATE transactions_fts SET description = replace(new.description, 'ı', 'i')
+        WHERE rowid = (SELECT fts_rowid FROM transactions_fts_keys WHERE transaction_id = new.id);
+    END
+    """,
+]
+
+_SQLITE_BACKFILL = [
+    "INSERT INTO transactions_fts_keys(transaction_id) SELECT id FROM transactions",
+    """
+    INSERT INTO transactions_fts(rowid, description)
+    SELECT k.fts_rowid, replace(t.description, 'ı', 'i')
+    FROM transactions_fts_keys k JOIN transactions t ON t.id = k.transaction_id
+    """,
+]
+
+# Postgres'te 'simple' sözlüğü aksanları katlamaz; search_tokens ile aynı
+# katlama (küçük harf, Türkçe karakterler ASCII'ye) index ifadesinde yapılır.
+# Sorgu index'i kullanabilsin diye ifade parametresiz, sabit SQL'dir.
+_TR_FOLD_FROM = "ÇĞİIÖŞÜÂÎÛçğıöşüâîû"
+_TR_FOLD_TO = "cgiiosuaiucgiosuaiu"
+
+
+def _pg_folded(column: str) -> str:
+    return f"lower(translate({column}, '{_TR_FOLD_FROM}', '{_TR_FOLD_TO}'))"
+
+
+_POSTGRES_TRGM_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "DROP INDEX IF EXISTS ix_transactions_description_trgm",
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_transactions_description_folded_trgm
+    ON transactions USING gin ({_pg_folded("description")} gin_trgm_ops)
+    """,
+]
+
+_POSTGRES_TSV_SETUP = [
+    "DROP INDEX IF EXISTS ix_transactions_description_tsv",
+    f"""
+    CREATE INDEX IF NOT EXISTS ix_transactions_description_folded_tsv
+    ON transactions USING gin (to_tsvector('simple', {_pg_folded("description")}))
+    """,
+]
+
+
+def fold_text(text: str) -> str:
+    """
+    Metni katlanmış (küçük harf, aksansız, ı→i) token'ların boşlukla
+    birleşimine çevirir; search_tokens ile aynı kurallar, token sınırı yok.
+    """
+    folded = unicodedata.normalize("NFKD", (text or "").replace("ı", "i").replace("I", "i"))
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch)).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", folded))
+
+
+def search_tokens(query: str) -> list[str]:
+    """
+    Arama metnini katlanmış (küçük harf, aksansız, ı→i) token'lara böler.
+    FTS tarafındaki indeksleme kurallarıyla birebir uyumludur.
+    """
+    return fold_text(query).split()[:MAX_QUERY_TOKENS]
+
+
+def ensure_search_index(engine: Engine) -> str:
+    """
+    Arama indeksini (yoksa) oluşturur ve kullanılacak backend'i döner:
+    "fts5", "postgres_trgm", "postgres" veya "like".
+    """
+    dialect = engine.dialect.name
+    backend = "like"
+
+    if dialect == "sqlite":
+        try:
+            with engine.begin() as conn:
+                existed = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts_keys'"
+                )).first() is not None
+                if not existed:
+                    # Eski (örtük rowid'li) kurulum varsa baştan kurulur
+                    for stmt in _SQLITE_LEGACY_TEARDOWN:
+                        conn.execute(text(stmt))
+                for stmt in _SQLITE_SETUP:
+                    conn.execute(text(stmt))
+                if not existed:
+                    for stmt in _SQLITE_BACKFILL:
+                        conn.execute(text(stmt))
+            backend = "fts5"
+        except Exception as e:
+            logger.warning(f"FTS5 search index unavailable, falling back to LIKE: {e}")
+
+    elif dialect == "postgresql":
+        try:
+            with engine.begin() as conn:
+                for stmt in _POSTGRES_TSV_SETUP:
+                    conn.execute(text(stmt))
+            backend = "postgres"
+        except Exception as e:
+            logger.warning(f"tsvector index could not be created: {e}")
+        try:
+            with engine.begin() as conn:
+                for stmt in _POSTGRES_TRGM_SETUP:
+                    conn.execute(text(stmt))
+            backend = "postgres_trgm"
+        except Exception as e:
+            logger.warning(f"pg_trgm unavailable, substring search will not use an index: {e}")
+
+    _backend_cache[engine] = backend
+    return backend
+
+
+def search_backend(db: Session) -> str:
+    """Session'ın bağlı olduğu veritabanı için arama backend'i (önbellekli)."""
+    engine = db.get_bind()
+    backend = _backend_cache.get(engine)
+    if backend is not None:
+        return backend
+
+    backend = "like"
+    if engine.dialect.name == "sqlite":
+        exists = db.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts_keys'"
+        )).first()
+        if exists:
+            backend = "fts5"
+    elif engine.dialect.name == "postgresql":
+        backend = "postgres"
+        has_trgm = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+        if has_trgm:
+            backend = "postgres_trgm"
+    _backend_cache[engine] = backend
+    return backend
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search_query(
+    db: Session,
+    company_id: int,
+    query: str,
+    filters=(),
+    backend: str = "like",
+):
+    """
+    Backend'e göre sıralı (Transaction, score) sorgusunu kurar.
+    Aranacak token yoksa None döner.
+    """
+    tokens = search_tokens(query)
+    if not tokens:
+        return None
+
+    if backend == "fts5":
+        # Her token önek eşleşmesi, token'lar arasında AND
+        match = " ".join(f'"{tok}"*' for tok in tokens)
+        fts = text(
+            "SELECT k.transaction_id AS tx_id, bm25(transactions_fts) AS rank "
+            "FROM transactions_fts JOIN transactions_fts_keys k ON k.fts_rowid = transactions_fts.rowid "
+            "WHERE transactions_fts MATCH :match"
+        ).bindparams(match=match).columns(tx_id=String, rank=Float).subquery("fts")
+        score = (-fts.c.rank).label("score")
+        q = db.query(Transaction, score).join(fts, fts.c.tx_id == Transaction.id)
+        order = [fts.c.rank.asc(), Transaction.date.desc()]
+
+    elif backend in ("postgres", "postgres_trgm"):
+        raw = " ".join(tokens)
+        folded = literal_column(_pg_folded("transactions.description"))
+        tsv = func.to_tsvector(literal_column("'simple'"), folded)
+        tsq = func.to_tsquery("simple", " & ".join(f"{tok}:*" for tok in tokens))
+        condition = or_(
+            tsv.op("@@")(tsq),
+            folded.like(f"%{_escape_like(raw)}%", escape="\\"),
+        )
+        rank = func.ts_rank(tsv, tsq)
+        if backend == "postgres_trgm":
+            rank = rank + func.similarity(folded, raw)
+        score = rank.label("score")
+        q = db.query(Transaction, score).filter(condition)
+        order = [score.desc(), Transaction.date.desc()]
+
+    else:
+        conditions = [
+            func.lower(Transaction.description).like(f"%{_escape_like(tok)}%", escape="\\")
+            for tok in tokens
+        ]
+        q = db.query(Transaction, literal(1.0).label("score")).filter(and_(*conditions))
+        order = [Transaction.date.desc()]
+
+    q = q.filter(Transaction.company_id == company_id, *filters)
+    return q.order_by(*order, Transaction.id)
+
+
+def search_transactions(
+    db: Session,
+    company_id: int,
+    query: str,
+    filters=(),
+    limit: int = 50,
+    backend: str | None = None,
+) -> list[tuple[Transaction, float]]:
+    """
+    Açıklamada `query` geçen işlemleri skora göre sıralı döner.
+
+    Args:
+        filters: ek SQLAlchemy koşulları (yön, tarih, tutar aralığı ...)
+
+    Returns:
+        [(Transaction, score)] - skor büyük olan daha alakalıdır.
+    """
+    q = build_search_query(db, company_id, query, filters, backend or search_backend(db))
+    if q is None:
+        return []
+    rows = q.limit(limit).all()
+    return [(tx, float(score or 0)) for tx, score in rows]
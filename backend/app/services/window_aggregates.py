@@ -0,0 +1,168 @@
+# app/services/window_aggregates.py
+"""
+Multi-window aggregate precomputation.
+
+Dashboard endpoints toggle between the standard periods (last30, last90,
+this_month, all). Instead of re-summing one window per request, income,
+expense and per-category totals for every standard window and its
+comparison window are computed in a single scan with conditional sums,
+and cached per company, day and data version.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from sqlalchemy import func, case, and_
+from sqlalchemy.orm import Session
+
+from app.models.transaction import Transaction
+from app.services.data_version import get_data_version
+
+STANDARD_WINDOWS = ("last30", "last90", "this_month", "all")
+DEFAULT_WINDOW = "last30"
+
+# Comparison window length: the days just before a window starts
+COMPARISON_DAYS = 30
+
+WINDOW_CACHE_MAX_COMPANIES = 256
+WINDOW_CACHE_TTL_SECONDS = 300
+
+_cache_lock = threading.Lock()
+_cache: "OrderedDict[int, tuple[tuple, float, dict]]" = OrderedDict()
+
+
+def resolve_window(period: str | None, today: date) -> tuple[date | None, date | None]:
+    """
+    Standart periyodun [start, end] aralığını döner (iki uç dahil).
+    "all" için (None, None); bilinmeyen periyotlar last30 kabul edilir.
+    """
+    if period == "last30":
+        return today - timedelta(days=30), today
+    if period == "last90":
+        return today - timedelta(days=90), today
+    if period == "this_month":
+        return today.replace(day=1), today
+    if period == "all":
+        return None, None
+    return today - timedelta(days=30), today
+
+
+def comparison_window(period: str, today: date) -> tuple[date | None, date | None]:
+    """Periyot başlangıcından önceki COMPARISON_DAYS günlük aralık ([start, end] dahil)."""
+    start, _ = resolve_window(period, today)
+    if start is None:
+        return None, None
+    return start - timedelta(days=COMPARISON_DAYS), start - timedelta(days=1)
+
+
+def _window_specs(today: date) -> list[tuple[str, date | None, date | None]]:
+    specs = []
+    for period in STANDARD_WINDOWS:
+        start, end = resolve_window(period, today)
+        specs.append((period, start, end))
+        if start is not None:
+            prev_start, prev_end = comparison_window(period, today)
+            specs.append((f"{period}:prev", prev_start, prev_end))
+    return specs
+
+
+def _conditional_sum(direction: str, start: date | None, end: date | None):
+    conditions = [Transaction.direction == direction]
+    if start is not None:
+        conditions.append(Transaction.date >= start)
+    if end is not None:
+        conditions.append(Transaction.date <= end)
+    return func.coalesce(
+        func.sum(case((and_(*conditions), Transaction.amount), else_=0)),
+        0,
+    )
+
+
+def compute_window_aggregates(db: Session, company_id: int, today: date) -> dict:
+    """
+    Tüm standart pencereler (ve karşılaştırma pencereleri) için tek taramada
+    gelir/gider ve kategori toplamlarını hesaplar.
+
+    Returns:
+        {
+            "last30": {"start": date, "end": date, "income": float,
+                       "expense": float, "net": float,
+                       "by_category": {cat: {"in": float, "out": float}}},
+            "last30:prev": {...},
+            ...
+            "all": {...},
+        }
+        Kategori anahtarlarında NULL kategori "UNCATEGORIZED" olur.
+    """
+    specs = _window_specs(today)
+
+    columns = [Transaction.category]
+    for idx, (_, start, end) in enumerate(specs):
+        columns.append(_conditional_sum("in", start, end).label(f"in_{idx}"))
+        columns.append(_conditional_sum("out", start, end).label(f"out_{idx}"))
+
+    rows = (
+        db.query(*columns)
+        .filter(Transaction.company_id == company_id)
+        .group_by(Transaction.category)
+        .all()
+    )
+
+    result = {}
+    for idx, (key, start, end) in enumerate(specs):
+        by_category = {}
+        income = 0.0
+        expense = 0.0
+        for row in rows:
+            in_v = float(getattr(row, f"in_{idx}") or 0)
+            out_v = float(getattr(row, f"out_{idx}") or 0)
+            if not in_v and not out_v:
+                continue
+            cat = row.category or "UNCATEGORIZED"
+            entry = by_category.setdefault(cat, {"in": 0.0, "out": 0.0})
+            entry["in"] += in_v
+            entry["out"] += out_v
+            income += in_v
+            expense += out_v
+        result[key] = {
+            "start": start,
+            "end": end,
+            "income": income,
+            "expense": expense,
+            "net": income - expense,
+            "by_category": by_category,
+        }
+    return result
+
+
+def get_window_aggregates(db: Session, company_id: int, today: date | None = None) -> dict:
+    """
+    compute_window_aggregates'in önbellekli hali.
+    Anahtar: (gün, data version); şirket başına tek kayıt tutulur, LRU ile sınırlıdır.
+    """
+    today = today or date.today()
+    key = (today, get_data_version(company_id))
+    now = time.monotonic()
+
+    with _cache_lock:
+        cached = _cache.get(company_id)
+        if cached and cached[0] == key and now - cached[1] < WINDOW_CACHE_TTL_SECONDS:
+            _cache.move_to_end(company_id)
+            return cached[2]
+
+    aggregates = compute_window_aggregates(db, company_id, today)
+
+    with _cache_lock:
+        _cache[company_id] = (key, now, aggregates)
+        _cache.move_to_end(company_id)
+        while len(_cache) > WINDOW_CACHE_MAX_COMPANIES:
+            _cache.popitem(last=False)
+
+    return aggregates
+
+
+def clear_window_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Backfill transactions.matched_amount / match_status from planned_matches.
+
+Adds the columns to an existing database if they are missing, creates the
+unmatched partial indexes, then recomputes the match state for every
+company (or a single one). Safe to re-run.
+
+Usage:
+    python backfill_match_state.py [--company-id ID]
+"""
+
+import argparse
+
+from app.core.database import SessionLocal, engine
+from app.models import user, transaction, planned_item, planned_match  # noqa
+from app.models.company import Company
+from app.models.transaction import Transaction
+from app.services import data_version  # noqa  (registers cache-invalidation hooks)
+from app.services.transaction_match_state import backfill_match_state, ensure_match_state_columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill transaction match state")
+    parser.add_argument("--company-id", type=int, default=None)
+    args = parser.parse_args()
+
+    added = ensure_match_state_columns(engine)
+    if added:
+        print(f"Added columns: {', '.join(added)}")
+    for index in Transaction.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        q = db.query(Company.id).order_by(Company.id)
+        if args.company_id is not None:
+            q = q.filter(Company.id == args.company_id)
+        company_ids = [cid for (cid,) in q.all()]
+
+        total = 0
+        for company_id in company_ids:
+            try:
+                updated = backfill_match_state(db, company_id)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"❌ Company {company_id}: {e}")
+                continue
+            total += updated
+            print(f"Company {company_id}: {updated} transactions")
+
+        print(f"\n✅ {total} transactions backfilled across {len(company_ids)} companies")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
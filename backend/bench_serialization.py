@@ -0,0 +1,101 @@
+"""
+Benchmark: list endpoint serialization, entity + Pydantic path vs column-tuple fast path.
+
+Usage:
+    python bench_serialization.py [rows]
+
+Builds an in-memory SQLite ledger, then measures rows/sec for:
+  - entity:  db.query(Transaction) -> List[TransactionSchema] -> json (what
+             FastAPI does with response_model)
+  - fast:    db.query(*TRANSACTION_SCHEMA_COLUMNS) -> dicts -> fast_json.dumps
+and checks that both produce identical bytes.
+"""
+
+import json
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.core.fast_json import dumps, ORJSON_AVAILABLE
+from app.models import user, company, planned_item, planned_match, company_settings  # noqa
+from app.models import email_alias, email_ingest_log, email_attachment  # noqa
+from app.models.transaction import (
+    Transaction,
+    TransactionSchema,
+    TRANSACTION_SCHEMA_COLUMNS,
+    transaction_row_to_dict,
+)
+
+
+def build_ledger(n_rows: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    start = date(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Transaction.__table__), [
+            {
+                "id": str(uuid.uuid4()),
+                "date": start + timedelta(days=i % 700),
+                "description": f"ÖDEME ACME LTD FATURA {i}",
+                "amount": Decimal(i % 99999) + Decimal("0.25"),
+                "direction": "in" if i % 3 else "out",
+                "category": "DIGER_GIDER" if i % 4 else None,
+                "source": "MANUAL",
+                "company_id": 1,
+            }
+            for i in range(n_rows)
+        ])
+    return sessionmaker(bind=engine)()
+
+
+def entity_path(db) -> bytes:
+    rows = db.query(Transaction).filter(Transaction.company_id == 1).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).all()
+    adapter = TypeAdapter(List[TransactionSchema])
+    content = adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(db) -> bytes:
+    rows = db.query(*TRANSACTION_SCHEMA_COLUMNS).filter(Transaction.company_id == 1).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).all()
+    return dumps([transaction_row_to_dict(row) for row in rows])
+
+
+def measure(fn, db, n_rows: int, repeat: int = 3) -> tuple[float, bytes]:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        db.expunge_all()
+        started = time.perf_counter()
+        body = fn(db)
+        best = min(best, time.perf_counter() - started)
+    return n_rows / best, body
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    db = build_ledger(n_rows)
+
+    entity_rate, entity_body = measure(entity_path, db, n_rows)
+    fast_rate, fast_body = measure(fast_path, db, n_rows)
+
+    print(f"rows: {n_rows}  (orjson: {ORJSON_AVAILABLE})")
+    print(f"entity + pydantic: {entity_rate:>12,.0f} rows/s")
+    print(f"column tuples:     {fast_rate:>12,.0f} rows/s  ({fast_rate / entity_rate:.1f}x)")
+    print(f"identical output:  {entity_body == fast_body}")
+
+
+if __name__ == "__main__":
+    main()
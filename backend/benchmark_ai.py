@@ -0,0 +1,204 @@
+"""
+Benchmark: /ai/query latency split into context build, model and post-processing.
+
+Usage:
+    python benchmark_ai.py [--url http://127.0.0.1:8000] (--token JWT | --email E --password P)
+                           [--concurrency 8] [--requests 64] [--question "..."]
+                           [--stream] [--bypass-cache]
+
+Drives the endpoint with `concurrency` parallel clients until `requests`
+requests have completed, then reports:
+  - end-to-end latency p50 / p95 / max and throughput (requests/s)
+  - average Server-Timing phases reported by the backend
+    (context, intent, retrieval, cache, queue, model, post; ms)
+  - with --stream: time to first token and tokens/s as seen by the client
+
+Run the backend against the local stub to measure our own overhead
+without the OpenAI API:
+    python ai_stub_server.py --latency-ms 600 --tokens-per-second 60 &
+    AI_BACKEND=local uvicorn main:app
+    python benchmark_ai.py --email demo@example.com --password ... --bypass-cache
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+DEFAULT_QUESTION = "Nakit durumum nasıl, önümüzdeki 30 günde risk var mı?"
+
+
+@dataclass
+class Sample:
+    ok: bool
+    total_ms: float
+    phases: dict = field(default_factory=dict)
+    ttft_ms: float | None = None
+    tokens: int = 0
+    cached: bool = False
+    intent: str | None = None
+    error: str = ""
+
+
+def parse_server_timing(header: str | None) -> dict:
+    """'context;dur=12.3, model;dur=800' -> {'context': 12.3, 'model': 800.0}"""
+    phases = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    phases[name] = float(value)
+                except ValueError:
+                    pass
+    return phases
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def query_once(client: httpx.AsyncClient, body: dict) -> Sample:
+    started = time.perf_counter()
+    response = await client.post("/ai/query", json=body)
+    total_ms = (time.perf_counter() - started) * 1000
+    if response.status_code != 200:
+        return Sample(False, total_ms, error=f"HTTP {response.status_code}: {response.text[:120]}")
+    data = response.json()
+    if data.get("answer", "").startswith("Hata:"):
+        return Sample(False, total_ms, error=data["answer"][:120])
+    phases = parse_server_timing(response.headers.get("server-timing"))
+    return Sample(True, total_ms, phases, cached=bool(data.get("cached")), intent=data.get("intent"))
+
+
+async def stream_once(client: httpx.AsyncClient, body: dict) -> Sample:
+    started = time.perf_counter()
+    ttft_ms = None
+    tokens = 0
+    done = {}
+    event = None
+    async with client.stream("POST", "/ai/query/stream", json=body) as response:
+        phases = parse_server_timing(response.headers.get("server-timing"))
+        if response.status_code != 200:
+            await response.aread()
+            return Sample(False, (time.perf_counter() - started) * 1000, error=f"HTTP {response.status_code}")
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:") and event == "token":
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                tokens += max(1, len(json.loads(line[5:]).get("text", "").split()))
+            elif line.startswith("data:") and event == "error":
+                return Sample(False, (time.perf_counter() - started) * 1000, error=line[5:].strip()[:120])
+            elif line.startswith("data:") and event == "done":
+                done = json.loads(line[5:])
+    return Sample(
+        True, (time.perf_counter() - started) * 1000, phases, ttft_ms, tokens,
+        bool(done.get("cached")), done.get("intent"),
+    )
+
+
+async def run(args) -> list[Sample]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        token = args.token or await login(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        body = {"question": args.question, "bypass_cache": args.bypass_cache}
+        once = stream_once if args.stream else query_once
+
+        samples: list[Sample] = []
+        remaining = args.requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                try:
+                    samples.append(await once(client, body))
+                except httpx.HTTPError as e:
+                    samples.append(Sample(False, 0.0, error=str(e)))
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        return samples
+
+
+def report(samples: list[Sample], elapsed: float, stream: bool) -> None:
+    ok = [s for s in samples if s.ok]
+    failed = [s for s in samples if not s.ok]
+    cached = sum(1 for s in ok if s.cached)
+    routed = sum(1 for s in ok if s.intent)
+    print(
+        f"requests:    {len(samples)} ({len(failed)} failed, {cached} from answer cache, "
+        f"{routed} by intent router) in {elapsed:.2f} s"
+    )
+    print(f"throughput:  {len(ok) / elapsed:.2f} req/s")
+    if failed:
+        print(f"first error: {failed[0].error}")
+    if not ok:
+        return
+    totals = [s.total_ms for s in ok]
+    print(f"latency ms:  p50 {percentile(totals, 0.5):.0f}  p95 {percentile(totals, 0.95):.0f}  max {max(totals):.0f}")
+
+    phases = defaultdict(list)
+    for s in ok:
+        for name, ms in s.phases.items():
+            phases[name].append(ms)
+    for name in ("context", "intent", "retrieval", "cache", "queue", "model", "post"):
+        if phases.get(name):
+            print(f"  {name:<8} avg {statistics.mean(phases[name]):8.1f} ms  p95 {percentile(phases[name], 0.95):8.1f} ms")
+
+    if stream:
+        ttfts = [s.ttft_ms for s in ok if s.ttft_ms is not None]
+        if ttfts:
+            print(f"ttft ms:     p50 {percentile(ttfts, 0.5):.0f}  p95 {percentile(ttfts, 0.95):.0f}")
+        rates = [
+            s.tokens / ((s.total_ms - s.ttft_ms) / 1000)
+            for s in ok
+            if not s.cached and not s.intent and s.ttft_ms and s.total_ms > s.ttft_ms
+        ]
+        if rates:
+            print(f"tokens/s:    avg {statistics.mean(rates):.1f} (per stream, after first token)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI endpoint latency benchmark")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", help="JWT; yoksa --email/--password ile login olunur")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--question", default=DEFAULT_QUESTION)
+    parser.add_argument("--stream", action="store_true", help="/ai/query/stream kullan")
+    parser.add_argument("--bypass-cache", action="store_true", help="cevap önbelleğini atla")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    if not args.token and not (args.email and args.password):
+        parser.error("--token ya da --email/--password gerekli")
+
+    started = time.perf_counter()
+    samples = asyncio.run(run(args))
+    report(samples, time.perf_counter() - started, args.stream)
+    return 0 if all(s.ok for s in samples) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,7 +8,13 @@ from app.models.company import Company
 from app.models.transaction import Transaction
 from app.models.planned_item import PlannedCashflowItem
 from app.models.planned_match import PlannedMatch
+from app.models.planned_recurrence import PlannedRecurrence
 from app.models.company_settings import CompanyFinancialSettings
+from app.models.email_ingest_log import EmailIngestLog
+from app.models.ai_answer_cache import AIAnswerCache
+from app.services.transaction_match_state import ensure_match_state_columns
+from app.services.planned_recurrence import ensure_recurrence_columns
+from app.services.transaction_search import ensure_search_index
 
 def create_tables():
     """Create all tables defined in SQLAlchemy models"""
@@ -17,6 +23,22 @@ def create_tables():
     
     # Create all tables
     Base.metadata.create_all(bind=engine)
+
+    # New columns on existing tables (indexes below depend on them)
+    added = ensure_match_state_columns(engine)
+    if added:
+        print(f"Added transaction columns: {', '.join(added)} (filled from planned_matches)")
+    added = ensure_recurrence_columns(engine)
+    if added:
+        print(f"Added planned item columns: {', '.join(added)}")
+
+    # create_all skips indexes on tables that already exist; add missing ones
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    # Full-text / trigram search index over transaction descriptions
+    print(f"Search backend: {ensure_search_index(engine)}")
     
     print("✓ All tables created successfully!")
     print("\nCreated tables:")
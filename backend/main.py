@@ -12,10 +12,14 @@ from app.models import user  # noqa
 from app.models import company  # noqa
 from app.models import planned_item  # noqa
 from app.models import planned_match  # noqa
+from app.models import planned_recurrence  # noqa
 from app.models import company_settings  # noqa
 from app.models import email_alias  # noqa
 from app.models import email_ingest_log  # noqa
 from app.models import email_attachment  # noqa
+from app.models import ai_answer_cache  # noqa
+from app.services import data_version  # noqa  (registers cache-invalidation hooks)
+from app.services.transaction_search import ensure_search_index
 from app.routes.transactions import router as transactions_router
 from app.routes.dashboard import router as dashboard_router
 from app.routes import planned as planned_routes
@@ -49,6 +53,7 @@ app.add_middleware(
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
 
 
 @app.get("/")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Reconciliation job: match unmatched transactions to open planned items
+for every company (or a single one).
+
+Usage:
+    python run_reconciliation.py [--company-id ID] [--dry-run]
+"""
+
+import argparse
+
+from app.core.database import SessionLocal
+from app.models import user, transaction, planned_item, planned_match  # noqa
+from app.models.company import Company
+from app.services import data_version  # noqa  (registers cache-invalidation hooks)
+from app.services.reconciliation import reconcile_company
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run global reconciliation")
+    parser.add_argument("--company-id", type=int, default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        q = db.query(Company.id).order_by(Company.id)
+        if args.company_id is not None:
+            q = q.filter(Company.id == args.company_id)
+        company_ids = [cid for (cid,) in q.all()]
+
+        total = 0
+        for company_id in company_ids:
+            try:
+                result = reconcile_company(db, company_id, dry_run=args.dry_run)
+                if not args.dry_run:
+                    db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"❌ Company {company_id}: {e}")
+                continue
+            total += len(result.matches)
+            print(
+                f"Company {company_id}: {len(result.matches)} matched, {result.ambiguous} ambiguous "
+                f"({result.transactions_scanned} tx x {result.planned_scanned} planned, "
+                f"{result.elapsed_ms:.0f}ms)"
+            )
+
+        suffix = " (dry run, nothing written)" if args.dry_run else ""
+        print(f"\n✅ {total} matches across {len(company_ids)} companies{suffix}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
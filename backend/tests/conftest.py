@@ -0,0 +1,135 @@
+# backend/tests/conftest.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models import user, company, transaction, planned_item, planned_match, planned_recurrence  # noqa
+from app.models import company_settings, email_alias, email_ingest_log, email_attachment, ai_answer_cache  # noqa
+from app.models.user import User
+from app.models.company import Company
+from app.models.planned_item import PlannedCashflowItem
+from app.models.transaction import Transaction
+from app.services.ai_context_cache import clear_context_cache
+from app.services.ai_retrieval import clear_retrieval_index
+from app.services.matching_health import clear_matching_health_cache
+from app.services.matching_index import clear_matching_index
+from app.services.window_aggregates import clear_window_cache
+
+
+def reset_caches():
+    """Process-wide, şirket başına tutulan tüm önbellekleri boşaltır."""
+    clear_window_cache()
+    clear_context_cache()
+    clear_matching_health_cache()
+    clear_matching_index()
+    clear_retrieval_index()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_caches():
+    """In-memory DB'ler aynı company id'yi tekrar kullanır; önbellekler testler arasında taşınmaz."""
+    reset_caches()
+    yield
+    reset_caches()
+
+
+@pytest.fixture
+def db():
+    """In-memory SQLite session with all tables created."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def company(db):
+    """A company owned by a fresh user."""
+    owner = User(email="owner@example.com", hashed_password="x")
+    db.add(owner)
+    db.commit()
+    c = Company(name="Test A.Ş.", owner_id=owner.id)
+    db.add(c)
+    db.commit()
+    db.refresh(c)
+    return c
+
+
+@pytest.fixture
+def ledger_base():
+    """make_tx / make_planned `days` ofsetlerinin başlangıç günü; modül override edebilir."""
+    return date(2026, 3, 10)
+
+
+@pytest.fixture
+def make_tx(db, company, ledger_base):
+    """
+    Transaction factory: make_tx(id, amount, days=..., direction=..., ...).
+    Tarih `on` ile ya da ledger_base'e göre `days` ile verilir. Session'a
+    ekler; commit=True değilse commit etmez.
+    """
+    def make(tx_id=None, amount="100", days=0, direction="out", description="ODEME",
+             on=None, commit=False, **fields):
+        values = {
+            "date": on or ledger_base + timedelta(days=days),
+            "description": description,
+            "amount": Decimal(str(amount)),
+            "direction": direction,
+            "company_id": company.id,
+            **fields,
+        }
+        if tx_id is not None:
+            values["id"] = tx_id
+        tx = Transaction(**values)
+        db.add(tx)
+        if commit:
+            db.commit()
+        return tx
+
+    return make
+
+
+@pytest.fixture
+def make_planned(db, company, ledger_base):
+    """
+    PlannedCashflowItem factory: make_planned(id, amount, days=..., ...).
+    remaining verilmezse tutarın tamamı açıktır; settled_amount farktan gelir.
+    """
+    def make(item_id=None, amount="100", days=0, direction="out", remaining=None, status="OPEN",
+             on=None, commit=False, **fields):
+        amount = Decimal(str(amount))
+        remaining = amount if remaining is None else Decimal(str(remaining))
+        values = {
+            "type": "INVOICE",
+            "direction": direction,
+            "amount": amount,
+            "remaining_amount": remaining,
+            "settled_amount": amount - remaining,
+            "due_date": on or ledger_base + timedelta(days=days),
+            "status": status,
+            "company_id": company.id,
+            **fields,
+        }
+        if item_id is not None:
+            values["id"] = item_id
+        item = PlannedCashflowItem(**values)
+        db.add(item)
+        if commit:
+            db.commit()
+        return item
+
+    return make
@@ -0,0 +1,52 @@
+# backend/tests/test_ai_answer_cache.py
+
+from datetime import datetime, timedelta, timezone
+
+from app.models.ai_answer_cache import AIAnswerCache
+from app.services import ai_answer_cache
+from app.services.ai_answer_cache import get_cached_answer, store_answer
+
+MODEL = "gpt-4o"
+
+
+class TestAnswerCache:
+    """Test persisted answers for repeated questions"""
+
+    def test_normalized_question_hits(self, db, company):
+        store_answer(db, company.id, "Nakit durumum nasıl?", "ctx", MODEL, "İyi.")
+        db.commit()
+
+        assert get_cached_answer(db, company.id, "  nakit DURUMUM nasil ", "ctx", MODEL) == "İyi."
+        db.commit()
+        assert db.query(AIAnswerCache).one().hit_count == 1
+
+    def test_context_or_model_change_misses(self, db, company):
+        store_answer(db, company.id, "nakit?", "ctx", MODEL, "İyi.")
+        db.commit()
+
+        assert get_cached_answer(db, company.id, "nakit?", "ctx v2", MODEL) is None
+        assert get_cached_answer(db, company.id, "nakit?", "ctx", "other-model") is None
+
+    def test_expired_entry_misses_and_is_purged(self, db, company):
+        store_answer(db, company.id, "nakit?", "ctx", MODEL, "Eski.")
+        db.query(AIAnswerCache).update({"expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+        db.commit()
+
+        assert get_cached_answer(db, company.id, "nakit?", "ctx", MODEL) is None
+        store_answer(db, company.id, "gider?", "ctx", MODEL, "Kira.")
+        db.commit()
+        assert [e.question_norm for e in db.query(AIAnswerCache).all()] == ["GIDER"]
+
+    def test_least_recently_used_are_evicted(self, db, company, monkeypatch):
+        monkeypatch.setattr(ai_answer_cache, "AI_ANSWER_CACHE_MAX_PER_COMPANY", 2)
+        store_answer(db, company.id, "bir", "ctx", MODEL, "1")
+        store_answer(db, company.id, "iki", "ctx", MODEL, "2")
+        get_cached_answer(db, company.id, "bir", "ctx", MODEL)
+        store_answer(db, company.id, "uc", "ctx", MODEL, "3")
+        db.commit()
+
+        assert sorted(e.question_norm for e in db.query(AIAnswerCache).all()) == ["BIR", "UC"]
+
+    def test_blank_question_is_not_cached(self, db, company):
+        store_answer(db, company.id, " ?! ", "ctx", MODEL, "x")
+        assert db.query(AIAnswerCache).count() == 0
@@ -0,0 +1,62 @@
+# backend/tests/test_ai_backend.py
+
+import pytest
+
+from app.routes.ai_chat import server_timing
+from app.services.ai_backend import (
+    LOCAL_BASE_URL,
+    AIBackendConfig,
+    AIBackendUnavailable,
+    get_ai_backend,
+)
+from benchmark_ai import parse_server_timing
+
+
+@pytest.fixture
+def env(monkeypatch):
+    for name in ("AI_BACKEND", "AI_BASE_URL", "AI_MODEL", "OPENAI_API_KEY"):
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+class TestAIBackendConfig:
+    """Test backend selection from the environment"""
+
+    def test_default_is_openai_and_needs_key(self, env):
+        config = AIBackendConfig.from_env()
+        assert (config.name, config.base_url, config.api_key) == ("openai", None, None)
+        with pytest.raises(AIBackendUnavailable):
+            get_ai_backend()
+
+    def test_local_needs_no_key(self, env):
+        env.setenv("AI_BACKEND", "local")
+        env.setenv("AI_MODEL", "stub")
+        backend = get_ai_backend()
+        assert backend.config.base_url == LOCAL_BASE_URL
+        assert backend.cache_key == "local:stub"
+        assert get_ai_backend() is backend
+
+    def test_config_change_rebuilds_backend(self, env):
+        env.setenv("AI_BACKEND", "local")
+        first = get_ai_backend()
+        env.setenv("AI_BASE_URL", "http://127.0.0.1:9999/v1")
+        second = get_ai_backend()
+        assert second is not first
+        assert second.config.base_url == "http://127.0.0.1:9999/v1"
+
+    def test_unknown_backend_is_rejected(self, env):
+        env.setenv("AI_BACKEND", "bogus")
+        with pytest.raises(AIBackendUnavailable):
+            AIBackendConfig.from_env()
+
+
+class TestServerTiming:
+    """Test the Server-Timing header round trip used by benchmark_ai.py"""
+
+    def test_round_trip(self):
+        header = server_timing({"context": 12.34, "model": 800.0, "post": 0.5})
+        assert header == "context;dur=12.3, model;dur=800.0, post;dur=0.5"
+        assert parse_server_timing(header) == {"context": 12.3, "model": 800.0, "post": 0.5}
+
+    def test_missing_header(self):
+        assert parse_server_timing(None) == {}
@@ -0,0 +1,148 @@
+# backend/tests/test_ai_context.py
+
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.company_settings import CompanyFinancialSettings
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.ai_context import (
+    CONTEXT_SECTIONS,
+    ContextSection,
+    compute_financial_context,
+    supports_parallel_sessions,
+)
+
+TODAY = date(2026, 6, 15)
+
+
+def _section(key, provider, timeout=1.0):
+    return ContextSection(key, f"### {key.upper()}", key, provider, timeout)
+
+
+class TestSectionProviders:
+    """Test the context assembled from independent sections"""
+
+    def test_sections_in_fixed_order_with_facts(self, db, company):
+        db.add_all([
+            Transaction(id="t1", date=TODAY - timedelta(days=5), description="X", amount=Decimal("1000"),
+                        direction="in", company_id=company.id, category="SATIS"),
+            Transaction(id="t2", date=TODAY - timedelta(days=2), description="Y", amount=Decimal("300"),
+                        direction="out", company_id=company.id, category="KIRA"),
+            PlannedCashflowItem(id="p1", type="OTHER", direction="out", amount=Decimal("300"),
+                                remaining_amount=0, settled_amount=Decimal("300"), counterparty="Ev sahibi",
+                                due_date=TODAY - timedelta(days=6), status="SETTLED", company_id=company.id),
+            PlannedMatch(planned_item_id="p1", transaction_id="t2", matched_amount=Decimal("300"),
+                         company_id=company.id),
+        ])
+        db.commit()
+
+        text, facts = compute_financial_context(
+            sessionmaker(bind=db.get_bind()), company.id, TODAY, parallel=supports_parallel_sessions(db.get_bind())
+        )
+
+        positions = [text.index(section.title) for section in CONTEXT_SECTIONS]
+        assert positions == sorted(positions)
+        assert "alınamadı" not in text
+        assert facts["profile"]["estimated_cash"] == 700.0
+        assert facts["forecast"]["cash"]["30"] == pytest.approx(700.0 + 30 * 700.0 / 90)
+        assert facts["payment_discipline"] == {"matches": 1, "on_time": 0, "late": 1, "avg_delay_days": 4.0}
+        assert facts["counterparties"]["top_expense"][0]["counterparty"] == "Ev sahibi"
+        assert set(facts["section_ms"]) == {section.key for section in CONTEXT_SECTIONS}
+        assert facts["degraded_sections"] == []
+
+    def test_estimated_cash_from_financial_settings(self, db, company):
+        db.add_all([
+            CompanyFinancialSettings(company_id=company.id, initial_balance=Decimal("10000"),
+                                     initial_balance_date=TODAY - timedelta(days=30)),
+            Transaction(id="t0", date=TODAY - timedelta(days=40), description="Önce", amount=Decimal("5000"),
+                        direction="in", company_id=company.id),
+            Transaction(id="t1", date=TODAY - timedelta(days=5), description="X", amount=Decimal("1000"),
+                        direction="in", company_id=company.id),
+            Transaction(id="t2", date=TODAY - timedelta(days=2), description="Y", amount=Decimal("300"),
+                        direction="out", company_id=company.id),
+        ])
+        db.commit()
+
+        text, facts = compute_financial_context(
+            sessionmaker(bind=db.get_bind()), company.id, TODAY, parallel=supports_parallel_sessions(db.get_bind())
+        )
+
+        # Dashboard ile aynı: başlangıç bakiyesi + başlangıç tarihinden beri net akış
+        assert "alınamadı" not in text
+        assert facts["profile"]["estimated_cash"] == 10700.0
+        assert facts["forecast"]["cash"]["30"] == pytest.approx(10700.0 + 30 * 5700.0 / 90)
+        assert "Tahmini nakit: **10,700 ₺**" in text
+
+    def test_failing_section_degrades_to_message(self):
+        def broken(db, company_id, today):
+            raise RuntimeError("boom")
+
+        text, facts = compute_financial_context(sessionmaker(), 1, TODAY, (_section("a", broken),), parallel=False)
+        assert "⚠️ a alınamadı: boom" in text
+        assert "a" not in facts and facts["degraded_sections"] == []
+
+
+class TestParallelExecution:
+    """Test concurrent sections and per-section timeouts"""
+
+    def test_sections_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=2)
+
+        def waits_for_peer(db, company_id, today):
+            barrier.wait()
+            return ["ok", ""], {"ok": True}
+
+        text, facts = compute_financial_context(
+            sessionmaker(), 1, TODAY, (_section("a", waits_for_peer), _section("b", waits_for_peer))
+        )
+        assert facts["a"] == facts["b"] == {"ok": True}
+
+    def test_slow_section_times_out_without_stalling(self):
+        release = threading.Event()
+
+        def slow(db, company_id, today):
+            release.wait(5)
+            return ["late", ""], {}
+
+        def fast(db, company_id, today):
+            return ["fast", ""], {"n": 1}
+
+        started = time.monotonic()
+        text, facts = compute_financial_context(
+            sessionmaker(), 1, TODAY, (_section("slow", slow, timeout=0.2), _section("fast", fast))
+        )
+        release.set()
+
+        assert time.monotonic() - started < 2
+        assert "⚠️ slow zaman aşımına uğradı (0.2 sn), bu bölüm atlandı." in text
+        assert "fast" in text and "late" not in text
+        assert facts["degraded_sections"] == ["slow"]
+        assert facts["fast"] == {"n": 1}
+
+    def test_concurrent_builds_do_not_eat_each_others_timeout(self):
+        def slowish(db, company_id, today):
+            time.sleep(0.6)
+            return ["ok", ""], {"ok": True}
+
+        sections = tuple(_section(s.key, slowish, timeout=1.5) for s in CONTEXT_SECTIONS)
+        degraded = []
+
+        def build(company_id):
+            _, facts = compute_financial_context(sessionmaker(), company_id, TODAY, sections)
+            degraded.extend(facts["degraded_sections"])
+
+        threads = [threading.Thread(target=build, args=(company_id,)) for company_id in (1, 2, 3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+
+        # Bölüm süresi kuyrukta beklerken değil, bölüm başladığında işlemeye başlar
+        assert degraded == []
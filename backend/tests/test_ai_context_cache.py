@@ -0,0 +1,87 @@
+# backend/tests/test_ai_context_cache.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.routes.ai_chat import build_financial_context
+from app.services.ai_context import compute_financial_context
+from app.services import ai_context_cache
+from app.services.ai_context_cache import (
+    get_context_cache_stats,
+    get_financial_context,
+)
+
+
+@pytest.fixture
+def ledger_base():
+    return date.today() - timedelta(days=3)
+
+
+class TestContextCache:
+    """Test AI context reuse across follow-up questions"""
+
+    def test_follow_up_questions_reuse_context(self, db, company, make_tx):
+        make_tx("t1", "1000", direction="in", commit=True)
+
+        first = build_financial_context(db, company)
+        assert build_financial_context(db, company) is first
+        stats = get_context_cache_stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_ledger_write_rebuilds(self, db, company, make_tx):
+        make_tx("t1", "1000", direction="in", commit=True)
+        build_financial_context(db, company)
+
+        make_tx("t2", "400", direction="out", commit=True)
+        text = build_financial_context(db, company)
+        assert "Tahmini nakit: **600 ₺**" in text
+        assert get_context_cache_stats()["misses"] == 2
+
+    def test_facts_are_cached_with_text(self, db, company, make_tx):
+        make_tx("t1", "1000", direction="in", commit=True)
+        factory = sessionmaker(bind=db.get_bind())
+        context = get_financial_context(
+            company.id, lambda today: compute_financial_context(factory, company.id, today, parallel=False)
+        )
+
+        assert context.facts["profile"]["estimated_cash"] == 1000.0
+        assert context.facts["matching_health"]["open_planned"] == 0
+        assert set(context.facts["forecast"]["cash"]) == {"30", "60", "90"}
+
+    def test_bounded_companies(self, monkeypatch):
+        monkeypatch.setattr(ai_context_cache, "AI_CONTEXT_CACHE_MAX_COMPANIES", 2)
+        for company_id in (1, 2, 3):
+            get_financial_context(company_id, lambda today: ("ctx", {}))
+
+        assert get_context_cache_stats()["entries"] == 2
+        get_financial_context(1, lambda today: ("ctx", {}))
+        assert get_context_cache_stats()["misses"] == 4
+
+    def test_degraded_context_is_not_cached(self):
+        get_financial_context(1, lambda today: ("ctx", {"degraded_sections": ["forecast"]}))
+        get_financial_context(1, lambda today: ("ctx", {"degraded_sections": []}))
+        get_financial_context(1, lambda today: ("ctx", {}))
+
+        stats = get_context_cache_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+
+    def test_concurrent_misses_share_one_build(self):
+        calls = []
+
+        def slow_build(today):
+            calls.append(today)
+            time.sleep(0.1)
+            return "ctx", {}
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: get_financial_context(1, slow_build), range(8)))
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        stats = get_context_cache_stats()
+        assert (stats["hits"], stats["misses"]) == (7, 1)
@@ -0,0 +1,116 @@
+# backend/tests/test_ai_intents.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.company_settings import CompanyFinancialSettings
+from app.models.planned_item import PlannedCashflowItem
+from app.models.transaction import Transaction
+from app.services.ai_context import compute_financial_context, supports_parallel_sessions
+from app.services.ai_intents import classify_intent, get_intent_stats, reset_intent_stats, route_question
+
+TODAY = date(2026, 6, 15)
+
+
+def _facts(db, company):
+    return compute_financial_context(
+        sessionmaker(bind=db.get_bind()), company.id, TODAY, parallel=supports_parallel_sessions(db.get_bind())
+    )[1]
+
+
+@pytest.fixture
+def ledger(db, company):
+    db.add_all([
+        Transaction(id="t1", date=TODAY - timedelta(days=5), description="X", amount=Decimal("9000"),
+                    direction="in", company_id=company.id, category="SATIS"),
+        Transaction(id="t2", date=TODAY - timedelta(days=4), description="Y", amount=Decimal("3000"),
+                    direction="out", company_id=company.id, category="KIRA"),
+        Transaction(id="t3", date=TODAY - timedelta(days=2), description="Z", amount=Decimal("1000"),
+                    direction="out", company_id=company.id, category="ELEKTRIK"),
+        PlannedCashflowItem(id="p1", type="OTHER", direction="out", amount=Decimal("500"),
+                            remaining_amount=Decimal("500"), settled_amount=0, counterparty="Tedarikçi",
+                            due_date=TODAY - timedelta(days=10), status="OPEN", company_id=company.id),
+    ])
+    db.commit()
+
+
+@pytest.fixture
+def facts(db, company, ledger):
+    db.add(CompanyFinancialSettings(company_id=company.id, initial_balance=Decimal("20000"),
+                                    initial_balance_date=TODAY - timedelta(days=30)))
+    db.commit()
+    return _facts(db, company)
+
+
+class TestClassifyIntent:
+    """Test keyword/pattern intent rules on normalized Turkish text"""
+
+    @pytest.mark.parametrize("question, intent", [
+        ("Şu an ne kadar nakdim var?", "cash"),
+        ("BAKİYEM NEDİR", "cash"),
+        ("Runway kaç gün?", "runway"),
+        ("Nakit kaç gün yeter?", "runway"),
+        ("Nakdimiz ne zaman biter?", "runway"),
+        ("30 gün sonra nakit ne olur?", "cash_forecast"),
+        ("En büyük gider kalemim ne?", "top_expense_category"),
+        ("En çok nereye para harcıyoruz?", "top_expense_category"),
+        ("Kaç vadesi geçmiş ödeme var?", "overdue_planned"),
+    ])
+    def test_metric_questions(self, question, intent):
+        classified = classify_intent(question)
+        assert classified is not None and classified[0].key == intent
+
+    @pytest.mark.parametrize("question", [
+        "Nakit durumum nasıl?",
+        "Nakit akışımı iyileştirmek için ne yapmalıyım?",
+        "En büyük gider tedarikçim kim?",
+        "Ortalama gecikme kaç gün?",
+        "Geçen çeyreğe göre giderlerimiz neden arttı, bunu detaylı şekilde analiz edip bize bütçe için bir yol haritası çıkarır mısın?",
+        "",
+    ])
+    def test_open_ended_questions_fall_back(self, question):
+        assert classify_intent(question) is None
+
+
+class TestRouteQuestion:
+    """Test templated answers from the context facts"""
+
+    def setup_method(self):
+        reset_intent_stats()
+
+    def test_answers_from_facts(self, facts):
+        intent, answer = route_question(1, "Ne kadar nakdim var?", facts)
+        # Dashboard ile aynı rakam: 20,000 başlangıç + 9,000 giriş - 4,000 çıkış
+        assert intent == "cash"
+        assert "Tahmini nakit: **25,000 ₺**" in answer
+
+        intent, answer = route_question(1, "En büyük gider kalemim ne?", facts)
+        assert intent == "top_expense_category"
+        assert "**KIRA**: 3,000 ₺" in answer and "%75.0" in answer
+
+        intent, answer = route_question(1, "Kaç vadesi geçmiş ödeme var?", facts)
+        assert intent == "overdue_planned"
+        assert "**1** kalem (500 ₺ kalan)" in answer
+
+    def test_missing_facts_fall_back(self, facts):
+        assert route_question(1, "60 gün sonra nakit?", facts) is not None
+        assert route_question(1, "45 gün sonra nakit?", facts) is None
+        assert route_question(1, "Runway kaç gün?", {"degraded_sections": ["profile"]}) is None
+
+    def test_cash_without_initial_balance_falls_back(self, db, company, ledger):
+        # Ayar yoksa bağlamdaki rakam bakiye değil dönem net akışı; modele bırakılır
+        facts = _facts(db, company)
+        assert route_question(1, "Ne kadar nakdim var?", facts) is None
+        assert route_question(1, "Runway kaç gün?", facts) is None
+        assert route_question(1, "30 gün sonra nakit ne olur?", facts) is None
+        assert route_question(1, "En büyük gider kalemim ne?", facts)[0] == "top_expense_category"
+
+    def test_hit_rate_is_counted(self, facts):
+        route_question(1, "Runway kaç gün?", facts)
+        route_question(1, "Nakit durumum nasıl?", facts)
+        stats = get_intent_stats()
+        assert (stats["routed"], stats["fallback"], stats["hit_rate"]) == (1, 1, 0.5)
+        assert stats["by_intent"] == {"runway": 1}
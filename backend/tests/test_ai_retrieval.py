@@ -0,0 +1,206 @@
+# backend/tests/test_ai_retrieval.py
+
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models.transaction import Transaction
+from app.routes.ai_chat import question_context
+from app.services import ai_retrieval
+from app.services.ai_context_cache import FinancialContext
+from app.services.ai_retrieval import (
+    get_retrieval_index,
+    question_period,
+    render_retrieval_section,
+    retrieve,
+    tokenize,
+)
+
+BASE = date(2026, 3, 10)
+
+
+@pytest.fixture
+def ledger(db, make_tx, make_planned):
+    make_tx("s1", "1200", description="POS SHELL PETROL KADIKOY", days=-20)
+    make_tx("s2", "800", description="SHELL AKARYAKIT ÖDEME", days=-5)
+    make_tx("m1", "450", description="MİGROS A.Ş. ÖDEME", days=-3)
+    make_tx("k1", "15000", description="KIRA ÖDEMESİ MART", days=-9)
+    make_tx("a1", "9000", description="ACME LTD HAVALE", days=-2, direction="in")
+    make_planned("p1", "600", days=10, counterparty="Shell Türkiye", reference_no="FTR-9")
+    db.commit()
+
+
+class TestTokenize:
+    """Test normalization and 5-character prefix stemming"""
+
+    def test_suffixes_share_a_stem(self):
+        assert tokenize("Shell'e ne kadar ödedik?") == ["SHELL", "ODEDI"]
+        assert tokenize("MİGROS'A") == tokenize("Migrosa") == ["MIGRO"]
+
+    def test_question_words_are_dropped(self):
+        assert tokenize("En çok hangi kime?") == []
+
+
+class TestRetrieval:
+    """Test BM25 search, anchors and aggregates"""
+
+    def test_counterparty_question_is_focused(self, db, company, ledger):
+        result = retrieve(db, company.id, "Shell'e ne kadar ödedik?")
+        assert result.focused and result.anchors == ["SHELL"]
+        assert {doc.id for _, doc in result.transactions[:2]} == {"s1", "s2"}
+        assert [doc.id for _, doc in result.planned] == ["p1"]
+        assert result.aggregates["tx_out"]["count"] == 2
+        assert result.aggregates["tx_out"]["total"] == 2000.0
+        assert result.aggregates["planned_out"]["remaining"] == 600.0
+
+        section = render_retrieval_section(result)
+        assert "Ödemeler (işlem): 2 kayıt, toplam **2,000 ₺**" in section
+        assert "| 2026-03-05 | SHELL AKARYAKIT ÖDEME | Çıkış | 800.00 ₺ | - |" in section
+
+    def test_generic_question_is_not_focused(self, db, company, ledger):
+        result = retrieve(db, company.id, "Bu ay ne kadar ödeme yaptık?")
+        assert not result.focused and result.anchors == []
+
+    def test_unknown_name_is_not_focused(self, db, company, ledger):
+        assert not retrieve(db, company.id, "Vodafone faturası ne kadar?").focused
+
+
+class TestGeneralQuestions:
+    """Test that period-style questions keep the full context"""
+
+    @pytest.fixture
+    def busy_ledger(self, db, ledger, make_tx):
+        make_tx("k2", "15000", description="KIRA ÖDEMESİ ŞUBAT", days=-37)
+        make_tx("b1", "700", description="İBB BÜYÜKŞEHİR BLD SU", days=-12)
+        make_tx("g1", "5000", description="GELEN HAVALE ACME", days=-15, direction="in")
+        make_tx("g2", "2500", description="GELEN EFT BETA", days=-4, direction="in")
+        db.commit()
+
+    @pytest.mark.parametrize("question", [
+        "Mart ayında toplam gelirimiz ne kadar?",
+        "Geçen ay en büyük giderim neydi?",
+        "Şubat ayı kârlılığımız?",
+        "Gelen ödemeler geçen aya göre arttı mı?",
+    ])
+    def test_not_focused(self, db, company, busy_ledger, question):
+        result = retrieve(db, company.id, question, BASE)
+        assert not result.focused and result.anchors == []
+
+    def test_period_limits_rows_and_aggregates(self, db, company, ledger):
+        result = retrieve(db, company.id, "Şubatta Shell'e ne kadar ödedik?", BASE)
+        assert result.period == (date(2026, 2, 1), date(2026, 2, 28))
+        assert [doc.id for _, doc in result.transactions] == ["s1"]
+        assert result.aggregates["tx_out"]["total"] == 1200.0
+        assert "planned_out" not in result.aggregates
+        assert "**Dönem:** 2026-02-01 – 2026-02-28" in render_retrieval_section(result)
+
+    def test_question_period(self):
+        assert question_period("Geçen ay?", BASE) == (date(2026, 2, 1), date(2026, 2, 28))
+        assert question_period("Bu yıl ne kadar?", BASE) == (date(2026, 1, 1), date(2026, 12, 31))
+        assert question_period("Aralık'ta?", BASE) == (date(2025, 12, 1), date(2025, 12, 31))
+        assert question_period("Nisan 2025", BASE) == (date(2025, 4, 1), date(2025, 4, 30))
+        assert question_period("Shell ödemeleri", BASE) is None
+
+
+class TestIncrementalSync:
+    """Test that writes update the index in place"""
+
+    def test_insert_update_delete(self, db, company, ledger, make_tx):
+        index = get_retrieval_index(db, company.id)
+        assert len(index) == 6
+
+        make_tx("s3", "300", description="SHELL MASLAK", days=-1)
+        db.get(Transaction, "m1").description = "MİGROS SHELL İSTASYON"
+        db.delete(db.get(Transaction, "k1"))
+        db.commit()
+
+        assert get_retrieval_index(db, company.id) is index
+        assert (len(index), index.tombstones) == (6, 2)
+        top = [doc.id for _, doc in index.search("Shell ödemeleri").transactions[:4]]
+        assert sorted(top) == ["m1", "s1", "s2", "s3"]
+        assert "k1" not in {doc.id for _, doc in index.search("kira").transactions}
+
+    def test_write_reloads_only_written_rows(self, db, company, ledger, monkeypatch, make_tx):
+        index = get_retrieval_index(db, company.id)
+        loads = []
+        load_rows = ai_retrieval._load_rows
+        monkeypatch.setattr(ai_retrieval, "_load_rows",
+                            lambda db, company_id, changes=None: loads.append(changes) or load_rows(db, company_id, changes))
+
+        make_tx("s3", "300", description="SHELL OTOYOL", days=-1)
+        db.delete(db.get(Transaction, "k1"))
+        db.commit()
+
+        assert get_retrieval_index(db, company.id) is index
+        assert loads == [{"transactions": {"s3", "k1"}, "planned_cashflow_items": set()}]
+        assert "s3" in {doc.id for _, doc in index.search("shell").transactions}
+        assert "k1" not in {doc.id for _, doc in index.search("kira").transactions}
+
+    def test_concurrent_questions_share_one_sync(self, db, company, ledger, monkeypatch, make_tx):
+        get_retrieval_index(db, company.id)
+        make_tx("s3", "300", description="SHELL OTOYOL", days=-1)
+        db.commit()
+
+        loads = []
+        load_rows = ai_retrieval._load_rows
+
+        def slow_load(db, company_id, changes=None):
+            loads.append(changes)
+            time.sleep(0.2)
+            return load_rows(db, company_id, changes)
+
+        monkeypatch.setattr(ai_retrieval, "_load_rows", slow_load)
+        factory = sessionmaker(bind=db.get_bind())
+        results = []
+
+        def ask():
+            session = factory()
+            try:
+                results.append(get_retrieval_index(session, company.id))
+            finally:
+                session.close()
+
+        threads = [threading.Thread(target=ask) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        assert len(loads) == 1 and len(results) == 4
+        assert len({id(index) for index in results}) == 1
+
+    def test_unchanged_version_reuses_index(self, db, company, ledger):
+        index = get_retrieval_index(db, company.id)
+        assert get_retrieval_index(db, company.id) is index
+        assert index.sync({key: row for key, (_, row) in index._signatures.items()}) == (0, 0)
+
+
+class TestQuestionContext:
+    """Test the prompt context chosen per question"""
+
+    def test_focused_question_gets_compact_context(self, db, company, ledger):
+        full = FinancialContext(
+            text="FULL " * 500,
+            facts={"section_text": {"profile": "### 📊 CFO PROFİLİ"}},
+            today=BASE,
+            build_ms=1.0,
+        )
+        context = question_context(db, company, full, "Shell'e ne kadar ödedik?")
+        assert context.startswith("### 📊 CFO PROFİLİ")
+        assert "SORUYLA İLGİLİ KAYITLAR" in context and "FULL" not in context
+        assert question_context(db, company, full, "Nakit durumum nasıl?") == full.text
+
+    def test_broader_question_keeps_full_context(self, db, company, ledger):
+        full = FinancialContext(
+            text="FULL " * 500,
+            facts={"section_text": {"profile": "### 📊 CFO PROFİLİ"}},
+            today=BASE,
+            build_ms=1.0,
+        )
+        # Shell dışında da şeyler soruluyor: kayıtlar tam bağlama eklenir
+        context = question_context(db, company, full, "Shell ödemelerimiz nakit akışımızı nasıl etkiliyor?")
+        assert context.startswith(full.text)
+        assert "SORUYLA İLGİLİ KAYITLAR" in context
@@ -0,0 +1,102 @@
+# backend/tests/test_ai_scheduler.py
+
+import asyncio
+
+import pytest
+
+from app.services.ai_scheduler import AIQueueFull, AIScheduler
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _request(scheduler, company_id, order, hold):
+    async with scheduler.slot(company_id):
+        order.append(company_id)
+        await hold.wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestAIScheduler:
+    """Test the global cap, fair queuing and queue bounds"""
+
+    def test_concurrency_cap(self):
+        async def scenario():
+            scheduler = AIScheduler(max_concurrency=2)
+            order, hold = [], asyncio.Event()
+            tasks = [asyncio.create_task(_request(scheduler, 1, order, hold)) for _ in range(5)]
+            await _settle()
+            assert len(order) == 2
+            assert scheduler.stats()["active"] == 2 and scheduler.stats()["waiting"] == 3
+            hold.set()
+            await asyncio.gather(*tasks)
+            return scheduler.stats()
+
+        stats = _run(scenario())
+        assert (stats["active"], stats["waiting"], stats["granted"], stats["queued"]) == (0, 0, 5, 3)
+
+    def test_companies_are_served_round_robin(self):
+        async def scenario():
+            scheduler = AIScheduler(max_concurrency=1)
+            order, holds = [], {}
+
+            async def request(company_id, n):
+                holds[n] = asyncio.Event()
+                async with scheduler.slot(company_id):
+                    order.append(company_id)
+                    await holds[n].wait()
+
+            tasks = []
+            for n, company_id in enumerate([1, 1, 1, 1, 2, 3]):
+                tasks.append(asyncio.create_task(request(company_id, n)))
+                await _settle()
+            for n in range(6):
+                holds[n].set()
+                await _settle()
+            await asyncio.gather(*tasks)
+            return order
+
+        # Şirket 1'in yığını 2 ve 3'ün önünü kesmez
+        assert _run(scenario()) == [1, 1, 2, 3, 1, 1]
+
+    def test_full_queue_is_rejected_with_retry_after(self):
+        async def scenario():
+            scheduler = AIScheduler(max_concurrency=1, max_queue=3, max_queue_per_company=2)
+            order, hold = [], asyncio.Event()
+            tasks = [asyncio.create_task(_request(scheduler, 1, order, hold)) for _ in range(3)]
+            await _settle()
+            with pytest.raises(AIQueueFull) as per_company:
+                await scheduler.acquire(1)
+            tasks.append(asyncio.create_task(_request(scheduler, 2, order, hold)))
+            await _settle()
+            with pytest.raises(AIQueueFull) as total:
+                await scheduler.acquire(3)
+            hold.set()
+            await asyncio.gather(*tasks)
+            return per_company.value, total.value, scheduler.stats()
+
+        per_company, total, stats = _run(scenario())
+        assert per_company.retry_after >= 1 and total.retry_after >= 1
+        assert stats["rejected"] == 2 and stats["granted"] == 4
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        async def scenario():
+            scheduler = AIScheduler(max_concurrency=1)
+            order, hold = [], asyncio.Event()
+            first = asyncio.create_task(_request(scheduler, 1, order, hold))
+            waiter = asyncio.create_task(_request(scheduler, 2, order, hold))
+            await _settle()
+            waiter.cancel()
+            await _settle()
+            assert scheduler.stats()["waiting"] == 0
+            hold.set()
+            await first
+            return scheduler.stats()
+
+        stats = _run(scenario())
+        assert (stats["active"], stats["waiting"], stats["granted"]) == (0, 0, 1)
@@ -0,0 +1,75 @@
+# backend/tests/test_ai_stream.py
+
+import asyncio
+import json
+
+from app.services.ai_stream import TableRepairStream, repair_table_line, sse_answer_events
+
+
+def _feed_all(chunks):
+    repair = TableRepairStream()
+    return [repair.feed(c) for c in chunks] + [repair.flush()]
+
+
+async def _chunks(parts, fail=None):
+    for part in parts:
+        yield part
+    if fail:
+        raise fail
+
+
+def _events(chunks, on_complete=None):
+    async def collect():
+        return [e async for e in sse_answer_events(chunks, on_complete)]
+
+    parsed = []
+    for raw in asyncio.run(collect()):
+        event_line, data_line = raw.strip().split("\n")
+        parsed.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+    return parsed
+
+
+class TestTableRepairStream:
+    """Test incremental markdown table repair"""
+
+    def test_glued_rows_are_split(self):
+        assert repair_table_line("| A | B | | --- | --- | | 1 | 2 |") == "| A | B |\n| --- | --- |\n| 1 | 2 |"
+
+    def test_correct_table_is_untouched(self):
+        table = "| A | B |\n| --- | --- |\n| 1 | 2 |\n"
+        assert "".join(_feed_all([table[i:i + 3] for i in range(0, len(table), 3)])) == table
+
+    def test_prose_streams_before_newline_rows_wait(self):
+        outputs = _feed_all(["## Baş", "lık\n| A | B | ", "| --- | --- |", "\nSon"])
+        assert outputs == ["## Baş", "lık\n", "", "| A | B |\n| --- | --- |\nSon", ""]
+
+    def test_unterminated_row_is_flushed(self):
+        assert _feed_all(["| A | | --- |"]) == ["", "| A |\n| --- |"]
+
+
+class TestSSEEvents:
+    """Test SSE framing of streamed answers"""
+
+    def test_tokens_then_done(self):
+        events = _events(_chunks(["Nakit ", "yeterli.\n| a | | --- |"]))
+        assert events == [
+            ("token", {"text": "Nakit "}),
+            ("token", {"text": "yeterli.\n"}),
+            ("token", {"text": "| a |\n| --- |"}),
+            ("done", {}),
+        ]
+
+    def test_completed_answer_is_handed_over(self):
+        seen = []
+        _events(_chunks(["a\n", "| x | | --- |"]), on_complete=seen.append)
+        assert seen == ["a\n| x |\n| --- |"]
+
+    def test_upstream_error_becomes_error_event(self):
+        seen = []
+        events = _events(_chunks(["Kısmi"], fail=RuntimeError("timeout")), on_complete=seen.append)
+        assert seen == []
+        assert events == [
+            ("token", {"text": "Kısmi"}),
+            ("error", {"detail": "OpenAI isteği başarısız: timeout"}),
+            ("done", {}),
+        ]
@@ -0,0 +1,123 @@
+# backend/tests/test_combination_match.py
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.combination_match import (
+    MANY_TO_ONE,
+    ONE_TO_MANY,
+    confirm_allocations,
+    find_subsets,
+    propose_for_planned,
+    propose_for_transaction,
+)
+
+
+@pytest.fixture
+def ledger_base():
+    return date(2026, 8, 3)
+
+
+class TestFindSubsets:
+    """Test the meet-in-the-middle subset search"""
+
+    def test_exact_and_tolerance_hits(self):
+        combos, truncated = find_subsets([30000, 20000, 50000, 10000, 49800], 50000, 500)
+        assert not truncated
+        assert combos == [(2,), (0, 1), (4,)]
+
+    def test_max_parts(self):
+        combos, _ = find_subsets([100] * 6, 500, 0, max_parts=4)
+        assert combos == []
+
+    def test_deadline(self):
+        combos, truncated = find_subsets([100] * 20, 300, 0, deadline=0)
+        assert truncated
+        assert combos == []
+
+
+class TestProposals:
+    """Test proposal generation"""
+
+    def test_one_payment_settles_three_invoices(self, db, company, make_tx, make_planned):
+        tx = make_tx("t1", "3000", description="BETA LTD FT-1 FT-2 FT-3")
+        make_planned("p1", "1000", days=-5, reference_no="FT-1")
+        make_planned("p2", "1200", days=-3, reference_no="FT-2")
+        make_planned("p3", "800", days=-1, reference_no="FT-3")
+        make_planned("p4", "1500", days=-2)
+        make_planned("far", "2000", days=-60)
+        db.commit()
+
+        result = propose_for_transaction(db, company.id, tx)
+        assert result.candidates == 4
+        best = result.proposals[0]
+        assert best.kind == ONE_TO_MANY
+        assert [a["planned_item_id"] for a in best.allocations] == ["p1", "p2", "p3"]
+        assert sum(a["matched_amount"] for a in best.allocations) == Decimal("3000")
+
+    def test_invoice_paid_in_two_transfers_minus_fees(self, db, company, make_tx, make_planned):
+        item = make_planned("p1", "5000", reference_no="FT-9")
+        make_tx("t1", "2497.50", days=1, description="FT-9 1/2")
+        make_tx("t2", "2497.50", days=4, description="FT-9 2/2")
+        make_tx("t3", "4100", days=2)
+        db.commit()
+
+        result = propose_for_planned(db, company.id, item)
+        best = result.proposals[0]
+        assert best.kind == MANY_TO_ONE
+        assert sorted(a["transaction_id"] for a in best.allocations) == ["t1", "t2"]
+        assert best.as_dict()["difference"] == -5.0
+
+
+class TestConfirmAllocations:
+    """Test one-click confirmation"""
+
+    def test_confirm_settles_everything(self, db, company, make_tx, make_planned):
+        make_tx("t1", "3000")
+        make_planned("p1", "1000")
+        make_planned("p2", "2000")
+        db.commit()
+
+        confirm_allocations(db, company.id, [
+            {"planned_item_id": "p1", "transaction_id": "t1", "matched_amount": 1000},
+            {"planned_item_id": "p2", "transaction_id": "t1", "matched_amount": 2000},
+        ])
+        db.commit()
+
+        assert db.query(PlannedMatch).count() == 2
+        assert {i.status for i in db.query(PlannedCashflowItem)} == {"SETTLED"}
+        assert db.get(Transaction, "t1").match_status == "MATCHED"
+
+    def test_over_allocation_is_rejected(self, db, company, make_tx, make_planned):
+        make_tx("t1", "1000")
+        make_planned("p1", "800")
+        make_planned("p2", "800")
+        db.commit()
+
+        with pytest.raises(HTTPException) as exc:
+            confirm_allocations(db, company.id, [
+                {"planned_item_id": "p1", "transaction_id": "t1", "matched_amount": 800},
+                {"planned_item_id": "p2", "transaction_id": "t1", "matched_amount": 800},
+            ])
+        assert exc.value.status_code == 400
+        assert db.query(PlannedMatch).count() == 0
+
+    def test_duplicate_pair_is_rejected(self, db, company, make_tx, make_planned):
+        make_tx("t1", "1000")
+        make_planned("p1", "1000")
+        db.commit()
+
+        # Toplamlar sığsa da aynı çift iki satır üretmemeli
+        with pytest.raises(HTTPException) as exc:
+            confirm_allocations(db, company.id, [
+                {"planned_item_id": "p1", "transaction_id": "t1", "matched_amount": 400},
+                {"planned_item_id": "p1", "transaction_id": "t1", "matched_amount": 400},
+            ])
+        assert exc.value.status_code == 400
+        assert db.query(PlannedMatch).count() == 0
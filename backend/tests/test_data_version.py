@@ -0,0 +1,76 @@
+# backend/tests/test_data_version.py
+
+from sqlalchemy import update
+
+from app.models.transaction import Transaction
+from app.services.data_version import changed_rows, get_data_version
+
+
+class TestBumpOnCommit:
+    """Test that versions move only when writes are committed"""
+
+    def test_flush_does_not_bump_until_commit(self, db, company, make_tx):
+        version = get_data_version(company.id)
+        make_tx("t1", "10")
+        db.flush()
+        assert get_data_version(company.id) == version
+
+        db.commit()
+        assert get_data_version(company.id) != version
+
+    def test_bulk_statement_bumps_on_commit(self, db, company, make_tx):
+        make_tx("t1", "10")
+        db.commit()
+        version = get_data_version(company.id, ("transactions",))
+
+        db.execute(
+            update(Transaction).where(Transaction.id == "t1").values(description="Y")
+            .execution_options(data_version_company_id=company.id)
+        )
+        assert get_data_version(company.id, ("transactions",)) == version
+        db.commit()
+        assert get_data_version(company.id, ("transactions",)) != version
+
+    def test_rollback_and_close_drop_pending_writes(self, db, company, make_tx):
+        version = get_data_version(company.id)
+        make_tx("t1", "10")
+        db.flush()
+        db.rollback()
+        make_tx("t2", "10")
+        db.flush()
+        db.close()
+
+        # Sonraki transaction'ın commit'i önceki yazımları taşımaz
+        db.commit()
+        assert get_data_version(company.id) == version
+
+
+class TestChangedRows:
+    """Test the per-company change log"""
+
+    def test_ids_of_flushed_and_bulk_writes(self, db, company, make_tx):
+        since = get_data_version(company.id)
+        make_tx("t1", "10")
+        db.commit()
+        db.execute(
+            update(Transaction).where(Transaction.id == "t1").values(description="Y")
+            .execution_options(data_version_company_id=company.id, data_version_row_ids=["t1"])
+        )
+        make_tx("t2", "10")
+        db.commit()
+
+        version, changes = changed_rows(company.id, since, ("transactions", "planned_cashflow_items"))
+        assert version == get_data_version(company.id)
+        assert changes == {"transactions": {"t1", "t2"}, "planned_cashflow_items": set()}
+
+    def test_bulk_write_without_ids_is_unknown(self, db, company, make_tx):
+        make_tx("t1", "10")
+        db.commit()
+        since = get_data_version(company.id)
+        db.execute(
+            update(Transaction).where(Transaction.id == "t1").values(description="Y")
+            .execution_options(data_version_company_id=company.id)
+        )
+        db.commit()
+
+        assert changed_rows(company.id, since, ("transactions",))[1] is None
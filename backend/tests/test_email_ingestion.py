@@ -0,0 +1,34 @@
+# backend/tests/test_email_ingestion.py
+
+import uuid
+from decimal import Decimal
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.data_version import get_data_version
+from app.services.email_ingestion import email_ingestion_service
+
+
+class TestRollbackEmailTransactions:
+    """Test that an attachment rollback unwinds its matches"""
+
+    def test_matches_are_removed_and_items_reopened(self, db, company, make_tx, make_planned):
+        attachment_id = uuid.uuid4()
+        make_planned("p1", "300", remaining="100", status="PARTIAL")
+        make_tx("t1", "200", source="EMAIL", source_id=attachment_id)
+        make_tx("t2", "50")
+        db.add(PlannedMatch(company_id=company.id, planned_item_id="p1", transaction_id="t1",
+                            matched_amount=Decimal("200"), match_type="AUTO"))
+        db.commit()
+        version = get_data_version(company.id)
+
+        result = email_ingestion_service.rollback_email_transactions(db, attachment_id, company.id)
+
+        assert result["transactions_deleted"] == 1
+        assert [tx.id for tx in db.query(Transaction)] == ["t2"]
+        assert db.query(PlannedMatch).count() == 0
+        item = db.get(PlannedCashflowItem, "p1")
+        db.refresh(item)
+        assert (item.status, float(item.settled_amount), float(item.remaining_amount)) == ("OPEN", 0, 300)
+        assert get_data_version(company.id) != version
@@ -0,0 +1,56 @@
+# backend/tests/test_fast_json.py
+
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app.core import fast_json
+from app.models.transaction import TransactionSchema, transaction_row_to_dict
+
+
+def _pydantic_bytes(model) -> bytes:
+    # FastAPI response_model yolu: mode="json" dump + json.dumps
+    return json.dumps(
+        model.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+ROWS = [
+    ("t1", date(2026, 1, 2), "ÖDEME ACME", Decimal("11550.00"), "out", None, "MANUAL",
+     datetime(2026, 1, 2, 3, 4, 5)),
+    ("t2", date(2026, 1, 3), "EFT", Decimal("0.10"), "in", "DIGER_GELIR", "EMAIL",
+     datetime(2026, 1, 2, 3, 4, 5, 120, tzinfo=timezone.utc)),
+    ("t3", date(2026, 1, 4), "POS", Decimal("-5.5"), "out", "KIRA", "MANUAL",
+     datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=3)))),
+]
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson" and not fast_json.ORJSON_AVAILABLE:
+        pytest.skip("orjson not installed")
+    if request.param == "stdlib":
+        monkeypatch.setattr(fast_json, "ORJSON_AVAILABLE", False)
+    return fast_json.dumps
+
+
+class TestFastJson:
+    """Fast path must produce the same bytes as the Pydantic path"""
+
+    @pytest.mark.parametrize("row", ROWS, ids=lambda r: r[0])
+    def test_transaction_row_matches_schema(self, encoder, row):
+        fields = ("id", "date", "description", "amount", "direction", "category", "source", "created_at")
+        model = TransactionSchema(**dict(zip(fields, row)))
+        assert encoder(transaction_row_to_dict(row)) == _pydantic_bytes(model)
+
+    def test_list_and_floats(self, encoder):
+        content = [{"date": date(2026, 1, 1), "income": 100.0, "net": -0.30000000000000004}]
+        expected = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+        assert encoder(content) == expected
+
+    def test_missing_created_at_defaults_to_now(self):
+        row = ROWS[0][:-1] + (None,)
+        assert isinstance(transaction_row_to_dict(row)["created_at"], datetime)
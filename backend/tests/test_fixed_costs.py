@@ -0,0 +1,79 @@
+# backend/tests/test_fixed_costs.py
+
+from datetime import date
+from decimal import Decimal
+
+from app.models.transaction import Transaction
+from app.services.fixed_costs import (
+    resolve_fixed_cost_windows,
+    compute_fixed_cost_totals,
+    detect_fixed_cost_anomalies,
+)
+
+
+def add_tx(db, company_id, d, amount, category, direction="out"):
+    db.add(Transaction(
+        date=d,
+        description=f"{category} {d}",
+        amount=Decimal(str(amount)),
+        direction=direction,
+        category=category,
+        company_id=company_id,
+    ))
+
+
+class TestFixedCostWindows:
+    """Test period window resolution"""
+
+    def test_current_month(self):
+        w = resolve_fixed_cost_windows("current_month", date(2026, 3, 15))
+        assert w["period_start"] == date(2026, 3, 1)
+        assert w["period_end"] == date(2026, 3, 15)
+        assert w["comparison_start"] == date(2026, 2, 1)
+
+    def test_unknown_period_falls_back_to_current_month(self):
+        today = date(2026, 3, 15)
+        assert resolve_fixed_cost_windows("xyz", today) == resolve_fixed_cost_windows("current_month", today)
+
+
+class TestFixedCostTotals:
+    """Test the single-query aggregation"""
+
+    def test_period_comparison_and_months(self, db, company):
+        today = date(2026, 3, 15)
+        add_tx(db, company.id, date(2026, 3, 5), 1000, "KIRA")
+        add_tx(db, company.id, date(2026, 2, 5), 800, "KIRA")
+        add_tx(db, company.id, date(2026, 1, 5), 800, "KIRA")
+        add_tx(db, company.id, date(2026, 3, 2), 300, "ELEKTRIK")
+        # Ignored: income, non-fixed category, other company
+        add_tx(db, company.id, date(2026, 3, 5), 999, "KIRA", direction="in")
+        add_tx(db, company.id, date(2026, 3, 5), 999, "DIGER_GIDER")
+        add_tx(db, company.id + 1, date(2026, 3, 5), 999, "KIRA")
+        db.commit()
+
+        w = resolve_fixed_cost_windows("current_month", today)
+        totals = compute_fixed_cost_totals(db, company.id, today=today, **w)
+
+        assert set(totals) == {"KIRA", "ELEKTRIK"}
+        assert totals["KIRA"]["current"] == 1000
+        assert totals["KIRA"]["comparison"] == 800
+        assert totals["KIRA"]["months"] == {"2026-03": 1000, "2026-02": 800, "2026-01": 800}
+        assert totals["ELEKTRIK"]["comparison"] == 0
+
+    def test_anomaly_detection_on_totals(self, db, company):
+        today = date(2026, 3, 15)
+        add_tx(db, company.id, date(2026, 3, 5), 1000, "KIRA")
+        add_tx(db, company.id, date(2026, 2, 5), 800, "KIRA")
+        add_tx(db, company.id, date(2026, 3, 5), 105, "SU")
+        add_tx(db, company.id, date(2026, 2, 5), 100, "SU")
+        db.commit()
+
+        w = resolve_fixed_cost_windows("current_month", today)
+        results = {r["category"]: r for r in detect_fixed_cost_anomalies(
+            compute_fixed_cost_totals(db, company.id, today=today, **w)
+        )}
+
+        assert results["KIRA"]["status"] == "alert"
+        assert results["KIRA"]["change_percentage"] == 25.0
+        assert results["SU"]["status"] == "normal"
+        assert results["SU"]["months"][0] == {"month": "2026-03", "amount": 105.0}
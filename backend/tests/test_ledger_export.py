@@ -0,0 +1,71 @@
+# backend/tests/test_ledger_export.py
+
+import csv
+import io
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from app.models.transaction import Transaction
+from app.services.ledger_export import (
+    EXPORT_COLUMNS,
+    EXPORT_FIELDS,
+    iter_csv,
+    iter_ndjson,
+    iter_parquet,
+)
+
+
+@pytest.fixture
+def ledger(db, company):
+    start = date(2026, 1, 1)
+    for i in range(23):
+        db.add(Transaction(
+            id=f"tx-{i:03d}",
+            date=start + timedelta(days=i),
+            description=f"Ödeme, \"{i}\"",
+            amount=Decimal(f"{i}.25"),
+            direction="in" if i % 2 else "out",
+            category=None if i % 5 == 0 else "DIGER_GIDER",
+            company_id=company.id,
+        ))
+    db.commit()
+    return select(*EXPORT_COLUMNS).where(
+        Transaction.company_id == company.id
+    ).order_by(Transaction.date, Transaction.id)
+
+
+class TestLedgerExport:
+    """Test chunked export encoders"""
+
+    def test_csv_chunks_and_roundtrip(self, db, ledger):
+        chunks = list(iter_csv(db, ledger, chunk_size=5))
+        assert len(chunks) == 5  # header + first chunk together, then one per chunk
+
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+        assert tuple(rows[0]) == EXPORT_FIELDS
+        assert len(rows) == 24
+        assert rows[1][:5] == ["tx-000", "2026-01-01", "Ödeme, \"0\"", "0.25", "out"]
+        assert rows[1][5] == ""
+
+    def test_ndjson_one_object_per_line(self, db, ledger):
+        lines = b"".join(iter_ndjson(db, ledger, chunk_size=7)).decode("utf-8").splitlines()
+        assert len(lines) == 23
+        first = json.loads(lines[0])
+        assert first["id"] == "tx-000"
+        assert first["amount"] == 0.25
+        assert first["category"] is None
+
+    def test_parquet_row_group_per_chunk(self, db, ledger):
+        pq = pytest.importorskip("pyarrow.parquet")
+        data = b"".join(iter_parquet(db, ledger, chunk_size=10))
+
+        parquet_file = pq.ParquetFile(io.BytesIO(data))
+        assert parquet_file.metadata.num_rows == 23
+        assert parquet_file.metadata.num_row_groups == 3
+        table = parquet_file.read()
+        assert table.column("amount")[3].as_py() == Decimal("3.25")
+        assert table.column("date")[0].as_py() == date(2026, 1, 1)
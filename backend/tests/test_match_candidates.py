@@ -0,0 +1,76 @@
+# backend/tests/test_match_candidates.py
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.models.planned_match import PlannedMatch
+from app.services.match_candidates import (
+    nearest_amount_candidates,
+    retrieve_candidates,
+    score_candidate,
+    suggest_matches,
+)
+from app.services.transaction_match_state import refresh_transaction_match_state
+
+
+@pytest.fixture
+def ledger_base():
+    return date(2026, 5, 4)
+
+
+class TestNearestAmountCandidates:
+    """Test the two-sided amount walk"""
+
+    def test_merges_both_sides_by_distance(self, db, company, make_tx):
+        for tx_id, amount in [("a", "90"), ("b", "99"), ("c", "100.5"), ("d", "101.5"), ("e", "130")]:
+            make_tx(tx_id, amount)
+        db.commit()
+
+        rows = nearest_amount_candidates(db, company.id, "out", Decimal("100"), 3)
+        assert [tx.id for tx in rows] == ["c", "b", "d"]
+
+    def test_upper_bound_and_matched_rows_are_excluded(self, db, company, make_tx):
+        make_tx("a", "100")
+        make_tx("b", "101")
+        make_tx("c", "103")
+        db.add(PlannedMatch(company_id=company.id, planned_item_id="other", transaction_id="a",
+                            matched_amount=Decimal("100"), match_type="MANUAL"))
+        db.flush()
+        refresh_transaction_match_state(db, company.id, ["a"])
+        db.commit()
+
+        rows = nearest_amount_candidates(db, company.id, "out", Decimal("100"), 5, upper=Decimal("102"))
+        assert [tx.id for tx in rows] == ["b"]
+
+
+class TestSuggestMatches:
+    """Test candidate retrieval and scoring"""
+
+    def test_amount_and_text_candidates_are_scored(self, db, company, make_tx, make_planned):
+        item = make_planned("p1", "2500", counterparty="Acme Lojistik", reference_no="FTR-77")
+        make_tx("exact", "2500", days=1)
+        make_tx("text", "900", days=40, description="ACME LOJISTIK FTR-77 odeme")
+        make_tx("far", "2500", days=30)
+        make_tx("income", "2500", days=0, direction="in")
+        db.commit()
+
+        out = suggest_matches(db, company.id, item)
+        assert [s["transaction_id"] for s in out] == ["text", "exact"]
+        assert out[0]["score"] == 18 + 58
+        assert out[1]["score"] == 30 + 12
+        assert out[0]["suggested_match_amount"] == 900.0
+
+    def test_fallback_ignores_date_window(self, db, company, make_tx, make_planned):
+        item = make_planned("p1", "100")
+        make_tx("late", "100", days=60)
+        db.commit()
+
+        assert [tx.id for tx in retrieve_candidates(db, company.id, item)] == ["late"]
+
+    def test_text_score_folds_turkish_letters(self, db, company, make_tx, make_planned):
+        item = make_planned("p1", "100", counterparty="Işık İnşaat Ödeme", reference_no="ftr-77")
+        tx = make_tx("t1", "40", days=30, description="EFT ISIK INSAAT ODEME FTR 77")
+
+        assert score_candidate(item, 100.0, tx) == 18 + 58
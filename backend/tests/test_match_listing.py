@@ -0,0 +1,80 @@
+# backend/tests/test_match_listing.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.match_listing import (
+    match_list_query,
+    match_row_to_dict,
+    planned_match_row_to_dict,
+    transaction_match_row_to_dict,
+)
+
+BASE = date(2026, 7, 1)
+
+
+def _seed(db, company, n=5):
+    for i in range(n):
+        db.add(Transaction(id=f"t{i}", date=BASE + timedelta(days=i), description=f"ODEME {i}",
+                           amount=Decimal("100"), direction="out", company_id=company.id))
+        db.add(PlannedCashflowItem(id=f"p{i}", type="INVOICE", direction="out", amount=Decimal("100"),
+                                   remaining_amount=Decimal("0"), settled_amount=Decimal("100"),
+                                   due_date=BASE, status="SETTLED" if i % 2 else "PARTIAL",
+                                   counterparty="ACME", company_id=company.id))
+        db.add(PlannedMatch(company_id=company.id, planned_item_id=f"p{i}", transaction_id=f"t{i}",
+                            matched_amount=Decimal("100"), match_type="AUTO" if i % 2 else "MANUAL"))
+    db.commit()
+
+
+class TestMatchListQuery:
+    """Test the joined match listing"""
+
+    def test_single_query(self, db, company):
+        _seed(db, company)
+        company_id = company.id
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.get_bind(), "before_cursor_execute", listener)
+        try:
+            rows = match_list_query(db, company_id).order_by(PlannedMatch.id).all()
+            out = [match_row_to_dict(row) for row in rows]
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        assert len(out) == 5
+        assert out[0]["planned_counterparty"] == "ACME"
+        assert out[0]["transaction_description"] == "ODEME 0"
+        assert out[0]["transaction_date"] == BASE.isoformat()
+
+    def test_filters(self, db, company):
+        _seed(db, company)
+        ids = lambda q: sorted(row.transaction_id for row in q.all())
+
+        assert ids(match_list_query(db, company.id, match_type="AUTO")) == ["t1", "t3"]
+        assert ids(match_list_query(db, company.id, planned_status="PARTIAL")) == ["t0", "t2", "t4"]
+        assert ids(match_list_query(
+            db, company.id, start_date=BASE + timedelta(days=1), end_date=BASE + timedelta(days=2)
+        )) == ["t1", "t2"]
+        assert ids(match_list_query(db, company.id + 1)) == []
+
+    def test_missing_planned_item(self, db, company):
+        _seed(db, company, n=1)
+        db.add(PlannedMatch(company_id=company.id, planned_item_id="gone", transaction_id="t0",
+                            matched_amount=Decimal("5"), match_type="MANUAL"))
+        db.commit()
+
+        rows = match_list_query(db, company.id).order_by(PlannedMatch.id).all()
+        assert match_row_to_dict(rows[1])["planned_status"] == ""
+        assert len(match_list_query(db, company.id, inner=True).all()) == 1
+
+    def test_nested_shapes(self, db, company):
+        _seed(db, company, n=1)
+        row = match_list_query(db, company.id).one()
+        assert transaction_match_row_to_dict(row)["planned_item"]["status"] == "PARTIAL"
+        assert planned_match_row_to_dict(row)["transaction"]["description"] == "ODEME 0"
@@ -0,0 +1,83 @@
+# backend/tests/test_matching_health.py
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.models.planned_match import PlannedMatch
+from app.services.matching_health import (
+    compute_matching_health,
+    get_matching_health,
+    list_matching_exceptions,
+)
+
+TODAY = date(2026, 3, 15)
+
+
+@pytest.fixture
+def ledger_base():
+    return TODAY
+
+
+@pytest.fixture
+def seeded(db, company, make_tx, make_planned):
+    make_planned("overdue", "100", days=-3)
+    make_planned("overdue_partial", "300", days=-1, status="PARTIAL", remaining="200")
+    make_planned("upcoming", "50", days=14)
+    make_planned("later", "70", days=15)
+    make_planned("settled", "40", days=2, status="SETTLED", remaining="0")
+    for planned_item_id, tx_id, amount, match_type in [
+        ("settled", "t1", "40", "AUTO"),
+        ("overdue_partial", "t2", "100", "MANUAL"),
+        ("gone", "t3", "10", "MANUAL"),   # planlı kalemi silinmiş
+    ]:
+        make_tx(tx_id, amount)
+        db.add(PlannedMatch(planned_item_id=planned_item_id, transaction_id=tx_id,
+                            matched_amount=Decimal(amount), match_type=match_type, company_id=company.id))
+    db.commit()
+
+
+class TestMatchingHealth:
+    """Test the two-query matching health aggregate"""
+
+    def test_counts_and_sums(self, db, company, seeded):
+        health = compute_matching_health(db, company.id, TODAY)
+
+        assert health["auto_matched"] == 1
+        assert health["auto_matched_amount"] == 40
+        # PARTIAL kalemin ve silinmiş kalemin manuel eşleşmesi manuel kartında sayılmaz
+        assert health["manual_matched"] == 0
+        assert health["manual_matched_all"] == 2
+        assert (health["unmatched_overdue"], health["unmatched_overdue_amount"]) == (2, 300)
+        assert (health["unmatched_upcoming_14d"], health["unmatched_upcoming_14d_amount"]) == (1, 50)
+        assert (health["partial_planned"], health["partial_remaining_amount"]) == (1, 200)
+        assert (health["open_planned"], health["open_remaining_amount"]) == (4, 420)
+
+    def test_two_queries(self, db, company, seeded):
+        company_id = company.id
+        statements = []
+        event.listen(db.get_bind(), "before_cursor_execute",
+                     lambda conn, cursor, stmt, *args: statements.append(stmt))
+
+        compute_matching_health(db, company_id, TODAY)
+        assert len(statements) == 2
+
+    def test_cached_until_data_changes(self, db, company, seeded, make_planned):
+        first = get_matching_health(db, company.id, TODAY)
+        assert get_matching_health(db, company.id, TODAY) is first
+
+        make_planned("new", "25", days=-1)
+        db.commit()
+        assert get_matching_health(db, company.id, TODAY)["unmatched_overdue"] == 3
+
+    def test_exception_lists_match_counts(self, db, company, seeded):
+        health = compute_matching_health(db, company.id, TODAY)
+
+        overdue = list_matching_exceptions(db, company.id, "overdue", TODAY)
+        assert [i["id"] for i in overdue] == ["overdue", "overdue_partial"]
+        assert len(overdue) == health["unmatched_overdue"]
+        assert len(list_matching_exceptions(db, company.id, "upcoming14", TODAY)) == 1
+        assert list_matching_exceptions(db, company.id, "partial", TODAY)[0]["remaining_amount"] == 200
+        assert list_matching_exceptions(db, company.id, "bogus", TODAY) is None
@@ -0,0 +1,200 @@
+# backend/tests/test_matching_index.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.planned_recurrence import PlannedRecurrence
+from app.models.transaction import Transaction
+from app.services import matching_index
+from app.services.auto_match import auto_match_transaction
+from app.routes.matches import planned_match_proposals, planned_match_suggestions
+from app.services.match_candidates import suggest_matches
+from app.services.matching_index import get_matching_index
+
+BASE = date(2026, 3, 10)
+
+
+def _count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, stmt, *args: statements.append(stmt))
+    return statements
+
+
+class TestMatchingIndex:
+    """Test the cached per-company planned item buckets"""
+
+    def test_buckets_by_direction_and_cents(self, db, company, make_planned):
+        make_planned("p1", "100.00", days=0)
+        make_planned("p2", "100.01", days=0)
+        make_planned("p3", "100.00", days=0, direction="in")
+        db.commit()
+
+        index = get_matching_index(db, company.id)
+        assert len(index) == 3
+        assert index.pick("out", Decimal("100"), BASE, "")[0].id == "p1"
+        assert index.pick("in", Decimal("100"), BASE, "")[0].id == "p3"
+        assert index.pick("out", Decimal("100.02"), BASE, "") == (None, False)
+
+    def test_transactions_do_not_invalidate(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=0)
+        db.commit()
+        index = get_matching_index(db, company.id)
+
+        make_tx("t1", "55", commit=True)
+        assert get_matching_index(db, company.id) is index
+
+        make_planned("p2", "55", days=0)
+        db.commit()
+        rebuilt = get_matching_index(db, company.id)
+        assert rebuilt is not index
+        assert rebuilt.pick("out", Decimal("55"), BASE, "")[0].id == "p2"
+
+    def test_lru_eviction(self, db, company, monkeypatch):
+        monkeypatch.setattr(matching_index, "MATCHING_INDEX_MAX_COMPANIES", 2)
+        for company_id in (company.id, 9001, 9002):
+            get_matching_index(db, company_id)
+        assert list(matching_index._cache) == [9001, 9002]
+
+
+class TestFind:
+    """Test planned item lookups for suggestion requests"""
+
+    def test_open_item_without_query(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100.50", days=3, reference_no="FTR-9")
+        db.commit()
+        make_tx("t1", "100.50", days=4, description="FTR-9 ODEME", commit=True)
+        index = get_matching_index(db, company.id)
+
+        statements = _count_queries(db)
+        item = index.find("p1")
+        assert statements == []
+        assert (item.direction, item.remaining_amount, item.due_date, item.reference_no) == (
+            "out", Decimal("100.50"), BASE + timedelta(days=3), "FTR-9"
+        )
+        assert suggest_matches(db, company.id, item) == suggest_matches(
+            db, company.id, db.get(PlannedCashflowItem, "p1")
+        )
+        assert index.find("missing") is None
+
+    def test_occurrences(self, db, company):
+        db.add(PlannedRecurrence(id="r1", type="OTHER", direction="out", amount=Decimal("750"),
+                                 counterparty="Ev sahibi", frequency="MONTHLY", interval=1,
+                                 start_date=BASE, occurrence_count=2, status="ACTIVE",
+                                 company_id=company.id))
+        db.commit()
+        index = get_matching_index(db, company.id)
+
+        occurrence = index.find("rec:r1:1")
+        assert (occurrence.due_date, occurrence.remaining_amount) == (date(2026, 4, 10), Decimal("750"))
+        # Kuralın sınırı dışı ya da bilinmeyen kural
+        assert index.find("rec:r1:2") is None
+        assert index.find("rec:r9:0") is None
+
+    def test_settled_item_leaves_index(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=0)
+        db.commit()
+        get_matching_index(db, company.id)
+
+        auto_match_transaction(db, make_tx("t1", "100", commit=True), company.id)
+        assert get_matching_index(db, company.id).find("p1") is None
+
+
+class TestSuggestionRoutes:
+    """Test that the index is only a fast path for suggestion routes"""
+
+    def test_item_created_after_index_build(self, db, company, make_tx):
+        get_matching_index(db, company.id)
+        make_tx("t1", "100", days=1, commit=True)
+        # Başka bir instance yazmış gibi: versiyon değişmeden satır eklenir
+        db.connection().execute(PlannedCashflowItem.__table__.insert().values(
+            id="p1", type="INVOICE", direction="out", amount=Decimal("100"),
+            remaining_amount=Decimal("100"), settled_amount=0, due_date=BASE,
+            status="OPEN", company_id=company.id,
+        ))
+        db.commit()
+
+        out = planned_match_suggestions("p1", db, company)
+        assert [s["transaction_id"] for s in out["suggestions"]] == ["t1"]
+        assert planned_match_proposals("p1", db, company).status_code == 200
+        with pytest.raises(HTTPException) as exc:
+            planned_match_suggestions("missing", db, company)
+        assert exc.value.status_code == 404
+
+    def test_remaining_amount_is_read_from_row(self, db, company, make_planned):
+        make_planned("p1", "100", days=0)
+        db.commit()
+        get_matching_index(db, company.id)
+        db.connection().execute(
+            PlannedCashflowItem.__table__.update()
+            .where(PlannedCashflowItem.id == "p1")
+            .values(remaining_amount=Decimal("40"), settled_amount=Decimal("60"), status="PARTIAL")
+        )
+        db.commit()
+
+        assert planned_match_suggestions("p1", db, company)["remaining_amount"] == 40.0
+
+
+class TestAutoMatchWithIndex:
+    """Test auto_match_transaction on top of the index"""
+
+    def test_no_candidate_costs_no_query(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=0)
+        db.commit()
+        get_matching_index(db, company.id)
+        tx = make_tx("t1", "250", commit=True)
+        # commit sonrası expire olan nesneleri sayıma katmamak için değerler önceden okunur
+        company_id = company.id
+        probe = Transaction(id=tx.id, date=tx.date, amount=tx.amount, direction="out", description="ODEME")
+
+        statements = _count_queries(db)
+        assert auto_match_transaction(db, probe, company_id) == []
+        assert statements == []
+
+    def test_match_updates_index_in_place(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=0)
+        make_planned("p2", "100", days=20)
+        db.commit()
+        index = get_matching_index(db, company.id)
+
+        created = auto_match_transaction(db, make_tx("t1", "100", days=1, commit=True), company.id)
+        assert [m.planned_item_id for m in created] == ["p1"]
+        assert get_matching_index(db, company.id) is index
+        assert len(index) == 1
+
+        # p1 kapandı: aynı tutardaki ikinci işlem p1'e eşleşmez
+        assert auto_match_transaction(db, make_tx("t2", "100", days=1, commit=True), company.id) == []
+        assert db.query(PlannedMatch).count() == 1
+
+    def test_stale_index_is_rebuilt(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=0)
+        make_planned("p2", "80", days=0)
+        db.commit()
+        index = get_matching_index(db, company.id)
+
+        # Başka bir instance p1'i kapatmış gibi: versiyon değişmeden satır güncellenir
+        db.connection().execute(
+            PlannedCashflowItem.__table__.update()
+            .where(PlannedCashflowItem.id == "p1")
+            .values(remaining_amount=Decimal("80"), settled_amount=Decimal("20"), status="PARTIAL")
+        )
+        db.commit()
+        assert get_matching_index(db, company.id) is index
+
+        tx = make_tx("t1", "100", days=0, commit=True)
+        assert auto_match_transaction(db, tx, company.id) == []
+        assert get_matching_index(db, company.id) is not index
+
+    def test_ambiguous_is_skipped(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=-2)
+        make_planned("p2", "100", days=2)
+        db.commit()
+
+        assert auto_match_transaction(db, make_tx("t1", "100", commit=True), company.id) == []
+        assert db.query(PlannedMatch).count() == 0
@@ -0,0 +1,102 @@
+# backend/tests/test_monte_carlo_forecast.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+
+from app.models.transaction import Transaction
+from app.models.planned_item import PlannedCashflowItem
+from app.services.monte_carlo_forecast import (
+    SlipDistribution,
+    simulate_cash_paths,
+    load_daily_net_history,
+    load_planned_flows,
+)
+
+
+class TestSimulation:
+    """Test the vectorized path simulation"""
+
+    def test_constant_history_is_deterministic(self):
+        result = simulate_cash_paths(
+            history_daily_net=np.array([100.0]),
+            start_balance=1000.0,
+            planned_days=np.array([2]),
+            planned_amounts=np.array([-5000.0]),
+            horizon_days=5,
+            n_paths=200,
+            seed=1,
+        )
+        expected = [1100, 1200, -3700, -3600, -3500]
+        assert np.allclose(result["p10"], expected)
+        assert np.allclose(result["p50"], expected)
+        assert np.allclose(result["p90"], expected)
+        assert list(result["prob_negative"]) == [0, 0, 1, 1, 1]
+        assert result["prob_negative_any"] == 1.0
+
+    def test_bands_are_ordered(self):
+        rng = np.random.default_rng(0)
+        result = simulate_cash_paths(
+            history_daily_net=rng.normal(0, 1000, 365),
+            start_balance=10000.0,
+            planned_days=np.array([]),
+            planned_amounts=np.array([]),
+            horizon_days=60,
+            n_paths=2000,
+            seed=2,
+        )
+        assert np.all(result["p10"] <= result["p50"])
+        assert np.all(result["p50"] <= result["p90"])
+        assert 0 <= result["prob_negative"][-1] <= 1
+
+    def test_slip_moves_planned_item_later(self):
+        slip = SlipDistribution.from_samples([3] * 10)
+        result = simulate_cash_paths(
+            history_daily_net=np.array([0.0]),
+            start_balance=100.0,
+            planned_days=np.array([1]),
+            planned_amounts=np.array([-500.0]),
+            horizon_days=6,
+            n_paths=100,
+            planned_slip=["out"],
+            slip_distributions={"out": slip},
+            seed=3,
+        )
+        assert list(result["prob_negative"]) == [0, 0, 0, 0, 1, 1]
+
+    def test_slip_beyond_horizon_drops_item(self):
+        slip = SlipDistribution.from_samples([30] * 10)
+        result = simulate_cash_paths(
+            np.array([0.0]), 100.0, np.array([1]), np.array([-500.0]),
+            horizon_days=5, n_paths=50,
+            planned_slip=["out"], slip_distributions={"out": slip},
+        )
+        assert result["prob_negative_any"] == 0.0
+
+
+class TestLoaders:
+    """Test history and planned-item loading"""
+
+    def test_history_includes_zero_days(self, db, company):
+        today = date(2026, 3, 15)
+        db.add(Transaction(date=today - timedelta(days=2), description="a", amount=Decimal("100"),
+                           direction="in", company_id=company.id))
+        db.add(Transaction(date=today, description="b", amount=Decimal("40"),
+                           direction="out", company_id=company.id))
+        db.commit()
+
+        history = load_daily_net_history(db, company.id, today)
+        assert list(history) == [100.0, 0.0, -40.0]
+
+    def test_overdue_planned_items_start_today(self, db, company):
+        today = date(2026, 3, 15)
+        for due, direction in ((today - timedelta(days=5), "out"), (today + timedelta(days=3), "in")):
+            db.add(PlannedCashflowItem(type="INVOICE", direction=direction, amount=Decimal("10"),
+                                       remaining_amount=Decimal("10"), settled_amount=0,
+                                       due_date=due, status="OPEN", company_id=company.id))
+        db.commit()
+
+        days, amounts, directions = load_planned_flows(db, company.id, today, 30)
+        assert sorted(zip(days.tolist(), amounts.tolist())) == [(0, -10.0), (3, 10.0)]
+        assert sorted(directions) == ["in", "out"]
@@ -0,0 +1,84 @@
+# backend/tests/test_pagination.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import keyset_page, count_total, encode_cursor, decode_cursor
+from app.models.transaction import Transaction
+
+
+def _seed(db, company, n=25):
+    start = date(2026, 1, 1)
+    for i in range(n):
+        # Üç işlem aynı güne düşer; id ile sıralama eşitliği bozar
+        db.add(Transaction(
+            id=f"tx-{i:03d}",
+            date=start + timedelta(days=i // 3),
+            description=f"tx {i}",
+            amount=Decimal(i + 1),
+            direction="in" if i % 2 else "out",
+            company_id=company.id,
+        ))
+    db.commit()
+
+
+class TestKeysetPage:
+    """Test cursor pagination over (date, id)"""
+
+    def test_pages_cover_all_rows_once_in_order(self, db, company):
+        _seed(db, company)
+        base = db.query(Transaction).filter(Transaction.company_id == company.id)
+
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = keyset_page(
+                base, Transaction.date, Transaction.id,
+                limit=7, cursor=cursor, parse_sort=date.fromisoformat,
+            )
+            seen.extend(rows)
+            if cursor is None:
+                break
+
+        assert len(seen) == 25
+        assert len({t.id for t in seen}) == 25
+        keys = [(t.date, t.id) for t in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_ascending_and_filters(self, db, company):
+        _seed(db, company)
+        base = db.query(Transaction).filter(
+            Transaction.company_id == company.id,
+            Transaction.direction == "in",
+        )
+        first, cursor = keyset_page(base, Transaction.date, Transaction.id,
+                                    limit=10, descending=False, parse_sort=date.fromisoformat)
+        rest, last_cursor = keyset_page(base, Transaction.date, Transaction.id,
+                                        limit=10, cursor=cursor, descending=False,
+                                        parse_sort=date.fromisoformat)
+        assert [t.id for t in first + rest] == [f"tx-{i:03d}" for i in range(1, 25, 2)]
+        assert last_cursor is None
+        assert count_total(base) == 12
+
+    def test_exact_page_has_no_next_cursor(self, db, company):
+        _seed(db, company, n=5)
+        base = db.query(Transaction).filter(Transaction.company_id == company.id)
+        rows, cursor = keyset_page(base, Transaction.date, Transaction.id, limit=5)
+        assert len(rows) == 5
+        assert cursor is None
+
+
+class TestCursorCodec:
+    """Test cursor encoding"""
+
+    def test_roundtrip(self):
+        cursor = encode_cursor(date(2026, 2, 3), "abc")
+        assert decode_cursor(cursor, date.fromisoformat) == (date(2026, 2, 3), "abc")
+
+    def test_invalid_cursor_is_400(self):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor("not-a-cursor")
+        assert exc.value.status_code == 400
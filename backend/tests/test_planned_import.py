@@ -0,0 +1,128 @@
+# backend/tests/test_planned_import.py
+
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.planned_import import IMPORT_ERROR_LIMIT, import_planned_items
+
+HEADER = "type,direction,amount,due_date,counterparty,reference_no\n"
+
+
+def _csv(*lines):
+    return (HEADER + "\n".join(lines) + "\n").encode("utf-8")
+
+
+class TestValidation:
+    """Test vectorized row validation"""
+
+    def test_valid_and_rejected_rows(self, db, company):
+        content = _csv(
+            "invoice,IN,\"1250,50\",2026-03-10,Acme,FTR-1",
+            "PO,out,abc,2026-03-11,Beta,",
+            "CHEQUE,out,10,2026-03-12,Gamma,",
+            "OTHER,out,-5,2026-03-13,Delta,",
+            "OTHER,sideways,5,2026-03-14,Eps,",
+            "OTHER,out,5,13/03/2026,Zeta,",
+        )
+        result = import_planned_items(db, company.id, "plan.csv", content)
+        db.commit()
+
+        assert (result.inserted, result.rejected) == (1, 5)
+        assert result.errors == [
+            "Satır 2: amount sayı olmalı",
+            "Satır 3: type sadece 'INVOICE', 'PO' veya 'OTHER' olabilir",
+            "Satır 4: amount pozitif olmalı",
+            "Satır 5: direction sadece 'in' veya 'out' olabilir",
+            "Satır 6: due_date YYYY-MM-DD formatında olmalı",
+        ]
+        item = db.query(PlannedCashflowItem).one()
+        assert (item.type, item.direction, item.amount, item.due_date, item.reference_no) == (
+            "INVOICE", "in", Decimal("1250.50"), date(2026, 3, 10), "FTR-1",
+        )
+        assert (item.status, item.remaining_amount, item.source) == ("OPEN", Decimal("1250.50"), "csv")
+
+    def test_missing_column_and_unknown_format(self, db, company):
+        with pytest.raises(HTTPException) as exc:
+            import_planned_items(db, company.id, "plan.csv", b"type,direction,amount\nPO,in,5\n")
+        assert exc.value.status_code == 400
+        with pytest.raises(HTTPException):
+            import_planned_items(db, company.id, "plan.txt", _csv("PO,in,5,2026-03-10,A,"))
+
+    def test_error_list_is_capped(self, db, company):
+        lines = [f"PO,in,x,2026-03-10,A{i}," for i in range(IMPORT_ERROR_LIMIT + 50)]
+        result = import_planned_items(db, company.id, "plan.csv", _csv(*lines))
+        assert result.rejected == IMPORT_ERROR_LIMIT + 50
+        assert len(result.errors) == IMPORT_ERROR_LIMIT
+
+    def test_excel_dates_and_numbers(self, db, company):
+        buffer = BytesIO()
+        pd.DataFrame({
+            "Type": ["INVOICE", None],
+            "Direction": ["out", None],
+            "Amount": [99.9, None],
+            "Due_Date": [pd.Timestamp("2026-04-01"), None],
+            "Counterparty": ["Acme", None],
+        }).to_excel(buffer, index=False)
+
+        result = import_planned_items(db, company.id, "plan.xlsx", buffer.getvalue())
+        db.commit()
+
+        assert (result.inserted, result.rejected) == (1, 0)
+        item = db.query(PlannedCashflowItem).one()
+        assert (item.amount, item.due_date, item.source) == (Decimal("99.90"), date(2026, 4, 1), "excel")
+
+
+class TestPostImportReconciliation:
+    """Test new items matched against existing unmatched transactions"""
+
+    def test_new_items_settle_existing_transactions(self, db, company):
+        db.add_all([
+            Transaction(id="t1", date=date(2026, 3, 12), description="ACME FTR-1", amount=Decimal("500"),
+                        direction="in", company_id=company.id),
+            Transaction(id="t2", date=date(2026, 5, 1), description="X", amount=Decimal("70"),
+                        direction="out", company_id=company.id),
+            PlannedCashflowItem(id="old", type="PO", direction="out", amount=Decimal("70"),
+                                remaining_amount=Decimal("70"), settled_amount=0,
+                                due_date=date(2026, 5, 2), status="OPEN", company_id=company.id),
+        ])
+        db.commit()
+
+        content = _csv(
+            "INVOICE,in,500,2026-03-10,Acme,FTR-1",
+            "INVOICE,in,500,2026-06-10,Acme,FTR-2",
+        )
+        result = import_planned_items(db, company.id, "plan.csv", content)
+        db.commit()
+
+        assert (result.inserted, result.auto_matched) == (2, 1)
+        match = db.query(PlannedMatch).one()
+        item = db.get(PlannedCashflowItem, match.planned_item_id)
+        assert (match.transaction_id, item.reference_no, item.status) == ("t1", "FTR-1", "SETTLED")
+        # Mevcut açık kalemler bu işte eşleştirilmez
+        assert db.get(PlannedCashflowItem, "old").status == "OPEN"
+
+    def test_existing_open_item_keeps_match_ambiguous(self, db, company):
+        db.add_all([
+            Transaction(id="t1", date=date(2026, 3, 12), description="Ödeme", amount=Decimal("500"),
+                        direction="in", company_id=company.id),
+            PlannedCashflowItem(id="old", type="INVOICE", direction="in", amount=Decimal("500"),
+                                remaining_amount=Decimal("500"), settled_amount=0,
+                                due_date=date(2026, 3, 11), status="OPEN", company_id=company.id),
+        ])
+        db.commit()
+
+        result = import_planned_items(db, company.id, "plan.csv", _csv("INVOICE,in,500,2026-03-10,Acme,"))
+        db.commit()
+
+        # Aynı tutarda iki açık kalem: auto-match gibi eşleştirme yapılmaz
+        assert (result.inserted, result.auto_matched) == (1, 0)
+        assert db.query(PlannedMatch).count() == 0
+        assert db.get(PlannedCashflowItem, "old").status == "OPEN"
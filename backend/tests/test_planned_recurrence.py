@@ -0,0 +1,177 @@
+# backend/tests/test_planned_recurrence.py
+
+from datetime import date
+from decimal import Decimal
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.planned_recurrence import PlannedRecurrence
+from app.models.transaction import Transaction
+from app.services.auto_match import auto_match_transaction
+from app.services.combination_match import confirm_allocations, propose_for_transaction
+from app.services.match_candidates import suggest_matches
+from app.services.matching_index import get_matching_index
+from app.services.monte_carlo_forecast import load_planned_flows
+from app.services.planned_recurrence import (
+    RecurrenceRule,
+    expand_occurrences,
+    find_open_occurrence,
+    occurrence_dates,
+    occurrence_id,
+    parse_occurrence_id,
+    resolve_planned_item_id,
+)
+from app.services.reconciliation import reconcile_company
+
+
+def _rule(frequency="MONTHLY", start=date(2026, 1, 31), interval=1, end=None, count=None):
+    return RecurrenceRule(
+        id="r1", type="OTHER", direction="out", amount=Decimal("15000"), counterparty="Ev sahibi",
+        reference_no=None, frequency=frequency, interval=interval, start_date=start,
+        end_date=end, occurrence_count=count,
+    )
+
+
+def _add_rule(db, company, rule_id="r1", amount="15000", start=date(2026, 1, 5), **kwargs):
+    db.add(PlannedRecurrence(id=rule_id, type="OTHER", direction="out", amount=Decimal(amount),
+                             counterparty="Ev sahibi", frequency=kwargs.pop("frequency", "MONTHLY"),
+                             interval=1, start_date=start, status="ACTIVE", company_id=company.id, **kwargs))
+    db.commit()
+
+
+class TestOccurrenceDates:
+    """Test lazy schedule expansion"""
+
+    def test_monthly_clamps_to_month_end(self):
+        dates = [d for _, d in occurrence_dates(_rule(), None, date(2026, 4, 30))]
+        assert dates == [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)]
+
+    def test_window_starts_at_first_index_inside(self):
+        rule = _rule(start=date(2020, 1, 15))
+        assert list(occurrence_dates(rule, date(2026, 3, 1), date(2026, 4, 20))) == [
+            (74, date(2026, 3, 15)), (75, date(2026, 4, 15)),
+        ]
+
+    def test_weekly_and_custom_intervals(self):
+        weekly = _rule("WEEKLY", start=date(2026, 1, 1), interval=2)
+        assert [d for _, d in occurrence_dates(weekly, date(2026, 1, 10), date(2026, 2, 1))] == [
+            date(2026, 1, 15), date(2026, 1, 29),
+        ]
+        custom = _rule("CUSTOM", start=date(2026, 1, 1), interval=10)
+        assert [i for i, _ in occurrence_dates(custom, date(2026, 1, 2), date(2026, 1, 31))] == [1, 2, 3]
+
+    def test_end_date_and_count_bound_the_schedule(self):
+        assert len(list(occurrence_dates(_rule(count=3), None, date(2030, 1, 1)))) == 3
+        assert len(list(occurrence_dates(_rule(end=date(2026, 3, 30)), None, date(2030, 1, 1)))) == 2
+
+    def test_occurrence_id_roundtrip(self):
+        assert parse_occurrence_id(occurrence_id("a:b", 7)) == ("a:b", 7)
+        assert parse_occurrence_id("3f2c-real-id") is None
+
+
+class TestMaterialization:
+    """Test occurrences turning into rows only when matched"""
+
+    def test_resolve_materializes_once(self, db, company):
+        _add_rule(db, company)
+        virtual_id = occurrence_id("r1", 2)
+
+        item_id = resolve_planned_item_id(db, company.id, virtual_id)
+        db.commit()
+        item = db.get(PlannedCashflowItem, item_id)
+        assert (item.due_date, item.recurrence_id, item.occurrence_index) == (date(2026, 3, 5), "r1", 2)
+        assert resolve_planned_item_id(db, company.id, virtual_id) == item_id
+
+        dates = [o.due_date for o in expand_occurrences(db, company.id, None, date(2026, 4, 30))]
+        assert dates == [date(2026, 1, 5), date(2026, 2, 5), date(2026, 4, 5)]
+
+    def test_auto_match_materializes_occurrence(self, db, company, make_tx):
+        _add_rule(db, company)
+        index = get_matching_index(db, company.id)
+
+        tx = make_tx("t1", "15000", on=date(2026, 2, 6), description="KIRA", commit=True)
+        created = auto_match_transaction(db, tx, company.id)
+        assert len(created) == 1
+        item = db.get(PlannedCashflowItem, created[0].planned_item_id)
+        assert (item.occurrence_index, item.status, float(item.remaining_amount)) == (1, "SETTLED", 0)
+        assert get_matching_index(db, company.id) is index
+
+        # Aynı ay ikinci ödeme: oluşum artık satır, tekrar eşleşmez; sonraki ay eşleşir
+        tx = make_tx("t2", "15000", on=date(2026, 2, 6), description="KIRA", commit=True)
+        assert auto_match_transaction(db, tx, company.id) == []
+        tx = make_tx("t3", "15000", on=date(2026, 3, 4), description="KIRA", commit=True)
+        created = auto_match_transaction(db, tx, company.id)
+        assert db.get(PlannedCashflowItem, created[0].planned_item_id).occurrence_index == 2
+        assert db.query(PlannedMatch).count() == 2
+
+    def test_cancelled_rule_stops_expanding(self, db, company, make_tx):
+        _add_rule(db, company)
+        db.get(PlannedRecurrence, "r1").status = "CANCELLED"
+        db.commit()
+
+        assert list(expand_occurrences(db, company.id, None, date(2026, 6, 1))) == []
+        tx = make_tx("t1", "15000", on=date(2026, 2, 5), description="KIRA", commit=True)
+        assert auto_match_transaction(db, tx, company.id) == []
+
+
+class TestMatchingIntegration:
+    """Test reconciliation, suggestions and proposals seeing occurrences"""
+
+    def test_reconcile_settles_past_occurrences(self, db, company, make_tx):
+        # İşlemler kural oluşturulmadan önce vardı
+        make_tx("t1", "15000", on=date(2026, 1, 6), description="KIRA", commit=True)
+        make_tx("t2", "15000", on=date(2026, 2, 4), description="KIRA", commit=True)
+        _add_rule(db, company)
+
+        dry = reconcile_company(db, company.id, dry_run=True)
+        assert sorted(m["planned_item_id"] for m in dry.matches) == [occurrence_id("r1", 0), occurrence_id("r1", 1)]
+
+        result = reconcile_company(db, company.id)
+        db.commit()
+        items = {m["transaction_id"]: db.get(PlannedCashflowItem, m["planned_item_id"]) for m in result.matches}
+        assert {tx_id: (i.occurrence_index, i.status) for tx_id, i in items.items()} == {
+            "t1": (0, "SETTLED"), "t2": (1, "SETTLED"),
+        }
+        assert db.get(Transaction, "t1").match_status == "MATCHED"
+        assert [o.index for o in expand_occurrences(db, company.id, None, date(2026, 3, 31))] == [2]
+
+    def test_suggestions_for_occurrence(self, db, company, make_tx):
+        _add_rule(db, company)
+        make_tx("t1", "15000", on=date(2026, 2, 6), description="KIRA", commit=True)
+
+        occurrence = find_open_occurrence(db, company.id, occurrence_id("r1", 1))
+        suggestions = suggest_matches(db, company.id, occurrence)
+        assert suggestions[0]["transaction_id"] == "t1"
+
+    def test_proposal_across_two_rules(self, db, company, make_tx):
+        _add_rule(db, company, "r1")
+        _add_rule(db, company, "r2", amount="5000")
+        tx = make_tx("t1", "20000", on=date(2026, 1, 6), description="KIRA", commit=True)
+
+        proposal = propose_for_transaction(db, company.id, tx).proposals[0]
+        allocations = list(proposal.allocations)
+        assert sorted(a["planned_item_id"] for a in allocations) == [occurrence_id("r1", 0), occurrence_id("r2", 0)]
+
+        confirm_allocations(db, company.id, allocations)
+        db.commit()
+        assert db.get(Transaction, "t1").match_status == "MATCHED"
+        assert db.query(PlannedCashflowItem).filter(PlannedCashflowItem.status == "SETTLED").count() == 2
+
+
+class TestForecastIntegration:
+    """Test forecasts treating occurrences like planned items"""
+
+    def test_planned_flows_include_occurrences(self, db, company, make_planned):
+        _add_rule(db, company, start=date(2026, 3, 20), occurrence_count=12)
+        make_planned("p1", "500", direction="in", on=date(2026, 3, 25), commit=True)
+
+        days, amounts, directions = load_planned_flows(db, company.id, date(2026, 3, 15), 60)
+        assert sorted(zip(days.tolist(), amounts.tolist())) == [(5, -15000.0), (10, 500.0), (36, -15000.0)]
+        assert sorted(directions) == ["in", "out", "out"]
+
+    def test_stale_past_occurrences_are_not_obligations(self, db, company):
+        # Bir yıl önce başlamış kural: 30 günden eski eşleşmemiş oluşumlar borç sayılmaz
+        _add_rule(db, company, start=date(2025, 1, 5))
+
+        days, amounts, _ = load_planned_flows(db, company.id, date(2026, 3, 15), 30)
+        assert sorted(zip(days.tolist(), amounts.tolist())) == [(0, -15000.0), (21, -15000.0)]
@@ -0,0 +1,86 @@
+# backend/tests/test_planned_settlement.py
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.services.data_version import get_data_version
+from app.services.planned_settlement import (
+    apply_settlement_delta,
+    apply_settlement_deltas,
+    recompute_planned_items,
+)
+
+DAY = date(2026, 6, 1)
+
+
+@pytest.fixture
+def ledger_base():
+    return DAY
+
+
+def _state(db, item_id):
+    item = db.get(PlannedCashflowItem, item_id)
+    return item.status, float(item.settled_amount), float(item.remaining_amount)
+
+
+class TestSettlementDeltas:
+    """Test signed deltas applied in SQL"""
+
+    def test_open_partial_settled_and_back(self, db, company, make_planned):
+        make_planned("p1", "1000")
+        db.commit()
+        version = get_data_version(company.id)
+
+        apply_settlement_delta(db, company.id, "p1", Decimal("400"))
+        assert _state(db, "p1") == ("PARTIAL", 400, 600)
+        # Versiyon yazım commit edilince artar
+        assert get_data_version(company.id) == version
+        db.commit()
+        assert get_data_version(company.id) != version
+
+        apply_settlement_delta(db, company.id, "p1", Decimal("599.997"))
+        assert _state(db, "p1") == ("SETTLED", 1000, 0)
+
+        apply_settlement_delta(db, company.id, "p1", Decimal("-1000"))
+        assert _state(db, "p1") == ("OPEN", 0, 1000)
+
+    def test_batch_does_not_commit(self, db, company, make_planned):
+        make_planned("p1", "100")
+        make_planned("p2", "200")
+        make_planned("other", "50")
+        db.commit()
+
+        assert apply_settlement_deltas(db, company.id, {"p1": 100, "p2": 50, "missing": 1}) == 2
+        assert _state(db, "p1")[0] == "SETTLED"
+        assert _state(db, "p2") == ("PARTIAL", 50, 150)
+        assert _state(db, "other") == ("OPEN", 0, 50)
+
+        db.rollback()
+        assert _state(db, "p1") == ("OPEN", 0, 100)
+
+    def test_other_company_is_untouched(self, db, company, make_planned):
+        make_planned("p1", "100")
+        db.commit()
+        assert apply_settlement_delta(db, company.id + 1, "p1", 100) == 0
+        assert _state(db, "p1")[0] == "OPEN"
+
+
+class TestRecomputePlannedItems:
+    """Test the full recompute from planned_matches"""
+
+    def test_recompute_from_matches(self, db, company, make_tx, make_planned):
+        make_planned("p1", "300")
+        make_planned("p2", "300")
+        make_tx("t1", "300")
+        for item_id, amount in (("p1", "120"), ("p2", "300")):
+            db.add(PlannedMatch(company_id=company.id, planned_item_id=item_id, transaction_id="t1",
+                                matched_amount=Decimal(amount), match_type="MANUAL"))
+        db.commit()
+
+        assert recompute_planned_items(db, company.id) == 2
+        assert _state(db, "p1") == ("PARTIAL", 120, 180)
+        assert _state(db, "p2") == ("SETTLED", 300, 0)
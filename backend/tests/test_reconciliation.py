@@ -0,0 +1,90 @@
+# backend/tests/test_reconciliation.py
+
+from decimal import Decimal
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.data_version import get_data_version
+from app.services.reconciliation import reconcile_company
+from app.services.transaction_match_state import refresh_transaction_match_state
+
+
+class TestReconcileCompany:
+    """Test the set-wise auto-match run"""
+
+    def test_exact_match_settles_item(self, db, company, make_tx, make_planned):
+        make_planned("p1", "1500.00", days=0)
+        make_tx("t1", "1500.00", days=3)
+        make_tx("t2", "1500.00", days=3, direction="in")   # wrong direction
+        make_tx("t3", "1499.99", days=0)                   # amount differs
+        db.commit()
+        version = get_data_version(company.id)
+
+        result = reconcile_company(db, company.id)
+        db.commit()
+
+        assert [(m["planned_item_id"], m["transaction_id"]) for m in result.matches] == [("p1", "t1")]
+        item = db.get(PlannedCashflowItem, "p1")
+        db.refresh(item)
+        assert item.status == "SETTLED"
+        assert float(item.remaining_amount) == 0
+        assert float(item.settled_amount) == 1500
+        match = db.query(PlannedMatch).one()
+        assert match.match_type == "AUTO"
+        tx = db.get(Transaction, "t1")
+        db.refresh(tx)
+        assert (tx.match_status, float(tx.matched_amount)) == ("MATCHED", 1500)
+        assert get_data_version(company.id) != version
+
+    def test_window_is_seven_days(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=0)
+        make_tx("t1", "100", days=8)
+        db.commit()
+        assert reconcile_company(db, company.id).matches == []
+
+    def test_equal_distance_is_ambiguous(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=-2)
+        make_planned("p2", "100", days=2)
+        make_tx("t1", "100", days=0)
+        db.commit()
+
+        result = reconcile_company(db, company.id)
+        assert result.matches == []
+        assert result.ambiguous == 1
+
+    def test_reference_first(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=0)
+        make_planned("p2", "100", days=5, reference_no="INV-77")
+        make_tx("t1", "100", days=0, description="FATURA INV-77 ODEMESI")
+        db.commit()
+
+        result = reconcile_company(db, company.id)
+        assert [m["planned_item_id"] for m in result.matches] == ["p2"]
+
+    def test_each_item_and_transaction_used_once(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=0)
+        make_tx("t1", "100", days=-1)
+        make_tx("t2", "100", days=1)
+        make_tx("t3", "250", days=0)
+        make_planned("p3", "250", days=0)
+        db.add(PlannedMatch(company_id=company.id, planned_item_id="p3", transaction_id="t3",
+                            matched_amount=Decimal("1"), match_type="MANUAL"))
+        db.flush()
+        refresh_transaction_match_state(db, company.id, ["t3"])
+        db.commit()
+
+        result = reconcile_company(db, company.id)
+        # t1 tarih sırasında önce gelir; t3 zaten eşleşmiş
+        assert [(m["planned_item_id"], m["transaction_id"]) for m in result.matches] == [("p1", "t1")]
+
+    def test_dry_run_writes_nothing(self, db, company, make_tx, make_planned):
+        make_planned("p1", "100", days=0)
+        make_tx("t1", "100", days=0)
+        db.commit()
+
+        result = reconcile_company(db, company.id, dry_run=True)
+        db.commit()
+        assert len(result.matches) == 1
+        assert db.query(PlannedMatch).count() == 0
+        assert db.get(PlannedCashflowItem, "p1").status == "OPEN"
@@ -0,0 +1,102 @@
+# backend/tests/test_transaction_match_state.py
+
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.models.planned_item import PlannedCashflowItem
+from app.models.planned_match import PlannedMatch
+from app.models.transaction import Transaction
+from app.services.auto_match import auto_match_transaction
+from app.services.transaction_match_state import (
+    backfill_match_state,
+    ensure_match_state_columns,
+    refresh_transaction_match_state,
+)
+
+DAY = date(2026, 4, 1)
+
+
+def _seed(db, company):
+    db.add(Transaction(id="t1", date=DAY, description="ODEME", amount=Decimal("300"),
+                       direction="out", company_id=company.id))
+    for item_id in ("p1", "p2"):
+        db.add(PlannedCashflowItem(id=item_id, type="INVOICE", direction="out", amount=Decimal("300"),
+                                   remaining_amount=Decimal("300"), settled_amount=0, due_date=DAY,
+                                   status="OPEN", company_id=company.id))
+    db.commit()
+
+
+def _match(db, company, item_id, amount):
+    m = PlannedMatch(company_id=company.id, planned_item_id=item_id, transaction_id="t1",
+                     matched_amount=Decimal(amount), match_type="MANUAL")
+    db.add(m)
+    db.flush()
+    return m
+
+
+class TestRefreshMatchState:
+    """Test matched_amount / match_status derivation"""
+
+    def test_status_follows_matches(self, db, company):
+        _seed(db, company)
+        tx = db.get(Transaction, "t1")
+        assert tx.match_status == "UNMATCHED"
+        assert float(tx.matched_amount) == 0
+
+        first = _match(db, company, "p1", "100")
+        refresh_transaction_match_state(db, company.id, ["t1"])
+        assert (tx.match_status, float(tx.matched_amount)) == ("PARTIAL", 100)
+
+        _match(db, company, "p2", "200")
+        refresh_transaction_match_state(db, company.id, ["t1"])
+        assert (tx.match_status, float(tx.matched_amount)) == ("MATCHED", 300)
+
+        db.delete(first)
+        db.flush()
+        refresh_transaction_match_state(db, company.id, ["t1"])
+        assert (tx.match_status, float(tx.matched_amount)) == ("PARTIAL", 200)
+
+    def test_auto_match_sets_state(self, db, company):
+        _seed(db, company)
+        db.delete(db.get(PlannedCashflowItem, "p2"))
+        db.commit()
+
+        tx = db.get(Transaction, "t1")
+        assert len(auto_match_transaction(db, tx, company.id)) == 1
+        db.refresh(tx)
+        assert tx.match_status == "MATCHED"
+
+    def test_backfill(self, db, company):
+        _seed(db, company)
+        _match(db, company, "p1", "50")
+        db.commit()
+        assert db.get(Transaction, "t1").match_status == "UNMATCHED"
+
+        assert backfill_match_state(db, company.id) == 1
+        db.commit()
+        db.expire_all()
+        assert db.get(Transaction, "t1").match_status == "PARTIAL"
+
+
+class TestEnsureColumns:
+    """Test adding the columns to an existing table"""
+
+    def test_adds_and_fills_missing_columns(self):
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE transactions (id VARCHAR PRIMARY KEY, amount NUMERIC(12, 2))"))
+            conn.execute(text("CREATE TABLE planned_matches (id INTEGER PRIMARY KEY, transaction_id VARCHAR, "
+                              "matched_amount NUMERIC(12, 2))"))
+            conn.execute(text("INSERT INTO transactions VALUES ('t1', 10), ('t2', 10), ('t3', 10)"))
+            conn.execute(text("INSERT INTO planned_matches VALUES (1, 't1', 10), (2, 't2', 4)"))
+
+        assert ensure_match_state_columns(engine) == ["matched_amount", "match_status"]
+        assert ensure_match_state_columns(engine) == []
+        columns = {col["name"] for col in inspect(engine).get_columns("transactions")}
+        assert {"matched_amount", "match_status"} <= columns
+        # Eski eşleşmeler backfill script'i beklemeden görünür
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT id, match_status FROM transactions ORDER BY id")).all()
+        assert rows == [("t1", "MATCHED"), ("t2", "PARTIAL"), ("t3", "UNMATCHED")]
@@ -0,0 +1,119 @@
+# backend/tests/test_transaction_search.py
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.transaction import Transaction
+from app.services.transaction_search import (
+    build_search_query,
+    ensure_search_index,
+    search_tokens,
+    search_transactions,
+)
+
+
+@pytest.fixture
+def indexed(db, company):
+    # Index is created on an existing table: rows written before must be backfilled
+    db.add(Transaction(id="t-old", date=date(2026, 1, 2), description="KIRTASİYE ALIŞVERİŞİ",
+                       amount=Decimal("120"), direction="out", company_id=company.id))
+    db.commit()
+    backend = ensure_search_index(db.get_bind())
+    rows = [
+        ("t-1", "ÖDEME ACME LTD FATURA INV-2041", "out", "5000"),
+        ("t-2", "EFT TAHSİLAT ACME LTD", "in", "7500"),
+        ("t-3", "POS SHELL İSTANBUL", "out", "900"),
+        ("t-4", "Kırtasiye ofis malzemesi", "out", "250"),
+    ]
+    for tx_id, desc, direction, amount in rows:
+        db.add(Transaction(id=tx_id, date=date(2026, 2, 1), description=desc,
+                           amount=Decimal(amount), direction=direction, company_id=company.id))
+    db.commit()
+    return backend
+
+
+class TestSearchTokens:
+    """Test query folding"""
+
+    def test_turkish_folding(self):
+        assert search_tokens("Ödeme İSTANBUL kırtasiye") == ["odeme", "istanbul", "kirtasiye"]
+
+    def test_punctuation_split(self):
+        assert search_tokens("INV-2041, acme!") == ["inv", "2041", "acme"]
+
+
+class TestFts5Search:
+    """Test SQLite FTS5 backend"""
+
+    def test_backend_is_fts5(self, indexed):
+        assert indexed == "fts5"
+
+    def test_diacritic_insensitive_prefix_match(self, db, company, indexed):
+        ids = [tx.id for tx, _ in search_transactions(db, company.id, "odem acme", backend=indexed)]
+        assert ids == ["t-1"]
+
+    def test_backfill_and_dotless_i(self, db, company, indexed):
+        ids = {tx.id for tx, _ in search_transactions(db, company.id, "kirtasiye", backend=indexed)}
+        assert ids == {"t-old", "t-4"}
+
+    def test_filters_and_company_scope(self, db, company, indexed):
+        hits = search_transactions(db, company.id, "acme", filters=[Transaction.direction == "in"],
+                                   backend=indexed)
+        assert [tx.id for tx, _ in hits] == ["t-2"]
+        assert search_transactions(db, company.id + 1, "acme", backend=indexed) == []
+
+    def test_index_follows_updates_and_deletes(self, db, company, indexed):
+        tx = db.get(Transaction, "t-3")
+        tx.description = "POS OPET ANKARA"
+        db.commit()
+        assert search_transactions(db, company.id, "shell", backend=indexed) == []
+        assert [t.id for t, _ in search_transactions(db, company.id, "opet", backend=indexed)] == ["t-3"]
+
+        db.delete(tx)
+        db.commit()
+        assert search_transactions(db, company.id, "opet", backend=indexed) == []
+
+    def test_index_survives_rowid_renumbering(self, db, company, indexed):
+        # VACUUM veya tablo yeniden kurulumu String PK'li tablonun örtük rowid'lerini değiştirebilir
+        db.connection().exec_driver_sql("UPDATE transactions SET rowid = rowid + 1000")
+        db.commit()
+
+        assert [t.id for t, _ in search_transactions(db, company.id, "shell", backend=indexed)] == ["t-3"]
+        ids = {t.id for t, _ in search_transactions(db, company.id, "kirtasiye", backend=indexed)}
+        assert ids == {"t-old", "t-4"}
+
+    def test_legacy_index_is_rebuilt(self, db, company):
+        db.add(Transaction(id="t-1", date=date(2026, 2, 1), description="ÖDEME ACME",
+                           amount=Decimal("10"), direction="out", company_id=company.id))
+        db.commit()
+        db.connection().exec_driver_sql(
+            "CREATE VIRTUAL TABLE transactions_fts USING fts5("
+            "description, content='transactions', content_rowid='rowid')"
+        )
+        db.commit()
+
+        assert ensure_search_index(db.get_bind()) == "fts5"
+        ids = [t.id for t, _ in search_transactions(db, company.id, "odeme", backend="fts5")]
+        assert ids == ["t-1"]
+
+
+class TestFallbacks:
+    """Test LIKE fallback and Postgres query shape"""
+
+    def test_like_fallback(self, db, company, indexed):
+        ids = {tx.id for tx, _ in search_transactions(db, company.id, "acme ltd", backend="like")}
+        assert ids == {"t-1", "t-2"}
+
+    def test_postgres_query_compiles(self, db, company):
+        q = build_search_query(db, company.id, "Ödeme acme", backend="postgres_trgm")
+        sql = str(q.statement.compile(dialect=postgresql.dialect()))
+        assert "to_tsvector" in sql
+        folded = "lower(translate(transactions.description, 'ÇĞİIÖŞÜÂÎÛçğıöşüâîû', 'cgiiosuaiucgiosuaiu'))"
+        # Sorgu, index ifadesiyle aynı (parametresiz) katlama ifadesini kullanır
+        assert f"to_tsvector('simple', {folded})" in sql
+        assert f"similarity({folded}" in sql
+        params = q.statement.compile(dialect=postgresql.dialect()).params
+        assert "odeme:* & acme:*" in params.values()
@@ -0,0 +1,81 @@
+# backend/tests/test_window_aggregates.py
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+from app.models.transaction import Transaction
+from app.services.data_version import get_data_version
+from app.services.window_aggregates import (
+    resolve_window,
+    comparison_window,
+    compute_window_aggregates,
+    get_window_aggregates,
+    clear_window_cache,
+)
+
+TODAY = date(2026, 3, 15)
+
+
+def add_tx(db, company_id, days_ago, amount, direction, category):
+    db.add(Transaction(
+        date=TODAY - timedelta(days=days_ago),
+        description="tx",
+        amount=Decimal(str(amount)),
+        direction=direction,
+        category=category,
+        company_id=company_id,
+    ))
+
+
+class TestWindows:
+    """Test standard window resolution"""
+
+    def test_standard_windows(self):
+        assert resolve_window("last30", TODAY) == (TODAY - timedelta(days=30), TODAY)
+        assert resolve_window("this_month", TODAY) == (date(2026, 3, 1), TODAY)
+        assert resolve_window("all", TODAY) == (None, None)
+        assert resolve_window("bogus", TODAY) == resolve_window("last30", TODAY)
+
+    def test_comparison_window_precedes_start(self):
+        start, _ = resolve_window("last90", TODAY)
+        prev_start, prev_end = comparison_window("last90", TODAY)
+        assert prev_end == start - timedelta(days=1)
+        assert (prev_end - prev_start).days == 29
+
+
+class TestWindowAggregates:
+    """Test single-scan aggregation and caching"""
+
+    def test_all_windows_in_one_scan(self, db, company):
+        add_tx(db, company.id, 5, 1000, "in", "POS_GELIRI")
+        add_tx(db, company.id, 5, 300, "out", "KIRA")
+        add_tx(db, company.id, 40, 200, "out", "KIRA")
+        add_tx(db, company.id, 400, 50, "out", None)
+        db.commit()
+
+        agg = compute_window_aggregates(db, company.id, TODAY)
+
+        assert agg["last30"]["income"] == 1000
+        assert agg["last30"]["expense"] == 300
+        assert agg["last30:prev"]["expense"] == 200
+        assert agg["last90"]["by_category"]["KIRA"] == {"in": 0.0, "out": 500.0}
+        assert agg["all"]["net"] == 1000 - 550
+        assert agg["all"]["by_category"]["UNCATEGORIZED"]["out"] == 50
+        assert "POS_GELIRI" not in agg["last30:prev"]["by_category"]
+
+    def test_cache_invalidated_by_write(self, db, company):
+        clear_window_cache()
+        add_tx(db, company.id, 1, 100, "in", "POS_GELIRI")
+        db.commit()
+
+        first = get_window_aggregates(db, company.id, TODAY)
+        assert get_window_aggregates(db, company.id, TODAY) is first
+
+        version = get_data_version(company.id)
+        add_tx(db, company.id, 1, 50, "in", "POS_GELIRI")
+        db.commit()
+        assert get_data_version(company.id) != version
+
+        second = get_window_aggregates(db, company.id, TODAY)
+        assert second is not first
+        assert second["last30"]["income"] == 150
@@ -188,7 +188,7 @@ function App() {
 
       // 2) Transactions
       let txUrl = `/transactions`;
-      const tParams = [];
+      const tParams = ["all=true"];
       if (startDateParam && endDateParam) {
         tParams.push(`start_date=${startDateParam}`, `end_date=${endDateParam}`);
       }
@@ -1557,7 +1557,7 @@ function DataManagementView({ onDataChanged, transactions, loading, error, token
       setPlannedLoading(true);
       setPlannedError(null);
       const token = localStorage.getItem("auth_token") || "";
-      const res = await apiFetch(`/planned`, {}, token);
+      const res = await apiFetch(`/planned?all=true`, {}, token);
       if (!res.ok) {
         throw new Error("Planli nakit kayıtları alınamadı");
       }
@@ -1912,9 +1912,9 @@ function DataManagementView({ onDataChanged, transactions, loading, error, token
       const data = await res.json();
       setPlannedUploadMessage(
         `Yükleme tamamlandı. Yeni eklenen: ${data.inserted}${
-          data.errors && data.errors.length > 0
-            ? `, hatalı satır: ${data.errors.length}`
-            : ""
+          data.auto_matched ? `, otomatik eşleşen: ${data.auto_matched}` : ""
+        }${
+          data.rejected > 0 ? `, hatalı satır: ${data.rejected}` : ""
         }`
       );
       e.target.reset();
@@ -38,7 +38,7 @@ export default function MatchingPanel({ data, token, onMatchDeleted }) {
 
     try {
       // Tüm matches'i getir
-      const res = await fetch(`${API_BASE}/matches`, {
+      const res = await fetch(`${API_BASE}/matches?all=true`, {
         headers: {
           "Authorization": `Bearer ${token}`,
         },
@@ -57,7 +57,7 @@ export default function MatchingPanel({ data, token, onMatchDeleted }) {
           );
         } else if (item.id === "partial") {
           // Kısmi eşleşenleri getir (PARTIAL status'lu planned items)
-          const pRes = await fetch(`${API_BASE}/planned`, {
+          const pRes = await fetch(`${API_BASE}/planned?all=true`, {
             headers: { "Authorization": `Bearer ${token}` },
           });
           if (pRes.ok) {
@@ -66,7 +66,7 @@ export default function MatchingPanel({ data, token, onMatchDeleted }) {
           }
         } else if (item.id === "overdue" || item.id === "upcoming") {
           // Overdue ve upcoming için planned items'ı göster
-          const pRes = await fetch(`${API_BASE}/planned`, {
+          const pRes = await fetch(`${API_BASE}/planned?all=true`, {
             headers: { "Authorization": `Bearer ${token}` },
           });
           if (pRes.ok) {
@@ -1,7 +1,7 @@
 import { apiFetch, API_ENDPOINTS } from '../../../api/client';
 
 export async function getPlannedItems(token) {
-  return apiFetch(API_ENDPOINTS.PLANNED, {}, token);
+  return apiFetch(`${API_ENDPOINTS.PLANNED}?all=true`, {}, token);
 }
 
 export async function uploadPlannedItems(file, token) {
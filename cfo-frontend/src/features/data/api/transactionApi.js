@@ -10,7 +10,7 @@ export async function uploadTransactions(file, token) {
 }
 
 export async function getTransactions(token) {
-  return apiFetch(API_ENDPOINTS.TRANSACTIONS, {}, token);
+  return apiFetch(`${API_ENDPOINTS.TRANSACTIONS}?all=true`, {}, token);
 }
 
 export async function deleteTransaction(txId, token) {
@@ -26,7 +26,7 @@ export default function DataManagement() {
     try {
       const API_BASE = import.meta.env.VITE_API_URL || "http://localhost:8000";
       const response = await fetch(
-        `${API_BASE}/transactions`,
+        `${API_BASE}/transactions?all=true`,
         { headers }
       );
       if (response.ok) {
@@ -42,7 +42,7 @@ export default function DataManagement() {
     try {
       const API_BASE = import.meta.env.VITE_API_URL || "http://localhost:8000";
       const response = await fetch(
-        `${API_BASE}/planned`,
+        `${API_BASE}/planned?all=true`,
         { headers }
       );
       if (response.ok) {
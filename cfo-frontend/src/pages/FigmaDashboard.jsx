@@ -68,7 +68,7 @@ export default function FigmaDashboard({ summary, cashPosition, matchHealth, fix
     setMatchingDetails([]);
 
     try {
-      const res = await fetch(`${API_BASE}/matches`, {
+      const res = await fetch(`${API_BASE}/matches?all=true`, {
         headers: {
           "Authorization": `Bearer ${token}`,
         },
@@ -87,7 +87,7 @@ export default function FigmaDashboard({ summary, cashPosition, matchHealth, fix
           );
         } else if (item.id === "partial") {
           // PARTIAL = status === "PARTIAL" olan planned kalemler
-          const pRes = await fetch(`${API_BASE}/planned`, {
+          const pRes = await fetch(`${API_BASE}/planned?all=true`, {
             headers: { "Authorization": `Bearer ${token}` },
           });
           if (pRes.ok) {
@@ -95,7 +95,7 @@ export default function FigmaDashboard({ summary, cashPosition, matchHealth, fix
             filtered = planned.filter(p => p.status === "PARTIAL");
           }
         } else if (item.id === "overdue" || item.id === "upcoming") {
-          const pRes = await fetch(`${API_BASE}/planned`, {
+          const pRes = await fetch(`${API_BASE}/planned?all=true`, {
             headers: { "Authorization": `Bearer ${token}` },
           });
           if (pRes.ok) {
@@ -157,7 +157,7 @@ export default function FigmaDashboard({ summary, cashPosition, matchHealth, fix
   async function fetchFilteredKpis(filter) {
     setFilteredKpis(prev => ({ ...prev, loading: true }));
     try {
-      const res = await fetch(`${API_BASE}/transactions`, {
+      const res = await fetch(`${API_BASE}/transactions?all=true`, {
         headers: { "Authorization": `Bearer ${token}` },
       });
       if (!res.ok) throw new Error("Transactions yüklenemedi");